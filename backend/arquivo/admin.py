@@ -0,0 +1,15 @@
+from django.contrib import admin
+from .models import MesArquivado
+
+# As tabelas de arquivo são somente leitura e consultadas pelos endpoints de
+# relatórios; o admin mostra apenas o catálogo dos meses arquivados.
+
+
+@admin.register(MesArquivado)
+class MesArquivadoAdmin(admin.ModelAdmin):
+    list_display = ("tabela", "mes", "registros", "arquivado_em")
+    list_filter = ("tabela",)
+    readonly_fields = ("tabela", "mes", "registros", "arquivado_em")
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,168 @@
+# arquivo/arquivamento.py
+"""
+Movimentação de registros antigos para o arquivo
+
+Prestações (pela `data`) e pontos (pelo mês local de `created_at`) anteriores
+ao corte — primeiro dia do mês atual menos ARQUIVO_HORIZONTE_MESES — são
+copiados para as tabelas de arquivo e apagados da tabela quente, mês a mês e
+em lotes por chave primária, cada lote em uma transação.
+
+A remoção da tabela quente é feita sem coletar relações nem enviar
+post_delete: os derivados continuam valendo para os registros arquivados
+(o resumo diário de prestações soma também o arquivo e os IntervaloPonto
+apontam para os mesmos ids). O histórico de validação acompanha a prestação.
+
+Prestações que ainda podem mudar ficam na tabela quente, qualquer que seja a
+data: pendentes ou em revisão, aprovadas sem lote de pagamento e as de lotes
+ainda não pagos (o cancelamento devolve essas prestações). Elas são movidas
+na primeira execução depois de rejeitadas ou pagas; o lote é conferido de
+novo dentro da transação, com as linhas travadas.
+Ao fim de cada lote é enviado `registros_arquivados`.
+"""
+from datetime import datetime, time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max, Q
+from django.utils import timezone
+
+from ponto.models import RegistroPonto
+from prestacoes.models import HistoricoValidacao, RegistroPrestacao
+from .models import (
+    HistoricoValidacaoArquivado, MesArquivado, RegistroPontoArquivado, RegistroPrestacaoArquivada
+)
+from .signals import registros_arquivados
+
+HORIZONTE_MESES = getattr(settings, 'ARQUIVO_HORIZONTE_MESES', 6)
+# A sincronização offline aceita pontos de até 30 dias; o horizonte precisa cobrir esse atraso
+HORIZONTE_MINIMO = 2
+TAMANHO_LOTE = 2000
+
+# Prestações que a validação ou o pagamento ainda podem alterar
+PRESTACOES_EM_ANDAMENTO = (
+    Q(validacao_gestor__in=('pendente', 'em_revisao'))
+    | Q(validacao_gestor='aprovada', lote_pagamento__isnull=True)
+    | Q(lote_pagamento__status='gerado')
+)
+
+
+def somar_meses(data, meses):
+    """Primeiro dia do mês `meses` depois (ou antes, se negativo) do mês de `data`"""
+    indice = data.year * 12 + data.month - 1 + meses
+    return data.replace(year=indice // 12, month=indice % 12 + 1, day=1)
+
+
+def corte_padrao(horizonte=HORIZONTE_MESES):
+    """Primeiro dia do mês mais antigo que permanece na tabela quente"""
+    return somar_meses(timezone.localdate(), -horizonte)
+
+
+def _inicio_do_dia(data):
+    return timezone.make_aware(datetime.combine(data, time.min))
+
+
+def _meses_prestacoes(corte):
+    return RegistroPrestacao.objects.filter(data__lt=corte).dates('data', 'month')
+
+
+def _meses_pontos(corte):
+    datas = RegistroPonto.objects.filter(created_at__lt=_inicio_do_dia(corte)).datetimes('created_at', 'month')
+    return [timezone.localdate(data) for data in datas]
+
+
+def _registros_prestacoes(mes, corte):
+    return RegistroPrestacao.objects.filter(
+        data__gte=mes, data__lt=min(somar_meses(mes, 1), corte)
+    ).exclude(PRESTACOES_EM_ANDAMENTO)
+
+
+def _registros_pontos(mes, corte):
+    return RegistroPonto.objects.filter(
+        created_at__gte=_inicio_do_dia(mes),
+        created_at__lt=_inicio_do_dia(min(somar_meses(mes, 1), corte)),
+    )
+
+
+def _copiar(origem, destino, queryset):
+    """Copia as linhas de `queryset` (modelo `origem`) para a tabela de arquivo `destino`"""
+    campos = [campo.attname for campo in origem._meta.concrete_fields]
+    return len(destino.objects.bulk_create(
+        [destino(**linha) for linha in queryset.values(*campos)], batch_size=500
+    ))
+
+
+def _remover(queryset):
+    # Sem Collector: não percorre relações nem envia pre/post_delete
+    queryset._raw_delete(queryset.db)
+
+
+def _arquivar_prestacoes(ids):
+    """Move as prestações `ids` com o histórico; devolve (total, chaves)"""
+    # Validação ou lote gerados depois da seleção dos ids
+    ids = list(
+        RegistroPrestacao.objects.filter(pk__in=ids).exclude(PRESTACOES_EM_ANDAMENTO)
+        .select_for_update(of=('self',)).values_list('pk', flat=True)
+    )
+    historico = HistoricoValidacao.objects.filter(prestacao_id__in=ids)
+    _copiar(HistoricoValidacao, HistoricoValidacaoArquivado, historico)
+    _remover(historico)
+    registros = RegistroPrestacao.objects.filter(pk__in=ids)
+    chaves = set(registros.values_list('funcionario_id', 'data'))
+    total = _copiar(RegistroPrestacao, RegistroPrestacaoArquivada, registros)
+    _remover(registros)
+    return total, chaves
+
+
+def _arquivar_pontos(ids):
+    """Move os pontos `ids`; devolve (total, chaves)"""
+    registros = RegistroPonto.objects.filter(pk__in=ids)
+    chaves = {
+        (funcionario_id, timezone.localdate(created_at))
+        for funcionario_id, created_at in registros.values_list('funcionario_id', 'created_at')
+    }
+    total = _copiar(RegistroPonto, RegistroPontoArquivado, registros)
+    _remover(registros)
+    return total, chaves
+
+
+# tabela -> (modelo quente, meses a arquivar, registros do mês, movimentação do lote)
+TABELAS = {
+    'prestacoes': (RegistroPrestacao, _meses_prestacoes, _registros_prestacoes, _arquivar_prestacoes),
+    'pontos': (RegistroPonto, _meses_pontos, _registros_pontos, _arquivar_pontos),
+}
+
+
+def arquivar(tabela, corte, tamanho_lote=TAMANHO_LOTE, progresso=None):
+    """
+    Move para o arquivo os registros de `tabela` anteriores a `corte`.
+
+    Devolve {mês: registros movidos}. `progresso(mes, total_do_mes)` é chamado
+    após cada lote.
+    """
+    modelo, meses, registros_do_mes, mover = TABELAS[tabela]
+    movidos = {}
+    for mes in meses(corte):
+        registros = registros_do_mes(mes, corte)
+        while True:
+            ids = list(registros.order_by('pk').values_list('pk', flat=True)[:tamanho_lote])
+            if not ids:
+                break
+            with transaction.atomic():
+                total, chaves = mover(ids)
+                catalogo, _ = MesArquivado.objects.get_or_create(tabela=tabela, mes=mes)
+                MesArquivado.objects.filter(pk=catalogo.pk).update(registros=F('registros') + total)
+                registros_arquivados.send(sender=modelo, mes=mes, registros=total, chaves=chaves)
+            movidos[mes] = movidos.get(mes, 0) + total
+            if progresso:
+                progresso(mes, movidos[mes])
+    return movidos
+
+
+def limite_arquivado(tabela):
+    """
+    Primeiro dia depois do último mês arquivado de `tabela`, ou None se nada foi arquivado.
+
+    Consultas que começam a partir desse dia não precisam ler o arquivo.
+    """
+    ultimo = MesArquivado.objects.filter(tabela=tabela).aggregate(ultimo=Max('mes'))['ultimo']
+    return somar_meses(ultimo, 1) if ultimo else None
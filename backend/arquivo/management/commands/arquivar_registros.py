@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from arquivo.arquivamento import HORIZONTE_MESES, HORIZONTE_MINIMO, TABELAS, TAMANHO_LOTE, arquivar, corte_padrao
+
+
+class Command(BaseCommand):
+    help = (
+        'Move prestações e registros de ponto mais antigos que o horizonte para as tabelas '
+        'de arquivo, mês a mês (as fotos ficam no mesmo lugar)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--horizonte-meses', type=int, default=HORIZONTE_MESES,
+            help=f'Meses completos mantidos na tabela quente além do atual (padrão: {HORIZONTE_MESES})'
+        )
+        parser.add_argument('--somente', choices=list(TABELAS), help='Arquiva apenas um dos tipos')
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help='Registros movidos por transação')
+
+    def handle(self, *args, **options):
+        horizonte = options['horizonte_meses']
+        if horizonte < HORIZONTE_MINIMO:
+            raise CommandError(f'O horizonte mínimo é de {HORIZONTE_MINIMO} meses.')
+        if options['lote'] < 1:
+            raise CommandError('O lote deve ser maior que zero.')
+
+        corte = corte_padrao(horizonte)
+        self.stdout.write(f'Arquivando registros anteriores a {corte}.')
+        tabelas = [options['somente']] if options['somente'] else list(TABELAS)
+        for tabela in tabelas:
+            movidos = arquivar(
+                tabela, corte, tamanho_lote=options['lote'],
+                progresso=lambda mes, total: self.stdout.write(f'  {tabela} {mes:%m/%Y}: {total}'),
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f'{sum(movidos.values())} registros de {tabela} arquivados em {len(movidos)} meses.'
+            ))
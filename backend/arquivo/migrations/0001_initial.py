@@ -0,0 +1,130 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:20
+
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('empresas', '0003_gestor_updated_at'),
+        ('funcionarios', '0005_funcionario_nome_busca'),
+        ('localizacao', '0005_localprestacao_raio_metros'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MesArquivado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tabela', models.CharField(choices=[('prestacoes', 'Prestações'), ('pontos', 'Pontos')], max_length=15)),
+                ('mes', models.DateField(help_text='Primeiro dia do mês arquivado')),
+                ('registros', models.PositiveIntegerField(default=0, help_text='Registros movidos para o arquivo')),
+                ('arquivado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Mês Arquivado',
+                'verbose_name_plural': 'Meses Arquivados',
+                'ordering': ['tabela', '-mes'],
+                'constraints': [models.UniqueConstraint(fields=('tabela', 'mes'), name='mes_arquivado_chave_unica')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RegistroPrestacaoArquivada',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('data', models.DateField()),
+                ('horario_chegada', models.TimeField()),
+                ('horario_saida_almoco', models.TimeField(blank=True, null=True)),
+                ('horario_retorno_almoco', models.TimeField(blank=True, null=True)),
+                ('horario_saida', models.TimeField()),
+                ('segundos_trabalhados', models.PositiveIntegerField(default=0, editable=False, help_text='Total trabalhado em segundos (descontado o almoço), mantido a partir dos horários')),
+                ('validacao_local', models.BooleanField(default=False, help_text='Validação no local da prestação')),
+                ('validacao_gestor', models.CharField(choices=[('pendente', 'Pendente'), ('aprovada', 'Aprovada'), ('rejeitada', 'Rejeitada'), ('em_revisao', 'Em Revisão')], default='pendente', max_length=15)),
+                ('valor', models.DecimalField(decimal_places=2, help_text='Valor da prestação de serviço', max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))])),
+                ('observacoes', models.TextField(blank=True)),
+                ('foto_comprovante', models.ImageField(blank=True, null=True, upload_to='prestacoes/%Y/%m/')),
+                ('latitude_chegada', models.DecimalField(blank=True, decimal_places=8, max_digits=10, null=True)),
+                ('longitude_chegada', models.DecimalField(blank=True, decimal_places=8, max_digits=11, null=True)),
+                ('latitude_saida', models.DecimalField(blank=True, decimal_places=8, max_digits=10, null=True)),
+                ('longitude_saida', models.DecimalField(blank=True, decimal_places=8, max_digits=11, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('created_by', models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('funcionario', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='funcionarios.funcionario')),
+                ('gestor', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='empresas.gestor')),
+                ('local_prestacao', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='localizacao.localprestacao')),
+            ],
+            options={
+                'verbose_name': 'Prestação Arquivada',
+                'verbose_name_plural': 'Prestações Arquivadas',
+                'ordering': ['-data', '-horario_chegada'],
+            },
+        ),
+        migrations.CreateModel(
+            name='HistoricoValidacaoArquivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('status_anterior', models.CharField(choices=[('pendente', 'Pendente'), ('aprovada', 'Aprovada'), ('rejeitada', 'Rejeitada'), ('em_revisao', 'Em Revisão')], max_length=15)),
+                ('status_novo', models.CharField(choices=[('pendente', 'Pendente'), ('aprovada', 'Aprovada'), ('rejeitada', 'Rejeitada'), ('em_revisao', 'Em Revisão')], max_length=15)),
+                ('observacoes', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('validado_por', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('prestacao', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='arquivo.registroprestacaoarquivada')),
+            ],
+            options={
+                'verbose_name': 'Histórico de Validação Arquivado',
+                'verbose_name_plural': 'Históricos de Validação Arquivados',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RegistroPontoArquivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('foto', models.ImageField(help_text='Foto do funcionário no momento do ponto', upload_to='pontos/%Y/%m/')),
+                ('foto_listagem', models.ImageField(blank=True, editable=False, help_text='Miniatura da foto para listagens', upload_to='pontos/%Y/%m/')),
+                ('foto_detalhe', models.ImageField(blank=True, editable=False, help_text='Foto reduzida para a tela de detalhe', upload_to='pontos/%Y/%m/')),
+                ('foto_status', models.CharField(choices=[('pendente', 'Pendente'), ('processando', 'Processando'), ('processada', 'Processada'), ('erro', 'Erro')], default='pendente', editable=False, help_text='Situação do processamento da foto', max_length=12)),
+                ('foto_processada_em', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('distancia_local', models.PositiveIntegerField(blank=True, editable=False, help_text='Distância (em metros) até o local mais próximo', null=True)),
+                ('validacao_local', models.BooleanField(default=False, editable=False, help_text='Ponto dentro do raio do local mais próximo')),
+                ('registrado_em', models.DateTimeField(default=django.utils.timezone.now, editable=False, help_text='Data e hora do ponto no dispositivo (difere de created_at em pontos sincronizados offline)')),
+                ('chave_idempotencia', models.UUIDField(blank=True, editable=False, help_text='Chave gerada pelo dispositivo; reenvios com a mesma chave são ignorados', null=True)),
+                ('ip', models.CharField(help_text='IP do dispositivo no momento do registro', max_length=100)),
+                ('latitude', models.DecimalField(decimal_places=15, help_text='Latitude do local do ponto', max_digits=20)),
+                ('longitude', models.DecimalField(decimal_places=15, help_text='Longitude do local do ponto', max_digits=20)),
+                ('created_at', models.DateTimeField(help_text='Data e hora do registro do ponto')),
+                ('updated_at', models.DateTimeField()),
+                ('funcionario', models.ForeignKey(db_constraint=False, db_index=False, help_text='Funcionário que realizou o ponto', on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='funcionarios.funcionario')),
+                ('local_proximo', models.ForeignKey(blank=True, db_constraint=False, db_index=False, help_text='Local de prestação mais próximo das coordenadas do ponto', null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='localizacao.localprestacao')),
+            ],
+            options={
+                'verbose_name': 'Registro de Ponto Arquivado',
+                'verbose_name_plural': 'Registros de Ponto Arquivados',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at', 'id'], name='arquivo_reg_created_fd84e0_idx'), models.Index(fields=['funcionario', 'created_at'], name='arquivo_reg_funcion_053102_idx')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='registroprestacaoarquivada',
+            index=models.Index(fields=['data', 'horario_chegada', 'id'], name='arquivo_reg_data_63073c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registroprestacaoarquivada',
+            index=models.Index(fields=['funcionario', 'data'], name='arquivo_reg_funcion_ef686b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historicovalidacaoarquivado',
+            index=models.Index(fields=['prestacao'], name='arquivo_his_prestac_ef54e2_idx'),
+        ),
+    ]
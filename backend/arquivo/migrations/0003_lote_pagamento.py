@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('arquivo', '0002_fila_validacao'),
+        ('pagamentos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registroprestacaoarquivada',
+            name='lote_pagamento',
+            field=models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='pagamentos.lotepagamento'),
+        ),
+    ]
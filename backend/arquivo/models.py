@@ -0,0 +1,125 @@
+# arquivo/models.py
+"""
+Arquivo dos registros antigos de prestação e ponto
+
+Registros mais antigos que o horizonte configurado (ARQUIVO_HORIZONTE_MESES)
+saem das tabelas quentes e vêm para as tabelas abaixo, mês a mês, pelo
+comando `arquivar_registros` (ver arquivo.arquivamento).
+
+Cada tabela de arquivo espelha as colunas da tabela quente, na mesma ordem
+(`campos_espelhados` copia `_meta.concrete_fields` do modelo original). Assim
+a consulta da tabela quente pode ser unida (UNION ALL) à do arquivo e as
+linhas voltam como instâncias do modelo original (relatorios.arquivo).
+
+As tabelas de arquivo são compactas: sem restrições de chave estrangeira, sem
+unicidade e só com os índices das consultas por período. As fotos continuam
+no mesmo caminho do storage.
+"""
+from django.db import models
+
+from ponto.models import RegistroPonto
+from prestacoes.models import HistoricoValidacao, RegistroPrestacao
+
+# Opções que não valem no arquivo: os valores são copiados como estão
+OPCOES_IGNORADAS = ('unique', 'db_index', 'auto_now', 'auto_now_add')
+
+
+def campos_espelhados(modelo, destinos=None):
+    """
+    Cópia dos campos concretos de `modelo` para uma tabela de arquivo
+
+    Relações viram ForeignKey sem restrição no banco (DO_NOTHING,
+    db_constraint=False), ainda utilizáveis em joins e filtros. `destinos`
+    troca o alvo de relações ('app.Modelo' -> 'app.ModeloArquivado').
+    """
+    destinos = destinos or {}
+    campos = {}
+    for campo in modelo._meta.concrete_fields:
+        if campo.is_relation:
+            # O modelo alvo pode ainda ser uma referência 'app.Modelo' neste ponto
+            alvo = campo.remote_field.model
+            alvo = alvo if isinstance(alvo, str) else alvo._meta.label
+            campos[campo.name] = models.ForeignKey(
+                destinos.get(alvo, alvo), on_delete=models.DO_NOTHING, db_constraint=False,
+                db_index=False, related_name='+', null=campo.null, blank=campo.blank,
+                help_text=campo.help_text,
+            )
+        elif campo.primary_key and isinstance(campo, models.AutoField):
+            campos[campo.name] = models.BigIntegerField(primary_key=True)
+        else:
+            _, _, args, kwargs = campo.deconstruct()
+            for opcao in OPCOES_IGNORADAS:
+                kwargs.pop(opcao, None)
+            campos[campo.name] = campo.__class__(*args, **kwargs)
+    return campos
+
+
+def _modelo_arquivo(nome, modelo, meta, destinos=None):
+    atributos = campos_espelhados(modelo, destinos)
+    atributos.update({'__module__': __name__, '__qualname__': nome, 'Meta': meta})
+    return type(nome, (models.Model,), atributos)
+
+
+class _MetaPrestacao:
+    verbose_name = 'Prestação Arquivada'
+    verbose_name_plural = 'Prestações Arquivadas'
+    ordering = RegistroPrestacao._meta.ordering
+    indexes = [
+        models.Index(fields=['data', 'horario_chegada', 'id']),
+        models.Index(fields=['funcionario', 'data']),
+    ]
+
+
+class _MetaHistorico:
+    verbose_name = 'Histórico de Validação Arquivado'
+    verbose_name_plural = 'Históricos de Validação Arquivados'
+    ordering = HistoricoValidacao._meta.ordering
+    indexes = [
+        models.Index(fields=['prestacao']),
+    ]
+
+
+class _MetaPonto:
+    verbose_name = 'Registro de Ponto Arquivado'
+    verbose_name_plural = 'Registros de Ponto Arquivados'
+    ordering = RegistroPonto._meta.ordering
+    indexes = [
+        models.Index(fields=['created_at', 'id']),
+        models.Index(fields=['funcionario', 'created_at']),
+    ]
+
+
+RegistroPrestacaoArquivada = _modelo_arquivo(
+    'RegistroPrestacaoArquivada', RegistroPrestacao, _MetaPrestacao
+)
+HistoricoValidacaoArquivado = _modelo_arquivo(
+    'HistoricoValidacaoArquivado', HistoricoValidacao, _MetaHistorico,
+    destinos={RegistroPrestacao._meta.label: 'arquivo.RegistroPrestacaoArquivada'},
+)
+RegistroPontoArquivado = _modelo_arquivo(
+    'RegistroPontoArquivado', RegistroPonto, _MetaPonto
+)
+
+
+class MesArquivado(models.Model):
+    """Catálogo do arquivo: uma linha por tabela e mês já movidos"""
+    TABELA_CHOICES = [
+        ('prestacoes', 'Prestações'),
+        ('pontos', 'Pontos'),
+    ]
+
+    tabela = models.CharField(max_length=15, choices=TABELA_CHOICES)
+    mes = models.DateField(help_text="Primeiro dia do mês arquivado")
+    registros = models.PositiveIntegerField(default=0, help_text="Registros movidos para o arquivo")
+    arquivado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Mês Arquivado'
+        verbose_name_plural = 'Meses Arquivados'
+        ordering = ['tabela', '-mes']
+        constraints = [
+            models.UniqueConstraint(fields=['tabela', 'mes'], name='mes_arquivado_chave_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tabela_display()} {self.mes:%m/%Y}: {self.registros}"
@@ -0,0 +1,12 @@
+# arquivo/signals.py
+from django.dispatch import Signal
+
+# Enviado depois que um lote de registros é movido da tabela quente para o
+# arquivo (os registros são apagados sem post_delete).
+#
+# Argumentos (sender = modelo da tabela quente):
+# - mes: primeiro dia do mês arquivado
+# - registros: quantidade de registros movidos
+# - chaves: conjunto de tuplas (funcionario_id, data) dos registros movidos
+#   (data local de created_at, no caso dos pontos)
+registros_arquivados = Signal()
@@ -0,0 +1,46 @@
+from datetime import date
+
+from django.test import TestCase
+
+from pagamentos.geracao import gerar, marcar_pago
+from prestacoes.models import RegistroPrestacao
+from prestacoes.tests import criar_prestacao, montar_cenario
+from .arquivamento import arquivar
+from .models import RegistroPrestacaoArquivada
+
+CORTE = date(2024, 6, 1)
+
+
+class ArquivamentoPrestacoesTests(TestCase):
+
+    def setUp(self):
+        self.cenario = montar_cenario()
+
+    def _arquivadas(self):
+        return set(RegistroPrestacaoArquivada.objects.values_list('id', flat=True))
+
+    def test_prestacoes_em_andamento_ficam_na_tabela_quente(self):
+        pendente = criar_prestacao(self.cenario)
+        em_revisao = criar_prestacao(self.cenario, data=date(2024, 5, 3), validacao_gestor='em_revisao')
+        aprovada = criar_prestacao(self.cenario, data=date(2024, 5, 6), validacao_gestor='aprovada')
+        rejeitada = criar_prestacao(self.cenario, data=date(2024, 5, 7), validacao_gestor='rejeitada')
+
+        arquivar('prestacoes', CORTE)
+
+        self.assertEqual(self._arquivadas(), {rejeitada.pk})
+        self.assertEqual(
+            set(RegistroPrestacao.objects.values_list('id', flat=True)),
+            {pendente.pk, em_revisao.pk, aprovada.pk},
+        )
+
+    def test_aprovadas_so_saem_depois_do_pagamento(self):
+        aprovada = criar_prestacao(self.cenario, validacao_gestor='aprovada')
+        lote = gerar(date(2024, 5, 1), date(2024, 5, 31))
+
+        arquivar('prestacoes', CORTE)
+        self.assertEqual(self._arquivadas(), set())
+
+        marcar_pago(lote)
+        arquivar('prestacoes', CORTE)
+        self.assertEqual(self._arquivadas(), {aprovada.pk})
+        self.assertFalse(RegistroPrestacao.objects.exists())
@@ -50,6 +50,8 @@ INSTALLED_APPS = [
     'prestacoes',
     'relatorios',
     'ponto',
+    'arquivo',
+    'pagamentos',
 ]
 
 MIDDLEWARE = [
@@ -94,6 +96,38 @@ DATABASES = {
 }
 
 
+# Cache
+# Compartilhado entre os workers do uWSGI (respostas dos dashboards de relatórios)
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'django_cache',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+    # Locks do single-flight dos dashboards (relatorios.cache): o `add` precisa
+    # ser atômico entre os workers, o que o FileBasedCache não garante.
+    # Tabela criada com `python manage.py createcachetable`.
+    'travas': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'relatorios_cache_travas',
+    },
+}
+
+# Tempo (segundos) que uma resposta de dashboard permanece em cache.
+# As respostas também são invalidadas por versão quando os dados mudam.
+RELATORIOS_CACHE_TIMEOUT = 15 * 60
+
+# Relatórios em segundo plano (relatorios.tarefas): diretório dos resultados e
+# tempo (segundos) que ficam disponíveis para download
+RELATORIOS_TAREFAS_DIR = BASE_DIR / 'relatorios_gerados'
+RELATORIOS_TAREFAS_EXPIRACAO = 24 * 60 * 60
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -153,7 +187,8 @@ AUTH_USER_MODEL = 'usuarios.Usuario'
 # Configurações do Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWT sem consulta do usuário por requisição (claims de escopo no token)
+        'usuarios.autenticacao.JWTStatelessAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -188,7 +223,7 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),  # Token de acesso válido por 1 hora
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),     # Token de refresh válido por 7 dias
     'ROTATE_REFRESH_TOKENS': True,                   # Rotaciona refresh tokens
-    'BLACKLIST_AFTER_ROTATION': True,                # Invalida tokens antigos após rotação
+    'BLACKLIST_AFTER_ROTATION': True,                # Revoga o refresh antigo na rotação (usuarios.revogacao)
     'UPDATE_LAST_LOGIN': True,                       # Atualiza last_login automaticamente
     
     'ALGORITHM': 'HS256',                            # Algoritmo de criptografia
@@ -212,4 +247,9 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_EXP_CLAIM': 'refresh_exp',
     'SLIDING_TOKEN_LIFETIME': timedelta(minutes=5),
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
+
+    # Refresh que relê os claims de escopo do usuário (usuarios.tokens)
+    'TOKEN_REFRESH_SERIALIZER': 'usuarios.tokens.TokenRefreshComEscopoSerializer',
+    # Verificação que recusa tokens revogados (usuarios.revogacao)
+    'TOKEN_VERIFY_SERIALIZER': 'usuarios.tokens.TokenVerifyComRevogacaoSerializer',
 }
\ No newline at end of file
@@ -30,7 +30,8 @@ urlpatterns = [
     path('api/', include('ponto.urls')),
     path('api/', include('prestacoes.urls')),
     path('api/', include('localizacao.urls')),
-    path('api/', include('relatorios.urls')),
+    path('api/relatorios/', include('relatorios.urls')),
+    path('api/pagamentos/', include('pagamentos.urls')),
 
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='docs'),
@@ -0,0 +1,81 @@
+# funcionarios/busca.py
+"""
+Busca de funcionários por nome, sem diferenciar acentos e maiúsculas
+
+O nome completo normalizado ("joao da silva") é mantido na coluna
+`Funcionario.nome_busca` (Funcionario.save e signal de Usuario). A consulta
+usa um índice conforme o banco:
+
+- SQLite: tabela FTS5 `funcionarios_funcionario_busca` com tokenizer trigram
+  (conteúdo externo, sincronizada por triggers), criada na migration 0005
+- PostgreSQL: índice GIN trigram (pg_trgm) em `nome_busca`
+
+Termos com menos de 3 letras não formam trigramas e são filtrados com
+`contains` na coluna normalizada.
+"""
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+TABELA_FTS = 'funcionarios_funcionario_busca'
+TAMANHO_TRIGRAMA = 3
+
+_ESPACOS = re.compile(r'\s+')
+_tem_fts = {}
+
+
+def normalizar_nome(texto):
+    """Remove acentos, converte para minúsculas e compacta espaços"""
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return _ESPACOS.sub(' ', sem_acentos).strip().lower()
+
+
+def nome_busca_de(usuario):
+    return normalizar_nome(f'{usuario.first_name} {usuario.last_name}')
+
+
+def _fts_disponivel():
+    if connection.vendor != 'sqlite':
+        return False
+    if connection.alias not in _tem_fts:
+        # Os triggers somem se uma migration recriar a tabela de funcionários no
+        # SQLite; sem eles o índice fica desatualizado e a busca usa a coluna.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+                [f'{TABELA_FTS}_%'],
+            )
+            _tem_fts[connection.alias] = cursor.fetchone()[0] == 3
+    return _tem_fts[connection.alias]
+
+
+def filtro_nome(valor, caminho=''):
+    """
+    Q que seleciona funcionários cujo nome contém todos os termos de `valor`.
+
+    `caminho` é o prefixo até o funcionário a partir do modelo consultado,
+    ex.: 'funcionario__' para prestações e pontos.
+    """
+    termos = normalizar_nome(valor).split()
+    if not termos:
+        return Q()
+
+    filtro = Q()
+    longos = [termo for termo in termos if len(termo) >= TAMANHO_TRIGRAMA]
+    if longos and _fts_disponivel():
+        expressao = ' AND '.join('"{}"'.format(termo.replace('"', '""')) for termo in longos)
+        ids = RawSQL(f'SELECT rowid FROM {TABELA_FTS} WHERE {TABELA_FTS} MATCH %s', [expressao])
+        filtro &= Q(**{f'{caminho}id__in': ids})
+        termos = [termo for termo in termos if len(termo) < TAMANHO_TRIGRAMA]
+
+    for termo in termos:
+        filtro &= Q(**{f'{caminho}nome_busca__contains': termo})
+    return filtro
+
+
+def filtrar_por_nome(queryset, valor, caminho=''):
+    return queryset.filter(filtro_nome(valor, caminho))
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from funcionarios.provisionamento import provisionar
+from prestacoes.importacao import ArquivoInvalido
+
+
+class Command(BaseCommand):
+    help = 'Cadastra funcionários e usuários de uma planilha CSV ou XLSX (mesmas regras de /api/funcionarios/provisionar/)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help='Caminho do arquivo .csv ou .xlsx')
+        parser.add_argument('--parcial', action='store_true', help='Grava as linhas válidas mesmo havendo erros')
+        parser.add_argument('--processos', type=int, help='Processos para o hash das senhas (padrão: um por CPU)')
+        parser.add_argument('--max-erros', type=int, default=20, help='Erros exibidos no terminal')
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        try:
+            with open(options['arquivo'], 'rb') as arquivo:
+                resultado = provisionar(
+                    arquivo, options['arquivo'], parcial=options['parcial'], processos=options['processos']
+                )
+        except OSError as e:
+            raise CommandError(f'Não foi possível abrir o arquivo: {e}')
+        except ArquivoInvalido as e:
+            raise CommandError(str(e))
+
+        for erro in resultado['erros'][:options['max_erros']]:
+            mensagens = '; '.join(f'{campo}: {" ".join(textos)}' for campo, textos in erro['erros'].items())
+            self.stdout.write(self.style.WARNING(f"Linha {erro['linha']}: {mensagens}"))
+        duracao = time.monotonic() - inicio
+        resumo = (
+            f"{resultado['linhas']} linhas, {resultado['criados']} funcionários criados, "
+            f"{resultado['total_erros']} com erro ({duracao:.1f}s)."
+        )
+        if resultado['total_erros'] and not resultado['criados']:
+            raise CommandError(f'{resumo} Nada foi gravado; corrija a planilha ou use --parcial.')
+        self.stdout.write(self.style.SUCCESS(resumo))
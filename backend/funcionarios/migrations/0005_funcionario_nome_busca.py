@@ -0,0 +1,103 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:57
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+TABELA_FTS = 'funcionarios_funcionario_busca'
+
+
+def normalizar_nome(texto):
+    """Cópia de funcionarios.busca.normalizar_nome na data desta migração"""
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return re.sub(r'\s+', ' ', sem_acentos).strip().lower()
+
+
+def preencher_nome_busca(apps, schema_editor):
+    Funcionario = apps.get_model('funcionarios', 'Funcionario')
+    lote = []
+    for funcionario in Funcionario.objects.select_related('usuario').only(
+        'id', 'usuario__first_name', 'usuario__last_name'
+    ).iterator(chunk_size=2000):
+        funcionario.nome_busca = normalizar_nome(
+            f'{funcionario.usuario.first_name} {funcionario.usuario.last_name}'
+        )
+        lote.append(funcionario)
+        if len(lote) >= 2000:
+            Funcionario.objects.bulk_update(lote, ['nome_busca'])
+            lote = []
+    if lote:
+        Funcionario.objects.bulk_update(lote, ['nome_busca'])
+
+
+SQLITE_CRIAR = [
+    f"CREATE VIRTUAL TABLE {TABELA_FTS} USING fts5("
+    "nome_busca, content='funcionarios_funcionario', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER {TABELA_FTS}_ai AFTER INSERT ON funcionarios_funcionario BEGIN "
+    f"INSERT INTO {TABELA_FTS}(rowid, nome_busca) VALUES (new.id, new.nome_busca); END",
+    f"CREATE TRIGGER {TABELA_FTS}_ad AFTER DELETE ON funcionarios_funcionario BEGIN "
+    f"INSERT INTO {TABELA_FTS}({TABELA_FTS}, rowid, nome_busca) VALUES ('delete', old.id, old.nome_busca); END",
+    f"CREATE TRIGGER {TABELA_FTS}_au AFTER UPDATE OF nome_busca ON funcionarios_funcionario BEGIN "
+    f"INSERT INTO {TABELA_FTS}({TABELA_FTS}, rowid, nome_busca) VALUES ('delete', old.id, old.nome_busca); "
+    f"INSERT INTO {TABELA_FTS}(rowid, nome_busca) VALUES (new.id, new.nome_busca); END",
+    f"INSERT INTO {TABELA_FTS}({TABELA_FTS}) VALUES ('rebuild')",
+]
+SQLITE_REMOVER = [
+    f"DROP TRIGGER IF EXISTS {TABELA_FTS}_ai",
+    f"DROP TRIGGER IF EXISTS {TABELA_FTS}_ad",
+    f"DROP TRIGGER IF EXISTS {TABELA_FTS}_au",
+    f"DROP TABLE IF EXISTS {TABELA_FTS}",
+]
+POSTGRESQL_CRIAR = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS funcionarios_nome_busca_trgm "
+    "ON funcionarios_funcionario USING gin (nome_busca gin_trgm_ops)",
+]
+POSTGRESQL_REMOVER = [
+    "DROP INDEX IF EXISTS funcionarios_nome_busca_trgm",
+]
+
+
+def _executar(schema_editor, comandos):
+    for comando in comandos:
+        schema_editor.execute(comando)
+
+
+def criar_indice_busca(apps, schema_editor):
+    """FTS5 trigram no SQLite, GIN trigram no PostgreSQL; outros bancos usam só a coluna"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            if not cursor.fetchone()[0]:
+                return
+        _executar(schema_editor, SQLITE_CRIAR)
+    elif vendor == 'postgresql':
+        _executar(schema_editor, POSTGRESQL_CRIAR)
+
+
+def remover_indice_busca(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _executar(schema_editor, SQLITE_REMOVER)
+    elif vendor == 'postgresql':
+        _executar(schema_editor, POSTGRESQL_REMOVER)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('funcionarios', '0004_cargo_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='funcionario',
+            name='nome_busca',
+            field=models.CharField(blank=True, default='', editable=False, max_length=301),
+        ),
+        migrations.RunPython(preencher_nome_busca, migrations.RunPython.noop),
+        migrations.RunPython(criar_indice_busca, remover_indice_busca),
+    ]
@@ -1,6 +1,7 @@
 # funcionarios/models.py
 from django.db import models
 from django.core.validators import RegexValidator
+from .busca import nome_busca_de
 # Removendo importações diretas para evitar importação circular
 
 
@@ -56,6 +57,9 @@ class Funcionario(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Nome completo sem acentos e em minúsculas, usado na busca (ver funcionarios/busca.py)
+    nome_busca = models.CharField(max_length=301, blank=True, default='', editable=False)
+
     class Meta:
         verbose_name = 'Funcionário'
         verbose_name_plural = 'Funcionários'
@@ -64,6 +68,13 @@ class Funcionario(models.Model):
     def __str__(self):
         return f"{self.usuario.get_full_name()} - {self.empresa}"
 
+    def save(self, *args, **kwargs):
+        self.nome_busca = nome_busca_de(self.usuario)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'nome_busca'}
+        super().save(*args, **kwargs)
+
     @property
     def nome_completo(self):
         return self.usuario.get_full_name()
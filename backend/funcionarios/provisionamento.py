@@ -0,0 +1,334 @@
+# funcionarios/provisionamento.py
+"""
+Cadastro em massa de funcionários (Usuario + Funcionario) a partir de
+planilhas CSV ou XLSX, para a entrada de um novo contrato
+
+As linhas são lidas como na importação de prestações
+(prestacoes.importacao.ler_linhas) e validadas sem consultas por linha:
+empresas (CNPJ) e cargos (nome) são carregados uma vez, e usuário, CPF,
+email e registro são conferidos contra a planilha e contra os valores já
+gravados, lidos em lotes só para os valores da planilha.
+
+As senhas passam pelos validadores de AUTH_PASSWORD_VALIDATORS e o hash
+(PBKDF2, a parte cara do cadastro) é calculado em um pool de processos
+(PROVISIONAMENTO_PROCESSOS, padrão: um por CPU), só para as linhas que
+serão gravadas. Usuários e funcionários são gravados com bulk_create em uma
+transação; como bulk_create não chama save(), email_login e nome_busca são
+preenchidos aqui, e o sinal funcionarios_criados avisa os caches.
+
+Por padrão o cadastro é tudo ou nada; com `parcial` as linhas válidas são
+gravadas mesmo havendo erros.
+
+O pool não roda nos processos do uWSGI: /api/funcionarios/provisionar/ só
+enfileira a planilha na fila de tarefas (relatorios.tarefas), executada por
+`executar_tarefa` no worker `processar_tarefas_relatorio`; arquivos grandes
+podem usar direto o comando `provisionar_funcionarios`.
+
+Colunas (cabeçalho na primeira linha, sem diferenciar maiúsculas/acentos):
+- obrigatórias: usuario, cpf, nome, sobrenome, senha, empresa (CNPJ), cargo,
+  registro, data_admissao
+- opcionais: email, telefone, pix, banco, agencia, conta
+"""
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import validate_password
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from empresas.models import EmpresaTerceirizada
+from prestacoes.importacao import MAX_ERROS_RELATORIO, ArquivoInvalido, _cpf, _data, _texto, ler_linhas
+from usuarios.models import Usuario, normalizar_email
+from .busca import normalizar_nome
+from .models import Cargo, Funcionario
+from .signals import funcionarios_criados
+
+COLUNAS_OBRIGATORIAS = (
+    'usuario', 'cpf', 'nome', 'sobrenome', 'senha', 'empresa', 'cargo', 'registro', 'data_admissao',
+)
+COLUNAS_OPCIONAIS = ('email', 'telefone', 'pix', 'banco', 'agencia', 'conta')
+TAMANHO_LOTE = 2000
+# Valores por consulta `__in` na conferência com o banco
+TAMANHO_CONSULTA = 500
+PROCESSOS = getattr(settings, 'PROVISIONAMENTO_PROCESSOS', None)
+# Abaixo disso o pool custa mais do que economiza
+MINIMO_PARALELO = 8
+# Hashes calculados entre dois avisos de progresso: o aviso é o sinal de vida da
+# tarefa na fila, que é devolvida à fila depois de relatorios.tarefas.TEMPO_ABANDONO
+HASHES_POR_AVISO = 500
+
+# Coluna -> (modelo, campo); o tamanho máximo vem do campo
+CAMPOS_TEXTO = {
+    'usuario': (Usuario, 'username'),
+    'nome': (Usuario, 'first_name'),
+    'sobrenome': (Usuario, 'last_name'),
+    'email': (Usuario, 'email'),
+    'telefone': (Usuario, 'telefone'),
+    'registro': (Funcionario, 'registro'),
+    'pix': (Funcionario, 'pix'),
+    'banco': (Funcionario, 'banco'),
+    'agencia': (Funcionario, 'agencia'),
+    'conta': (Funcionario, 'conta'),
+}
+OBRIGATORIOS_TEXTO = {'usuario', 'nome', 'sobrenome', 'registro'}
+
+# Campo único -> (coluna da planilha, erro quando o valor já está gravado)
+UNICOS = {
+    'username': ('usuario', 'Já existe um usuário com este nome de usuário.'),
+    'cpf': ('cpf', 'Já existe um usuário com este CPF.'),
+    'email_login': ('email', 'Já existe um usuário com este email.'),
+    'registro': ('registro', 'Já existe um funcionário com este registro.'),
+}
+
+_validar_username = UnicodeUsernameValidator()
+
+
+def _cnpj(valor):
+    digitos = re.sub(r'\D', '', _texto(valor)).zfill(14)
+    if len(digitos) != 14:
+        raise ValueError('CNPJ inválido.')
+    return f'{digitos[:2]}.{digitos[2:5]}.{digitos[5:8]}/{digitos[8:12]}-{digitos[12:]}'
+
+
+def carregar_referencias():
+    """Empresas (CNPJ) e cargos (nome normalizado) ativos, carregados uma única vez"""
+    return {
+        'empresas': dict(EmpresaTerceirizada.objects.filter(ativa=True).values_list('cnpj', 'id')),
+        'cargos': {
+            normalizar_nome(nome): cargo_id
+            for cargo_id, nome in Cargo.objects.filter(ativo=True).values_list('id', 'nome')
+        },
+    }
+
+
+def validar_linha(linha, referencias):
+    """Devolve (campos, erros) de uma linha da planilha"""
+    campos = {}
+    erros = {}
+    for coluna, (modelo, campo) in CAMPOS_TEXTO.items():
+        valor = _texto(linha.get(coluna))
+        maximo = modelo._meta.get_field(campo).max_length
+        if not valor and coluna in OBRIGATORIOS_TEXTO:
+            erros[coluna] = ['Campo obrigatório.']
+        elif len(valor) > maximo:
+            erros[coluna] = [f'Use no máximo {maximo} caracteres.']
+        campos[campo] = valor
+
+    if 'usuario' not in erros:
+        try:
+            _validar_username(campos['username'])
+        except ValidationError as e:
+            erros['usuario'] = list(e.messages)
+    if campos['email'] and 'email' not in erros:
+        try:
+            validate_email(campos['email'])
+        except ValidationError:
+            erros['email'] = ['Email inválido.']
+    campos['email_login'] = normalizar_email(campos['email'])
+
+    try:
+        campos['cpf'] = _cpf(linha.get('cpf'))
+    except ValueError as e:
+        erros['cpf'] = [str(e)]
+    try:
+        campos['data_admissao'] = _data(linha.get('data_admissao'))
+    except ValueError as e:
+        erros['data_admissao'] = [str(e)]
+    try:
+        campos['empresa_id'] = referencias['empresas'][_cnpj(linha.get('empresa'))]
+    except ValueError as e:
+        erros['empresa'] = [str(e)]
+    except KeyError:
+        erros['empresa'] = ['Empresa ativa não encontrada para este CNPJ.']
+    campos['cargo_id'] = referencias['cargos'].get(normalizar_nome(_texto(linha.get('cargo'))))
+    if campos['cargo_id'] is None:
+        erros['cargo'] = ['Cargo ativo não encontrado.']
+
+    senha = _texto(linha.get('senha'))
+    if not senha:
+        erros['senha'] = ['Campo obrigatório.']
+    else:
+        try:
+            validate_password(senha, Usuario(
+                username=campos['username'], email=campos['email'],
+                first_name=campos['first_name'], last_name=campos['last_name'],
+            ))
+        except ValidationError as e:
+            erros['senha'] = list(e.messages)
+    campos['senha'] = senha
+    return campos, erros
+
+
+def _gravados(validas):
+    """Valores das chaves únicas da planilha que já existem no banco"""
+    consultas = {
+        'username': (Usuario.objects, 'username'),
+        'cpf': (Usuario.objects, 'cpf'),
+        'email_login': (Usuario.objects, 'email_login'),
+        'registro': (Funcionario.objects, 'registro'),
+    }
+    gravados = {}
+    for chave, (manager, campo) in consultas.items():
+        valores = sorted({campos[chave] for _, campos in validas if campos[chave]})
+        gravados[chave] = set()
+        for inicio in range(0, len(valores), TAMANHO_CONSULTA):
+            gravados[chave].update(manager.filter(
+                **{f'{campo}__in': valores[inicio:inicio + TAMANHO_CONSULTA]}
+            ).values_list(campo, flat=True))
+    return gravados
+
+
+def _em_fatias(senhas, calcular, progresso):
+    hashes = []
+    for inicio in range(0, len(senhas), HASHES_POR_AVISO):
+        hashes.extend(calcular(senhas[inicio:inicio + HASHES_POR_AVISO]))
+        if progresso:
+            progresso(len(hashes))
+    return hashes
+
+
+def calcular_hashes(senhas, processos=None, progresso=None):
+    """
+    make_password de cada senha, em paralelo em `processos` processos (padrão: um por CPU)
+
+    `progresso(calculados)` é chamado a cada HASHES_POR_AVISO senhas.
+    """
+    processos = processos or PROCESSOS or os.cpu_count() or 1
+    if processos <= 1 or len(senhas) < MINIMO_PARALELO:
+        return _em_fatias(senhas, lambda fatia: [make_password(senha) for senha in fatia], progresso)
+    processos = min(processos, len(senhas))
+    # django.setup: nos processos iniciados sem fork as configurações ainda não foram carregadas
+    with ProcessPoolExecutor(max_workers=processos, initializer=django.setup) as executor:
+        return _em_fatias(senhas, lambda fatia: list(executor.map(
+            make_password, fatia, chunksize=max(1, len(fatia) // (processos * 4))
+        )), progresso)
+
+
+def _gravar(validas, hashes, tamanho_lote):
+    criados = []
+    with transaction.atomic():
+        for inicio in range(0, len(validas), tamanho_lote):
+            lote = validas[inicio:inicio + tamanho_lote]
+            usuarios = Usuario.objects.bulk_create([
+                Usuario(
+                    username=campos['username'], email=campos['email'], email_login=campos['email_login'],
+                    cpf=campos['cpf'], first_name=campos['first_name'], last_name=campos['last_name'],
+                    telefone=campos['telefone'], password=senha,
+                )
+                for campos, senha in zip(lote, hashes[inicio:inicio + tamanho_lote])
+            ])
+            if any(usuario.pk is None for usuario in usuarios):
+                # Bancos sem RETURNING no INSERT em massa
+                ids = dict(Usuario.objects.filter(
+                    username__in=[usuario.username for usuario in usuarios]
+                ).values_list('username', 'id'))
+                for usuario in usuarios:
+                    usuario.pk = ids[usuario.username]
+            criados.extend(Funcionario.objects.bulk_create([
+                Funcionario(
+                    usuario=usuario, empresa_id=campos['empresa_id'], cargo_id=campos['cargo_id'],
+                    registro=campos['registro'], data_admissao=campos['data_admissao'],
+                    pix=campos['pix'], banco=campos['banco'], agencia=campos['agencia'], conta=campos['conta'],
+                    nome_busca=normalizar_nome(f"{campos['first_name']} {campos['last_name']}"),
+                )
+                for usuario, campos in zip(usuarios, lote)
+            ]))
+        funcionarios_criados.send(sender=Funcionario, funcionarios=criados)
+    return criados
+
+
+def provisionar(arquivo, nome_arquivo, parcial=False, processos=None, tamanho_lote=TAMANHO_LOTE,
+                progresso=None):
+    """
+    Valida e grava os funcionários da planilha.
+
+    Devolve {'linhas', 'criados', 'total_erros', 'erros': [{'linha', 'erros'}]}
+    (`erros` limitado a MAX_ERROS_RELATORIO, em ordem de linha).
+    `progresso(percentual)` é chamado depois da validação e a cada
+    HASHES_POR_AVISO senhas: o hash de milhares de senhas leva mais que o
+    TEMPO_ABANDONO da fila de tarefas.
+    """
+    referencias = carregar_referencias()
+    validas = []
+    erros = []
+    vistas = {chave: {} for chave in UNICOS}
+    total = 0
+    for numero, linha in ler_linhas(arquivo, nome_arquivo, obrigatorias=COLUNAS_OBRIGATORIAS):
+        total += 1
+        campos, erros_linha = validar_linha(linha, referencias)
+        if not erros_linha:
+            for chave, (coluna, _) in UNICOS.items():
+                anterior = vistas[chave].get(campos[chave]) if campos[chave] else None
+                if anterior:
+                    erros_linha[coluna] = [f'Repete o valor da linha {anterior}.']
+            if not erros_linha:
+                for chave in UNICOS:
+                    if campos[chave]:
+                        vistas[chave][campos[chave]] = numero
+                validas.append((numero, campos))
+        if erros_linha:
+            erros.append({'linha': numero, 'erros': erros_linha})
+    if not total:
+        raise ArquivoInvalido('Nenhuma linha para importar.')
+
+    if validas:
+        gravados = _gravados(validas)
+        restantes = []
+        for numero, campos in validas:
+            erros_linha = {
+                coluna: [mensagem]
+                for chave, (coluna, mensagem) in UNICOS.items()
+                if campos[chave] in gravados[chave]
+            }
+            if erros_linha:
+                erros.append({'linha': numero, 'erros': erros_linha})
+            else:
+                restantes.append(campos)
+        validas = restantes
+        erros.sort(key=lambda erro: erro['linha'])
+    if progresso:
+        progresso(20)
+
+    criados = []
+    if validas and (parcial or not erros):
+        hashes = calcular_hashes(
+            [campos['senha'] for campos in validas], processos,
+            # Validação até 20%, hash das senhas até 90%
+            progresso and (lambda calculados: progresso(20 + 70 * calculados // len(validas))),
+        )
+        try:
+            criados = _gravar(validas, hashes, tamanho_lote)
+        except IntegrityError:
+            raise ArquivoInvalido(
+                'Outro cadastro gravou o mesmo usuário, CPF, email ou registro durante a importação; '
+                'envie a planilha de novo.'
+            )
+
+    return {
+        'linhas': total,
+        'criados': len(criados),
+        'total_erros': len(erros),
+        'erros': erros[:MAX_ERROS_RELATORIO],
+    }
+
+
+def executar_tarefa(arquivo, nome_arquivo, parcial=False, progresso=None):
+    """
+    Cadastro pedido por /api/funcionarios/provisionar/, executado pela fila de
+    tarefas. `arquivo` é o caminho gravado por relatorios.tarefas.salvar_entrada,
+    apagado ao fim (a tarefa não é repetida depois de concluída ou com erro).
+    """
+    try:
+        with open(arquivo, 'rb') as entrada:
+            return provisionar(entrada, nome_arquivo, parcial=parcial, progresso=progresso)
+    finally:
+        try:
+            os.remove(arquivo)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,26 @@
+# funcionarios/signals.py
+from django.conf import settings
+from django.db.models.signals import post_save
+from django.dispatch import Signal, receiver
+
+from .busca import nome_busca_de
+from .models import Funcionario
+
+# Enviado quando funcionários (e os usuários deles) são criados em massa
+# (funcionarios.provisionamento), operação que não dispara post_save.
+#
+# Argumentos:
+# - funcionarios: lista dos Funcionario criados
+funcionarios_criados = Signal()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def atualizar_nome_busca(sender, instance, raw=False, **kwargs):
+    """Mantém Funcionario.nome_busca quando o nome do usuário muda"""
+    if raw:
+        return
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and not {'first_name', 'last_name'} & set(update_fields):
+        return
+    nome_busca = nome_busca_de(instance)
+    Funcionario.objects.filter(usuario=instance).exclude(nome_busca=nome_busca).update(nome_busca=nome_busca)
@@ -1,3 +1,146 @@
-from django.test import TestCase
+import io
+import json
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from prestacoes.tests import cliente, criar_funcionario, criar_usuario, montar_cenario
+from relatorios import tarefas
+from relatorios.models import TarefaRelatorio
+from usuarios.models import Usuario
+from . import provisionamento
+from .busca import filtrar_por_nome, normalizar_nome
+from .models import Funcionario
+
+CABECALHO = 'usuario,cpf,nome,sobrenome,senha,empresa,cargo,registro,data_admissao,email\n'
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ProvisionamentoApiTests(TestCase):
+
+    def setUp(self):
+        self.cenario = montar_cenario()
+        self.api = cliente(self.cenario.admin)
+        diretorio = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, diretorio, ignore_errors=True)
+        for nome, valor in (('DIRETORIO', diretorio), ('ENTRADAS', diretorio / 'entradas')):
+            patcher = mock.patch.object(tarefas, nome, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.entradas = diretorio / 'entradas'
+
+    def _linha(self, usuario, cpf, registro, cnpj=None, email=''):
+        cnpj = cnpj or self.cenario.empresa.cnpj
+        return f'{usuario},{cpf},Nome,Sobrenome,Senha#Forte2024,{cnpj},Analista,{registro},2024-03-01,{email}\n'
+
+    def _enviar(self, conteudo, **dados):
+        arquivo = SimpleUploadedFile('contrato.csv', conteudo.encode(), content_type='text/csv')
+        return self.api.post('/api/funcionarios/provisionar/', {'arquivo': arquivo, **dados}, format='multipart')
+
+    def _processar(self):
+        tarefa = tarefas.reservar_proxima()
+        self.assertTrue(tarefas.executar(tarefa))
+        tarefa.refresh_from_db()
+        resposta = self.api.get(f'/api/relatorios/tarefas/{tarefa.pk}/resultado/')
+        self.assertEqual(resposta.status_code, 200)
+        relatorio = json.loads(b''.join(resposta.streaming_content))
+        resposta.close()
+        return tarefa, relatorio
+
+    def test_endpoint_enfileira_e_o_worker_cadastra(self):
+        resposta = self._enviar(CABECALHO + self._linha('novo1', '111.222.333-44', 'P1', email='Novo1@Ex.com'))
+        self.assertEqual(resposta.status_code, 202)
+        self.assertEqual(resposta.data['status'], 'pendente')
+        # Nada é gravado durante o pedido
+        self.assertFalse(Usuario.objects.filter(username='novo1').exists())
+
+        tarefa, relatorio = self._processar()
+        self.assertEqual(tarefa.status, 'concluida')
+        self.assertEqual(relatorio, {'linhas': 1, 'criados': 1, 'total_erros': 0, 'erros': []})
+        funcionario = Funcionario.objects.get(registro='P1')
+        self.assertEqual(funcionario.usuario.email_login, 'novo1@ex.com')
+        self.assertTrue(funcionario.usuario.check_password('Senha#Forte2024'))
+        self.assertEqual(list(self.entradas.iterdir()), [])
+
+    def test_relatorio_de_erros_por_linha(self):
+        conteudo = CABECALHO + ''.join([
+            self._linha('ok1', '111.222.333-44', 'P1'),
+            self._linha('ok1', '555.666.777-88', 'P2'),
+            self._linha('outro', '999.888.777-66', 'P3', cnpj='00.000.000/0001-00'),
+        ])
+        self.assertEqual(self._enviar(conteudo).status_code, 202)
+        _, relatorio = self._processar()
+        self.assertEqual((relatorio['linhas'], relatorio['criados'], relatorio['total_erros']), (3, 0, 2))
+        self.assertEqual([erro['linha'] for erro in relatorio['erros']], [3, 4])
+        self.assertIn('usuario', relatorio['erros'][0]['erros'])
+        self.assertIn('empresa', relatorio['erros'][1]['erros'])
+        # Tudo ou nada
+        self.assertFalse(Funcionario.objects.filter(registro__in=['P1', 'P2', 'P3']).exists())
+
+    def test_parcial_grava_as_linhas_validas(self):
+        conteudo = CABECALHO + self._linha('ok1', '111.222.333-44', 'P1') + self._linha('ok1', '555.666.777-88', 'P2')
+        self.assertEqual(self._enviar(conteudo, parcial='true').status_code, 202)
+        _, relatorio = self._processar()
+        self.assertEqual(relatorio['criados'], 1)
+        self.assertTrue(Funcionario.objects.filter(registro='P1').exists())
+
+    def test_progresso_a_cada_fatia_de_senhas(self):
+        # O aviso mantém a tarefa viva na fila durante o hash de planilhas grandes
+        conteudo = CABECALHO + ''.join(self._linha(f'novo{n}', f'111.222.333-4{n}', f'P{n}') for n in range(5))
+        avisos = []
+        with mock.patch.object(provisionamento, 'HASHES_POR_AVISO', 2):
+            relatorio = provisionamento.provisionar(
+                io.BytesIO(conteudo.encode()), 'contrato.csv', processos=1, progresso=avisos.append
+            )
+        self.assertEqual(relatorio['criados'], 5)
+        self.assertEqual(avisos, [20, 48, 76, 90])
+
+    def test_formato_invalido_retorna_400(self):
+        arquivo = SimpleUploadedFile('contrato.txt', b'x')
+        resposta = self.api.post('/api/funcionarios/provisionar/', {'arquivo': arquivo}, format='multipart')
+        self.assertEqual(resposta.status_code, 400)
+        self.assertFalse(TarefaRelatorio.objects.exists())
+
+
+class BuscaNomeTests(TestCase):
+
+    def setUp(self):
+        self.cenario = montar_cenario()
+        self.joao = self._funcionario('João', 'da Conceição')
+        self.maria = self._funcionario('Maria', 'Lu')
+
+    def _funcionario(self, nome, sobrenome):
+        usuario = criar_usuario(first_name=nome, last_name=sobrenome)
+        return criar_funcionario(self.cenario.empresa, self.cenario.cargo, usuario=usuario)
+
+    def _buscar(self, valor):
+        return set(filtrar_por_nome(Funcionario.objects.all(), valor))
+
+    def test_normalizar_nome(self):
+        self.assertEqual(normalizar_nome('  JOÃO  da\tConceição '), 'joao da conceicao')
+        self.assertEqual(self.joao.nome_busca, 'joao da conceicao')
+
+    def test_sem_acentos_nem_maiusculas(self):
+        self.assertEqual(self._buscar('CONCEICAO'), {self.joao})
+        self.assertEqual(self._buscar('joão conceiç'), {self.joao})
+        # Termos curtos (sem trigramas) também filtram
+        self.assertEqual(self._buscar('maria lu'), {self.maria})
+        self.assertEqual(self._buscar('joao lu'), set())
+
+    def test_troca_de_nome_do_usuario_atualiza_a_busca(self):
+        usuario = self.maria.usuario
+        usuario.last_name = 'Gonçalves'
+        usuario.save(update_fields=['last_name'])
+        self.assertEqual(self._buscar('goncalves'), {self.maria})
+        self.assertEqual(self._buscar('maria lu'), set())
+
+    def test_endpoint_de_relatorio(self):
+        api = cliente(self.cenario.admin)
+        for parametros in ({'search': 'joao'}, {'nome': 'Joao Conceicao'}):
+            resposta = api.get('/api/relatorios/funcionarios/', parametros)
+            self.assertEqual(resposta.status_code, 200)
+            self.assertEqual([linha['id'] for linha in resposta.data['results']], [self.joao.pk], parametros)
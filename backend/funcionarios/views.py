@@ -1,10 +1,54 @@
 from django.shortcuts import render
-from rest_framework import viewsets
+from rest_framework import permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from relatorios.serializers import TarefaRelatorioSerializer
+from relatorios.tarefas import salvar_entrada, solicitar
 from .models import Funcionario
 from .serialazer import FuncionarioSerializer
 
+FORMATOS_PLANILHA = ('.csv', '.xlsx')
+
 # Create your views here.
 
 class FuncionariosView(viewsets.ModelViewSet):
     queryset = Funcionario.objects.all()
-    serializer_class = FuncionarioSerializer
\ No newline at end of file
+    serializer_class = FuncionarioSerializer
+
+    @action(
+        detail=False, methods=['post'], parser_classes=[MultiPartParser],
+        permission_classes=[permissions.IsAdminUser]
+    )
+    def provisionar(self, request):
+        """
+        Cadastra funcionários e os usuários deles a partir de uma planilha CSV
+        ou XLSX (multipart `arquivo`).
+
+        Colunas: usuario, cpf, nome, sobrenome, senha, empresa (CNPJ), cargo,
+        registro, data_admissao e, opcionais, email, telefone, pix, banco,
+        agencia, conta (ver funcionarios/provisionamento.py).
+
+        Tudo ou nada: com qualquer erro nada é gravado e o relatório traz os
+        erros por linha. Com `parcial=true` as linhas válidas são gravadas
+        mesmo assim.
+
+        O hash das senhas não roda no uWSGI: a planilha entra na fila de
+        tarefas (202, processada por `processar_tarefas_relatorio`). Acompanhe
+        em /api/relatorios/tarefas/{id}/; o relatório
+        ({linhas, criados, total_erros, erros}) fica em `resultado_url`.
+        """
+        arquivo = request.FILES.get('arquivo')
+        if arquivo is None:
+            return Response({'detail': 'Envie a planilha no campo arquivo.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not arquivo.name.lower().endswith(FORMATOS_PLANILHA):
+            return Response(
+                {'detail': 'Formato não suportado. Envie um arquivo .csv ou .xlsx.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        parcial = str(request.data.get('parcial', '')).lower() in ('1', 'true', 'sim')
+        tarefa, _ = solicitar('provisionamento', {
+            'arquivo': salvar_entrada(arquivo, arquivo.name), 'nome_arquivo': arquivo.name, 'parcial': parcial,
+        }, request.user)
+        dados = TarefaRelatorioSerializer(tarefa, context={'request': request}).data
+        return Response(dados, status=status.HTTP_202_ACCEPTED)
@@ -56,7 +56,7 @@ class LocalPrestacaoAdmin(admin.ModelAdmin):
             'fields': ('endereco', 'cep')
         }),
         ('Geolocalização', {
-            'fields': ('latitude', 'longitude'),
+            'fields': ('latitude', 'longitude', 'raio_metros'),
             'classes': ('collapse',)
         }),
         ('Observações', {
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class LocalizacaoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'localizacao'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,177 @@
+# localizacao/geofence.py
+"""
+Validação de cerca geográfica (geofence) no servidor
+
+Mantém em memória um índice em grade dos LocalPrestacao ativos com
+coordenadas: cada local fica no balde (linha, coluna) da célula de
+TAMANHO_CELULA graus que o contém. A busca do local mais próximo percorre
+anéis de células a partir da célula do ponto e para assim que nenhum local
+fora dos anéis já vistos pode estar mais perto que o melhor encontrado, então
+o custo depende da densidade local e não do total de locais.
+
+O índice é reconstruído quando a versão em cache muda (sinais de
+LocalPrestacao em localizacao.signals); cada processo confere a versão no
+máximo a cada INTERVALO_VERIFICACAO segundos.
+
+Distâncias em metros. Perto do ponto (até BUSCA_MAXIMA_METROS) a projeção
+equirretangular é usada para comparar candidatos; a distância devolvida é a
+de haversine, a mesma do frontend (hooks/useDistance.ts).
+"""
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+RAIO_TERRA_METROS = 6371000
+METROS_POR_GRAU = math.pi * RAIO_TERRA_METROS / 180
+TAMANHO_CELULA = 0.01
+# O local mais próximo só é procurado até esta distância do ponto
+BUSCA_MAXIMA_METROS = getattr(settings, 'GEOFENCE_BUSCA_MAXIMA_METROS', 10000)
+INTERVALO_VERIFICACAO = 5
+CHAVE_VERSAO = 'localizacao:geofence:versao'
+
+
+def haversine(latitude1, longitude1, latitude2, longitude2):
+    """Distância em metros entre dois pontos"""
+    lat1, lat2 = math.radians(latitude1), math.radians(latitude2)
+    delta_lat = lat2 - lat1
+    delta_lon = math.radians(longitude2 - longitude1)
+    a = math.sin(delta_lat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(delta_lon / 2) ** 2
+    return 2 * RAIO_TERRA_METROS * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def _celula(latitude, longitude):
+    return math.floor(latitude / TAMANHO_CELULA), math.floor(longitude / TAMANHO_CELULA)
+
+
+class IndiceLocais:
+    """Índice em grade de locais: (id, latitude, longitude, raio_metros)"""
+
+    def __init__(self, locais):
+        self.celulas = {}
+        self.por_id = {}
+        for local_id, latitude, longitude, raio in locais:
+            local = (local_id, float(latitude), float(longitude), raio)
+            self.por_id[local_id] = local
+            self.celulas.setdefault(_celula(local[1], local[2]), []).append(local)
+
+    def __len__(self):
+        return len(self.por_id)
+
+    def mais_proximo(self, latitude, longitude, distancia_maxima=BUSCA_MAXIMA_METROS):
+        """(local, distância) do local mais próximo até `distancia_maxima`, ou (None, None)"""
+        if not self.celulas:
+            return None, None
+        latitude, longitude = float(latitude), float(longitude)
+        linha, coluna = _celula(latitude, longitude)
+        # Largura de uma célula em metros no sentido mais estreito (longitude
+        # encolhe com a latitude), usada como limite inferior entre anéis
+        alcance = distancia_maxima / METROS_POR_GRAU + TAMANHO_CELULA
+        cos_minimo = math.cos(math.radians(min(abs(latitude) + alcance, 89.0)))
+        celula_metros = TAMANHO_CELULA * METROS_POR_GRAU * cos_minimo
+        aneis = math.ceil(distancia_maxima / celula_metros) + 1
+        escala_lon = math.cos(math.radians(latitude))
+        # Distância do ponto até a borda mais próxima da própria célula
+        margem = min(
+            (latitude - linha * TAMANHO_CELULA) * METROS_POR_GRAU,
+            ((linha + 1) * TAMANHO_CELULA - latitude) * METROS_POR_GRAU,
+            (longitude - coluna * TAMANHO_CELULA) * METROS_POR_GRAU * cos_minimo,
+            ((coluna + 1) * TAMANHO_CELULA - longitude) * METROS_POR_GRAU * cos_minimo,
+        )
+
+        melhor, melhor_quadrado = None, (distancia_maxima / METROS_POR_GRAU) ** 2
+        for anel in range(aneis + 1):
+            # Todo local fora dos anéis 0..anel-1 está a pelo menos margem + (anel - 1) células
+            limite = margem + (anel - 1) * celula_metros
+            if melhor is not None and limite > math.sqrt(melhor_quadrado) * METROS_POR_GRAU:
+                break
+            for celula in self._anel(linha, coluna, anel):
+                for local in self.celulas.get(celula, ()):
+                    delta_lat = local[1] - latitude
+                    delta_lon = (local[2] - longitude) * escala_lon
+                    quadrado = delta_lat * delta_lat + delta_lon * delta_lon
+                    if quadrado <= melhor_quadrado:
+                        melhor, melhor_quadrado = local, quadrado
+        if melhor is None:
+            return None, None
+        return melhor, haversine(latitude, longitude, melhor[1], melhor[2])
+
+    @staticmethod
+    def _anel(linha, coluna, anel):
+        if anel == 0:
+            yield linha, coluna
+            return
+        for deslocamento in range(-anel, anel + 1):
+            yield linha - anel, coluna + deslocamento
+            yield linha + anel, coluna + deslocamento
+        for deslocamento in range(-anel + 1, anel):
+            yield linha + deslocamento, coluna - anel
+            yield linha + deslocamento, coluna + anel
+
+    def distancia(self, local_id, latitude, longitude):
+        """Distância até um local específico, ou None se ele não está no índice"""
+        local = self.por_id.get(local_id)
+        if local is None:
+            return None
+        return haversine(float(latitude), float(longitude), local[1], local[2])
+
+
+def construir_indice():
+    from .models import LocalPrestacao
+
+    locais = LocalPrestacao.objects.filter(
+        ativo=True, latitude__isnull=False, longitude__isnull=False
+    ).values_list('id', 'latitude', 'longitude', 'raio_metros')
+    return IndiceLocais(locais.iterator(chunk_size=5000))
+
+
+_estado = {'indice': None, 'versao': None, 'verificado_em': 0.0}
+_lock = threading.Lock()
+
+
+def marcar_alteracao():
+    """Invalida o índice em todos os processos"""
+    cache.set(CHAVE_VERSAO, time.time_ns(), None)
+
+
+def obter_indice(recarregar=False):
+    """Índice atual, reconstruído se algum local mudou desde a última verificação"""
+    agora = time.monotonic()
+    if recarregar:
+        _estado['indice'] = None
+    elif _estado['indice'] is not None and agora - _estado['verificado_em'] < INTERVALO_VERIFICACAO:
+        return _estado['indice']
+    with _lock:
+        versao = cache.get(CHAVE_VERSAO)
+        if versao is None:
+            versao = time.time_ns()
+            cache.add(CHAVE_VERSAO, versao, None)
+            versao = cache.get(CHAVE_VERSAO, versao)
+        if _estado['indice'] is None or versao != _estado['versao']:
+            _estado['indice'] = construir_indice()
+            _estado['versao'] = versao
+        _estado['verificado_em'] = agora
+        return _estado['indice']
+
+
+def local_proximo(latitude, longitude):
+    """(local_id, distância em metros, dentro do raio) do local mais próximo, ou (None, None, False)"""
+    if latitude is None or longitude is None:
+        return None, None, False
+    local, distancia = obter_indice().mais_proximo(latitude, longitude)
+    if local is None:
+        return None, None, False
+    return local[0], distancia, distancia <= local[3]
+
+
+def distancia_local(local_id, latitude, longitude):
+    """(distância em metros, dentro do raio) até o local `local_id`, ou (None, False)"""
+    if latitude is None or longitude is None:
+        return None, False
+    indice = obter_indice()
+    distancia = indice.distancia(local_id, latitude, longitude)
+    if distancia is None:
+        return None, False
+    return distancia, distancia <= indice.por_id[local_id][3]
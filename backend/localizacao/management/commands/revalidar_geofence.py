@@ -0,0 +1,48 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from localizacao import geofence
+from ponto.models import RegistroPonto
+from prestacoes.models import RegistroPrestacao
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula a validação de local (geofence) de pontos e prestações já gravados, '
+        'ex.: após cadastrar coordenadas ou alterar o raio dos locais'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--inicio', help='Data inicial (YYYY-MM-DD). Omitida: desde o primeiro registro')
+        parser.add_argument('--fim', help='Data final (YYYY-MM-DD). Omitida: até o último registro')
+        parser.add_argument('--somente', choices=['pontos', 'prestacoes'], help='Revalida apenas um dos tipos')
+        parser.add_argument('--lote', type=int, default=1000, help='Registros lidos e gravados por vez')
+
+    def handle(self, *args, **options):
+        try:
+            inicio = date.fromisoformat(options['inicio']) if options['inicio'] else None
+            fim = date.fromisoformat(options['fim']) if options['fim'] else None
+        except ValueError as e:
+            raise CommandError(f'Data inválida: {e}')
+
+        indice = geofence.obter_indice(recarregar=True)
+        self.stdout.write(f'{len(indice)} locais com coordenadas no índice.')
+
+        if options['somente'] != 'prestacoes':
+            pontos = RegistroPonto.objects.all()
+            if inicio:
+                pontos = pontos.filter(registrado_em__date__gte=inicio)
+            if fim:
+                pontos = pontos.filter(registrado_em__date__lte=fim)
+            total = pontos.revalidar_geofence(batch_size=options['lote'])
+            self.stdout.write(self.style.SUCCESS(f'{total} registros de ponto atualizados.'))
+
+        if options['somente'] != 'pontos':
+            prestacoes = RegistroPrestacao.objects.all()
+            if inicio:
+                prestacoes = prestacoes.filter(data__gte=inicio)
+            if fim:
+                prestacoes = prestacoes.filter(data__lte=fim)
+            total = prestacoes.revalidar_geofence(batch_size=options['lote'])
+            self.stdout.write(self.style.SUCCESS(f'{total} prestações atualizadas.'))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('localizacao', '0004_alter_estado_created_at_alter_estado_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='localprestacao',
+            name='raio_metros',
+            field=models.PositiveIntegerField(default=200, help_text='Distância máxima (em metros) para validar presença no local'),
+        ),
+    ]
@@ -46,6 +46,9 @@ class LocalPrestacao(models.Model):
     cep = models.CharField(max_length=10, blank=True)
     latitude = models.DecimalField(max_digits=10, decimal_places=8, blank=True, null=True)
     longitude = models.DecimalField(max_digits=11, decimal_places=8, blank=True, null=True)
+    raio_metros = models.PositiveIntegerField(
+        default=200, help_text="Distância máxima (em metros) para validar presença no local"
+    )
     observacoes = models.TextField(blank=True)
     ativo = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
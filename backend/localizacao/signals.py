@@ -0,0 +1,18 @@
+# localizacao/signals.py
+"""
+Mantém o índice de geofence (localizacao.geofence) em dia: qualquer
+alteração em locais de prestação troca a versão e os processos reconstroem
+o índice na próxima consulta.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import geofence
+from .models import LocalPrestacao
+
+
+@receiver(post_save, sender=LocalPrestacao)
+@receiver(post_delete, sender=LocalPrestacao)
+def invalidar_indice_geofence(sender, **kwargs):
+    transaction.on_commit(geofence.marcar_alteracao)
@@ -1,3 +1,87 @@
-from django.test import TestCase
+import random
+from decimal import Decimal
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+
+from ponto.models import RegistroPonto
+from prestacoes.tests import criar_prestacao, montar_cenario
+from . import geofence
+from .geofence import IndiceLocais, haversine
+
+CACHE_TESTES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'geofence'}}
+
+
+class IndiceLocaisTests(TestCase):
+
+    def test_mais_proximo_igual_a_busca_exaustiva(self):
+        sorteio = random.Random(14)
+        locais = [
+            (numero, -15.6 + sorteio.uniform(-0.2, 0.2), -56.1 + sorteio.uniform(-0.2, 0.2), 200)
+            for numero in range(500)
+        ]
+        indice = IndiceLocais(locais)
+        for _ in range(200):
+            latitude, longitude = -15.6 + sorteio.uniform(-0.25, 0.25), -56.1 + sorteio.uniform(-0.25, 0.25)
+            distancias = sorted((haversine(latitude, longitude, lat, lon), local_id) for local_id, lat, lon, _ in locais)
+            local, distancia = indice.mais_proximo(latitude, longitude)
+            self.assertEqual(local[0], distancias[0][1])
+            self.assertAlmostEqual(distancia, distancias[0][0], places=6)
+
+    def test_nada_alem_da_distancia_maxima(self):
+        indice = IndiceLocais([(1, -15.6, -56.1, 200)])
+        self.assertEqual(indice.mais_proximo(-15.6, -56.2, distancia_maxima=5000), (None, None))
+        local, distancia = indice.mais_proximo(-15.6, -56.2, distancia_maxima=20000)
+        self.assertEqual(local[0], 1)
+        self.assertAlmostEqual(distancia, 10710, delta=10)
+        self.assertEqual(IndiceLocais([]).mais_proximo(0, 0), (None, None))
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class GeofenceRegistrosTests(TestCase):
+
+    def setUp(self):
+        geofence.obter_indice(recarregar=True)
+        self.cenario = montar_cenario()
+        local = self.cenario.local
+        local.latitude, local.longitude, local.raio_metros = Decimal('-15.6'), Decimal('-56.1'), 150
+        with self.captureOnCommitCallbacks(execute=True):
+            local.save()
+        # Outros processos conferem a versão a cada INTERVALO_VERIFICACAO; aqui, na hora
+        geofence._estado['verificado_em'] = 0
+
+    def _ponto(self, latitude, longitude):
+        return RegistroPonto.objects.create(
+            funcionario=self.cenario.funcionario, foto='pontos/teste.png', ip='127.0.0.1',
+            latitude=latitude, longitude=longitude,
+        )
+
+    def test_ponto_guarda_o_local_mais_proximo(self):
+        dentro = self._ponto(Decimal('-15.6009'), Decimal('-56.1'))
+        self.assertEqual((dentro.local_proximo_id, dentro.validacao_local), (self.cenario.local.pk, True))
+        self.assertEqual(dentro.distancia_local, 100)
+
+        fora = self._ponto(Decimal('-15.602'), Decimal('-56.1'))
+        self.assertEqual((fora.local_proximo_id, fora.validacao_local), (self.cenario.local.pk, False))
+
+    def test_local_alterado_reconstroi_o_indice(self):
+        local = self.cenario.local
+        local.raio_metros = 500
+        with self.captureOnCommitCallbacks(execute=True):
+            local.save()
+        geofence._estado['verificado_em'] = 0
+        self.assertTrue(self._ponto(Decimal('-15.602'), Decimal('-56.1')).validacao_local)
+
+        local.ativo = False
+        with self.captureOnCommitCallbacks(execute=True):
+            local.save()
+        geofence._estado['verificado_em'] = 0
+        self.assertIsNone(self._ponto(Decimal('-15.6009'), Decimal('-56.1')).local_proximo_id)
+
+    def test_chegada_da_prestacao_no_raio_do_local(self):
+        dentro = criar_prestacao(self.cenario, latitude_chegada=Decimal('-15.6005'), longitude_chegada=Decimal('-56.1'))
+        fora = criar_prestacao(
+            self.cenario, data=dentro.data.replace(day=3),
+            latitude_chegada=Decimal('-15.61'), longitude_chegada=Decimal('-56.1'),
+        )
+        self.assertTrue(dentro.validacao_local)
+        self.assertFalse(fora.validacao_local)
@@ -1,18 +1,23 @@
 from django.shortcuts import render
 from rest_framework import viewsets
+from relatorios.condicional import RespostaCondicionalMixin
 from .models import Estado, Cidade, LocalPrestacao
 from .serializers import EstadoSerializer, CidadeSerializer, LocalPrestacaoSerializer
 
 # Create your views here.
+# As listagens respondem 304 (ETag/Last-Modified) enquanto as tabelas não mudarem.
 
-class EstadoView(viewsets.ModelViewSet):
+class EstadoView(RespostaCondicionalMixin, viewsets.ModelViewSet):
     queryset = Estado.objects.all()
     serializer_class = EstadoSerializer
+    tabelas_condicionais = ['localizacao.Estado']
 
-class CidadeView(viewsets.ModelViewSet):
+class CidadeView(RespostaCondicionalMixin, viewsets.ModelViewSet):
     queryset = Cidade.objects.all()
     serializer_class = CidadeSerializer
+    tabelas_condicionais = ['localizacao.Cidade']
 
-class LocalPrestacaoView(viewsets.ModelViewSet):
+class LocalPrestacaoView(RespostaCondicionalMixin, viewsets.ModelViewSet):
     queryset = LocalPrestacao.objects.all()
-    serializer_class = LocalPrestacaoSerializer
\ No newline at end of file
+    serializer_class = LocalPrestacaoSerializer
+    tabelas_condicionais = ['localizacao.LocalPrestacao']
@@ -0,0 +1,31 @@
+from django.contrib import admin
+from .models import LotePagamento, ItemLotePagamento
+
+# Lotes são gerados e fechados pela API (pagamentos.geracao); o admin só consulta.
+
+
+class ItemLotePagamentoInline(admin.TabularInline):
+    model = ItemLotePagamento
+    fields = ("nome", "cpf", "pix", "banco", "agencia", "conta", "quantidade_prestacoes", "valor")
+    readonly_fields = fields
+    can_delete = False
+    extra = 0
+    show_change_link = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(LotePagamento)
+class LotePagamentoAdmin(admin.ModelAdmin):
+    list_display = ("id", "data_inicio", "data_fim", "empresa", "status", "quantidade_funcionarios", "valor_total", "created_at")
+    list_filter = ("status", "empresa", "created_at")
+    list_per_page = 20
+    readonly_fields = (
+        "data_inicio", "data_fim", "empresa", "status", "quantidade_funcionarios", "quantidade_prestacoes",
+        "valor_total", "created_at", "criado_por", "status_alterado_em", "status_alterado_por",
+    )
+    inlines = [ItemLotePagamentoInline]
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,130 @@
+# pagamentos/geracao.py
+"""
+Geração e fechamento dos lotes de pagamento
+
+A geração roda em uma passada, dentro de uma transação:
+
+1. um UPDATE liga ao novo lote todas as prestações aprovadas do período
+   que ainda não têm lote. A condição `lote_pagamento IS NULL` é repetida no
+   UPDATE, então duas gerações simultâneas não pegam a mesma prestação;
+2. uma consulta agrupada por funcionário (sobre as prestações do lote)
+   devolve quantidade, valor e dados bancários, lida com cursor e gravada
+   com bulk_create em blocos.
+
+Os totais do lote saem da mesma passada. Marcar as prestações não dispara
+`prestacoes_alteradas`: o lote não muda resumos nem conflitos.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from prestacoes.models import RegistroPrestacao
+from relatorios.exportacao import nome_completo
+from .models import ItemLotePagamento, LotePagamento
+
+TAMANHO_LOTE = 2000
+
+CAMPOS_ITEM = (
+    'funcionario_id', 'funcionario__usuario__first_name', 'funcionario__usuario__last_name',
+    'funcionario__usuario__cpf', 'funcionario__pix', 'funcionario__banco',
+    'funcionario__agencia', 'funcionario__conta',
+)
+
+
+class LoteInvalido(Exception):
+    """Lote que não pode ser gerado ou mudar de status; a mensagem vai para o usuário"""
+
+
+def a_pagar(data_inicio, data_fim, empresa_id=None):
+    """Prestações aprovadas do período que ainda não entraram em nenhum lote"""
+    filtros = {
+        'validacao_gestor': 'aprovada',
+        'lote_pagamento__isnull': True,
+        'data__gte': data_inicio,
+        'data__lte': data_fim,
+    }
+    if empresa_id:
+        filtros['funcionario__empresa_id'] = empresa_id
+    return RegistroPrestacao.objects.filter(**filtros)
+
+
+def _itens(lote):
+    totais = (
+        RegistroPrestacao.objects.filter(lote_pagamento=lote)
+        .values(*CAMPOS_ITEM)
+        .annotate(quantidade=Count('pk'), valor=Sum('valor'))
+        .order_by('funcionario__usuario__first_name', 'funcionario__usuario__last_name', 'funcionario_id')
+        .values_list(*CAMPOS_ITEM, 'quantidade', 'valor')
+    )
+    for (funcionario_id, first_name, last_name, cpf, pix, banco, agencia, conta,
+         quantidade, valor) in totais.iterator(chunk_size=TAMANHO_LOTE):
+        yield ItemLotePagamento(
+            lote=lote, funcionario_id=funcionario_id, nome=nome_completo(first_name, last_name),
+            cpf=cpf, pix=pix, banco=banco, agencia=agencia, conta=conta,
+            quantidade_prestacoes=quantidade, valor=valor,
+        )
+
+
+def gerar(data_inicio, data_fim, empresa_id=None, criado_por=None):
+    """
+    Gera o lote das prestações aprovadas e ainda não pagas de
+    `data_inicio` a `data_fim` (de uma empresa ou de todas).
+
+    Sem prestações a pagar levanta LoteInvalido e nada é gravado.
+    """
+    if data_fim < data_inicio:
+        raise LoteInvalido('A data final deve ser igual ou posterior à inicial.')
+
+    with transaction.atomic():
+        lote = LotePagamento.objects.create(
+            data_inicio=data_inicio, data_fim=data_fim, empresa_id=empresa_id, criado_por=criado_por
+        )
+        if not a_pagar(data_inicio, data_fim, empresa_id).update(lote_pagamento=lote):
+            raise LoteInvalido('Nenhuma prestação aprovada a pagar no período.')
+
+        funcionarios = prestacoes = 0
+        valor_total = Decimal('0')
+        bloco = []
+        for item in _itens(lote):
+            bloco.append(item)
+            funcionarios += 1
+            prestacoes += item.quantidade_prestacoes
+            valor_total += item.valor
+            if len(bloco) >= TAMANHO_LOTE:
+                ItemLotePagamento.objects.bulk_create(bloco)
+                bloco = []
+        ItemLotePagamento.objects.bulk_create(bloco)
+
+        lote.quantidade_funcionarios = funcionarios
+        lote.quantidade_prestacoes = prestacoes
+        lote.valor_total = valor_total.quantize(Decimal('0.01'))
+        lote.save(update_fields=['quantidade_funcionarios', 'quantidade_prestacoes', 'valor_total'])
+    return lote
+
+
+def _mudar_status(lote, status, usuario):
+    # UPDATE condicional: só sai de 'gerado', mesmo com pedidos simultâneos
+    agora = timezone.now()
+    alterados = LotePagamento.objects.filter(pk=lote.pk, status='gerado').update(
+        status=status, status_alterado_em=agora, status_alterado_por=usuario
+    )
+    if not alterados:
+        lote.refresh_from_db(fields=['status'])
+        raise LoteInvalido(f'O lote está {lote.get_status_display().lower()} e não pode mais mudar de status.')
+    lote.status, lote.status_alterado_em, lote.status_alterado_por = status, agora, usuario
+
+
+def marcar_pago(lote, usuario=None):
+    """Confirma o pagamento do lote; as prestações dele passam a contar como pagas"""
+    _mudar_status(lote, 'pago', usuario)
+    return lote
+
+
+def cancelar(lote, usuario=None):
+    """Cancela o lote; as prestações voltam a ficar disponíveis para o próximo lote"""
+    with transaction.atomic():
+        _mudar_status(lote, 'cancelado', usuario)
+        RegistroPrestacao.objects.filter(lote_pagamento=lote).update(lote_pagamento=None)
+    return lote
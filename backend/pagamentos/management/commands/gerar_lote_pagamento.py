@@ -0,0 +1,38 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pagamentos.geracao import LoteInvalido, gerar
+from pagamentos.remessa import gerar_cnab
+
+
+class Command(BaseCommand):
+    help = 'Gera o lote de pagamento das prestações aprovadas e ainda não pagas de um período'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--inicio', required=True, help='Data inicial (YYYY-MM-DD)')
+        parser.add_argument('--fim', required=True, help='Data final (YYYY-MM-DD)')
+        parser.add_argument('--empresa', type=int, help='Id da empresa (omitido: todas)')
+        parser.add_argument('--remessa', help='Grava também o arquivo posicional (cnab) do lote neste caminho')
+
+    def handle(self, *args, **options):
+        try:
+            inicio = date.fromisoformat(options['inicio'])
+            fim = date.fromisoformat(options['fim'])
+        except ValueError as e:
+            raise CommandError(f'Data inválida: {e}')
+
+        try:
+            lote = gerar(inicio, fim, empresa_id=options['empresa'])
+        except LoteInvalido as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f'Lote {lote.pk}: {lote.quantidade_funcionarios} funcionários, '
+            f'{lote.quantidade_prestacoes} prestações, R$ {lote.valor_total}.'
+        ))
+
+        if options['remessa']:
+            with open(options['remessa'], 'wb') as arquivo:
+                for bloco in gerar_cnab(lote):
+                    arquivo.write(bloco)
+            self.stdout.write(f"Remessa gravada em {options['remessa']}.")
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('empresas', '0003_gestor_updated_at'),
+        ('funcionarios', '0005_funcionario_nome_busca'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LotePagamento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data_inicio', models.DateField()),
+                ('data_fim', models.DateField()),
+                ('status', models.CharField(choices=[('gerado', 'Gerado'), ('pago', 'Pago'), ('cancelado', 'Cancelado')], default='gerado', max_length=10)),
+                ('quantidade_funcionarios', models.PositiveIntegerField(default=0)),
+                ('quantidade_prestacoes', models.PositiveIntegerField(default=0)),
+                ('valor_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('status_alterado_em', models.DateTimeField(blank=True, null=True)),
+                ('criado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='lotes_pagamento_criados', to=settings.AUTH_USER_MODEL)),
+                ('empresa', models.ForeignKey(blank=True, help_text='Empresa do lote (vazio: todas)', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='lotes_pagamento', to='empresas.empresaterceirizada')),
+                ('status_alterado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Lote de Pagamento',
+                'verbose_name_plural': 'Lotes de Pagamento',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ItemLotePagamento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=301)),
+                ('cpf', models.CharField(max_length=14)),
+                ('pix', models.CharField(blank=True, max_length=100)),
+                ('banco', models.CharField(blank=True, max_length=100)),
+                ('agencia', models.CharField(blank=True, max_length=10)),
+                ('conta', models.CharField(blank=True, max_length=20)),
+                ('quantidade_prestacoes', models.PositiveIntegerField()),
+                ('valor', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('funcionario', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='itens_pagamento', to='funcionarios.funcionario')),
+                ('lote', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='itens', to='pagamentos.lotepagamento')),
+            ],
+            options={
+                'verbose_name': 'Item de Lote de Pagamento',
+                'verbose_name_plural': 'Itens de Lote de Pagamento',
+                'ordering': ['lote', 'id'],
+                'constraints': [models.UniqueConstraint(fields=('lote', 'funcionario'), name='item_lote_pagamento_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,92 @@
+# pagamentos/models.py
+"""
+Lotes de pagamento (PIX) das prestações aprovadas
+
+Um lote congela, para um período, quanto cada funcionário vai receber:
+as prestações aprovadas e ainda sem lote ficam ligadas a ele
+(`RegistroPrestacao.lote_pagamento`) e cada funcionário vira um
+ItemLotePagamento com o total e os dados bancários do momento da geração.
+Depois de gerado o lote não muda: só passa a pago ou é cancelado, o que
+devolve as prestações para o próximo lote (ver pagamentos.geracao).
+"""
+from django.db import models
+
+
+class LotePagamento(models.Model):
+    """Lote de pagamento de um período"""
+    STATUS_CHOICES = [
+        ('gerado', 'Gerado'),
+        ('pago', 'Pago'),
+        ('cancelado', 'Cancelado'),
+    ]
+
+    data_inicio = models.DateField()
+    data_fim = models.DateField()
+    empresa = models.ForeignKey(
+        'empresas.EmpresaTerceirizada',
+        on_delete=models.PROTECT,
+        related_name='lotes_pagamento',
+        blank=True,
+        null=True,
+        help_text="Empresa do lote (vazio: todas)"
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='gerado')
+
+    # Totais congelados na geração
+    quantidade_funcionarios = models.PositiveIntegerField(default=0)
+    quantidade_prestacoes = models.PositiveIntegerField(default=0)
+    valor_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    # Auditoria
+    created_at = models.DateTimeField(auto_now_add=True)
+    criado_por = models.ForeignKey(
+        'usuarios.Usuario',
+        on_delete=models.PROTECT,
+        related_name='lotes_pagamento_criados',
+        blank=True,
+        null=True
+    )
+    status_alterado_em = models.DateTimeField(blank=True, null=True)
+    status_alterado_por = models.ForeignKey(
+        'usuarios.Usuario',
+        on_delete=models.PROTECT,
+        related_name='+',
+        blank=True,
+        null=True
+    )
+
+    class Meta:
+        verbose_name = 'Lote de Pagamento'
+        verbose_name_plural = 'Lotes de Pagamento'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Lote {self.pk} - {self.data_inicio} a {self.data_fim} ({self.get_status_display()})"
+
+
+class ItemLotePagamento(models.Model):
+    """Total a pagar a um funcionário em um lote, com os dados bancários da geração"""
+    lote = models.ForeignKey(LotePagamento, on_delete=models.CASCADE, related_name='itens')
+    funcionario = models.ForeignKey('funcionarios.Funcionario', on_delete=models.PROTECT, related_name='itens_pagamento')
+
+    # Cópia dos dados do funcionário na geração do lote
+    nome = models.CharField(max_length=301)
+    cpf = models.CharField(max_length=14)
+    pix = models.CharField(max_length=100, blank=True)
+    banco = models.CharField(max_length=100, blank=True)
+    agencia = models.CharField(max_length=10, blank=True)
+    conta = models.CharField(max_length=20, blank=True)
+
+    quantidade_prestacoes = models.PositiveIntegerField()
+    valor = models.DecimalField(max_digits=12, decimal_places=2)
+
+    class Meta:
+        verbose_name = 'Item de Lote de Pagamento'
+        verbose_name_plural = 'Itens de Lote de Pagamento'
+        ordering = ['lote', 'id']
+        constraints = [
+            models.UniqueConstraint(fields=['lote', 'funcionario'], name='item_lote_pagamento_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.nome} - {self.valor}"
@@ -0,0 +1,104 @@
+# pagamentos/remessa.py
+"""
+Arquivos de remessa dos lotes de pagamento, gerados em streaming
+
+- csv / xlsx: uma linha por funcionário (relatorios.exportacao)
+- cnab: arquivo posicional de 240 colunas no estilo CNAB, com registro
+  header (0), um detalhe por funcionário (1) e trailer (9). O leiaute é
+  simplificado e próprio do sistema (não é o CNAB 240 de nenhum banco):
+  serve de entrada para a conversão no sistema do banco pagador.
+
+Campos alfanuméricos vão sem acentos, em maiúsculas (exceto a chave PIX,
+que diferencia maiúsculas), alinhados à esquerda com espaços; numéricos
+vão só com dígitos, alinhados à direita com zeros. Valores em centavos.
+"""
+import unicodedata
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from relatorios.exportacao import FORMATOS as FORMATOS_PLANILHA, Coluna, resposta_exportacao
+
+TAMANHO_LINHA = 240
+TAMANHO_BLOCO = 2000
+FORMATOS = (*FORMATOS_PLANILHA, 'cnab')
+
+COLUNAS = [
+    Coluna('Funcionário', 'nome'),
+    Coluna('CPF', 'cpf'),
+    Coluna('Chave PIX', 'pix'),
+    Coluna('Banco', 'banco'),
+    Coluna('Agência', 'agencia'),
+    Coluna('Conta', 'conta'),
+    Coluna('Prestações', 'quantidade_prestacoes'),
+    Coluna('Valor', 'valor'),
+]
+
+
+def _ascii(texto):
+    decomposto = unicodedata.normalize('NFKD', str(texto or ''))
+    return decomposto.encode('ascii', 'ignore').decode('ascii').replace('\r', ' ').replace('\n', ' ')
+
+
+def _alfa(valor, tamanho, maiusculas=True):
+    texto = _ascii(valor)
+    if maiusculas:
+        texto = texto.upper()
+    return texto[:tamanho].ljust(tamanho)
+
+
+def _num(valor, tamanho):
+    digitos = ''.join(c for c in str(valor or 0) if c.isdigit())
+    return digitos[-tamanho:].rjust(tamanho, '0')
+
+
+def _centavos(valor):
+    return int(valor * 100)
+
+
+def _linha(*campos):
+    return ''.join(campos).ljust(TAMANHO_LINHA) + '\r\n'
+
+
+def gerar_cnab(lote, tamanho_bloco=TAMANHO_BLOCO):
+    """Linhas do arquivo posicional do lote, em blocos de bytes"""
+    gerado_em = timezone.localtime()
+    yield _linha(
+        '0', _alfa('REMESSA PAGAMENTO PIX', 30), _num(lote.pk, 9),
+        gerado_em.strftime('%d%m%Y%H%M%S'),
+        lote.data_inicio.strftime('%d%m%Y'), lote.data_fim.strftime('%d%m%Y'),
+        _num(lote.quantidade_funcionarios, 6),
+    ).encode('ascii')
+
+    itens = lote.itens.order_by('id').values_list(
+        'cpf', 'nome', 'pix', 'banco', 'agencia', 'conta', 'quantidade_prestacoes', 'valor'
+    )
+    bloco = []
+    total = 0
+    sequencial = 0
+    for cpf, nome, pix, banco, agencia, conta, quantidade, valor in itens.iterator(chunk_size=tamanho_bloco):
+        sequencial += 1
+        total += _centavos(valor)
+        bloco.append(_linha(
+            '1', _num(sequencial, 6), _num(cpf, 11), _alfa(nome, 30), _alfa(pix, 77, maiusculas=False),
+            _alfa(banco, 20), _alfa(agencia, 10), _alfa(conta, 20), _num(quantidade, 6),
+            _num(_centavos(valor), 15),
+        ))
+        if len(bloco) >= tamanho_bloco:
+            yield ''.join(bloco).encode('ascii')
+            bloco = []
+
+    # Trailer: total de registros (header e trailer incluídos) e soma dos valores
+    bloco.append(_linha('9', _num(sequencial + 2, 6), _num(total, 18)))
+    yield ''.join(bloco).encode('ascii')
+
+
+def resposta_remessa(lote, formato='csv'):
+    """StreamingHttpResponse com o arquivo do lote no formato pedido"""
+    nome_arquivo = f'lote_pagamento_{lote.pk}'
+    if formato != 'cnab':
+        return resposta_exportacao(lote.itens.order_by('id'), COLUNAS, nome_arquivo, formato)
+
+    resposta = StreamingHttpResponse(gerar_cnab(lote), content_type='text/plain; charset=ascii')
+    resposta['Content-Disposition'] = f'attachment; filename="{nome_arquivo}.rem"'
+    return resposta
@@ -0,0 +1,37 @@
+from rest_framework import serializers
+
+from empresas.models import EmpresaTerceirizada
+from .models import ItemLotePagamento, LotePagamento
+
+
+class LotePagamentoSerializer(serializers.ModelSerializer):
+    empresa_nome = serializers.CharField(source='empresa.nome_fantasia', read_only=True, default=None)
+
+    class Meta:
+        model = LotePagamento
+        fields = '__all__'
+        # O lote só é criado por pagamentos.geracao e só muda pelas actions pagar/cancelar
+        read_only_fields = [
+            'status', 'quantidade_funcionarios', 'quantidade_prestacoes', 'valor_total',
+            'criado_por', 'status_alterado_em', 'status_alterado_por',
+        ]
+
+
+class GeracaoLoteSerializer(serializers.Serializer):
+    """Entrada de POST /api/pagamentos/lotes/"""
+    data_inicio = serializers.DateField()
+    data_fim = serializers.DateField()
+    empresa = serializers.PrimaryKeyRelatedField(
+        queryset=EmpresaTerceirizada.objects.all(), required=False, allow_null=True
+    )
+
+    def validate(self, attrs):
+        if attrs['data_fim'] < attrs['data_inicio']:
+            raise serializers.ValidationError({'data_fim': 'A data final deve ser igual ou posterior à inicial.'})
+        return attrs
+
+
+class ItemLotePagamentoSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ItemLotePagamento
+        fields = '__all__'
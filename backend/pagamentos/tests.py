@@ -0,0 +1,85 @@
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+
+from prestacoes.models import RegistroPrestacao
+from prestacoes.tests import cliente, criar_funcionario, criar_prestacao, montar_cenario
+from .models import LotePagamento
+
+PERIODO = {'data_inicio': '2024-05-01', 'data_fim': '2024-05-31'}
+
+
+class LotePagamentoApiTests(TestCase):
+
+    def setUp(self):
+        self.cenario = montar_cenario()
+        self.api = cliente(self.cenario.admin)
+        outro = criar_funcionario(self.cenario.empresa, self.cenario.cargo, pix='outro@pix')
+        criar_prestacao(self.cenario, validacao_gestor='aprovada', valor=Decimal('100.00'))
+        criar_prestacao(self.cenario, data=date(2024, 5, 3), validacao_gestor='aprovada', valor=Decimal('50.50'))
+        criar_prestacao(self.cenario, funcionario=outro, validacao_gestor='aprovada', valor=Decimal('80.00'))
+        # Fora do lote: pendente e aprovada de outro período
+        criar_prestacao(self.cenario, data=date(2024, 5, 6))
+        criar_prestacao(self.cenario, data=date(2024, 6, 3), validacao_gestor='aprovada')
+
+    def _gerar(self, **dados):
+        return self.api.post('/api/pagamentos/lotes/', {**PERIODO, **dados}, format='json')
+
+    def _acao(self, lote_id, acao):
+        return self.api.post(f'/api/pagamentos/lotes/{lote_id}/{acao}/')
+
+    def test_gera_lote_com_um_item_por_funcionario(self):
+        resposta = self._gerar()
+        self.assertEqual(resposta.status_code, 201)
+        self.assertEqual(resposta.data['quantidade_funcionarios'], 2)
+        self.assertEqual(resposta.data['quantidade_prestacoes'], 3)
+        self.assertEqual(Decimal(resposta.data['valor_total']), Decimal('230.50'))
+
+        lote = LotePagamento.objects.get(pk=resposta.data['id'])
+        self.assertEqual(
+            sorted((item.quantidade_prestacoes, item.valor) for item in lote.itens.all()),
+            [(1, Decimal('80.00')), (2, Decimal('150.50'))],
+        )
+        self.assertEqual(RegistroPrestacao.objects.filter(lote_pagamento=lote).count(), 3)
+
+        itens = self.api.get(f'/api/pagamentos/lotes/{lote.pk}/itens/')
+        self.assertEqual(itens.status_code, 200)
+        arquivo = self.api.get(f'/api/pagamentos/lotes/{lote.pk}/arquivo/', {'formato': 'csv'})
+        self.assertEqual(arquivo.status_code, 200)
+        arquivo.close()
+
+    def test_prestacao_nao_entra_em_dois_lotes(self):
+        self.assertEqual(self._gerar().status_code, 201)
+        resposta = self._gerar()
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn('detail', resposta.data)
+        self.assertEqual(LotePagamento.objects.count(), 1)
+
+    def test_filtro_por_empresa(self):
+        outra = montar_cenario()
+        criar_prestacao(outra, validacao_gestor='aprovada')
+        resposta = self._gerar(empresa=outra.empresa.pk)
+        self.assertEqual(resposta.status_code, 201)
+        self.assertEqual(resposta.data['quantidade_prestacoes'], 1)
+
+    def test_cancelar_libera_as_prestacoes(self):
+        lote_id = self._gerar().data['id']
+        resposta = self._acao(lote_id, 'cancelar')
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.data['status'], 'cancelado')
+        self.assertFalse(RegistroPrestacao.objects.filter(lote_pagamento__isnull=False).exists())
+
+        # Lote cancelado não muda mais de status; as prestações entram no próximo
+        self.assertEqual(self._acao(lote_id, 'pagar').status_code, 400)
+        self.assertEqual(self._gerar().data['quantidade_prestacoes'], 3)
+
+    def test_lote_pago_nao_pode_ser_cancelado(self):
+        lote_id = self._gerar().data['id']
+        self.assertEqual(self._acao(lote_id, 'pagar').data['status'], 'pago')
+        self.assertEqual(self._acao(lote_id, 'cancelar').status_code, 400)
+        self.assertEqual(RegistroPrestacao.objects.filter(lote_pagamento_id=lote_id).count(), 3)
+
+    def test_restrito_a_staff(self):
+        api = cliente(self.cenario.funcionario.usuario)
+        self.assertEqual(api.post('/api/pagamentos/lotes/', PERIODO, format='json').status_code, 403)
@@ -0,0 +1,10 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import LotePagamentoViewSet
+
+router = DefaultRouter()
+router.register(r"lotes", LotePagamentoViewSet)
+
+urlpatterns = [
+    path("", include(router.urls)),
+]
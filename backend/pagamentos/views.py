@@ -0,0 +1,84 @@
+from rest_framework import permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from . import geracao
+from .models import LotePagamento
+from .remessa import FORMATOS, resposta_remessa
+from .serializers import GeracaoLoteSerializer, ItemLotePagamentoSerializer, LotePagamentoSerializer
+
+
+class LotePagamentoViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Lotes de pagamento PIX das prestações aprovadas (pagamentos/geracao.py).
+
+    Restrito a usuários staff. O lote é imutável depois de gerado: só pode
+    ser marcado como pago ou cancelado.
+    """
+    queryset = LotePagamento.objects.select_related('empresa')
+    serializer_class = LotePagamentoSerializer
+    permission_classes = [permissions.IsAdminUser]
+    filterset_fields = ['status', 'empresa']
+    ordering_fields = ['created_at', 'data_inicio', 'valor_total']
+
+    def create(self, request):
+        """
+        Gera o lote das prestações aprovadas e ainda não pagas do período.
+
+        Corpo: `data_inicio`, `data_fim` e, opcional, `empresa` (id).
+        """
+        entrada = GeracaoLoteSerializer(data=request.data)
+        entrada.is_valid(raise_exception=True)
+        dados = entrada.validated_data
+        empresa = dados.get('empresa')
+        try:
+            lote = geracao.gerar(
+                dados['data_inicio'], dados['data_fim'],
+                empresa_id=empresa.pk if empresa else None, criado_por=request.user,
+            )
+        except geracao.LoteInvalido as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(lote).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['get'])
+    def itens(self, request, pk=None):
+        """Itens do lote (um por funcionário), paginados"""
+        itens = self.get_object().itens.order_by('id')
+        pagina = self.paginate_queryset(itens)
+        return self.get_paginated_response(ItemLotePagamentoSerializer(pagina, many=True).data)
+
+    @action(detail=True, methods=['get'])
+    def arquivo(self, request, pk=None):
+        """
+        Arquivo do lote em streaming
+
+        **Parâmetros:**
+        - `formato`: csv (padrão), xlsx ou cnab (posicional de 240 colunas)
+        """
+        formato = request.query_params.get('formato', 'csv').lower()
+        if formato not in FORMATOS:
+            return Response(
+                {'detail': f"Formato inválido. Use: {', '.join(FORMATOS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return resposta_remessa(self.get_object(), formato)
+
+    @action(detail=True, methods=['post'])
+    def pagar(self, request, pk=None):
+        """Confirma o pagamento do lote gerado"""
+        lote = self.get_object()
+        try:
+            geracao.marcar_pago(lote, request.user)
+        except geracao.LoteInvalido as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(lote).data)
+
+    @action(detail=True, methods=['post'])
+    def cancelar(self, request, pk=None):
+        """Cancela o lote gerado; as prestações voltam para o próximo lote"""
+        lote = self.get_object()
+        try:
+            geracao.cancelar(lote, request.user)
+        except geracao.LoteInvalido as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(lote).data)
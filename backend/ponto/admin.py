@@ -3,9 +3,9 @@ from .models import RegistroPonto
 
 @admin.register(RegistroPonto)
 class RegistroPontoAdmin(admin.ModelAdmin):
-    list_display = ("funcionario", "created_at")
+    list_display = ("funcionario", "created_at", "foto_status")
     search_fields = ("funcionario", "created_at")
     list_display_links = ("funcionario", "created_at")
-    list_filter = ("funcionario", "created_at")
+    list_filter = ("funcionario", "created_at", "foto_status")
     list_per_page = 10
-    readonly_fields = ("created_at", "updated_at")
\ No newline at end of file
+    readonly_fields = ("created_at", "updated_at", "foto_status", "foto_listagem", "foto_detalhe", "foto_processada_em")
\ No newline at end of file
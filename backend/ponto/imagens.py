@@ -0,0 +1,130 @@
+# ponto/imagens.py
+"""
+Processamento das fotos de ponto fora da request
+
+A câmera do navegador envia PNG em resolução cheia. O worker
+`processar_fotos_ponto` reserva registros com foto pendente (UPDATE
+condicional, como a fila de relatórios) e, para cada um:
+
+- valida a imagem com o Pillow (arquivos inválidos ficam com status 'erro')
+- aplica a orientação do EXIF e descarta os metadados
+- recodifica a foto em JPEG com no máximo LADO_MAXIMO pixels no maior lado,
+  substituindo o arquivo original
+- gera as variantes WebP de listagem e de detalhe ao lado da foto
+"""
+import logging
+import posixpath
+from datetime import timedelta
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import RegistroPonto
+
+logger = logging.getLogger(__name__)
+
+LADO_MAXIMO = 1600
+QUALIDADE_JPEG = 82
+# campo -> (maior lado em pixels, qualidade WebP, sufixo do arquivo)
+VARIANTES = {
+    'foto_listagem': (160, 70, 'lista'),
+    'foto_detalhe': (640, 78, 'detalhe'),
+}
+TEMPO_ABANDONO = timedelta(minutes=10)
+
+
+def _abrir(arquivo):
+    """Lê e valida a imagem, já com a orientação do EXIF aplicada"""
+    with arquivo.open('rb'):
+        conteudo = arquivo.read()
+    # verify() detecta arquivos truncados/corrompidos, mas inutiliza o objeto
+    Image.open(BytesIO(conteudo)).verify()
+    imagem = Image.open(BytesIO(conteudo))
+    imagem = ImageOps.exif_transpose(imagem)
+    if imagem.mode != 'RGB':
+        fundo = Image.new('RGB', imagem.size, 'white')
+        imagem = imagem.convert('RGBA')
+        fundo.paste(imagem, mask=imagem.getchannel('A'))
+        imagem = fundo
+    return imagem
+
+
+def _codificar(imagem, lado, formato, qualidade):
+    """Reduz para caber em `lado` x `lado` e codifica sem metadados"""
+    copia = imagem.copy()
+    copia.thumbnail((lado, lado), Image.Resampling.LANCZOS)
+    saida = BytesIO()
+    opcoes = {'optimize': True, 'progressive': True} if formato == 'JPEG' else {'method': 4}
+    copia.save(saida, format=formato, quality=qualidade, **opcoes)
+    return saida.getvalue()
+
+
+def _salvar(storage, nome, conteudo):
+    return storage.save(nome, ContentFile(conteudo))
+
+
+def processar_foto(registro):
+    """Recodifica a foto e gera as variantes; devolve os novos nomes por campo"""
+    imagem = _abrir(registro.foto)
+    storage = registro.foto.storage
+    diretorio, nome = posixpath.split(registro.foto.name)
+    base = posixpath.join(diretorio, posixpath.splitext(nome)[0])
+
+    novos = {'foto': _salvar(storage, f'{base}.jpg', _codificar(imagem, LADO_MAXIMO, 'JPEG', QUALIDADE_JPEG))}
+    for campo, (lado, qualidade, sufixo) in VARIANTES.items():
+        novos[campo] = _salvar(storage, f'{base}_{sufixo}.webp', _codificar(imagem, lado, 'WEBP', qualidade))
+    return novos
+
+
+def reservar_pendentes(limite=20):
+    """Reserva até `limite` registros com foto pendente para este worker"""
+    ids = list(
+        RegistroPonto.objects.filter(foto_status='pendente').order_by('id').values_list('id', flat=True)[:limite]
+    )
+    reservados = []
+    for registro_id in ids:
+        if RegistroPonto.objects.filter(id=registro_id, foto_status='pendente').update(
+            foto_status='processando', foto_processada_em=timezone.now()
+        ):
+            reservados.append(registro_id)
+    return RegistroPonto.objects.filter(id__in=reservados).only(
+        'id', 'foto', 'foto_listagem', 'foto_detalhe'
+    )
+
+
+def executar(registro):
+    """Processa a foto de um registro já reservado"""
+    reservado = RegistroPonto.objects.filter(id=registro.id, foto_status='processando')
+    try:
+        novos = processar_foto(registro)
+    except (UnidentifiedImageError, SyntaxError, OSError) as e:
+        # Arquivo que não é uma imagem válida (ou está truncado)
+        logger.warning('Foto inválida no ponto %s: %s', registro.id, e)
+        reservado.update(foto_status='erro', foto_processada_em=timezone.now())
+        return False
+    except Exception:
+        logger.exception('Falha ao processar a foto do ponto %s', registro.id)
+        reservado.update(foto_status='erro', foto_processada_em=timezone.now())
+        return False
+
+    if not reservado.update(foto_status='processada', foto_processada_em=timezone.now(), **novos):
+        # O registro foi removido ou devolvido à fila no meio do processamento
+        for nome in novos.values():
+            registro.foto.storage.delete(nome)
+        return False
+
+    # Arquivos substituídos (original em resolução cheia e variantes antigas)
+    antigos = {registro.foto.name, registro.foto_listagem.name, registro.foto_detalhe.name}
+    for nome in antigos - set(novos.values()) - {''}:
+        registro.foto.storage.delete(nome)
+    return True
+
+
+def recuperar_abandonadas():
+    """Devolve à fila fotos cujo worker parou no meio do processamento"""
+    limite = timezone.now() - TEMPO_ABANDONO
+    return RegistroPonto.objects.filter(foto_status='processando', foto_processada_em__lt=limite).update(
+        foto_status='pendente'
+    )
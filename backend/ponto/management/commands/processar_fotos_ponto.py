@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from ponto.imagens import executar, recuperar_abandonadas, reservar_pendentes
+from ponto.models import RegistroPonto
+
+INTERVALO_MANUTENCAO = 60
+
+
+class Command(BaseCommand):
+    help = 'Worker que recodifica as fotos de ponto e gera as miniaturas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--uma-vez', action='store_true', help='Processa as fotos pendentes e encerra')
+        parser.add_argument('--intervalo', type=float, default=2.0, help='Segundos entre verificações da fila vazia')
+        parser.add_argument('--lote', type=int, default=20, help='Fotos reservadas por vez')
+        parser.add_argument(
+            '--reprocessar-erros', action='store_true', help='Recoloca na fila as fotos que falharam antes'
+        )
+
+    def handle(self, *args, **options):
+        if options['reprocessar_erros']:
+            total = RegistroPonto.objects.filter(foto_status='erro').update(foto_status='pendente')
+            self.stdout.write(f'{total} fotos recolocadas na fila.')
+
+        proxima_manutencao = 0
+        while True:
+            close_old_connections()
+            if time.monotonic() >= proxima_manutencao:
+                recuperadas = recuperar_abandonadas()
+                if recuperadas:
+                    self.stdout.write(f'{recuperadas} fotos recolocadas na fila.')
+                proxima_manutencao = time.monotonic() + INTERVALO_MANUTENCAO
+
+            registros = list(reservar_pendentes(options['lote']))
+            if not registros:
+                if options['uma_vez']:
+                    break
+                time.sleep(options['intervalo'])
+                continue
+
+            processadas = sum(executar(registro) for registro in registros)
+            self.stdout.write(self.style.SUCCESS(f'{processadas}/{len(registros)} fotos processadas.'))
@@ -0,0 +1,34 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from ponto.models import RegistroPonto
+from ponto.pareamento import reconstruir
+
+
+class Command(BaseCommand):
+    help = 'Refaz os intervalos de ponto (IntervaloPonto) de um período a partir dos registros de ponto'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--inicio', help='Data inicial (YYYY-MM-DD). Omitida: desde o primeiro registro')
+        parser.add_argument('--fim', help='Data final (YYYY-MM-DD). Omitida: até o último registro')
+
+    def handle(self, *args, **options):
+        try:
+            inicio = date.fromisoformat(options['inicio']) if options['inicio'] else None
+            fim = date.fromisoformat(options['fim']) if options['fim'] else None
+        except ValueError as e:
+            raise CommandError(f'Data inválida: {e}')
+
+        if inicio is None or fim is None:
+            limites = RegistroPonto.objects.aggregate(primeiro=Min('registrado_em'), ultimo=Max('registrado_em'))
+            if limites['primeiro'] is None:
+                self.stdout.write('Nenhum registro de ponto.')
+                return
+            inicio = inicio or timezone.localdate(limites['primeiro'])
+            fim = fim or timezone.localdate(limites['ultimo'])
+
+        total = reconstruir(inicio, fim)
+        self.stdout.write(self.style.SUCCESS(f'{total} intervalos gerados de {inicio} a {fim}.'))
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('funcionarios', '0004_cargo_updated_at'),
+        ('ponto', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='registroponto',
+            name='latitude',
+            field=models.DecimalField(decimal_places=15, help_text='Latitude do local do ponto', max_digits=20),
+        ),
+        migrations.AlterField(
+            model_name='registroponto',
+            name='longitude',
+            field=models.DecimalField(decimal_places=15, help_text='Longitude do local do ponto', max_digits=20),
+        ),
+        migrations.AddIndex(
+            model_name='registroponto',
+            index=models.Index(fields=['created_at', 'id'], name='ponto_regis_created_eef447_idx'),
+        ),
+    ]
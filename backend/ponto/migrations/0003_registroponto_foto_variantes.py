@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ponto', '0002_alter_registroponto_latitude_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registroponto',
+            name='foto_detalhe',
+            field=models.ImageField(blank=True, editable=False, help_text='Foto reduzida para a tela de detalhe', upload_to='pontos/%Y/%m/'),
+        ),
+        migrations.AddField(
+            model_name='registroponto',
+            name='foto_listagem',
+            field=models.ImageField(blank=True, editable=False, help_text='Miniatura da foto para listagens', upload_to='pontos/%Y/%m/'),
+        ),
+        migrations.AddField(
+            model_name='registroponto',
+            name='foto_processada_em',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='registroponto',
+            name='foto_status',
+            field=models.CharField(choices=[('pendente', 'Pendente'), ('processando', 'Processando'), ('processada', 'Processada'), ('erro', 'Erro')], db_index=True, default='pendente', editable=False, help_text='Situação do processamento da foto', max_length=12),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:09
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def preencher_registrado_em(apps, schema_editor):
+    RegistroPonto = apps.get_model('ponto', 'RegistroPonto')
+    RegistroPonto.objects.update(registrado_em=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ponto', '0003_registroponto_foto_variantes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registroponto',
+            name='chave_idempotencia',
+            field=models.UUIDField(blank=True, editable=False, help_text='Chave gerada pelo dispositivo; reenvios com a mesma chave são ignorados', null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='registroponto',
+            name='registrado_em',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, help_text='Data e hora do ponto no dispositivo (difere de created_at em pontos sincronizados offline)'),
+        ),
+        migrations.RunPython(preencher_registrado_em, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('localizacao', '0005_localprestacao_raio_metros'),
+        ('ponto', '0004_registroponto_sincronizacao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registroponto',
+            name='distancia_local',
+            field=models.PositiveIntegerField(blank=True, editable=False, help_text='Distância (em metros) até o local mais próximo', null=True),
+        ),
+        migrations.AddField(
+            model_name='registroponto',
+            name='local_proximo',
+            field=models.ForeignKey(blank=True, editable=False, help_text='Local de prestação mais próximo das coordenadas do ponto', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pontos_proximos', to='localizacao.localprestacao'),
+        ),
+        migrations.AddField(
+            model_name='registroponto',
+            name='validacao_local',
+            field=models.BooleanField(default=False, editable=False, help_text='Ponto dentro do raio do local mais próximo'),
+        ),
+    ]
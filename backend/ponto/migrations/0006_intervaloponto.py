@@ -0,0 +1,68 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('funcionarios', '0005_funcionario_nome_busca'),
+        ('localizacao', '0005_localprestacao_raio_metros'),
+        ('ponto', '0005_registroponto_geofence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IntervaloPonto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(help_text='Dia local (America/Cuiaba) dos pontos')),
+                ('inicio', models.DateTimeField()),
+                ('fim', models.DateTimeField(blank=True, null=True)),
+                ('segundos', models.PositiveIntegerField(default=0, help_text='Duração do intervalo em segundos')),
+                ('status', models.CharField(choices=[('completo', 'Completo'), ('sem_saida', 'Sem saída')], default='completo', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Intervalo de Ponto',
+                'verbose_name_plural': 'Intervalos de Ponto',
+                'ordering': ['-data', '-inicio'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='registroponto',
+            index=models.Index(fields=['funcionario', 'created_at'], name='ponto_regis_funcion_c8f570_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registroponto',
+            index=models.Index(fields=['funcionario', 'registrado_em'], name='ponto_regis_funcion_eaa8a4_idx'),
+        ),
+        migrations.AddField(
+            model_name='intervaloponto',
+            name='entrada',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='intervalo_entrada', to='ponto.registroponto'),
+        ),
+        migrations.AddField(
+            model_name='intervaloponto',
+            name='funcionario',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='intervalos_ponto', to='funcionarios.funcionario'),
+        ),
+        migrations.AddField(
+            model_name='intervaloponto',
+            name='saida',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='intervalo_saida', to='ponto.registroponto'),
+        ),
+        migrations.AddIndex(
+            model_name='intervaloponto',
+            index=models.Index(fields=['funcionario', 'data'], name='ponto_inter_funcion_497289_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='intervaloponto',
+            index=models.Index(fields=['data', 'inicio'], name='ponto_inter_data_7523ff_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='intervaloponto',
+            index=models.Index(fields=['status', 'data'], name='ponto_inter_status_523cec_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ponto', '0006_intervaloponto'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='intervaloponto',
+            name='entrada',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='intervalo_entrada', to='ponto.registroponto'),
+        ),
+        migrations.AlterField(
+            model_name='intervaloponto',
+            name='saida',
+            field=models.OneToOneField(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='intervalo_saida', to='ponto.registroponto'),
+        ),
+    ]
@@ -1,5 +1,46 @@
 # ponto/models.py
 from django.db import models
+from django.utils import timezone
+
+from localizacao.geofence import local_proximo
+from .signals import pontos_alterados
+
+CAMPOS_GEOFENCE = ('local_proximo', 'distancia_local', 'validacao_local')
+
+
+class RegistroPontoQuerySet(models.QuerySet):
+    """
+    bulk_create não dispara post_save: envia `pontos_alterados` com as
+    chaves (funcionario_id, data) criadas, para que caches derivados sejam
+    invalidados.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.atualizar_geofence()
+        criados = super().bulk_create(objs, *args, **kwargs)
+        pontos_alterados.send(sender=self.model, registros=criados, chaves={
+            (obj.funcionario_id, timezone.localdate(obj.created_at)) for obj in criados
+        })
+        return criados
+
+    def revalidar_geofence(self, batch_size=1000):
+        """Recalcula local mais próximo e distância; grava só os registros que mudaram"""
+        total = 0
+        lote = []
+        registros = self.order_by().only('pk', 'latitude', 'longitude', *CAMPOS_GEOFENCE)
+        for registro in registros.iterator(chunk_size=batch_size):
+            anterior = (registro.local_proximo_id, registro.distancia_local, registro.validacao_local)
+            registro.atualizar_geofence()
+            if anterior != (registro.local_proximo_id, registro.distancia_local, registro.validacao_local):
+                lote.append(registro)
+            if len(lote) >= batch_size:
+                total += self.model.objects.bulk_update(lote, CAMPOS_GEOFENCE)
+                lote = []
+        if lote:
+            total += self.model.objects.bulk_update(lote, CAMPOS_GEOFENCE)
+        return total
 
 
 class RegistroPonto(models.Model):
@@ -7,8 +48,47 @@ class RegistroPonto(models.Model):
     Registro de ponto dos funcionários.
     Responsável por armazenar a foto (comprovante), IP, latitude, longitude e o funcionário relacionado.
     Utilizado para validação de presença/autenticação do usuário no local.
+
+    A foto enviada é processada fora da request (ponto.imagens): recodificada
+    com tamanho limitado, sem EXIF, e com miniaturas para listagem e detalhe.
     """
+    FOTO_STATUS_CHOICES = [
+        ('pendente', 'Pendente'),
+        ('processando', 'Processando'),
+        ('processada', 'Processada'),
+        ('erro', 'Erro'),
+    ]
+
     foto = models.ImageField(upload_to='pontos/%Y/%m/', help_text="Foto do funcionário no momento do ponto")
+    foto_listagem = models.ImageField(
+        upload_to='pontos/%Y/%m/', blank=True, editable=False, help_text="Miniatura da foto para listagens"
+    )
+    foto_detalhe = models.ImageField(
+        upload_to='pontos/%Y/%m/', blank=True, editable=False, help_text="Foto reduzida para a tela de detalhe"
+    )
+    foto_status = models.CharField(
+        max_length=12, choices=FOTO_STATUS_CHOICES, default='pendente', editable=False, db_index=True,
+        help_text="Situação do processamento da foto"
+    )
+    foto_processada_em = models.DateTimeField(blank=True, null=True, editable=False)
+    local_proximo = models.ForeignKey(
+        'localizacao.LocalPrestacao', on_delete=models.SET_NULL, blank=True, null=True, editable=False,
+        related_name='pontos_proximos', help_text="Local de prestação mais próximo das coordenadas do ponto"
+    )
+    distancia_local = models.PositiveIntegerField(
+        blank=True, null=True, editable=False, help_text="Distância (em metros) até o local mais próximo"
+    )
+    validacao_local = models.BooleanField(
+        default=False, editable=False, help_text="Ponto dentro do raio do local mais próximo"
+    )
+    registrado_em = models.DateTimeField(
+        default=timezone.now, editable=False,
+        help_text="Data e hora do ponto no dispositivo (difere de created_at em pontos sincronizados offline)"
+    )
+    chave_idempotencia = models.UUIDField(
+        blank=True, null=True, unique=True, editable=False,
+        help_text="Chave gerada pelo dispositivo; reenvios com a mesma chave são ignorados"
+    )
     ip = models.CharField(max_length=100, help_text="IP do dispositivo no momento do registro")
     latitude = models.DecimalField(max_digits=20, decimal_places=15, help_text="Latitude do local do ponto")
     longitude = models.DecimalField(max_digits=20, decimal_places=15, help_text="Longitude do local do ponto")
@@ -25,10 +105,34 @@ class RegistroPonto(models.Model):
         verbose_name = 'Registro de Ponto'
         verbose_name_plural = 'Registros de Ponto'
         ordering = ['-created_at']
+        indexes = [
+            # Paginação por cursor da ordenação padrão (-created_at, -id)
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['funcionario', 'created_at']),
+            # Varredura ordenada do pareamento (ponto.pareamento)
+            models.Index(fields=['funcionario', 'registrado_em']),
+        ]
+
+    objects = RegistroPontoQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.funcionario} - {self.created_at.strftime('%d/%m/%Y %H:%M:%S')}"
 
+    def atualizar_geofence(self):
+        """Local mais próximo, distância e validação a partir de latitude/longitude"""
+        local_id, distancia, dentro = local_proximo(self.latitude, self.longitude)
+        self.local_proximo_id = local_id
+        self.distancia_local = round(distancia) if distancia is not None else None
+        self.validacao_local = dentro
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or set(update_fields) & {'latitude', 'longitude'}:
+            self.atualizar_geofence()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | set(CAMPOS_GEOFENCE)
+        super().save(*args, **kwargs)
+
     def to_dict(self):
         """
         Retorna um dicionário com os dados essenciais para resposta da API.
@@ -40,7 +144,57 @@ class RegistroPonto(models.Model):
             "nome_funcionario": str(self.funcionario),
             "created_at": self.created_at.isoformat(),
             "foto_url": self.foto.url if self.foto else None,
+            "foto_listagem_url": self.foto_listagem.url if self.foto_listagem else None,
+            "foto_detalhe_url": self.foto_detalhe.url if self.foto_detalhe else None,
             "ip": self.ip,
             "latitude": float(self.latitude) if self.latitude else None,
             "longitude": float(self.longitude) if self.longitude else None,
-        }
\ No newline at end of file
+        }
+
+
+class IntervaloPonto(models.Model):
+    """
+    Intervalo trabalhado derivado dos registros de ponto (entrada/saída).
+
+    Mantido por ponto.pareamento a cada ponto gravado; não deve ser editado
+    manualmente. Um ponto sem par no dia gera um intervalo 'sem_saida'.
+
+    `entrada`/`saida` não têm restrição de chave estrangeira: quando os pontos
+    são movidos para o arquivo (app `arquivo`), o intervalo continua apontando
+    para o mesmo id, agora em RegistroPontoArquivado. Pontos apagados da
+    tabela quente refazem os intervalos do dia pelos sinais de ponto.signals.
+    """
+    STATUS_CHOICES = [
+        ('completo', 'Completo'),
+        ('sem_saida', 'Sem saída'),
+    ]
+
+    funcionario = models.ForeignKey(
+        'funcionarios.Funcionario', on_delete=models.CASCADE, related_name='intervalos_ponto'
+    )
+    data = models.DateField(help_text="Dia local (America/Cuiaba) dos pontos")
+    entrada = models.OneToOneField(
+        RegistroPonto, on_delete=models.DO_NOTHING, db_constraint=False, related_name='intervalo_entrada'
+    )
+    saida = models.OneToOneField(
+        RegistroPonto, on_delete=models.DO_NOTHING, db_constraint=False,
+        blank=True, null=True, related_name='intervalo_saida'
+    )
+    inicio = models.DateTimeField()
+    fim = models.DateTimeField(blank=True, null=True)
+    segundos = models.PositiveIntegerField(default=0, help_text="Duração do intervalo em segundos")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='completo')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Intervalo de Ponto'
+        verbose_name_plural = 'Intervalos de Ponto'
+        ordering = ['-data', '-inicio']
+        indexes = [
+            models.Index(fields=['funcionario', 'data']),
+            models.Index(fields=['data', 'inicio']),
+            models.Index(fields=['status', 'data']),
+        ]
+
+    def __str__(self):
+        return f"{self.funcionario} - {self.data} ({self.get_status_display()})"
@@ -0,0 +1,125 @@
+# ponto/pareamento.py
+"""
+Pareamento dos registros de ponto em intervalos trabalhados (IntervaloPonto)
+
+Os pontos de cada funcionário são agrupados pelo dia local (America/Cuiaba)
+de `registrado_em` e pareados na ordem: 1º entrada, 2º saída, 3º entrada...
+Um ponto que sobra no fim do dia gera um intervalo 'sem_saida'. Batidas
+repetidas a menos de DUPLICIDADE da anterior (toque duplo) são ignoradas.
+
+`parear` é uma única varredura sobre linhas já ordenadas por
+(funcionario_id, registrado_em): a folha de qualquer número de funcionários
+sai de uma consulta ordenada pelo índice (funcionario, registrado_em), sem
+consultas por funcionário.
+
+- `recalcular(chaves)`: refaz os dias (funcionario_id, data) afetados; chamado
+  pelos sinais de RegistroPonto a cada ponto gravado ou removido
+- `reconstruir(inicio, fim)`: refaz um período inteiro (comando
+  `recalcular_intervalos_ponto`)
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import IntervaloPonto, RegistroPonto
+
+DUPLICIDADE = timedelta(minutes=1)
+TAMANHO_LOTE = 5000
+
+
+def parear(linhas):
+    """
+    Gera IntervaloPonto (não salvos) a partir de linhas
+    (id, funcionario_id, registrado_em) ordenadas por funcionário e horário.
+    """
+    fuso = timezone.get_current_timezone()
+    chave_atual = None
+    entrada = ultimo = None
+    for registro_id, funcionario_id, registrado_em in linhas:
+        chave = (funcionario_id, registrado_em.astimezone(fuso).date())
+        if chave != chave_atual:
+            if entrada is not None:
+                yield _intervalo(chave_atual, entrada, None)
+            chave_atual, entrada, ultimo = chave, None, None
+        if ultimo is not None and registrado_em - ultimo < DUPLICIDADE:
+            continue
+        ultimo = registrado_em
+        if entrada is None:
+            entrada = (registro_id, registrado_em)
+        else:
+            yield _intervalo(chave_atual, entrada, (registro_id, registrado_em))
+            entrada = None
+    if entrada is not None:
+        yield _intervalo(chave_atual, entrada, None)
+
+
+def _intervalo(chave, entrada, saida):
+    funcionario_id, data = chave
+    intervalo = IntervaloPonto(
+        funcionario_id=funcionario_id, data=data, entrada_id=entrada[0], inicio=entrada[1]
+    )
+    if saida is None:
+        intervalo.status = 'sem_saida'
+    else:
+        intervalo.saida_id, intervalo.fim = saida
+        intervalo.segundos = int((saida[1] - entrada[1]).total_seconds())
+    return intervalo
+
+
+def _inicio_do_dia(data):
+    return timezone.make_aware(datetime.combine(data, time.min))
+
+
+def _linhas(registros):
+    return registros.order_by('funcionario_id', 'registrado_em', 'id').values_list(
+        'id', 'funcionario_id', 'registrado_em'
+    ).iterator(chunk_size=TAMANHO_LOTE)
+
+
+def _gravar(intervalos):
+    total = 0
+    lote = []
+    for intervalo in intervalos:
+        lote.append(intervalo)
+        if len(lote) >= TAMANHO_LOTE:
+            total += len(IntervaloPonto.objects.bulk_create(lote))
+            lote = []
+    if lote:
+        total += len(IntervaloPonto.objects.bulk_create(lote))
+    return total
+
+
+def recalcular(chaves):
+    """Refaz os intervalos dos dias (funcionario_id, data) informados"""
+    chaves = {(funcionario_id, data) for funcionario_id, data in chaves if funcionario_id and data}
+    if not chaves:
+        return 0
+    funcionarios = {funcionario_id for funcionario_id, _ in chaves}
+    datas = {data for _, data in chaves}
+    registros = RegistroPonto.objects.filter(
+        funcionario_id__in=funcionarios,
+        registrado_em__gte=_inicio_do_dia(min(datas)),
+        registrado_em__lt=_inicio_do_dia(max(datas) + timedelta(days=1)),
+    )
+    filtro = Q()
+    for funcionario_id, data in chaves:
+        filtro |= Q(funcionario_id=funcionario_id, data=data)
+    with transaction.atomic():
+        IntervaloPonto.objects.filter(filtro).delete()
+        return _gravar(
+            intervalo for intervalo in parear(_linhas(registros))
+            if (intervalo.funcionario_id, intervalo.data) in chaves
+        )
+
+
+def reconstruir(inicio, fim):
+    """Refaz todos os intervalos com data entre `inicio` e `fim` (inclusive)"""
+    registros = RegistroPonto.objects.filter(
+        registrado_em__gte=_inicio_do_dia(inicio),
+        registrado_em__lt=_inicio_do_dia(fim + timedelta(days=1)),
+    )
+    with transaction.atomic():
+        IntervaloPonto.objects.filter(data__gte=inicio, data__lte=fim).delete()
+        return _gravar(parear(_linhas(registros)))
@@ -6,3 +6,13 @@ class RegistroPontoSerializer(serializers.ModelSerializer):
     class Meta:
         model = RegistroPonto
         fields = '__all__'
+
+
+class ItemSincronizacaoSerializer(serializers.Serializer):
+    """Um ponto do lote de sincronização offline (a foto é tratada à parte)"""
+    chave_idempotencia = serializers.UUIDField()
+    registrado_em = serializers.DateTimeField()
+    funcionario = serializers.IntegerField(min_value=1)
+    ip = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    latitude = serializers.DecimalField(max_digits=20, decimal_places=15)
+    longitude = serializers.DecimalField(max_digits=20, decimal_places=15)
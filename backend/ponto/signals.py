@@ -0,0 +1,50 @@
+# ponto/signals.py
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+# Enviado quando registros de ponto são criados em massa (bulk_create),
+# operação que não dispara post_save.
+#
+# Argumentos:
+# - chaves: conjunto de tuplas (funcionario_id, data local de created_at)
+# - registros: lista dos RegistroPonto criados
+pontos_alterados = Signal()
+
+
+def _dia(registro):
+    return registro.funcionario_id, timezone.localdate(registro.registrado_em)
+
+
+@receiver(pre_save, sender='ponto.RegistroPonto')
+def guardar_dia_anterior(sender, instance, **kwargs):
+    """Guarda (funcionario, dia) anteriores para refazer também o dia antigo"""
+    instance._dia_anterior = None
+    if not instance._state.adding:
+        anterior = sender.objects.filter(pk=instance.pk).values_list('funcionario_id', 'registrado_em').first()
+        if anterior:
+            instance._dia_anterior = (anterior[0], timezone.localdate(anterior[1]))
+
+
+@receiver(post_save, sender='ponto.RegistroPonto')
+def parear_ponto_salvo(sender, instance, **kwargs):
+    from .pareamento import recalcular
+
+    dias = {_dia(instance)}
+    if getattr(instance, '_dia_anterior', None):
+        dias.add(instance._dia_anterior)
+    recalcular(dias)
+
+
+@receiver(post_delete, sender='ponto.RegistroPonto')
+def parear_ponto_removido(sender, instance, **kwargs):
+    from .pareamento import recalcular
+
+    recalcular({_dia(instance)})
+
+
+@receiver(pontos_alterados)
+def parear_pontos_em_massa(sender, registros=(), **kwargs):
+    from .pareamento import recalcular
+
+    recalcular({_dia(registro) for registro in registros})
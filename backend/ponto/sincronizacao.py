@@ -0,0 +1,196 @@
+# ponto/sincronizacao.py
+"""
+Sincronização em lote de pontos batidos offline
+
+O dispositivo guarda os pontos sem sinal e os envia de uma vez. Cada item tem
+uma `chave_idempotencia` (UUID gerado no dispositivo) e o `registrado_em` do
+relógio do aparelho. O lote é validado em conjunto (uma consulta para chaves
+já recebidas e uma para funcionários) e os novos registros entram com um
+único bulk_create.
+
+Reenviar o mesmo lote não cria nada: as chaves já gravadas são respondidas
+como 'duplicado' antes de qualquer validação de imagem ou gravação de arquivo.
+As fotos são gravadas antes do INSERT; se o lote falhar, elas são apagadas.
+"""
+import base64
+import binascii
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from funcionarios.models import Funcionario
+from .models import RegistroPonto
+from .serializers import ItemSincronizacaoSerializer
+
+MAX_ITENS = 200
+# Relógio do aparelho adiantado além disso é tratado como erro
+TOLERANCIA_FUTURO = timedelta(minutes=5)
+# Pontos mais antigos que isso não são mais aceitos pela sincronização
+ATRASO_MAXIMO = timedelta(days=30)
+
+
+class LoteInvalido(Exception):
+    """O lote como um todo não pode ser processado"""
+
+
+def _resultado(chave, status, registro_id=None, erros=None):
+    resultado = {'chave_idempotencia': chave, 'status': status, 'id': registro_id}
+    if erros:
+        resultado['erros'] = erros
+    return resultado
+
+
+def _foto_base64(texto, chave):
+    """Aceita data URI ('data:image/png;base64,...') ou base64 puro"""
+    if ',' in texto and texto.startswith('data:'):
+        cabecalho, texto = texto.split(',', 1)
+        extensao = cabecalho.split('/')[-1].split(';')[0] or 'png'
+    else:
+        extensao = 'png'
+    try:
+        conteudo = base64.b64decode(texto, validate=True)
+    except (binascii.Error, ValueError):
+        raise serializers.ValidationError('Foto em base64 inválida.')
+    return ContentFile(conteudo, name=f'ponto_{chave}.{extensao}')
+
+
+def _validar_foto(item, arquivos, chave):
+    """Foto do item: arquivo do multipart com o nome da chave ou `foto` em base64"""
+    foto = arquivos.get(str(chave))
+    if foto is None and isinstance(item.get('foto'), str) and item['foto']:
+        foto = _foto_base64(item['foto'], chave)
+    if foto is None:
+        raise serializers.ValidationError('Foto obrigatória.')
+    # Mesma validação (Pillow) do upload individual
+    return serializers.ImageField().run_validation(foto)
+
+
+def _inserir(registros):
+    """bulk_create; devolve as chaves que outros envios gravaram no meio do caminho"""
+    concorrentes = set()
+    restantes = registros
+    while restantes:
+        try:
+            with transaction.atomic():
+                RegistroPonto.objects.bulk_create(restantes)
+            break
+        except IntegrityError:
+            # Envios simultâneos do mesmo lote: grava só o que ainda falta,
+            # quantas vezes for preciso
+            gravadas = set(RegistroPonto.objects.filter(
+                chave_idempotencia__in=[registro.chave_idempotencia for registro in restantes]
+            ).values_list('chave_idempotencia', flat=True))
+            if not gravadas:
+                # O conflito não é de chave repetida
+                raise
+        concorrentes |= gravadas
+        proximos = []
+        for registro in restantes:
+            if registro.chave_idempotencia in gravadas:
+                registro.foto.delete(save=False)
+            else:
+                proximos.append(registro)
+        restantes = proximos
+    return concorrentes
+
+
+def _preparar(dados, item, arquivos, funcionarios, agora, ip_padrao):
+    """Valida um item novo e devolve (registro, erros); a foto já fica gravada no storage"""
+    chave = dados['chave_idempotencia']
+    erros = {}
+    if dados['funcionario'] not in funcionarios:
+        erros['funcionario'] = ['Funcionário não encontrado.']
+    if dados['registrado_em'] > agora + TOLERANCIA_FUTURO:
+        erros['registrado_em'] = ['Horário no futuro.']
+    elif dados['registrado_em'] < agora - ATRASO_MAXIMO:
+        erros['registrado_em'] = ['Ponto antigo demais para sincronização.']
+    if erros:
+        return None, erros
+    try:
+        foto = _validar_foto(item, arquivos, chave)
+    except serializers.ValidationError as e:
+        return None, {'foto': e.detail}
+
+    registro = RegistroPonto(
+        funcionario_id=dados['funcionario'],
+        registrado_em=dados['registrado_em'],
+        chave_idempotencia=chave,
+        ip=dados.get('ip') or ip_padrao,
+        latitude=dados['latitude'],
+        longitude=dados['longitude'],
+    )
+    registro.foto.save(foto.name, foto, save=False)
+    return registro, None
+
+
+def sincronizar(itens, arquivos, ip_padrao=''):
+    """
+    Processa um lote de pontos. Devolve a lista de resultados na ordem dos itens:
+    {'chave_idempotencia', 'status': 'criado' | 'duplicado' | 'erro', 'id', 'erros'}
+    """
+    if not isinstance(itens, list) or not itens:
+        raise LoteInvalido('Envie uma lista de registros não vazia.')
+    if len(itens) > MAX_ITENS:
+        raise LoteInvalido(f'Máximo de {MAX_ITENS} registros por lote.')
+
+    resultados = [None] * len(itens)
+    # chave -> (dados validados, índices dos itens com essa chave)
+    por_chave = {}
+    for indice, item in enumerate(itens):
+        item = item if isinstance(item, dict) else {}
+        serializer = ItemSincronizacaoSerializer(data=item)
+        if not serializer.is_valid():
+            resultados[indice] = _resultado(item.get('chave_idempotencia'), 'erro', erros=serializer.errors)
+            continue
+        chave = serializer.validated_data['chave_idempotencia']
+        por_chave.setdefault(chave, (serializer.validated_data, []))[1].append(indice)
+
+    # Reenvio: chaves já gravadas não passam pela validação da foto
+    existentes = dict(RegistroPonto.objects.filter(
+        chave_idempotencia__in=list(por_chave)
+    ).values_list('chave_idempotencia', 'id'))
+    ids_funcionarios = {dados['funcionario'] for chave, (dados, _) in por_chave.items() if chave not in existentes}
+    funcionarios = set(
+        Funcionario.objects.filter(id__in=ids_funcionarios).values_list('id', flat=True)
+    ) if ids_funcionarios else set()
+    agora = timezone.now()
+
+    finais = {}
+    novos = []
+    try:
+        for chave, (dados, indices) in por_chave.items():
+            if chave in existentes:
+                finais[chave] = _resultado(str(chave), 'duplicado', existentes[chave])
+                continue
+            registro, erros = _preparar(dados, itens[indices[0]], arquivos, funcionarios, agora, ip_padrao)
+            if erros:
+                finais[chave] = _resultado(str(chave), 'erro', erros=erros)
+            else:
+                novos.append(registro)
+        concorrentes = _inserir(novos) if novos else set()
+    except Exception:
+        # Nenhum registro do lote foi gravado: as fotos já salvas ficariam órfãs
+        for registro in novos:
+            registro.foto.delete(save=False)
+        raise
+    if concorrentes:
+        existentes = dict(RegistroPonto.objects.filter(
+            chave_idempotencia__in=concorrentes
+        ).values_list('chave_idempotencia', 'id'))
+    for registro in novos:
+        chave = registro.chave_idempotencia
+        if chave in concorrentes:
+            finais[chave] = _resultado(str(chave), 'duplicado', existentes.get(chave))
+        else:
+            finais[chave] = _resultado(str(chave), 'criado', registro.pk)
+
+    # Itens repetidos dentro do lote respondem como duplicata do primeiro
+    for chave, (_, indices) in por_chave.items():
+        primeiro, *repetidos = indices
+        resultados[primeiro] = finais[chave]
+        for indice in repetidos:
+            resultados[indice] = dict(finais[chave], status='duplicado') if finais[chave]['id'] else finais[chave]
+    return resultados
@@ -1,3 +1,216 @@
-from django.test import TestCase
+import base64
+import contextlib
+import io
+import shutil
+import tempfile
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, OperationalError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from prestacoes.tests import cliente, montar_cenario
+from . import imagens
+from .models import IntervaloPonto, RegistroPonto
+from .pareamento import parear, reconstruir
+from .sincronizacao import sincronizar
+
+
+def foto_base64():
+    conteudo = io.BytesIO()
+    Image.new('RGB', (4, 4)).save(conteudo, format='PNG')
+    return base64.b64encode(conteudo.getvalue()).decode()
+
+
+class MidiaTemporariaMixin:
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        configuracao = override_settings(MEDIA_ROOT=self.media)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        self.funcionario = montar_cenario().funcionario
+
+    def _fotos_gravadas(self):
+        return sorted(
+            str(caminho.relative_to(self.media))
+            for caminho in Path(self.media).rglob('*') if caminho.is_file()
+        )
+
+
+class SincronizacaoTests(MidiaTemporariaMixin, TestCase):
+
+    def _itens(self, quantidade):
+        foto = foto_base64()
+        return [{
+            'chave_idempotencia': str(uuid.uuid4()),
+            'registrado_em': timezone.now().isoformat(),
+            'funcionario': self.funcionario.pk,
+            'latitude': '-15.6', 'longitude': '-56.1',
+            'foto': foto,
+        } for _ in range(quantidade)]
+
+    def test_conflitos_repetidos_gravam_o_que_falta(self):
+        itens = self._itens(3)
+        bulk_create = RegistroPonto.objects.bulk_create
+        tentativas = []
+
+        def concorrente(registros, *args, **kwargs):
+            # Nas duas primeiras tentativas outro envio grava um dos registros
+            # antes (fora do savepoint, que o mock de transaction.atomic dispensa)
+            tentativas.append(len(registros))
+            if len(tentativas) <= 2:
+                primeiro = registros[0]
+                bulk_create([RegistroPonto(
+                    funcionario_id=primeiro.funcionario_id, registrado_em=primeiro.registrado_em,
+                    chave_idempotencia=primeiro.chave_idempotencia, latitude=primeiro.latitude,
+                    longitude=primeiro.longitude, foto='pontos/concorrente.png',
+                )])
+                raise IntegrityError('UNIQUE constraint failed')
+            return bulk_create(registros, *args, **kwargs)
+
+        with mock.patch.object(RegistroPonto.objects, 'bulk_create', side_effect=concorrente), \
+                mock.patch('ponto.sincronizacao.transaction', mock.Mock(atomic=contextlib.nullcontext)):
+            resultados = sincronizar(itens, {})
+
+        self.assertEqual(tentativas, [3, 2, 1])
+        self.assertEqual([resultado['status'] for resultado in resultados], ['duplicado', 'duplicado', 'criado'])
+        self.assertEqual(RegistroPonto.objects.count(), 3)
+        # Só a foto do registro criado fica no storage
+        self.assertEqual(len(self._fotos_gravadas()), 1)
+
+    def test_falha_no_insert_apaga_as_fotos(self):
+        with mock.patch.object(RegistroPonto.objects, 'bulk_create', side_effect=OperationalError('database is locked')):
+            with self.assertRaises(OperationalError):
+                sincronizar(self._itens(2), {})
+        self.assertEqual(self._fotos_gravadas(), [])
+        self.assertFalse(RegistroPonto.objects.exists())
+
+
+class FotosPontoTests(MidiaTemporariaMixin, TestCase):
+
+    def _ponto(self, conteudo, nome='camera.png'):
+        return RegistroPonto.objects.create(
+            funcionario=self.funcionario, foto=SimpleUploadedFile(nome, conteudo),
+            ip='127.0.0.1', latitude='-15.6', longitude='-56.1',
+        )
+
+    def _png(self, largura, altura):
+        conteudo = io.BytesIO()
+        Image.new('RGBA', (largura, altura), (200, 10, 10, 255)).save(conteudo, format='PNG')
+        return conteudo.getvalue()
+
+    def _processar(self):
+        return [imagens.executar(registro) for registro in imagens.reservar_pendentes()]
+
+    def test_recodifica_e_gera_as_variantes(self):
+        ponto = self._ponto(self._png(3200, 1800))
+        original = ponto.foto.name
+        self.assertEqual(ponto.foto_status, 'pendente')
+
+        self.assertEqual(self._processar(), [True])
+        ponto.refresh_from_db()
+        self.assertEqual(ponto.foto_status, 'processada')
+        tamanhos = {}
+        for campo in ('foto', 'foto_listagem', 'foto_detalhe'):
+            with Image.open(getattr(ponto, campo).path) as imagem:
+                tamanhos[campo] = (imagem.format, imagem.size)
+        self.assertEqual(tamanhos, {
+            'foto': ('JPEG', (1600, 900)),
+            'foto_listagem': ('WEBP', (160, 90)),
+            'foto_detalhe': ('WEBP', (640, 360)),
+        })
+        # O PNG original em resolução cheia é substituído
+        self.assertNotIn(original, self._fotos_gravadas())
+        self.assertEqual(len(self._fotos_gravadas()), 3)
+
+    def test_arquivo_invalido_fica_com_erro(self):
+        ponto = self._ponto(b'nao e uma imagem')
+        with self.assertLogs('ponto.imagens', 'WARNING'):
+            self.assertEqual(self._processar(), [False])
+        ponto.refresh_from_db()
+        self.assertEqual(ponto.foto_status, 'erro')
+
+    def test_reserva_exclusiva_e_recuperacao(self):
+        ponto = self._ponto(self._png(10, 10))
+        self.assertEqual([registro.pk for registro in imagens.reservar_pendentes()], [ponto.pk])
+        self.assertFalse(imagens.reservar_pendentes().exists())
+
+        self.assertEqual(imagens.recuperar_abandonadas(), 0)
+        RegistroPonto.objects.filter(pk=ponto.pk).update(
+            foto_processada_em=timezone.now() - imagens.TEMPO_ABANDONO - timedelta(seconds=1)
+        )
+        self.assertEqual(imagens.recuperar_abandonadas(), 1)
+        self.assertEqual(self._processar(), [True])
+
+
+def instante(dia, hora, minuto=0, segundo=0):
+    return timezone.make_aware(datetime(2024, 5, dia, hora, minuto, segundo))
+
+
+class PareamentoTests(TestCase):
+
+    def setUp(self):
+        self.cenario = montar_cenario()
+        self.funcionario = self.cenario.funcionario
+
+    def _ponto(self, registrado_em):
+        return RegistroPonto.objects.create(
+            funcionario=self.funcionario, foto='pontos/teste.png', ip='127.0.0.1',
+            latitude='-15.6', longitude='-56.1', registrado_em=registrado_em,
+        )
+
+    def _intervalos(self):
+        return list(IntervaloPonto.objects.order_by('inicio').values_list('data', 'status', 'segundos'))
+
+    def test_parear_em_uma_varredura(self):
+        linhas = [
+            (1, 7, instante(2, 8)), (2, 7, instante(2, 8, 0, 30)),  # toque duplo
+            (3, 7, instante(2, 12)), (4, 7, instante(2, 13)),        # sem saída no fim do dia
+            (5, 7, instante(3, 8)), (6, 7, instante(3, 17)),
+            (7, 9, instante(2, 23, 30)), (8, 9, instante(3, 0, 30)),  # virada do dia local
+        ]
+        resultado = [
+            (intervalo.funcionario_id, intervalo.data.day, intervalo.entrada_id, intervalo.saida_id,
+             intervalo.segundos, intervalo.status)
+            for intervalo in parear(linhas)
+        ]
+        self.assertEqual(resultado, [
+            (7, 2, 1, 3, 4 * 3600, 'completo'),
+            (7, 2, 4, None, 0, 'sem_saida'),
+            (7, 3, 5, 6, 9 * 3600, 'completo'),
+            (9, 2, 7, None, 0, 'sem_saida'),
+            (9, 3, 8, None, 0, 'sem_saida'),
+        ])
+
+    def test_sinais_refazem_os_dias_alterados(self):
+        entrada = self._ponto(instante(2, 8))
+        self.assertEqual(self._intervalos(), [(date(2024, 5, 2), 'sem_saida', 0)])
+        saida = self._ponto(instante(2, 12))
+        self.assertEqual(self._intervalos(), [(date(2024, 5, 2), 'completo', 4 * 3600)])
+
+        # Mudar o ponto de dia refaz o dia antigo e o novo
+        saida.registrado_em = instante(3, 9)
+        saida.save()
+        self.assertEqual(self._intervalos(), [(date(2024, 5, 2), 'sem_saida', 0), (date(2024, 5, 3), 'sem_saida', 0)])
+
+        saida.delete()
+        entrada.delete()
+        self.assertEqual(self._intervalos(), [])
+
+    def test_reconstruir_periodo_e_folha(self):
+        for hora in (8, 12, 13, 17):
+            self._ponto(instante(2, hora))
+        IntervaloPonto.objects.all().delete()
+        self.assertEqual(reconstruir(date(2024, 5, 1), date(2024, 5, 31)), 2)
+
+        resposta = cliente(self.cenario.admin).get('/api/relatorios/intervalos/folha/')
+        self.assertEqual(resposta.status_code, 200)
+        linha, = resposta.data['results']
+        self.assertEqual((linha['intervalos'], linha['sem_saida'], linha['horas']), (2, 0, '8:00:00'))
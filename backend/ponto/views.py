@@ -1,10 +1,51 @@
+import json
+
 from django.shortcuts import render
-from rest_framework import viewsets
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework.response import Response
 from .models import RegistroPonto
 from .serializers import RegistroPontoSerializer
+from .sincronizacao import LoteInvalido, sincronizar
 
 # Create your views here.
 
 class RegistroPontoView(viewsets.ModelViewSet):
     queryset = RegistroPonto.objects.all()
-    serializer_class = RegistroPontoSerializer
\ No newline at end of file
+    serializer_class = RegistroPontoSerializer
+
+    @action(detail=False, methods=['post'], parser_classes=[MultiPartParser, FormParser, JSONParser])
+    def sincronizar(self, request):
+        """
+        Recebe vários pontos batidos offline em uma única requisição.
+
+        Corpo JSON ou multipart com `registros`: lista de itens com
+        `chave_idempotencia` (UUID gerado no dispositivo), `registrado_em`,
+        `funcionario`, `latitude`, `longitude` e `ip` (opcional). A foto de
+        cada item vai no arquivo multipart cujo nome é a própria chave, ou
+        em `foto` como base64/data URI.
+
+        Responde um resultado por item, na mesma ordem: `criado`,
+        `duplicado` (chave já recebida; reenviar o lote é seguro) ou `erro`.
+        """
+        registros = request.data.get('registros')
+        if isinstance(registros, str):
+            try:
+                registros = json.loads(registros)
+            except ValueError:
+                return Response({'detail': 'registros deve ser uma lista JSON.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            resultados = sincronizar(registros, request.FILES, ip_padrao=request.META.get('REMOTE_ADDR', ''))
+        except LoteInvalido as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        totais = {situacao: 0 for situacao in ('criado', 'duplicado', 'erro')}
+        for resultado in resultados:
+            totais[resultado['status']] += 1
+        return Response({
+            'criados': totais['criado'],
+            'duplicados': totais['duplicado'],
+            'erros': totais['erro'],
+            'resultados': resultados,
+        })
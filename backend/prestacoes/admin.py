@@ -8,20 +8,20 @@ class RegistroPrestacaoAdmin(admin.ModelAdmin):
     search_fields = ("funcionario__usuario__first_name", "funcionario__usuario__last_name", "local_prestacao__nome")
     list_filter = ("data", "validacao_gestor", "validacao_local", "funcionario__empresa", "created_at")
     list_per_page = 20
-    readonly_fields = ("created_at", "updated_at")
+    readonly_fields = ("segundos_trabalhados", "lote_pagamento", "created_at", "updated_at")
     
     fieldsets = (
         ('Informações Básicas', {
             'fields': ('funcionario', 'local_prestacao', 'gestor', 'data')
         }),
         ('Horários', {
-            'fields': ('horario_chegada', 'horario_saida_almoco', 'horario_retorno_almoco', 'horario_saida')
+            'fields': ('horario_chegada', 'horario_saida_almoco', 'horario_retorno_almoco', 'horario_saida', 'segundos_trabalhados')
         }),
         ('Validações', {
             'fields': ('validacao_local', 'validacao_gestor')
         }),
         ('Financeiro', {
-            'fields': ('valor', 'observacoes')
+            'fields': ('valor', 'observacoes', 'lote_pagamento')
         }),
         ('Evidências', {
             'fields': ('foto_comprovante',)
@@ -0,0 +1,104 @@
+# prestacoes/fila.py
+"""
+Fila de validação das prestações pendentes de cada gestor
+
+Cada revisor pede o próximo lote (`reservar`) e recebe as prestações
+pendentes mais antigas do seu escopo que não estão reservadas por outro
+revisor. A reserva é um prazo curto (`reservado_por`/`reservado_ate`):
+vencido o prazo sem validação, a prestação volta para a fila sozinha, sem
+nenhuma rotina de limpeza.
+
+A reserva não segura locks enquanto o revisor trabalha. Ela é um UPDATE
+condicional (só grava onde a reserva continua livre ou vencida), então dois
+revisores que escolheram a mesma linha ao mesmo tempo não a recebem ambos:
+quem perder a corrida recebe só o que de fato reservou e tenta mais uma vez
+completar o lote. No PostgreSQL a escolha das candidatas ainda usa
+SKIP LOCKED, para que revisores simultâneos nem disputem as mesmas linhas.
+
+A busca usa o índice parcial `prestacao_fila_pendentes` (gestor, created_at
+das pendentes), que contém só a fila, não o histórico.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from .models import RegistroPrestacao
+
+DURACAO_RESERVA = getattr(settings, 'FILA_VALIDACAO_RESERVA_SEGUNDOS', 10 * 60)
+TAMANHO_PADRAO = 20
+TAMANHO_MAXIMO = 100
+TENTATIVAS = 2
+
+
+def pendentes(gestor_id):
+    """Prestações pendentes do gestor, das mais antigas para as mais novas"""
+    return RegistroPrestacao.objects.filter(gestor_id=gestor_id, validacao_gestor='pendente').order_by('created_at')
+
+
+def _livre(agora):
+    return Q(reservado_ate__isnull=True) | Q(reservado_ate__lte=agora)
+
+
+def _candidatas(gestor_id, agora, quantidade):
+    candidatas = pendentes(gestor_id).filter(_livre(agora))
+    if connection.features.has_select_for_update_skip_locked:
+        candidatas = candidatas.select_for_update(skip_locked=True, of=('self',))
+    return list(candidatas.values_list('pk', flat=True)[:quantidade])
+
+
+def reservar(gestor_id, usuario, quantidade=TAMANHO_PADRAO):
+    """
+    Reserva para `usuario` até `quantidade` prestações pendentes do gestor.
+
+    As reservas que o usuário ainda tem no gestor são renovadas e entram no
+    lote. Devolve (queryset das prestações reservadas, fim da reserva).
+    """
+    agora = timezone.now()
+    fim = agora + timedelta(seconds=DURACAO_RESERVA)
+    minhas = pendentes(gestor_id).filter(reservado_por=usuario, reservado_ate__gt=agora)
+    reservadas = minhas.update(reservado_ate=fim)
+
+    for _ in range(TENTATIVAS):
+        if reservadas >= quantidade:
+            break
+        with transaction.atomic():
+            ids = _candidatas(gestor_id, agora, quantidade - reservadas)
+            if not ids:
+                break
+            # Condição repetida no UPDATE: linhas reservadas por outro revisor
+            # entre a leitura e a escrita ficam de fora
+            reservadas += RegistroPrestacao.objects.filter(
+                _livre(agora), pk__in=ids, validacao_gestor='pendente'
+            ).update(reservado_por=usuario, reservado_ate=fim)
+
+    lote = pendentes(gestor_id).filter(reservado_por=usuario, reservado_ate=fim)
+    return lote, fim
+
+
+def liberar(usuario, ids=None):
+    """Devolve à fila as reservas de `usuario` (todas ou só as de `ids`); devolve quantas"""
+    reservas = RegistroPrestacao.objects.filter(reservado_por=usuario, reservado_ate__isnull=False)
+    if ids is not None:
+        reservas = reservas.filter(pk__in=ids)
+    return reservas.update(reservado_por=None, reservado_ate=None)
+
+
+def resumo(gestor_id):
+    """Profundidade e idade da fila do gestor"""
+    agora = timezone.now()
+    dados = pendentes(gestor_id).order_by().aggregate(
+        pendentes=Count('pk'),
+        reservadas=Count('pk', filter=Q(reservado_ate__gt=agora)),
+        mais_antiga=Min('created_at'),
+    )
+    dados['disponiveis'] = dados['pendentes'] - dados['reservadas']
+    mais_antiga = dados['mais_antiga']
+    if mais_antiga:
+        dados['mais_antiga'] = timezone.localtime(mais_antiga)
+        dados['idade_segundos'] = int((agora - mais_antiga).total_seconds())
+    else:
+        dados['idade_segundos'] = None
+    return dados
@@ -0,0 +1,385 @@
+# prestacoes/importacao.py
+"""
+Importação em massa de prestações a partir de planilhas (CSV ou XLSX)
+
+As linhas são lidas em streaming (CSV com `csv.reader`, XLSX direto do XML da
+planilha, sem carregar o arquivo inteiro) e validadas sem consultas por
+linha: funcionários (CPF), locais (nome e, se preciso, cidade) e gestores
+(usuário) são carregados uma vez em dicionários, as regras de horário são as
+de `RegistroPrestacao.clean` (`validar_horarios`) e a unicidade
+(funcionário, data, local) é conferida contra o arquivo e contra as
+prestações já gravadas no período da planilha (tabela atual e arquivo), na
+mesma transação da gravação. Uma prestação gravada por outro processo entre a
+conferência e a gravação faz a importação inteira falhar com ArquivoInvalido.
+
+Por padrão a importação é tudo ou nada: havendo qualquer erro, nada é
+gravado e o relatório de erros por linha é devolvido. Com `parcial` as
+linhas válidas são gravadas mesmo assim. A gravação usa bulk_create em lotes
+(que mantém segundos_trabalhados, validacao_local e o resumo diário).
+
+Colunas (cabeçalho na primeira linha, sem diferenciar maiúsculas/acentos):
+- obrigatórias: cpf, data, local, gestor (usuário), horario_chegada,
+  horario_saida, valor
+- opcionais: cidade (desempata locais com o mesmo nome),
+  horario_saida_almoco, horario_retorno_almoco, observacoes
+"""
+import csv
+import io
+import re
+import zipfile
+from datetime import date, time, timedelta
+from decimal import Decimal, InvalidOperation
+from xml.etree.ElementTree import iterparse
+
+from django.db import IntegrityError, transaction
+
+from arquivo.models import RegistroPrestacaoArquivada
+from empresas.models import Gestor
+from funcionarios.busca import normalizar_nome
+from funcionarios.models import Funcionario
+from localizacao.models import LocalPrestacao
+from .models import RegistroPrestacao, validar_horarios
+
+COLUNAS_OBRIGATORIAS = ('cpf', 'data', 'local', 'gestor', 'horario_chegada', 'horario_saida', 'valor')
+COLUNAS_OPCIONAIS = ('cidade', 'horario_saida_almoco', 'horario_retorno_almoco', 'observacoes')
+TAMANHO_LOTE = 2000
+# Erros devolvidos no relatório; o total continua sendo contado
+MAX_ERROS_RELATORIO = 1000
+VALOR_MAXIMO = Decimal('99999999.99')
+# Dia zero das datas seriais do Excel
+EPOCA_EXCEL = date(1899, 12, 30)
+
+_NS_PLANILHA = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_COLUNA_CELULA = re.compile(r'[A-Z]+')
+
+
+class ArquivoInvalido(Exception):
+    """O arquivo como um todo não pode ser importado"""
+
+
+# Leitura
+
+def _coluna(nome):
+    return normalizar_nome(str(nome or '')).replace(' ', '_')
+
+
+def _linhas_csv(arquivo):
+    texto = io.TextIOWrapper(arquivo, encoding='utf-8-sig', newline='')
+    cabecalho = texto.readline()
+    # Planilhas exportadas pelo Excel em português usam ';'
+    delimitador = ';' if cabecalho.count(';') > cabecalho.count(',') else ','
+    yield next(csv.reader([cabecalho], delimiter=delimitador), [])
+    yield from csv.reader(texto, delimiter=delimitador)
+
+
+def _indice_coluna(referencia):
+    indice = 0
+    for letra in _COLUNA_CELULA.match(referencia).group():
+        indice = indice * 26 + ord(letra) - 64
+    return indice - 1
+
+
+def _textos_compartilhados(pacote):
+    if 'xl/sharedStrings.xml' not in pacote.namelist():
+        return []
+    textos = []
+    with pacote.open('xl/sharedStrings.xml') as xml:
+        for _, elemento in iterparse(xml):
+            if elemento.tag == f'{_NS_PLANILHA}si':
+                textos.append(''.join(t.text or '' for t in elemento.iter(f'{_NS_PLANILHA}t')))
+                elemento.clear()
+    return textos
+
+
+def _valor_celula(celula, compartilhados):
+    tipo = celula.get('t')
+    if tipo == 'inlineStr':
+        return ''.join(t.text or '' for t in celula.iter(f'{_NS_PLANILHA}t'))
+    valor = celula.findtext(f'{_NS_PLANILHA}v')
+    if valor is None:
+        return ''
+    if tipo == 's':
+        return compartilhados[int(valor)]
+    if tipo in ('str', 'e'):
+        return valor
+    if tipo == 'b':
+        return valor == '1'
+    numero = float(valor)
+    return int(numero) if numero.is_integer() else numero
+
+
+def _linhas_xlsx(arquivo):
+    try:
+        pacote = zipfile.ZipFile(arquivo)
+    except zipfile.BadZipFile:
+        raise ArquivoInvalido('Arquivo XLSX inválido.')
+    with pacote:
+        planilhas = sorted(nome for nome in pacote.namelist() if nome.startswith('xl/worksheets/sheet'))
+        if not planilhas:
+            raise ArquivoInvalido('Arquivo XLSX sem planilhas.')
+        compartilhados = _textos_compartilhados(pacote)
+        with pacote.open(planilhas[0]) as xml:
+            for _, elemento in iterparse(xml):
+                if elemento.tag != f'{_NS_PLANILHA}row':
+                    continue
+                valores = []
+                for celula in elemento.iter(f'{_NS_PLANILHA}c'):
+                    indice = _indice_coluna(celula.get('r')) if celula.get('r') else len(valores)
+                    valores.extend([''] * (indice - len(valores)))
+                    valores.append(_valor_celula(celula, compartilhados))
+                elemento.clear()
+                yield valores
+
+
+def ler_linhas(arquivo, nome_arquivo, obrigatorias=COLUNAS_OBRIGATORIAS):
+    """Dicionários (coluna -> valor) das linhas do arquivo, com o número da linha na planilha"""
+    extensao = nome_arquivo.rsplit('.', 1)[-1].lower() if '.' in nome_arquivo else ''
+    if extensao == 'csv':
+        linhas = _linhas_csv(arquivo)
+    elif extensao == 'xlsx':
+        linhas = _linhas_xlsx(arquivo)
+    else:
+        raise ArquivoInvalido('Formato não suportado. Envie um arquivo .csv ou .xlsx.')
+
+    try:
+        cabecalho = [_coluna(nome) for nome in next(linhas)]
+    except (StopIteration, UnicodeDecodeError):
+        raise ArquivoInvalido('Arquivo vazio ou com codificação inválida (use UTF-8).')
+    faltando = [coluna for coluna in obrigatorias if coluna not in cabecalho]
+    if faltando:
+        raise ArquivoInvalido(f"Colunas obrigatórias ausentes: {', '.join(faltando)}.")
+
+    try:
+        for numero, valores in enumerate(linhas, start=2):
+            if not any(str(valor).strip() for valor in valores):
+                continue
+            yield numero, dict(zip(cabecalho, valores))
+    except UnicodeDecodeError:
+        raise ArquivoInvalido('Codificação inválida (use UTF-8).')
+
+
+# Conversão dos valores
+
+def _texto(valor):
+    return str(valor).strip() if valor is not None else ''
+
+
+def _cpf(valor):
+    digitos = re.sub(r'\D', '', _texto(valor))
+    # Células numéricas perdem os zeros à esquerda
+    digitos = digitos.zfill(11) if digitos else ''
+    if len(digitos) != 11:
+        raise ValueError('CPF inválido.')
+    return f'{digitos[:3]}.{digitos[3:6]}.{digitos[6:9]}-{digitos[9:]}'
+
+
+def _data(valor):
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return EPOCA_EXCEL + timedelta(days=int(valor))
+    texto = _texto(valor)
+    try:
+        if '/' in texto:
+            dia, mes, ano = texto.split('/')
+            return date(int(ano), int(mes), int(dia))
+        return date.fromisoformat(texto[:10])
+    except ValueError:
+        raise ValueError('Data inválida (use AAAA-MM-DD ou DD/MM/AAAA).')
+
+
+def _horario(valor, obrigatorio=True):
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        # Fração do dia no Excel
+        segundos = round((valor % 1) * 86400)
+        if segundos >= 86400:
+            raise ValueError('Horário inválido.')
+        return time(segundos // 3600, segundos % 3600 // 60, segundos % 60)
+    texto = _texto(valor)
+    if not texto:
+        if obrigatorio:
+            raise ValueError('Horário obrigatório.')
+        return None
+    try:
+        return time.fromisoformat(texto.zfill(5) if len(texto) == 4 else texto)
+    except ValueError:
+        raise ValueError('Horário inválido (use HH:MM).')
+
+
+def _valor(valor):
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        numero = Decimal(str(valor))
+    else:
+        texto = _texto(valor).replace('R$', '').replace(' ', '')
+        if ',' in texto:
+            # Formato brasileiro: 1.234,56
+            texto = texto.replace('.', '').replace(',', '.')
+        try:
+            numero = Decimal(texto)
+        except InvalidOperation:
+            raise ValueError('Valor inválido.')
+    numero = numero.quantize(Decimal('0.01'))
+    if numero < Decimal('0.01') or numero > VALOR_MAXIMO:
+        raise ValueError('Valor fora do intervalo permitido.')
+    return numero
+
+
+# Validação
+
+def carregar_referencias():
+    """Dicionários de busca por chave natural, carregados uma única vez por importação"""
+    locais = {}
+    for local_id, nome, cidade in LocalPrestacao.objects.filter(ativo=True).values_list(
+        'id', 'nome', 'cidade__nome'
+    ).iterator(chunk_size=5000):
+        locais.setdefault(normalizar_nome(nome), []).append((local_id, normalizar_nome(cidade)))
+    return {
+        'funcionarios': dict(
+            Funcionario.objects.filter(ativo=True).values_list('usuario__cpf', 'id').iterator(chunk_size=5000)
+        ),
+        'gestores': {
+            usuario.lower(): gestor_id
+            for gestor_id, usuario in Gestor.objects.filter(ativo=True).values_list('id', 'usuario__username')
+        },
+        'locais': locais,
+    }
+
+
+def _local(linha, locais):
+    candidatos = locais.get(normalizar_nome(_texto(linha.get('local'))))
+    if not candidatos:
+        raise ValueError('Local de prestação não encontrado.')
+    cidade = normalizar_nome(_texto(linha.get('cidade')))
+    if cidade:
+        candidatos = [candidato for candidato in candidatos if candidato[1] == cidade]
+        if not candidatos:
+            raise ValueError('Local de prestação não encontrado nesta cidade.')
+    if len(candidatos) > 1:
+        raise ValueError('Há mais de um local com este nome; informe a cidade.')
+    return candidatos[0][0]
+
+
+# Campo -> (coluna, conversão)
+CONVERSOES = {
+    'data': ('data', _data),
+    'horario_chegada': ('horario_chegada', _horario),
+    'horario_saida_almoco': ('horario_saida_almoco', lambda valor: _horario(valor, obrigatorio=False)),
+    'horario_retorno_almoco': ('horario_retorno_almoco', lambda valor: _horario(valor, obrigatorio=False)),
+    'horario_saida': ('horario_saida', _horario),
+    'valor': ('valor', _valor),
+}
+
+
+def validar_linha(linha, referencias):
+    """Devolve (campos, erros) de uma linha da planilha"""
+    campos = {}
+    erros = {}
+    try:
+        campos['funcionario_id'] = referencias['funcionarios'][_cpf(linha.get('cpf'))]
+    except ValueError as e:
+        erros['cpf'] = [str(e)]
+    except KeyError:
+        erros['cpf'] = ['Funcionário ativo não encontrado para este CPF.']
+    try:
+        campos['local_prestacao_id'] = _local(linha, referencias['locais'])
+    except ValueError as e:
+        erros['local'] = [str(e)]
+    gestor = referencias['gestores'].get(_texto(linha.get('gestor')).lower())
+    if gestor is None:
+        erros['gestor'] = ['Gestor ativo não encontrado para este usuário.']
+    campos['gestor_id'] = gestor
+    for campo, (coluna, converter) in CONVERSOES.items():
+        try:
+            campos[campo] = converter(linha.get(coluna))
+        except ValueError as e:
+            erros[coluna] = [str(e)]
+    campos['observacoes'] = _texto(linha.get('observacoes'))
+
+    if not erros.keys() & {'horario_chegada', 'horario_saida_almoco', 'horario_retorno_almoco', 'horario_saida'}:
+        erro = validar_horarios(
+            campos['horario_chegada'], campos['horario_saida_almoco'],
+            campos['horario_retorno_almoco'], campos['horario_saida'],
+        )
+        if erro:
+            erros['horarios'] = [erro]
+    return campos, erros
+
+
+def _chaves_existentes(datas):
+    """(funcionario_id, data, local_id) já gravados no período, na tabela atual e no arquivo"""
+    chaves = set()
+    for modelo in (RegistroPrestacao, RegistroPrestacaoArquivada):
+        chaves.update(modelo.objects.filter(data__gte=datas[0], data__lte=datas[1]).values_list(
+            'funcionario_id', 'data', 'local_prestacao_id'
+        ).iterator(chunk_size=5000))
+    return chaves
+
+
+def _descartar_existentes(validas, erros):
+    """Linhas válidas sem prestação gravada; as demais entram em `erros`"""
+    datas = (min(campos['data'] for _, campos in validas), max(campos['data'] for _, campos in validas))
+    existentes = _chaves_existentes(datas)
+    restantes = []
+    for numero, campos in validas:
+        if (campos['funcionario_id'], campos['data'], campos['local_prestacao_id']) in existentes:
+            erros.append({'linha': numero, 'erros': {
+                'linha': ['Já existe prestação para este funcionário, data e local.']
+            }})
+        else:
+            restantes.append(campos)
+    return restantes
+
+
+def importar(arquivo, nome_arquivo, criado_por=None, parcial=False, tamanho_lote=TAMANHO_LOTE):
+    """
+    Valida e grava as prestações da planilha.
+
+    Devolve {'linhas', 'criadas', 'total_erros', 'erros': [{'linha', 'erros'}]}
+    (`erros` limitado a MAX_ERROS_RELATORIO, em ordem de linha).
+    """
+    referencias = carregar_referencias()
+    validas = []
+    erros = []
+    vistas = {}
+    total = 0
+    for numero, linha in ler_linhas(arquivo, nome_arquivo):
+        total += 1
+        campos, erros_linha = validar_linha(linha, referencias)
+        if not erros_linha:
+            chave = (campos['funcionario_id'], campos['data'], campos['local_prestacao_id'])
+            if chave in vistas:
+                erros_linha = {'linha': [f'Repete a prestação da linha {vistas[chave]} (funcionário, data e local).']}
+            else:
+                vistas[chave] = numero
+                validas.append((numero, campos))
+        if erros_linha:
+            erros.append({'linha': numero, 'erros': erros_linha})
+    if not total:
+        raise ArquivoInvalido('Nenhuma linha para importar.')
+
+    criadas = 0
+    if validas:
+        try:
+            # A conferência com o banco e a gravação na mesma transação; um cadastro
+            # concorrente da mesma chave ainda viola a unicidade e vira erro de arquivo
+            with transaction.atomic():
+                validas = _descartar_existentes(validas, erros)
+                erros.sort(key=lambda erro: erro['linha'])
+                if validas and (parcial or not erros):
+                    for inicio in range(0, len(validas), tamanho_lote):
+                        lote = [
+                            RegistroPrestacao(created_by=criado_por, **campos)
+                            for campos in validas[inicio:inicio + tamanho_lote]
+                        ]
+                        RegistroPrestacao.objects.bulk_create(lote)
+                        criadas += len(lote)
+        except IntegrityError:
+            raise ArquivoInvalido(
+                'Outro cadastro gravou uma prestação do mesmo funcionário, data e local durante a importação; '
+                'envie a planilha de novo.'
+            )
+
+    return {
+        'linhas': total,
+        'criadas': criadas,
+        'total_erros': len(erros),
+        'erros': erros[:MAX_ERROS_RELATORIO],
+    }
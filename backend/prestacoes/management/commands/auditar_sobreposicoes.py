@@ -0,0 +1,33 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from prestacoes.models import RegistroPrestacao
+from prestacoes.sobreposicao import reconstruir
+
+
+class Command(BaseCommand):
+    help = 'Refaz os conflitos de horário entre prestações (ConflitoPrestacao) de um período'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--inicio', help='Data inicial (YYYY-MM-DD). Omitida: desde a primeira prestação')
+        parser.add_argument('--fim', help='Data final (YYYY-MM-DD). Omitida: até a última prestação')
+
+    def handle(self, *args, **options):
+        try:
+            inicio = date.fromisoformat(options['inicio']) if options['inicio'] else None
+            fim = date.fromisoformat(options['fim']) if options['fim'] else None
+        except ValueError as e:
+            raise CommandError(f'Data inválida: {e}')
+
+        if inicio is None or fim is None:
+            limites = RegistroPrestacao.objects.aggregate(primeira=Min('data'), ultima=Max('data'))
+            if limites['primeira'] is None:
+                self.stdout.write('Nenhuma prestação.')
+                return
+            inicio = inicio or limites['primeira']
+            fim = fim or limites['ultima']
+
+        total = reconstruir(inicio, fim)
+        self.stdout.write(self.style.SUCCESS(f'{total} conflitos encontrados de {inicio} a {fim}.'))
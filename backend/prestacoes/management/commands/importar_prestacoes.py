@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from prestacoes.importacao import ArquivoInvalido, importar
+from usuarios.models import Usuario
+
+
+class Command(BaseCommand):
+    help = 'Importa prestações de uma planilha CSV ou XLSX (mesmas regras do endpoint /api/prestacoes/importar/)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help='Caminho do arquivo .csv ou .xlsx')
+        parser.add_argument('--parcial', action='store_true', help='Grava as linhas válidas mesmo havendo erros')
+        parser.add_argument('--usuario', help='Usuário registrado como created_by das prestações')
+        parser.add_argument('--max-erros', type=int, default=20, help='Erros exibidos no terminal')
+
+    def handle(self, *args, **options):
+        criado_por = None
+        if options['usuario']:
+            criado_por = Usuario.objects.filter(username=options['usuario']).first()
+            if criado_por is None:
+                raise CommandError(f"Usuário não encontrado: {options['usuario']}")
+
+        inicio = time.monotonic()
+        try:
+            with open(options['arquivo'], 'rb') as arquivo:
+                resultado = importar(arquivo, options['arquivo'], criado_por=criado_por, parcial=options['parcial'])
+        except OSError as e:
+            raise CommandError(f'Não foi possível abrir o arquivo: {e}')
+        except ArquivoInvalido as e:
+            raise CommandError(str(e))
+
+        for erro in resultado['erros'][:options['max_erros']]:
+            mensagens = '; '.join(f'{campo}: {" ".join(textos)}' for campo, textos in erro['erros'].items())
+            self.stdout.write(self.style.WARNING(f"Linha {erro['linha']}: {mensagens}"))
+        duracao = time.monotonic() - inicio
+        resumo = (
+            f"{resultado['linhas']} linhas, {resultado['criadas']} prestações criadas, "
+            f"{resultado['total_erros']} com erro ({duracao:.1f}s)."
+        )
+        if resultado['total_erros'] and not resultado['criadas']:
+            raise CommandError(f'{resumo} Nada foi gravado; corrija a planilha ou use --parcial.')
+        self.stdout.write(self.style.SUCCESS(resumo))
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:49
+
+from django.db import migrations, models
+
+
+def _segundos_do_dia(horario):
+    return horario.hour * 3600 + horario.minute * 60 + horario.second
+
+
+def calcular_segundos_trabalhados(horario_chegada, horario_saida_almoco, horario_retorno_almoco, horario_saida):
+    """Cópia da regra de prestacoes.models na data desta migração"""
+    if not all([horario_chegada, horario_saida]):
+        return 0
+    total = _segundos_do_dia(horario_saida) - _segundos_do_dia(horario_chegada)
+    if total < 0:
+        total += 24 * 3600
+    if all([horario_saida_almoco, horario_retorno_almoco]):
+        almoco = _segundos_do_dia(horario_retorno_almoco) - _segundos_do_dia(horario_saida_almoco)
+        if almoco > 0:
+            total -= almoco
+    return max(total, 0)
+
+
+def preencher_segundos_trabalhados(apps, schema_editor):
+    """Backfill em lotes do total trabalhado dos registros existentes"""
+    RegistroPrestacao = apps.get_model('prestacoes', 'RegistroPrestacao')
+    campos = ['horario_chegada', 'horario_saida_almoco', 'horario_retorno_almoco', 'horario_saida']
+    lote = []
+    for registro in RegistroPrestacao.objects.only('pk', *campos).order_by('pk').iterator(chunk_size=2000):
+        registro.segundos_trabalhados = calcular_segundos_trabalhados(
+            *(getattr(registro, campo) for campo in campos)
+        )
+        lote.append(registro)
+        if len(lote) >= 2000:
+            RegistroPrestacao.objects.bulk_update(lote, ['segundos_trabalhados'])
+            lote = []
+    if lote:
+        RegistroPrestacao.objects.bulk_update(lote, ['segundos_trabalhados'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prestacoes', '0004_historicovalidacao_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registroprestacao',
+            name='segundos_trabalhados',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, help_text='Total trabalhado em segundos (descontado o almoço), mantido a partir dos horários'),
+        ),
+        migrations.RunPython(preencher_segundos_trabalhados, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empresas', '0003_gestor_updated_at'),
+        ('funcionarios', '0004_cargo_updated_at'),
+        ('localizacao', '0004_alter_estado_created_at_alter_estado_updated_at'),
+        ('prestacoes', '0005_registroprestacao_segundos_trabalhados'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='registroprestacao',
+            index=models.Index(fields=['data', 'horario_chegada', 'id'], name='prestacoes__data_830325_idx'),
+        ),
+    ]
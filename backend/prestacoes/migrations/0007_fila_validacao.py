@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empresas', '0003_gestor_updated_at'),
+        ('funcionarios', '0005_funcionario_nome_busca'),
+        ('localizacao', '0005_localprestacao_raio_metros'),
+        ('prestacoes', '0006_registroprestacao_prestacoes__data_830325_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registroprestacao',
+            name='reservado_ate',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='registroprestacao',
+            name='reservado_por',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='registroprestacao',
+            index=models.Index(condition=models.Q(('validacao_gestor', 'pendente')), fields=['gestor', 'created_at'], name='prestacao_fila_pendentes'),
+        ),
+    ]
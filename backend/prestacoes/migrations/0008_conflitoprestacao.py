@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('funcionarios', '0005_funcionario_nome_busca'),
+        ('localizacao', '0005_localprestacao_raio_metros'),
+        ('prestacoes', '0007_fila_validacao'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConflitoPrestacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(help_text='Data da prestação que começa primeiro')),
+                ('inicio', models.DateTimeField(help_text='Início da sobreposição')),
+                ('fim', models.DateTimeField(help_text='Fim da sobreposição')),
+                ('segundos', models.PositiveIntegerField(help_text='Duração da sobreposição em segundos')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('conflitante', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='prestacoes.registroprestacao')),
+                ('funcionario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conflitos_prestacao', to='funcionarios.funcionario')),
+                ('local_conflitante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='localizacao.localprestacao')),
+                ('local_prestacao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='localizacao.localprestacao')),
+                ('prestacao', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='prestacoes.registroprestacao')),
+            ],
+            options={
+                'verbose_name': 'Conflito de Prestação',
+                'verbose_name_plural': 'Conflitos de Prestação',
+                'ordering': ['-data', '-inicio'],
+                'indexes': [models.Index(fields=['funcionario', 'data'], name='prestacoes__funcion_6972b9_idx'), models.Index(fields=['data'], name='prestacoes__data_a5ec4e_idx')],
+                'constraints': [models.UniqueConstraint(fields=('prestacao', 'conflitante'), name='conflito_prestacao_par_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pagamentos', '0001_initial'),
+        ('prestacoes', '0008_conflitoprestacao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registroprestacao',
+            name='lote_pagamento',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='prestacoes', to='pagamentos.lotepagamento'),
+        ),
+    ]
@@ -1,9 +1,203 @@
 # prestacoes/models.py
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from decimal import Decimal
 import uuid
 
+from localizacao.geofence import distancia_local
+from .signals import prestacoes_alteradas
+
+
+HORARIO_FIELDS = (
+    'horario_chegada', 'horario_saida_almoco', 'horario_retorno_almoco', 'horario_saida'
+)
+# Campos dos quais `validacao_local` é derivada
+GEOFENCE_FIELDS = ('local_prestacao', 'latitude_chegada', 'longitude_chegada')
+# Campos mantidos a partir de outros; gravá-los sozinhos não altera resumos
+CAMPOS_DERIVADOS = {'segundos_trabalhados', 'validacao_local'}
+# Reserva na fila de validação (prestacoes.fila); também não altera resumos
+CAMPOS_RESERVA = {'reservado_por', 'reservado_por_id', 'reservado_ate'}
+# Lote de pagamento (app pagamentos); também não altera resumos
+CAMPOS_PAGAMENTO = {'lote_pagamento', 'lote_pagamento_id'}
+
+
+def _segundos_do_dia(horario):
+    return horario.hour * 3600 + horario.minute * 60 + horario.second
+
+
+def calcular_segundos_trabalhados(horario_chegada, horario_saida_almoco, horario_retorno_almoco, horario_saida):
+    """
+    Calcula o total de segundos trabalhados a partir dos horários.
+    
+    Mesma regra de `RegistroPrestacao.horas_trabalhadas`: saída anterior à
+    chegada é tratada como virada de dia e o almoço só é descontado quando
+    o retorno é posterior à saída.
+    """
+    if not all([horario_chegada, horario_saida]):
+        return 0
+    
+    total = _segundos_do_dia(horario_saida) - _segundos_do_dia(horario_chegada)
+    if total < 0:
+        total += 24 * 3600
+    
+    if all([horario_saida_almoco, horario_retorno_almoco]):
+        almoco = _segundos_do_dia(horario_retorno_almoco) - _segundos_do_dia(horario_saida_almoco)
+        if almoco > 0:
+            total -= almoco
+    
+    # Almoço maior que o turno (horários que não passaram por validar_horarios)
+    return max(total, 0)
+
+
+def validar_horarios(horario_chegada, horario_saida_almoco, horario_retorno_almoco, horario_saida):
+    """
+    Regras de horário de `RegistroPrestacao.clean`, sem instanciar o modelo.
+    Devolve a mensagem do primeiro erro ou None.
+    """
+    if horario_saida <= horario_chegada:
+        return 'Horário de saída deve ser posterior ao de chegada.'
+    
+    if horario_saida_almoco and horario_retorno_almoco:
+        if horario_retorno_almoco <= horario_saida_almoco:
+            return 'Horário de retorno do almoço deve ser posterior à saída.'
+        if horario_saida_almoco <= horario_chegada:
+            return 'Saída para almoço deve ser posterior à chegada.'
+        if horario_retorno_almoco >= horario_saida:
+            return 'Retorno do almoço deve ser anterior à saída.'
+    return None
+
+
+def _em_lotes(itens, tamanho=5000):
+    for inicio in range(0, len(itens), tamanho):
+        yield itens[inicio:inicio + tamanho]
+
+
+class RegistroPrestacaoQuerySet(models.QuerySet):
+    """
+    Operações em massa que não disparam post_save.
+    
+    Mantém `segundos_trabalhados` correto e envia `prestacoes_alteradas` com
+    as chaves (funcionario_id, data) afetadas, para que resumos e caches
+    derivados possam ser atualizados.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.segundos_trabalhados = obj.calcular_segundos_trabalhados()
+            obj.validar_local()
+        criados = super().bulk_create(objs, *args, **kwargs)
+        prestacoes_alteradas.send(
+            sender=self.model, chaves={(obj.funcionario_id, obj.data) for obj in objs}
+        )
+        return criados
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        fields = list(fields)
+        if set(fields) & set(HORARIO_FIELDS):
+            for obj in objs:
+                obj.segundos_trabalhados = obj.calcular_segundos_trabalhados()
+            if 'segundos_trabalhados' not in fields:
+                fields.append('segundos_trabalhados')
+        if set(fields) & set(GEOFENCE_FIELDS):
+            for obj in objs:
+                obj.validar_local()
+            if 'validacao_local' not in fields:
+                fields.append('validacao_local')
+        linhas = super().bulk_update(objs, fields, *args, **kwargs)
+        if not set(fields) <= CAMPOS_DERIVADOS:
+            prestacoes_alteradas.send(
+                sender=self.model, chaves={(obj.funcionario_id, obj.data) for obj in objs}
+            )
+        return linhas
+
+    def update(self, **kwargs):
+        if set(kwargs) <= CAMPOS_RESERVA | CAMPOS_PAGAMENTO:
+            return super().update(**kwargs)
+        registros = list(self.values_list('pk', 'funcionario_id', 'data'))
+        linhas = super().update(**kwargs)
+        ids = [pk for pk, _, _ in registros]
+        chaves = {(funcionario_id, data) for _, funcionario_id, data in registros}
+        
+        for lote in _em_lotes(ids):
+            atualizados = self.model.objects.filter(pk__in=lote)
+            if set(kwargs) & set(HORARIO_FIELDS):
+                atualizados.recalcular_segundos_trabalhados()
+            if set(kwargs) & {*GEOFENCE_FIELDS, 'local_prestacao_id'}:
+                atualizados.revalidar_geofence()
+            if set(kwargs) & {'funcionario', 'funcionario_id', 'data'}:
+                chaves.update(atualizados.values_list('funcionario_id', 'data'))
+        
+        prestacoes_alteradas.send(sender=self.model, chaves=chaves)
+        return linhas
+
+    def recalcular_segundos_trabalhados(self, batch_size=1000):
+        """Recalcula e persiste `segundos_trabalhados` em lotes"""
+        lote = []
+        registros = self.order_by().only('pk', *HORARIO_FIELDS)
+        for registro in registros.iterator(chunk_size=batch_size):
+            registro.segundos_trabalhados = registro.calcular_segundos_trabalhados()
+            lote.append(registro)
+            if len(lote) >= batch_size:
+                self.model.objects.bulk_update(lote, ['segundos_trabalhados'])
+                lote = []
+        if lote:
+            self.model.objects.bulk_update(lote, ['segundos_trabalhados'])
+
+    def revalidar_geofence(self, batch_size=1000):
+        """Recalcula `validacao_local` pelas coordenadas de chegada; grava só o que mudou"""
+        total = 0
+        lote = []
+        registros = self.order_by().only('pk', 'validacao_local', *GEOFENCE_FIELDS)
+        for registro in registros.iterator(chunk_size=batch_size):
+            anterior = registro.validacao_local
+            registro.validar_local()
+            if registro.validacao_local != anterior:
+                lote.append(registro)
+            if len(lote) >= batch_size:
+                total += self.model.objects.bulk_update(lote, ['validacao_local'])
+                lote = []
+        if lote:
+            total += self.model.objects.bulk_update(lote, ['validacao_local'])
+        return total
+
+    def validar(self, status, validado_por, observacoes=''):
+        """
+        Muda `validacao_gestor` das prestações do queryset para `status` e
+        registra um HistoricoValidacao por prestação, em uma única transação.
+
+        Prestações que já estão em `status` ficam de fora, assim como as
+        que estão em um lote de pagamento (o lote precisa ser cancelado
+        antes). Devolve {status_anterior: quantidade} das prestações alteradas.
+        """
+        with transaction.atomic():
+            # O status anterior lido é o que vai para o histórico: as linhas
+            # ficam travadas até o UPDATE (sem efeito no SQLite, que já serializa escritas)
+            registros = list(
+                self.exclude(validacao_gestor=status).filter(lote_pagamento__isnull=True)
+                .select_for_update(of=('self',))
+                .order_by().values_list('pk', 'validacao_gestor')
+            )
+            agora = timezone.now()
+            for lote in _em_lotes([pk for pk, _ in registros]):
+                self.model.objects.filter(pk__in=lote).update(
+                    validacao_gestor=status, updated_at=agora, reservado_por=None, reservado_ate=None
+                )
+            HistoricoValidacao.objects.bulk_create([
+                HistoricoValidacao(
+                    prestacao_id=pk, status_anterior=anterior, status_novo=status,
+                    validado_por=validado_por, observacoes=observacoes,
+                )
+                for pk, anterior in registros
+            ], batch_size=1000)
+
+        por_status = {}
+        for _, anterior in registros:
+            por_status[anterior] = por_status.get(anterior, 0) + 1
+        return por_status
+
 
 class RegistroPrestacao(models.Model):
     """Registro principal de prestação de serviço"""
@@ -27,6 +221,12 @@ class RegistroPrestacao(models.Model):
     horario_saida_almoco = models.TimeField(blank=True, null=True)
     horario_retorno_almoco = models.TimeField(blank=True, null=True)
     horario_saida = models.TimeField()
+    segundos_trabalhados = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        db_index=True,
+        help_text="Total trabalhado em segundos (descontado o almoço), mantido a partir dos horários"
+    )
     
     # Validações
     validacao_local = models.BooleanField(default=False, help_text="Validação no local da prestação")
@@ -45,6 +245,25 @@ class RegistroPrestacao(models.Model):
     )
     observacoes = models.TextField(blank=True)
     
+    # Reserva na fila de validação (prestacoes.fila): quem está revisando e até quando
+    reservado_por = models.ForeignKey(
+        'usuarios.Usuario',
+        on_delete=models.SET_NULL,
+        related_name='+',
+        blank=True,
+        null=True
+    )
+    reservado_ate = models.DateTimeField(blank=True, null=True)
+    
+    # Lote de pagamento em que a prestação aprovada entrou (vazio: ainda não paga)
+    lote_pagamento = models.ForeignKey(
+        'pagamentos.LotePagamento',
+        on_delete=models.PROTECT,
+        related_name='prestacoes',
+        blank=True,
+        null=True
+    )
+    
     # Evidências
     foto_comprovante = models.ImageField(upload_to='prestacoes/%Y/%m/', blank=True, null=True)
     
@@ -74,10 +293,20 @@ class RegistroPrestacao(models.Model):
             models.Index(fields=['local_prestacao', 'data']),
             models.Index(fields=['gestor', 'validacao_gestor']),
             models.Index(fields=['data']),
+            # Paginação por cursor da ordenação padrão (-data, -horario_chegada, -id)
+            models.Index(fields=['data', 'horario_chegada', 'id']),
+            # Fila de validação: só as pendentes, das mais antigas para as mais novas
+            models.Index(
+                fields=['gestor', 'created_at'],
+                condition=models.Q(validacao_gestor='pendente'),
+                name='prestacao_fila_pendentes'
+            ),
         ]
         # Evitar registros duplicados no mesmo dia/funcionário/local
         unique_together = ['funcionario', 'data', 'local_prestacao']
 
+    objects = RegistroPrestacaoQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.funcionario.nome_completo} - {self.data} - {self.local_prestacao}"
 
@@ -116,31 +345,38 @@ class RegistroPrestacao(models.Model):
     @property
     def horas_trabalhadas(self):
         """Calcula total de horas trabalhadas"""
-        from datetime import datetime, timedelta
-        
-        if not all([self.horario_chegada, self.horario_saida]):
-            return timedelta(0)
-        
-        # Converte para datetime para cálculos
-        chegada = datetime.combine(self.data, self.horario_chegada)
-        saida = datetime.combine(self.data, self.horario_saida)
-        
-        # Se saída é no dia seguinte
-        if saida < chegada:
-            saida += timedelta(days=1)
+        from datetime import timedelta
         
-        total = saida - chegada
-        
-        # Subtrai horário de almoço se informado
-        if all([self.horario_saida_almoco, self.horario_retorno_almoco]):
-            saida_almoco = datetime.combine(self.data, self.horario_saida_almoco)
-            retorno_almoco = datetime.combine(self.data, self.horario_retorno_almoco)
-            
-            if retorno_almoco > saida_almoco:
-                almoco = retorno_almoco - saida_almoco
-                total -= almoco
-        
-        return total
+        return timedelta(seconds=self.calcular_segundos_trabalhados())
+
+    def calcular_segundos_trabalhados(self):
+        return calcular_segundos_trabalhados(
+            self.horario_chegada, self.horario_saida_almoco,
+            self.horario_retorno_almoco, self.horario_saida
+        )
+
+    def validar_local(self):
+        """
+        Valida a chegada contra o raio do local de prestação (localizacao.geofence).
+        Sem coordenadas de chegada ou do local, `validacao_local` não é alterada.
+        """
+        distancia, dentro = distancia_local(self.local_prestacao_id, self.latitude_chegada, self.longitude_chegada)
+        if distancia is not None:
+            self.validacao_local = dentro
+
+    def save(self, *args, **kwargs):
+        self.segundos_trabalhados = self.calcular_segundos_trabalhados()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or set(update_fields) & set(GEOFENCE_FIELDS):
+            self.validar_local()
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if update_fields & set(HORARIO_FIELDS):
+                update_fields.add('segundos_trabalhados')
+            if update_fields & set(GEOFENCE_FIELDS):
+                update_fields.add('validacao_local')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
 
     @property
     def valor_por_hora(self):
@@ -155,16 +391,12 @@ class RegistroPrestacao(models.Model):
         from django.core.exceptions import ValidationError
         
         # Validação de horários
-        if self.horario_saida <= self.horario_chegada:
-            raise ValidationError('Horário de saída deve ser posterior ao de chegada.')
-        
-        if self.horario_saida_almoco and self.horario_retorno_almoco:
-            if self.horario_retorno_almoco <= self.horario_saida_almoco:
-                raise ValidationError('Horário de retorno do almoço deve ser posterior à saída.')
-            if self.horario_saida_almoco <= self.horario_chegada:
-                raise ValidationError('Saída para almoço deve ser posterior à chegada.')
-            if self.horario_retorno_almoco >= self.horario_saida:
-                raise ValidationError('Retorno do almoço deve ser anterior à saída.')
+        erro = validar_horarios(
+            self.horario_chegada, self.horario_saida_almoco,
+            self.horario_retorno_almoco, self.horario_saida
+        )
+        if erro:
+            raise ValidationError(erro)
 
 
 class HistoricoValidacao(models.Model):
@@ -184,3 +416,54 @@ class HistoricoValidacao(models.Model):
 
     def __str__(self):
         return f"{self.prestacao} - {self.status_anterior} → {self.status_novo}"
+
+
+class ConflitoPrestacao(models.Model):
+    """
+    Sobreposição de horários entre duas prestações do mesmo funcionário.
+
+    Mantido por prestacoes.sobreposicao a cada prestação gravada; não deve
+    ser editado manualmente. `prestacao` é a que começa primeiro e `data` é
+    a data dela (uma prestação que vira a noite pode conflitar com uma do
+    dia seguinte).
+
+    `prestacao`/`conflitante` não têm restrição de chave estrangeira, como
+    em IntervaloPonto: prestações movidas para o arquivo mantêm o mesmo id.
+    Os locais ficam gravados no conflito para que a listagem não dependa da
+    prestação continuar na tabela quente.
+    """
+    funcionario = models.ForeignKey(
+        'funcionarios.Funcionario', on_delete=models.CASCADE, related_name='conflitos_prestacao'
+    )
+    data = models.DateField(help_text="Data da prestação que começa primeiro")
+    prestacao = models.ForeignKey(
+        RegistroPrestacao, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    conflitante = models.ForeignKey(
+        RegistroPrestacao, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    local_prestacao = models.ForeignKey(
+        'localizacao.LocalPrestacao', on_delete=models.CASCADE, related_name='+'
+    )
+    local_conflitante = models.ForeignKey(
+        'localizacao.LocalPrestacao', on_delete=models.CASCADE, related_name='+'
+    )
+    inicio = models.DateTimeField(help_text="Início da sobreposição")
+    fim = models.DateTimeField(help_text="Fim da sobreposição")
+    segundos = models.PositiveIntegerField(help_text="Duração da sobreposição em segundos")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Conflito de Prestação'
+        verbose_name_plural = 'Conflitos de Prestação'
+        ordering = ['-data', '-inicio']
+        indexes = [
+            models.Index(fields=['funcionario', 'data']),
+            models.Index(fields=['data']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['prestacao', 'conflitante'], name='conflito_prestacao_par_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.funcionario} - {self.data} - {self.segundos}s sobrepostos"
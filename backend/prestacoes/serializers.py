@@ -1,14 +1,67 @@
 from rest_framework import serializers
-from .models import RegistroPrestacao, HistoricoValidacao
+from .fila import TAMANHO_MAXIMO, TAMANHO_PADRAO
+from .models import HORARIO_FIELDS, RegistroPrestacao, HistoricoValidacao, validar_horarios
+
+# Campos que o lote de pagamento já totalizou; só mudam depois de cancelado o lote
+CAMPOS_LOTE = ('validacao_gestor', 'valor')
 
 
 class RegistroPrestacaoSerializer(serializers.ModelSerializer):
     class Meta:
         model = RegistroPrestacao
         fields = '__all__'
+        # Mantidos pela fila de validação (/api/fila-validacao/) e pelos lotes de pagamento
+        read_only_fields = ['reservado_por', 'reservado_ate', 'lote_pagamento']
+
+    def validate(self, attrs):
+        if self.instance is not None and self.instance.lote_pagamento_id:
+            alterados = [
+                campo for campo in CAMPOS_LOTE
+                if campo in attrs and attrs[campo] != getattr(self.instance, campo)
+            ]
+            if alterados:
+                raise serializers.ValidationError({
+                    campo: 'Prestação em lote de pagamento; cancele o lote para alterar.' for campo in alterados
+                })
+
+        # Regras de RegistroPrestacao.clean, que o DRF não chama; no PATCH
+        # os horários não enviados vêm da prestação gravada
+        horarios = {
+            campo: attrs[campo] if campo in attrs else getattr(self.instance, campo, None)
+            for campo in HORARIO_FIELDS
+        }
+        if horarios['horario_chegada'] and horarios['horario_saida']:
+            erro = validar_horarios(**horarios)
+            if erro:
+                raise serializers.ValidationError(erro)
+        return attrs
 
 
 class HistoricoValidacaoSerializer(serializers.ModelSerializer):
     class Meta:
         model = HistoricoValidacao
         fields = '__all__'
+
+
+class ValidacaoEmMassaSerializer(serializers.Serializer):
+    """Entrada de /api/prestacoes/validar-em-massa/: `ids` ou `filtros`, mais o status"""
+    ids = serializers.ListField(child=serializers.UUIDField(), required=False, allow_empty=False)
+    filtros = serializers.DictField(required=False)
+    status = serializers.ChoiceField(choices=RegistroPrestacao.STATUS_VALIDACAO_CHOICES)
+    observacoes = serializers.CharField(required=False, allow_blank=True, default='')
+
+    def validate(self, attrs):
+        if ('ids' in attrs) == ('filtros' in attrs):
+            raise serializers.ValidationError('Informe ids ou filtros (apenas um dos dois).')
+        return attrs
+
+
+class ReservaFilaSerializer(serializers.Serializer):
+    """Entrada de /api/fila-validacao/proximos/"""
+    quantidade = serializers.IntegerField(required=False, min_value=1, max_value=TAMANHO_MAXIMO, default=TAMANHO_PADRAO)
+    gestor = serializers.IntegerField(required=False)
+
+
+class LiberacaoFilaSerializer(serializers.Serializer):
+    """Entrada de /api/fila-validacao/liberar/ (sem `ids`, libera todas as reservas do usuário)"""
+    ids = serializers.ListField(child=serializers.UUIDField(), required=False, allow_empty=False)
@@ -0,0 +1,53 @@
+# prestacoes/signals.py
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+# Enviado quando prestações são criadas/alteradas em massa (bulk_create,
+# bulk_update, update), operações que não disparam post_save.
+#
+# Argumentos:
+# - chaves: conjunto de tuplas (funcionario_id, data) afetadas
+prestacoes_alteradas = Signal()
+
+
+@receiver(pre_save, sender='prestacoes.RegistroPrestacao')
+def guardar_dia_anterior(sender, instance, **kwargs):
+    """
+    Guarda (funcionario, data) anteriores em `instance._dia_anterior`.
+
+    Lido pelos post_save que precisam refazer também o dia antigo: conflitos
+    de sobreposição (aqui) e resumo diário (relatorios/signals.py). Um único
+    receiver para que cada save faça uma consulta, não uma por app.
+    """
+    instance._dia_anterior = None
+    if not instance._state.adding:
+        instance._dia_anterior = sender.objects.filter(pk=instance.pk).values_list(
+            'funcionario_id', 'data'
+        ).first()
+
+
+@receiver(post_save, sender='prestacoes.RegistroPrestacao')
+def verificar_sobreposicao(sender, instance, update_fields=None, **kwargs):
+    from .models import CAMPOS_DERIVADOS, CAMPOS_PAGAMENTO, CAMPOS_RESERVA
+    from .sobreposicao import recalcular
+
+    if update_fields and set(update_fields) <= CAMPOS_DERIVADOS | CAMPOS_RESERVA | CAMPOS_PAGAMENTO:
+        return
+    dias = {(instance.funcionario_id, instance.data)}
+    if getattr(instance, '_dia_anterior', None):
+        dias.add(instance._dia_anterior)
+    recalcular(dias)
+
+
+@receiver(post_delete, sender='prestacoes.RegistroPrestacao')
+def verificar_sobreposicao_removida(sender, instance, **kwargs):
+    from .sobreposicao import recalcular
+
+    recalcular({(instance.funcionario_id, instance.data)})
+
+
+@receiver(prestacoes_alteradas)
+def verificar_sobreposicao_em_massa(sender, chaves, **kwargs):
+    from .sobreposicao import recalcular
+
+    recalcular(chaves)
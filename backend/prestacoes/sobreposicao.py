@@ -0,0 +1,192 @@
+# prestacoes/sobreposicao.py
+"""
+Detecção de horários sobrepostos entre prestações do mesmo funcionário
+(ConflitoPrestacao)
+
+Cada prestação vira um ou dois intervalos trabalhados (chegada-saída, sem o
+almoço), com as mesmas regras de `calcular_segundos_trabalhados`: saída
+anterior à chegada vira a noite, e o almoço só é descontado quando o retorno
+é posterior à saída. Os intervalos de cada funcionário são ordenados pelo
+início e percorridos uma vez (varredura): cada intervalo é comparado só com
+os que ainda estão abertos quando ele começa. Prestações rejeitadas não
+entram na comparação.
+
+`detectar` consome linhas já ordenadas por funcionário. Assim a auditoria
+de qualquer período sai de uma única consulta ordenada pelo índice
+(funcionario, data), sem consultas por par ou por funcionário.
+
+- `recalcular(chaves)`: refaz os conflitos dos dias (funcionario_id, data)
+  afetados. É chamado pelos sinais de RegistroPrestacao a cada prestação
+  gravada ou removida e nas operações em massa.
+- `reconstruir(inicio, fim)`: refaz um período inteiro (comando
+  `auditar_sobreposicoes`).
+"""
+from datetime import date, datetime, time, timedelta
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import HORARIO_FIELDS, ConflitoPrestacao, RegistroPrestacao, _em_lotes
+
+DIA = 24 * 3600
+TAMANHO_LOTE = 5000
+# Status que não contam como horário trabalhado
+STATUS_IGNORADOS = ('rejeitada',)
+
+
+def _segundos(horario):
+    return horario.hour * 3600 + horario.minute * 60 + horario.second
+
+
+def intervalos(data, horario_chegada, horario_saida_almoco, horario_retorno_almoco, horario_saida):
+    """
+    Intervalos trabalhados da prestação, em segundos absolutos
+    (data.toordinal() * DIA + segundos do dia).
+    """
+    if not (horario_chegada and horario_saida):
+        return []
+    inicio = _segundos(horario_chegada)
+    fim = _segundos(horario_saida)
+    if fim < inicio:
+        fim += DIA
+    partes = [(inicio, fim)]
+    if horario_saida_almoco and horario_retorno_almoco and horario_retorno_almoco > horario_saida_almoco:
+        saida_almoco = _segundos(horario_saida_almoco)
+        if saida_almoco < inicio:
+            saida_almoco += DIA
+        retorno_almoco = saida_almoco + _segundos(horario_retorno_almoco) - _segundos(horario_saida_almoco)
+        partes = [(inicio, min(saida_almoco, fim)), (max(retorno_almoco, inicio), fim)]
+    base = data.toordinal() * DIA
+    return [(base + de, base + ate) for de, ate in partes if ate > de]
+
+
+def _instante(segundos):
+    dia = date.fromordinal(segundos // DIA)
+    resto = segundos % DIA
+    return timezone.make_aware(datetime.combine(dia, time(resto // 3600, resto % 3600 // 60, resto % 60)))
+
+
+def _conflitos_do_funcionario(funcionario_id, registros):
+    partes = []
+    prestacoes = {}
+    for pk, _, data, local_id, *horarios in registros:
+        trechos = intervalos(data, *horarios)
+        if trechos:
+            prestacoes[pk] = (trechos[0][0], data, local_id)
+            partes.extend((inicio, fim, pk) for inicio, fim in trechos)
+    partes.sort(key=itemgetter(0, 1))
+
+    abertos = []
+    pares = {}
+    for inicio, fim, pk in partes:
+        abertos = [aberto for aberto in abertos if aberto[1] > inicio]
+        for _, fim_aberto, pk_aberto in abertos:
+            if pk_aberto == pk:
+                continue
+            # A prestação que começa primeiro fica em `prestacao`
+            par = tuple(sorted((pk_aberto, pk), key=lambda chave: (prestacoes[chave][0], str(chave))))
+            fim_comum = min(fim, fim_aberto)
+            de, ate, segundos = pares.get(par, (inicio, fim_comum, 0))
+            pares[par] = (min(de, inicio), max(ate, fim_comum), segundos + fim_comum - inicio)
+        abertos.append((inicio, fim, pk))
+
+    for (primeira, segunda), (de, ate, segundos) in pares.items():
+        _, data, local_id = prestacoes[primeira]
+        yield ConflitoPrestacao(
+            funcionario_id=funcionario_id, data=data,
+            prestacao_id=primeira, conflitante_id=segunda,
+            local_prestacao_id=local_id, local_conflitante_id=prestacoes[segunda][2],
+            inicio=_instante(de), fim=_instante(ate), segundos=segundos,
+        )
+
+
+def detectar(linhas):
+    """
+    Gera ConflitoPrestacao (não salvos) a partir de linhas
+    (id, funcionario_id, data, local_prestacao_id, *HORARIO_FIELDS)
+    ordenadas por funcionário.
+    """
+    for funcionario_id, registros in groupby(linhas, key=itemgetter(1)):
+        yield from _conflitos_do_funcionario(funcionario_id, registros)
+
+
+def _linhas(registros):
+    return registros.exclude(validacao_gestor__in=STATUS_IGNORADOS).order_by(
+        'funcionario_id', 'data', 'horario_chegada', 'id'
+    ).values_list(
+        'id', 'funcionario_id', 'data', 'local_prestacao_id', *HORARIO_FIELDS
+    ).iterator(chunk_size=TAMANHO_LOTE)
+
+
+def _gravar(conflitos):
+    total = 0
+    lote = []
+    for conflito in conflitos:
+        lote.append(conflito)
+        if len(lote) >= TAMANHO_LOTE:
+            total += len(ConflitoPrestacao.objects.bulk_create(lote))
+            lote = []
+    if lote:
+        total += len(ConflitoPrestacao.objects.bulk_create(lote))
+    return total
+
+
+def _remover(queryset):
+    # Linhas derivadas: sem Collector (um post_delete por linha)
+    queryset._raw_delete(queryset.db)
+
+
+def _filtros_por_data(celulas):
+    """
+    Filtros de até TAMANHO_LOTE células (funcionario_id, data), com um termo
+    por data: cargas em massa cobrem muitos funcionários em poucos dias.
+    """
+    por_data = {}
+    for funcionario_id, data in celulas:
+        por_data.setdefault(data, []).append(funcionario_id)
+    filtro, tamanho = None, 0
+    for data in sorted(por_data):
+        for parte in _em_lotes(sorted(por_data[data]), TAMANHO_LOTE):
+            if filtro is not None and tamanho + len(parte) > TAMANHO_LOTE:
+                yield filtro
+                filtro, tamanho = None, 0
+            termo = Q(data=data, funcionario_id__in=parte)
+            filtro = termo if filtro is None else filtro | termo
+            tamanho += len(parte)
+    if filtro is not None:
+        yield filtro
+
+
+def recalcular(chaves):
+    """Refaz os conflitos que envolvem prestações dos dias (funcionario_id, data) informados"""
+    chaves = {(funcionario_id, data) for funcionario_id, data in chaves if funcionario_id and data}
+    if not chaves:
+        return 0
+    # O conflito fica na data da prestação que começa primeiro, que pode ser
+    # a da véspera (prestação que vira a noite). Os conflitos de um dia só
+    # envolvem prestações dele e do dia seguinte.
+    um_dia = timedelta(days=1)
+    afetadas = chaves | {(funcionario_id, data - um_dia) for funcionario_id, data in chaves}
+    lidas = afetadas | {(funcionario_id, data + um_dia) for funcionario_id, data in chaves}
+    with transaction.atomic():
+        for filtro in _filtros_por_data(afetadas):
+            _remover(ConflitoPrestacao.objects.filter(filtro))
+        linhas = []
+        for filtro in _filtros_por_data(lidas):
+            linhas.extend(_linhas(RegistroPrestacao.objects.filter(filtro)))
+        linhas.sort(key=itemgetter(1))
+        return _gravar(
+            conflito for conflito in detectar(linhas)
+            if (conflito.funcionario_id, conflito.data) in afetadas
+        )
+
+
+def reconstruir(inicio, fim):
+    """Refaz todos os conflitos com data entre `inicio` e `fim` (inclusive)"""
+    registros = RegistroPrestacao.objects.filter(data__gte=inicio, data__lte=fim + timedelta(days=1))
+    with transaction.atomic():
+        _remover(ConflitoPrestacao.objects.filter(data__gte=inicio, data__lte=fim))
+        return _gravar(conflito for conflito in detectar(_linhas(registros)) if conflito.data <= fim)
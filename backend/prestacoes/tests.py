@@ -1,3 +1,405 @@
+from datetime import date, time, timedelta
+from decimal import Decimal
+from itertools import count
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from arquivo.arquivamento import arquivar
+from empresas.models import EmpresaTerceirizada, Gestor
+from funcionarios.models import Cargo, Funcionario
+from localizacao.models import Cidade, Estado, LocalPrestacao
+from pagamentos.geracao import cancelar, gerar
+from usuarios.models import Usuario
+from . import importacao
+from .models import ConflitoPrestacao, RegistroPrestacao, calcular_segundos_trabalhados
+from .sobreposicao import reconstruir
+
+_sequencia = count(1)
+
+
+def criar_usuario(**campos):
+    """Usuário sem senha utilizável (sem o custo do hash)"""
+    numero = next(_sequencia)
+    digitos = f'{numero:011d}'
+    campos.setdefault('username', f'usuario{numero}')
+    campos.setdefault('cpf', f'{digitos[:3]}.{digitos[3:6]}.{digitos[6:9]}-{digitos[9:]}')
+    campos.setdefault('first_name', 'Nome')
+    campos.setdefault('last_name', f'Sobrenome {numero}')
+    return Usuario.objects.create(**campos)
+
+
+def criar_funcionario(empresa, cargo, **campos):
+    numero = next(_sequencia)
+    return Funcionario.objects.create(
+        usuario=campos.pop('usuario', None) or criar_usuario(),
+        empresa=empresa, cargo=cargo, registro=f'R{numero}',
+        data_admissao=date(2024, 1, 1), **campos
+    )
+
+
+def montar_cenario():
+    """Empresa, cargo, funcionário, gestor, local e um admin, usados pelos testes das apps"""
+    numero = next(_sequencia)
+    digitos = f'{numero:08d}'
+    empresa = EmpresaTerceirizada.objects.create(
+        razao_social=f'Empresa {numero}', cnpj=f'{digitos[:2]}.{digitos[2:5]}.{digitos[5:]}/0001-11'
+    )
+    cargo, _ = Cargo.objects.get_or_create(nome='Analista')
+    estado, _ = Estado.objects.get_or_create(sigla='MT', defaults={'nome': 'Mato Grosso'})
+    cidade, _ = Cidade.objects.get_or_create(nome='Cuiabá', estado=estado)
+    gestor = Gestor.objects.create(usuario=criar_usuario(), empresa=empresa, cargo='Supervisor')
+    return SimpleNamespace(
+        empresa=empresa,
+        cargo=cargo,
+        funcionario=criar_funcionario(empresa, cargo),
+        gestor=gestor,
+        local=LocalPrestacao.objects.create(nome=f'Local {numero}', cidade=cidade, endereco='Rua 1'),
+        admin=criar_usuario(is_staff=True, is_superuser=True),
+    )
+
+
+def criar_prestacao(cenario, **campos):
+    campos.setdefault('funcionario', cenario.funcionario)
+    campos.setdefault('local_prestacao', cenario.local)
+    campos.setdefault('gestor', cenario.gestor)
+    campos.setdefault('data', date(2024, 5, 2))
+    campos.setdefault('horario_chegada', time(8))
+    campos.setdefault('horario_saida', time(17))
+    campos.setdefault('valor', Decimal('100.00'))
+    return RegistroPrestacao.objects.create(**campos)
+
+
+def cliente(usuario):
+    api = APIClient()
+    api.force_authenticate(usuario)
+    return api
+
+
+class SegundosTrabalhadosTests(TestCase):
+
+    def test_almoco_maior_que_o_turno_nao_fica_negativo(self):
+        self.assertEqual(calcular_segundos_trabalhados(time(8), time(10), time(20), time(9)), 0)
+
+    def test_desconta_almoco(self):
+        self.assertEqual(calcular_segundos_trabalhados(time(8), time(12), time(13), time(17)), 8 * 3600)
+
+
+class RegistroPrestacaoApiTests(TestCase):
+
+    def setUp(self):
+        self.cenario = montar_cenario()
+        self.api = cliente(self.cenario.admin)
+
+    def _dados(self, **campos):
+        dados = {
+            'funcionario': self.cenario.funcionario.pk,
+            'local_prestacao': self.cenario.local.pk,
+            'gestor': self.cenario.gestor.pk,
+            'data': '2024-05-02',
+            'horario_chegada': '08:00',
+            'horario_saida': '09:00',
+            'valor': '100.00',
+        }
+        dados.update(campos)
+        return dados
+
+    def test_horarios_invalidos_retornam_400(self):
+        resposta = self.api.post('/api/prestacoes/', self._dados(
+            horario_saida_almoco='10:00', horario_retorno_almoco='20:00'
+        ), format='json')
+        self.assertEqual(resposta.status_code, 400)
+        self.assertFalse(RegistroPrestacao.objects.exists())
+
+    def test_horarios_validos_gravam_segundos(self):
+        resposta = self.api.post('/api/prestacoes/', self._dados(), format='json')
+        self.assertEqual(resposta.status_code, 201)
+        self.assertEqual(RegistroPrestacao.objects.get().segundos_trabalhados, 3600)
+
+    def test_patch_valida_com_os_horarios_gravados(self):
+        prestacao = criar_prestacao(self.cenario)
+        resposta = self.api.patch(f'/api/prestacoes/{prestacao.pk}/', {'horario_saida': '07:00'}, format='json')
+        self.assertEqual(resposta.status_code, 400)
+
+
+class PrestacaoEmLoteTests(TestCase):
+
+    def setUp(self):
+        self.cenario = montar_cenario()
+        self.api = cliente(self.cenario.admin)
+        self.prestacao = criar_prestacao(self.cenario, validacao_gestor='aprovada')
+        self.lote = gerar(date(2024, 5, 1), date(2024, 5, 31))
+
+    def test_validacao_em_massa_ignora_prestacoes_em_lote(self):
+        resposta = self.api.post('/api/prestacoes/validar-em-massa/', {
+            'ids': [str(self.prestacao.pk)], 'status': 'rejeitada',
+        }, format='json')
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.data['alteradas'], 0)
+        self.prestacao.refresh_from_db()
+        self.assertEqual(self.prestacao.validacao_gestor, 'aprovada')
+
+    def test_patch_recusa_status_e_valor(self):
+        url = f'/api/prestacoes/{self.prestacao.pk}/'
+        for campo, valor in (('validacao_gestor', 'rejeitada'), ('valor', '1.00')):
+            resposta = self.api.patch(url, {campo: valor}, format='json')
+            self.assertEqual(resposta.status_code, 400)
+            self.assertIn(campo, resposta.data)
+        self.prestacao.refresh_from_db()
+        self.assertEqual((self.prestacao.validacao_gestor, self.prestacao.valor), ('aprovada', Decimal('100.00')))
+
+    def test_cancelar_o_lote_libera_a_prestacao(self):
+        cancelar(self.lote)
+        resposta = self.api.patch(f'/api/prestacoes/{self.prestacao.pk}/', {'valor': '120.00'}, format='json')
+        self.assertEqual(resposta.status_code, 200)
+
+
+class ValidacaoEmMassaTests(TestCase):
+
+    URL = '/api/prestacoes/validar-em-massa/'
+
+    def setUp(self):
+        self.cenario = montar_cenario()
+        self.minha = criar_prestacao(self.cenario)
+        outro_gestor = Gestor.objects.create(usuario=criar_usuario(), empresa=self.cenario.empresa, cargo='Supervisor')
+        self.de_outro = criar_prestacao(self.cenario, data=date(2024, 5, 3), gestor=outro_gestor)
+
+    def _validar(self, usuario, **dados):
+        return cliente(usuario).post(self.URL, {'status': 'aprovada', **dados}, format='json')
+
+    def _status(self):
+        return [
+            RegistroPrestacao.objects.get(pk=prestacao.pk).validacao_gestor
+            for prestacao in (self.minha, self.de_outro)
+        ]
+
+    def test_gestor_valida_so_as_suas(self):
+        usuario = self.cenario.gestor.usuario
+        resposta = self._validar(usuario, ids=[self.minha.pk, self.de_outro.pk])
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual((resposta.data['alteradas'], resposta.data['nao_encontradas']), (1, [self.de_outro.pk]))
+
+        resposta = self._validar(usuario, status='rejeitada', filtros={'data_inicio': '2024-05-01'})
+        self.assertEqual(resposta.data['encontradas'], 1)
+        self.assertEqual(self._status(), ['rejeitada', 'pendente'])
+
+    def test_staff_valida_qualquer_prestacao(self):
+        resposta = self._validar(self.cenario.admin, filtros={'data_inicio': '2024-05-01'})
+        self.assertEqual(resposta.data['alteradas'], 2)
+        self.assertEqual(self._status(), ['aprovada', 'aprovada'])
+
+    def test_usuario_sem_gestor_ativo_e_recusado(self):
+        self.assertEqual(self._validar(self.cenario.funcionario.usuario, ids=[self.minha.pk]).status_code, 403)
+        self.cenario.gestor.ativo = False
+        self.cenario.gestor.save()
+        self.assertEqual(self._validar(self.cenario.gestor.usuario, ids=[self.minha.pk]).status_code, 403)
+        self.assertEqual(self._status(), ['pendente', 'pendente'])
+
+
+class FilaValidacaoTests(TestCase):
+
+    def setUp(self):
+        self.cenario = montar_cenario()
+        self.gestor = cliente(self.cenario.gestor.usuario)
+        self.admin = cliente(self.cenario.admin)
+        inicio = timezone.now() - timedelta(days=1)
+        self.prestacoes = []
+        for dia in range(4):
+            prestacao = criar_prestacao(self.cenario, data=date(2024, 5, 2 + dia))
+            # Ordem de chegada na fila
+            RegistroPrestacao.objects.filter(pk=prestacao.pk).update(created_at=inicio + timedelta(minutes=dia))
+            self.prestacoes.append(prestacao.pk)
+
+    def _proximos(self, api, **dados):
+        resposta = api.post('/api/fila-validacao/proximos/', dados, format='json')
+        self.assertEqual(resposta.status_code, 200, resposta.data)
+        return [item['id'] for item in resposta.data['resultados']]
+
+    def _ids(self, *indices):
+        return [str(self.prestacoes[indice]) for indice in indices]
+
+    def test_revisores_recebem_lotes_distintos_na_ordem(self):
+        self.assertEqual(self._proximos(self.gestor, quantidade=2), self._ids(0, 1))
+        self.assertEqual(self._proximos(self.admin, quantidade=5, gestor=self.cenario.gestor.pk), self._ids(2, 3))
+        # Pedir de novo renova as próprias reservas
+        self.assertEqual(self._proximos(self.gestor, quantidade=2), self._ids(0, 1))
+
+        resumo = self.gestor.get('/api/fila-validacao/resumo/').data
+        self.assertEqual((resumo['pendentes'], resumo['reservadas'], resumo['disponiveis']), (4, 4, 0))
+
+    def test_reserva_vencida_volta_para_a_fila(self):
+        self._proximos(self.gestor, quantidade=2)
+        RegistroPrestacao.objects.filter(pk=self.prestacoes[0]).update(
+            reservado_ate=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(self._proximos(self.admin, quantidade=2, gestor=self.cenario.gestor.pk), self._ids(0, 2))
+
+    def test_liberar_e_validar_tiram_da_reserva(self):
+        self._proximos(self.gestor, quantidade=3)
+        resposta = self.gestor.post('/api/fila-validacao/liberar/', {'ids': self._ids(1)}, format='json')
+        self.assertEqual(resposta.data['liberadas'], 1)
+        self.gestor.post('/api/prestacoes/validar-em-massa/', {'ids': self._ids(0), 'status': 'aprovada'}, format='json')
+
+        self.assertEqual(self._proximos(self.admin, quantidade=5, gestor=self.cenario.gestor.pk), self._ids(1, 3))
+        resumo = self.gestor.get('/api/fila-validacao/resumo/').data
+        self.assertEqual((resumo['pendentes'], resumo['reservadas']), (3, 3))
+
+    def test_escopo_da_fila(self):
+        funcionario = cliente(self.cenario.funcionario.usuario)
+        self.assertEqual(funcionario.post('/api/fila-validacao/proximos/', {}, format='json').status_code, 403)
+        # Staff sem cadastro de gestor precisa informar qual fila
+        self.assertEqual(self.admin.get('/api/fila-validacao/resumo/').status_code, 400)
+        self.assertEqual(self.admin.get('/api/fila-validacao/resumo/', {'gestor': 0}).status_code, 400)
+
+
+class SobreposicaoTests(TestCase):
+
+    def setUp(self):
+        self.cenario = montar_cenario()
+        local = self.cenario.local
+        self.outro_local = LocalPrestacao.objects.create(nome=f'{local.nome} B', cidade=local.cidade, endereco='Rua 2')
+
+    def _conflitos(self):
+        return list(ConflitoPrestacao.objects.order_by('data').values_list(
+            'data', 'prestacao_id', 'conflitante_id', 'segundos'
+        ))
+
+    def test_sobreposicao_entre_locais(self):
+        primeira = criar_prestacao(self.cenario)
+        segunda = criar_prestacao(
+            self.cenario, local_prestacao=self.outro_local, horario_chegada=time(15), horario_saida=time(18)
+        )
+        self.assertEqual(self._conflitos(), [(date(2024, 5, 2), primeira.pk, segunda.pk, 2 * 3600)])
+        conflito = ConflitoPrestacao.objects.get()
+        self.assertEqual(
+            (timezone.localtime(conflito.inicio).time(), timezone.localtime(conflito.fim).time()), (time(15), time(17))
+        )
+
+        # Rejeitada não conta como horário trabalhado
+        RegistroPrestacao.objects.filter(pk=segunda.pk).validar('rejeitada', self.cenario.admin)
+        self.assertEqual(self._conflitos(), [])
+
+    def test_almoco_nao_conta(self):
+        criar_prestacao(self.cenario, horario_saida_almoco=time(12), horario_retorno_almoco=time(13))
+        criar_prestacao(
+            self.cenario, local_prestacao=self.outro_local, horario_chegada=time(12), horario_saida=time(13)
+        )
+        self.assertEqual(self._conflitos(), [])
+
+    def test_turno_que_vira_a_noite(self):
+        noite = criar_prestacao(self.cenario, horario_chegada=time(22), horario_saida=time(6))
+        manha = criar_prestacao(
+            self.cenario, data=date(2024, 5, 3), local_prestacao=self.outro_local,
+            horario_chegada=time(5), horario_saida=time(9),
+        )
+        self.assertEqual(self._conflitos(), [(date(2024, 5, 2), noite.pk, manha.pk, 3600)])
+
+    def test_mudar_a_data_refaz_o_dia_antigo(self):
+        criar_prestacao(self.cenario)
+        segunda = criar_prestacao(self.cenario, local_prestacao=self.outro_local)
+        self.assertEqual(len(self._conflitos()), 1)
+        segunda.data = date(2024, 5, 6)
+        segunda.save()
+        self.assertEqual(self._conflitos(), [])
+
+    def test_save_le_o_dia_anterior_uma_vez(self):
+        # Conflitos e resumo diário usam o mesmo (funcionario, data) anterior
+        prestacao = criar_prestacao(self.cenario)
+        prestacao.valor = Decimal('90.00')
+        with CaptureQueriesContext(connection) as consultas:
+            prestacao.save()
+        dia_anterior = str(
+            RegistroPrestacao.objects.filter(pk=prestacao.pk).values_list('funcionario_id', 'data').query
+        ).split(' WHERE ')[0]
+        self.assertEqual(sum(consulta['sql'].startswith(dia_anterior) for consulta in consultas.captured_queries), 1)
+
+    def test_reconstruir_igual_ao_incremental(self):
+        outro = criar_funcionario(self.cenario.empresa, self.cenario.cargo)
+        for funcionario in (self.cenario.funcionario, outro):
+            criar_prestacao(self.cenario, funcionario=funcionario, horario_chegada=time(22), horario_saida=time(6))
+            criar_prestacao(
+                self.cenario, funcionario=funcionario, local_prestacao=self.outro_local,
+                horario_chegada=time(20), horario_saida=time(23),
+            )
+            criar_prestacao(
+                self.cenario, funcionario=funcionario, data=date(2024, 5, 3), horario_chegada=time(4),
+                horario_saida=time(7),
+            )
+        incremental = self._conflitos()
+        self.assertEqual(len(incremental), 4)
+        self.assertEqual(reconstruir(date(2024, 5, 1), date(2024, 5, 31)), 4)
+        self.assertEqual(self._conflitos(), incremental)
+
+
+class ImportacaoApiTests(TestCase):
+
+    CABECALHO = 'cpf,data,local,gestor,horario_chegada,horario_saida,valor\n'
+
+    def setUp(self):
+        self.cenario = montar_cenario()
+        self.api = cliente(self.cenario.admin)
+
+    def _linha(self, data='2024-05-02', chegada='08:00', saida='17:00', cpf=None):
+        cpf = cpf or self.cenario.funcionario.usuario.cpf
+        return f'{cpf},{data},{self.cenario.local.nome},{self.cenario.gestor.usuario.username},{chegada},{saida},150.00\n'
+
+    def _importar(self, conteudo, **dados):
+        arquivo = SimpleUploadedFile('prestacoes.csv', conteudo.encode(), content_type='text/csv')
+        return self.api.post('/api/prestacoes/importar/', {'arquivo': arquivo, **dados}, format='multipart')
+
+    def _planilha_com_erros(self):
+        criar_prestacao(self.cenario, data=date(2024, 5, 10))
+        return self.CABECALHO + ''.join([
+            self._linha(),
+            self._linha(cpf='999.999.999-99'),
+            self._linha(data='2024-05-03', chegada='18:00'),
+            self._linha(),
+            self._linha(data='2024-05-10'),
+        ])
+
+    def test_relatorio_de_erros_por_linha(self):
+        resposta = self._importar(self._planilha_com_erros())
+        self.assertEqual(resposta.status_code, 400)
+        self.assertEqual((resposta.data['linhas'], resposta.data['criadas'], resposta.data['total_erros']), (5, 0, 4))
+        self.assertEqual(
+            [(erro['linha'], sorted(erro['erros'])) for erro in resposta.data['erros']],
+            [(3, ['cpf']), (4, ['horarios']), (5, ['linha']), (6, ['linha'])],
+        )
+        # Tudo ou nada
+        self.assertEqual(RegistroPrestacao.objects.count(), 1)
+
+    def test_parcial_grava_as_linhas_validas(self):
+        resposta = self._importar(self._planilha_com_erros(), parcial='true')
+        self.assertEqual(resposta.status_code, 201)
+        self.assertEqual((resposta.data['criadas'], resposta.data['total_erros']), (1, 4))
+        importada = RegistroPrestacao.objects.get(data=date(2024, 5, 2))
+        self.assertEqual((importada.segundos_trabalhados, importada.created_by), (9 * 3600, self.cenario.admin))
+
+    def test_conflito_com_prestacao_arquivada(self):
+        criar_prestacao(self.cenario, validacao_gestor='rejeitada')
+        arquivar('prestacoes', date(2024, 6, 1))
+        resposta = self._importar(self.CABECALHO + self._linha())
+        self.assertEqual(resposta.status_code, 400)
+        self.assertEqual(resposta.data['erros'][0]['erros'], {
+            'linha': ['Já existe prestação para este funcionário, data e local.']
+        })
+
+    def test_colunas_ausentes(self):
+        resposta = self._importar('cpf,data\n1,2024-05-02\n')
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn('Colunas obrigatórias ausentes', resposta.data['detail'])
 
-# Create your tests here.
+    def test_prestacao_gravada_durante_a_importacao(self):
+        # Outro processo grava a mesma chave depois da conferência com o banco
+        criar_prestacao(self.cenario)
+        with mock.patch.object(importacao, '_chaves_existentes', return_value=set()):
+            resposta = self._importar(self.CABECALHO + self._linha() + self._linha(data='2024-05-03'), parcial='true')
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn('envie a planilha de novo', resposta.data['detail'])
+        self.assertEqual(RegistroPrestacao.objects.count(), 1)
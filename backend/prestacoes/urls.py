@@ -1,10 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import RegistroPrestacaoView, HistoricoValidacaoView
+from .views import RegistroPrestacaoView, HistoricoValidacaoView, FilaValidacaoView
 
 router = DefaultRouter()
 router.register(r"prestacoes", RegistroPrestacaoView)
 router.register(r"historico-validacoes", HistoricoValidacaoView)
+router.register(r"fila-validacao", FilaValidacaoView, basename="fila-validacao")
 
 urlpatterns = [
     path("", include(router.urls)),
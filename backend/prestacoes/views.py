@@ -1,14 +1,177 @@
 from django.shortcuts import render
-from rest_framework import viewsets
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from relatorios.filters import PrestacaoFilter
+from empresas.models import Gestor
+from . import fila
+from .importacao import ArquivoInvalido, importar
 from .models import RegistroPrestacao, HistoricoValidacao
-from .serializers import RegistroPrestacaoSerializer, HistoricoValidacaoSerializer
+from .serializers import (
+    RegistroPrestacaoSerializer, HistoricoValidacaoSerializer, ValidacaoEmMassaSerializer,
+    ReservaFilaSerializer, LiberacaoFilaSerializer,
+)
 
 # Create your views here.
 
+def gestor_ativo_id(usuario):
+    """Id do cadastro de gestor ativo do usuário, ou None"""
+    return Gestor.objects.filter(usuario_id=usuario.pk, ativo=True).values_list('pk', flat=True).first()
+
+
 class RegistroPrestacaoView(viewsets.ModelViewSet):
     queryset = RegistroPrestacao.objects.all()
     serializer_class = RegistroPrestacaoSerializer
 
+    @action(detail=False, methods=['post'], parser_classes=[MultiPartParser])
+    def importar(self, request):
+        """
+        Importa prestações de uma planilha CSV ou XLSX (multipart `arquivo`).
+
+        Colunas: cpf, data, local, gestor (usuário), horario_chegada,
+        horario_saida, valor e, opcionais, cidade, horario_saida_almoco,
+        horario_retorno_almoco, observacoes (ver prestacoes/importacao.py).
+
+        Tudo ou nada: com qualquer erro nada é gravado (400) e o relatório
+        traz os erros por linha. Com `parcial=true` as linhas válidas são
+        gravadas mesmo assim.
+        """
+        arquivo = request.FILES.get('arquivo')
+        if arquivo is None:
+            return Response({'detail': 'Envie a planilha no campo arquivo.'}, status=status.HTTP_400_BAD_REQUEST)
+        parcial = str(request.data.get('parcial', '')).lower() in ('1', 'true', 'sim')
+        try:
+            resultado = importar(arquivo, arquivo.name, criado_por=request.user, parcial=parcial)
+        except ArquivoInvalido as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if resultado['total_erros'] and not resultado['criadas']:
+            return Response(resultado, status=status.HTTP_400_BAD_REQUEST)
+        return Response(resultado, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'], url_path='validar-em-massa')
+    def validar_em_massa(self, request):
+        """
+        Aprova, rejeita ou devolve para revisão várias prestações de uma vez.
+
+        Corpo: `status` (pendente, aprovada, rejeitada, em_revisao),
+        `observacoes` opcional e um de:
+        - `ids`: lista de ids de prestações
+        - `filtros`: os mesmos filtros de /api/relatorios/prestacoes/
+          (ex.: {"data_inicio": "2024-05-01", "data_fim": "2024-05-31",
+          "empresa": "ABC", "validacao_gestor": "pendente"})
+
+        Tudo em uma transação: um UPDATE por lote de ids e um
+        HistoricoValidacao (status anterior e novo) por prestação alterada.
+        Prestações que já estão no status pedido ou que estão em um lote
+        de pagamento não são alteradas.
+
+        Usuários staff validam qualquer prestação; gestores ativos, só as
+        atribuídas a eles (ids de outros gestores voltam em `nao_encontradas`).
+        """
+        if request.user.is_staff:
+            escopo = RegistroPrestacao.objects.all()
+        else:
+            gestor_id = gestor_ativo_id(request.user)
+            if gestor_id is None:
+                raise PermissionDenied('Apenas gestores ativos e administradores validam prestações.')
+            escopo = RegistroPrestacao.objects.filter(gestor_id=gestor_id)
+
+        entrada = ValidacaoEmMassaSerializer(data=request.data)
+        entrada.is_valid(raise_exception=True)
+        dados = entrada.validated_data
+
+        resposta = {}
+        if 'ids' in dados:
+            ids = set(dados['ids'])
+            queryset = escopo.filter(pk__in=ids)
+            encontradas = set(queryset.values_list('pk', flat=True))
+            resposta['nao_encontradas'] = sorted(ids - encontradas)
+            total = len(encontradas)
+        else:
+            filtros = dados['filtros']
+            if not set(filtros) & set(PrestacaoFilter.base_filters):
+                return Response(
+                    {'detail': f"Informe ao menos um filtro: {', '.join(PrestacaoFilter.base_filters)}."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            filterset = PrestacaoFilter(filtros, queryset=escopo, request=request)
+            if not filterset.is_valid():
+                return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+            queryset = filterset.qs
+            total = queryset.count()
+
+        por_status = queryset.validar(dados['status'], request.user, dados['observacoes'])
+        alteradas = sum(por_status.values())
+        return Response({
+            'status': dados['status'],
+            'encontradas': total,
+            'alteradas': alteradas,
+            'inalteradas': total - alteradas,
+            'por_status_anterior': por_status,
+            **resposta,
+        })
+
 class HistoricoValidacaoView(viewsets.ModelViewSet):
     queryset = HistoricoValidacao.objects.all()
-    serializer_class = HistoricoValidacaoSerializer
\ No newline at end of file
+    serializer_class = HistoricoValidacaoSerializer
+
+
+class FilaValidacaoView(viewsets.ViewSet):
+    """
+    Fila de validação do gestor (prestacoes/fila.py).
+
+    O escopo é o gestor do usuário logado; usuários staff informam `gestor`
+    (id) para trabalhar na fila de outro gestor.
+    """
+
+    def _gestor_id(self, request, gestor_id=None):
+        if request.user.is_staff and gestor_id is not None:
+            try:
+                gestor_id = int(gestor_id)
+            except (TypeError, ValueError):
+                raise ValidationError({'gestor': ['Informe o id do gestor.']})
+            if not Gestor.objects.filter(pk=gestor_id).exists():
+                raise ValidationError({'gestor': ['Gestor não encontrado.']})
+            return gestor_id
+        gestor_id = gestor_ativo_id(request.user)
+        if gestor_id is None:
+            if request.user.is_staff:
+                raise ValidationError({'gestor': ['Informe o gestor da fila.']})
+            raise PermissionDenied('Apenas gestores ativos têm fila de validação.')
+        return gestor_id
+
+    @action(detail=False, methods=['post'])
+    def proximos(self, request):
+        """
+        Reserva e devolve as próximas prestações pendentes (as mais antigas
+        primeiro), até `quantidade` (padrão 20, máximo 100).
+
+        A reserva vale até `reservado_ate`; pedir de novo antes disso renova
+        as reservas que ainda não foram validadas. Validar (PATCH ou
+        /api/prestacoes/validar-em-massa/) tira a prestação da fila.
+        """
+        entrada = ReservaFilaSerializer(data=request.data)
+        entrada.is_valid(raise_exception=True)
+        gestor_id = self._gestor_id(request, entrada.validated_data.get('gestor'))
+        lote, fim = fila.reservar(gestor_id, request.user, entrada.validated_data['quantidade'])
+        return Response({
+            'reservado_ate': fim,
+            'resultados': RegistroPrestacaoSerializer(lote, many=True).data,
+        })
+
+    @action(detail=False, methods=['post'])
+    def liberar(self, request):
+        """Devolve à fila as reservas do usuário (as de `ids` ou todas)"""
+        entrada = LiberacaoFilaSerializer(data=request.data)
+        entrada.is_valid(raise_exception=True)
+        liberadas = fila.liberar(request.user, entrada.validated_data.get('ids'))
+        return Response({'liberadas': liberadas})
+
+    @action(detail=False, methods=['get'])
+    def resumo(self, request):
+        """Profundidade (pendentes, reservadas, disponíveis) e idade da fila do gestor"""
+        gestor_id = self._gestor_id(request, request.query_params.get('gestor'))
+        return Response({'gestor': gestor_id, **fila.resumo(gestor_id)})
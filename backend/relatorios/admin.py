@@ -1,4 +1,5 @@
 from django.contrib import admin
 
-# Esta app não possui modelos próprios - apenas endpoints filtrados
-# Os dados são obtidos diretamente dos modelos das outras apps
\ No newline at end of file
+# Esta app não possui modelos editáveis - apenas endpoints filtrados.
+# O ResumoDiarioPrestacao é derivado das prestações e mantido automaticamente
+# (ver relatorios.signals e o comando reconstruir_resumo_prestacoes).
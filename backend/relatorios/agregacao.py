@@ -0,0 +1,213 @@
+# relatorios/agregacao.py
+"""
+Motor de agregação dos dashboards
+
+Cada dashboard declara uma lista de medidas (contagens, somas e razões) e o
+motor compila todas elas em UMA única consulta por modelo, usando agregação
+condicional (``Count('id', filter=Q(...))``) em vez de disparar uma consulta
+por número exibido.
+
+Exemplo:
+    MEDIDAS = [
+        Medida('aprovadas', Count, 'id', filtro=Q(validacao_gestor='aprovada')),
+        Medida('valor_total', Sum, 'valor'),
+        Razao('valor_medio', 'valor_total', 'aprovadas'),
+    ]
+    agregar(RegistroPrestacao.objects.filter(...), MEDIDAS)
+
+Quando o mesmo conjunto filtrado precisa ser exibido em vários recortes
+(por dia, por status, por empresa), agrupa-se uma vez pelo recorte mais fino
+com ``agregar_por`` e os demais são derivados em memória com ``consolidar``.
+Consultas divididas em partes (tabela quente + arquivo) são agregadas com
+``agregar_partes``.
+"""
+from collections import Counter
+from decimal import Decimal
+
+from django.db.models import Count, Sum
+
+PREFIXO_MEDIDA = 'medida_'
+
+
+class Medida:
+    """
+    Medida agregada no banco (ex.: Count, Sum, Avg), opcionalmente condicional
+
+    ``distinto`` conta valores distintos (ex.: funcionários que bateram ponto);
+    essas medidas não são aditivas.
+    """
+
+    ADITIVAS = (Count, Sum)
+
+    def __init__(self, nome, funcao, campo, filtro=None, padrao=0, distinto=False):
+        self.nome = nome
+        self.funcao = funcao
+        self.campo = campo
+        self.filtro = filtro
+        self.padrao = padrao
+        self.distinto = distinto
+
+    @property
+    def aditiva(self):
+        """Medidas aditivas podem ser re-somadas ao consolidar linhas agrupadas"""
+        return self.funcao in self.ADITIVAS and not self.distinto
+
+    def expressao(self):
+        if self.distinto:
+            return self.funcao(self.campo, filter=self.filtro, distinct=True)
+        return self.funcao(self.campo, filter=self.filtro)
+
+
+class Razao:
+    """
+    Medida derivada calculada após a agregação (ex.: valor médio)
+
+    ``fator`` multiplica o resultado, por exemplo 3600 para transformar
+    valor por segundo em valor por hora.
+    """
+
+    def __init__(self, nome, numerador, denominador, padrao=0, fator=1):
+        self.nome = nome
+        self.numerador = numerador
+        self.denominador = denominador
+        self.padrao = padrao
+        self.fator = fator
+
+    def calcular(self, linha):
+        numerador = linha.get(self.numerador)
+        denominador = linha.get(self.denominador)
+        if not denominador or numerador is None:
+            return self.padrao
+        if isinstance(numerador, Decimal) or isinstance(denominador, Decimal):
+            return Decimal(numerador) * self.fator / Decimal(denominador)
+        return numerador * self.fator / denominador
+
+
+def _separar(medidas):
+    banco = [m for m in medidas if isinstance(m, Medida)]
+    derivadas = [m for m in medidas if isinstance(m, Razao)]
+    return banco, derivadas
+
+
+def _finalizar(linha, banco, derivadas):
+    for medida in banco:
+        if linha.get(medida.nome) is None:
+            linha[medida.nome] = medida.padrao
+    for medida in derivadas:
+        linha[medida.nome] = medida.calcular(linha)
+    return linha
+
+
+def linha_vazia(medidas, **campos):
+    """Linha sem registros (todas as medidas no valor padrão), ex.: para preencher lacunas"""
+    banco, derivadas = _separar(medidas)
+    return _finalizar(dict(campos), banco, derivadas)
+
+
+def agregar(queryset, medidas):
+    """Calcula todas as medidas sobre o queryset em uma única consulta"""
+    banco, derivadas = _separar(medidas)
+    linha = queryset.order_by().aggregate(**{m.nome: m.expressao() for m in banco})
+    return _finalizar(linha, banco, derivadas)
+
+
+def agregar_por(queryset, campos, medidas):
+    """
+    Agrupa o queryset pelos campos informados calculando as medidas em uma consulta.
+
+    ``campos`` pode ser uma lista de lookups ou um dicionário {nome_na_saida: lookup},
+    útil quando a fonte (ex.: o resumo diário) usa caminhos diferentes dos expostos na API.
+    """
+    banco, derivadas = _separar(medidas)
+    apelidos = campos if isinstance(campos, dict) else {campo: campo for campo in campos}
+    # As anotações usam um prefixo para não colidir com campos do modelo de mesmo
+    # nome (ex.: Sum('valor_total') declarada depois de uma medida 'valor_total')
+    linhas = queryset.order_by().values(*apelidos.values()).annotate(
+        **{PREFIXO_MEDIDA + m.nome: m.expressao() for m in banco}
+    )
+    resultado = []
+    for linha in linhas:
+        for nome, lookup in apelidos.items():
+            if nome != lookup:
+                linha[nome] = linha.pop(lookup)
+        for medida in banco:
+            linha[medida.nome] = linha.pop(PREFIXO_MEDIDA + medida.nome)
+        resultado.append(_finalizar(linha, banco, derivadas))
+    return resultado
+
+
+def consolidar(linhas, campos, medidas, condicao=None):
+    """
+    Re-agrupa em memória linhas vindas de ``agregar_por`` por um subconjunto dos campos.
+
+    Apenas medidas aditivas (Count/Sum) são re-somadas; razões são recalculadas
+    sobre os totais consolidados. ``condicao`` permite descartar linhas antes
+    da soma (ex.: apenas o status 'aprovada').
+    """
+    banco, derivadas = _separar(medidas)
+    for medida in banco:
+        if not medida.aditiva:
+            raise ValueError(f"Medida '{medida.nome}' não é aditiva e não pode ser consolidada.")
+
+    grupos = {}
+    for linha in linhas:
+        if condicao and not condicao(linha):
+            continue
+        chave = tuple(linha[campo] for campo in campos)
+        grupo = grupos.get(chave)
+        if grupo is None:
+            grupo = dict(zip(campos, chave))
+            for medida in banco:
+                grupo[medida.nome] = None
+            grupos[chave] = grupo
+        for medida in banco:
+            valor = linha.get(medida.nome)
+            if valor is not None:
+                grupo[medida.nome] = valor if grupo[medida.nome] is None else grupo[medida.nome] + valor
+
+    return [_finalizar(grupo, banco, derivadas) for grupo in grupos.values()]
+
+
+def agregar_partes(querysets, campos, medidas):
+    """
+    ``agregar_por`` sobre a soma de vários querysets (ex.: tabela quente e arquivo).
+
+    Cada parte é agrupada em uma consulta e as linhas são re-somadas com
+    ``consolidar``. Contagens distintas não são aditivas: os valores distintos
+    de cada parte são lidos e contados em memória, para que um valor presente
+    em duas partes conte uma vez só.
+    """
+    querysets = list(querysets)
+    if len(querysets) == 1:
+        return agregar_por(querysets[0], campos, medidas)
+
+    banco, derivadas = _separar(medidas)
+    for medida in banco:
+        if not medida.aditiva and not (medida.distinto and medida.funcao is Count):
+            raise ValueError(f"Medida '{medida.nome}' não pode ser somada entre partes.")
+    aditivas = [m for m in banco if m.aditiva]
+    distintas = [m for m in banco if not m.aditiva]
+    apelidos = campos if isinstance(campos, dict) else {campo: campo for campo in campos}
+    nomes = list(apelidos)
+
+    grupos = {}
+    if aditivas:
+        linhas = []
+        for queryset in querysets:
+            linhas.extend(agregar_por(queryset, apelidos, aditivas))
+        for linha in consolidar(linhas, nomes, aditivas):
+            grupos[tuple(linha[nome] for nome in nomes)] = linha
+
+    for medida in distintas:
+        valores = set()
+        for queryset in querysets:
+            if medida.filtro is not None:
+                queryset = queryset.filter(medida.filtro)
+            valores.update(
+                queryset.order_by().values_list(*apelidos.values(), medida.campo).distinct()
+            )
+        contagem = Counter(valor[:-1] for valor in valores if valor[-1] is not None)
+        for chave, total in contagem.items():
+            grupos.setdefault(chave, dict(zip(nomes, chave)))[medida.nome] = total
+
+    return [_finalizar(grupo, banco, derivadas) for grupo in grupos.values()]
@@ -0,0 +1,132 @@
+# relatorios/arquivo.py
+"""
+Leitura do arquivo (app `arquivo`) nas listagens de relatórios
+
+Quando o período filtrado começa antes do limite do que já foi arquivado
+(`arquivo.arquivamento.limite_arquivado`), a listagem e a exportação juntam a
+tabela quente e a tabela de arquivo em um UNION ALL. Sem filtro de data, ou
+com datas a partir do limite, só a tabela quente é lida. Ações agregadas
+(`acoes_arquivo_sem_periodo`, ex.: estatísticas) incluem o arquivo também
+sem filtro de data, como o resumo diário, que soma as duas tabelas.
+
+As tabelas de arquivo têm as mesmas colunas, na mesma ordem, que as tabelas
+quentes; os mesmos filtros (FilterSet, busca, ordenação) valem para as duas
+partes e as linhas voltam como instâncias ou `values()` do modelo original.
+"""
+from datetime import datetime
+
+from django_filters.rest_framework import DjangoFilterBackend
+
+from arquivo.arquivamento import limite_arquivado
+
+
+class ConsultaComArquivo:
+    """
+    União de querysets (tabela quente + arquivo) com a parte da API de
+    QuerySet usada pela paginação e pela exportação.
+
+    Filtros e `values()` são aplicados a cada parte antes da união; a
+    ordenação (a da primeira parte, se não for trocada) vale para o resultado.
+    """
+    ordered = True
+
+    def __init__(self, partes, ordem=None):
+        self.partes = list(partes)
+        self.model = self.partes[0].model
+        self.ordem = list(ordem or self.partes[0].query.order_by or self.model._meta.ordering)
+
+    def _aplicar(self, metodo, *args, **kwargs):
+        return ConsultaComArquivo(
+            [getattr(parte, metodo)(*args, **kwargs) for parte in self.partes], self.ordem
+        )
+
+    def filter(self, *args, **kwargs):
+        return self._aplicar('filter', *args, **kwargs)
+
+    def values(self, *campos, **expressoes):
+        return self._aplicar('values', *campos, **expressoes)
+
+    def values_list(self, *campos, **kwargs):
+        return self._aplicar('values_list', *campos, **kwargs)
+
+    def order_by(self, *ordem):
+        return ConsultaComArquivo(self.partes, ordem)
+
+    def count(self):
+        return sum(parte.count() for parte in self.partes)
+
+    def unida(self):
+        # Subconsultas de um UNION não podem ter ORDER BY próprio
+        primeira, *demais = [parte.order_by() for parte in self.partes]
+        return primeira.union(*demais, all=True).order_by(*self.ordem)
+
+    def iterator(self, chunk_size=None):
+        return self.unida().iterator(chunk_size=chunk_size)
+
+    def __getitem__(self, indice):
+        return self.unida()[indice]
+
+    def __iter__(self):
+        return iter(self.unida())
+
+    def __len__(self):
+        return len(self.unida())
+
+
+def partes_consulta(queryset):
+    """Querysets que compõem a consulta: as partes da união ou o próprio queryset"""
+    return queryset.partes if isinstance(queryset, ConsultaComArquivo) else [queryset]
+
+
+class ArquivoMixin:
+    """
+    Inclui o arquivo nas ações `acoes_arquivo` quando há filtro de período e
+    ele começa antes do limite arquivado (só `data_fim`: período aberto no
+    início, sempre inclui).
+
+    As ações de `acoes_arquivo_sem_periodo` incluem o arquivo também sem
+    filtro de período.
+
+    A view define `tabela_arquivo` ('prestacoes', 'pontos') e
+    `get_queryset_arquivo()` com os mesmos select_related do queryset quente.
+    """
+    tabela_arquivo = None
+    acoes_arquivo = ('list', 'exportar')
+    acoes_arquivo_sem_periodo = ()
+    filtro_inicio_arquivo = 'data_inicio'
+    filtro_fim_arquivo = 'data_fim'
+
+    def get_queryset_arquivo(self):
+        raise NotImplementedError
+
+    def incluir_arquivo(self):
+        if self.action not in self.acoes_arquivo:
+            return False
+        parametros = self.request.query_params
+        if not (parametros.get(self.filtro_inicio_arquivo) or parametros.get(self.filtro_fim_arquivo)):
+            return self.action in self.acoes_arquivo_sem_periodo and limite_arquivado(self.tabela_arquivo) is not None
+        limite = limite_arquivado(self.tabela_arquivo)
+        if limite is None:
+            return False
+        filterset = self.filterset_class(parametros, queryset=self.get_queryset(), request=self.request)
+        if not filterset.is_valid():
+            return False
+        inicio = filterset.form.cleaned_data.get(self.filtro_inicio_arquivo)
+        if isinstance(inicio, datetime):
+            inicio = inicio.date()
+        return inicio is None or inicio < limite
+
+    def filter_queryset(self, queryset):
+        filtrado = super().filter_queryset(queryset)
+        if not self.incluir_arquivo():
+            return filtrado
+        arquivo = self.get_queryset_arquivo()
+        for backend in self.filter_backends:
+            if issubclass(backend, DjangoFilterBackend):
+                # O backend exige o modelo do FilterSet; os campos são os mesmos no arquivo
+                arquivo = self.filterset_class(
+                    self.request.query_params, queryset=arquivo, request=self.request
+                ).qs
+            else:
+                arquivo = backend().filter_queryset(self.request, arquivo, self)
+        return ConsultaComArquivo([filtrado, arquivo])
@@ -0,0 +1,186 @@
+# relatorios/cache.py
+"""
+Cache versionado das respostas dos dashboards
+
+As respostas são guardadas no cache compartilhado (settings.CACHES) sob uma
+chave formada por: endpoint + parâmetros normalizados + escopo do usuário +
+versões dos dados dos quais a resposta depende.
+
+Invalidação: em vez de apagar respostas, cada alteração de dados troca as
+versões por domínio ('prestacoes', 'funcionarios', 'pontos'), empresa e mês.
+Uma resposta só é reaproveitada enquanto todas as versões das células que
+ela lê continuam iguais. Ex.: uma prestação da empresa 3 em março/2025 troca
+as versões das células (3, 2025-03), (3, *), (*, 2025-03) e (*, *);
+dashboards de outras empresas ou de outros meses continuam válidos.
+
+As versões mudam só depois do commit da transação que alterou os dados
+(transaction.on_commit): um leitor concorrente não guarda dados anteriores
+ao commit sob a versão nova. Cada mudança grava uma versão nova, nunca usada
+(não um incremento, que no FileBasedCache é um get seguido de set e pode
+perder uma das mudanças concorrentes).
+
+Single-flight: no cache miss, o worker que obtém o lock calcula a resposta e
+os demais aguardam o resultado por alguns segundos. O lock fica no cache
+`travas` (DatabaseCache), cujo `add` é um INSERT na chave primária e por
+isso exclusivo entre processos; o `add` do FileBasedCache não é.
+"""
+import hashlib
+import time
+from datetime import date
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+PREFIXO = 'relatorios'
+TEMPO_RESPOSTA = getattr(settings, 'RELATORIOS_CACHE_TIMEOUT', 15 * 60)
+TEMPO_LOCK = 30
+ESPERA_LOCK = 10
+INTERVALO_ESPERA = 0.05
+MAX_MESES = 36
+# Cache com `add` atômico entre processos, usado só para os locks
+ALIAS_TRAVAS = 'travas'
+
+
+class Dependencia:
+    """
+    Domínio de dados lido por um endpoint.
+
+    - empresa: a resposta respeita o parâmetro `empresa_id`
+    - periodo: a resposta respeita `data_inicio`/`data_fim`
+    """
+
+    def __init__(self, dominio, empresa=False, periodo=False):
+        self.dominio = dominio
+        self.empresa = empresa
+        self.periodo = periodo
+
+
+def _mes(data):
+    return data.strftime('%Y-%m') if data else '*'
+
+
+def _chave_versao(dominio, empresa_id, mes):
+    return f'{PREFIXO}:v:{dominio}:{empresa_id or "*"}:{mes}'
+
+
+def _nova_versao():
+    # Baseada no relógio para que uma versão expulsa do cache nunca volte a um valor já usado
+    return time.time_ns()
+
+
+def invalidar(dominio, celulas):
+    """
+    Troca as versões das células alteradas, após o commit.
+
+    `celulas` é um iterável de tuplas (empresa_id, data); data pode ser None
+    para domínios sem dimensão temporal (ex.: funcionários).
+    """
+    chaves = set()
+    for empresa_id, data in celulas:
+        mes = _mes(data)
+        chaves.update({
+            _chave_versao(dominio, empresa_id, mes),
+            _chave_versao(dominio, empresa_id, '*'),
+            _chave_versao(dominio, None, mes),
+            _chave_versao(dominio, None, '*'),
+        })
+
+    def atualizar():
+        cache.set_many({chave: _nova_versao() for chave in chaves}, None)
+    transaction.on_commit(atualizar)
+
+
+def _meses(data_inicio, data_fim):
+    """Meses cobertos pelo intervalo, ou ['*'] se for aberto ou longo demais"""
+    if not data_inicio or not data_fim:
+        return ['*']
+    try:
+        inicio = date.fromisoformat(str(data_inicio)[:10])
+        fim = date.fromisoformat(str(data_fim)[:10])
+    except ValueError:
+        return ['*']
+    total = (fim.year - inicio.year) * 12 + fim.month - inicio.month + 1
+    if total <= 0 or total > MAX_MESES:
+        return ['*']
+    meses = []
+    ano, mes = inicio.year, inicio.month
+    for _ in range(total):
+        meses.append(f'{ano:04d}-{mes:02d}')
+        ano, mes = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+    return meses
+
+
+def _versoes(chaves):
+    versoes = cache.get_many(chaves)
+    for chave in chaves:
+        if chave not in versoes:
+            cache.add(chave, _nova_versao(), None)
+            versoes[chave] = cache.get(chave)
+    return [versoes[chave] for chave in chaves]
+
+
+def escopo_usuario(user):
+    """Parte da chave que separa o que cada usuário pode ver"""
+    if user.is_staff:
+        return 'staff'
+    return f'usuario:{user.pk}'
+
+
+def chave_resposta(endpoint, request, dependencias):
+    params = request.query_params
+    empresa_id = params.get('empresa_id') or None
+    meses = _meses(params.get('data_inicio'), params.get('data_fim'))
+
+    chaves_versao = []
+    for dependencia in dependencias:
+        empresa = empresa_id if dependencia.empresa else None
+        for mes in (meses if dependencia.periodo else ['*']):
+            chaves_versao.append(_chave_versao(dependencia.dominio, empresa, mes))
+
+    normalizados = sorted((nome, tuple(sorted(params.getlist(nome)))) for nome in params)
+    assinatura = repr((normalizados, _versoes(chaves_versao))).encode()
+    resumo = hashlib.sha1(assinatura).hexdigest()
+    return f'{PREFIXO}:resp:{endpoint}:{escopo_usuario(request.user)}:{resumo}'
+
+
+def em_cache(*dependencias, timeout=None):
+    """
+    Decorator para actions de ViewSet que devolvem dados agregados.
+
+    Exemplo:
+        @action(detail=False, methods=['get'])
+        @em_cache(Dependencia('prestacoes', empresa=True, periodo=True))
+        def financeiro(self, request): ...
+    """
+    def decorator(metodo):
+        @wraps(metodo)
+        def wrapper(self, request, *args, **kwargs):
+            chave = chave_resposta(metodo.__name__, request, dependencias)
+            dados = cache.get(chave)
+            if dados is not None:
+                return Response(dados)
+
+            travas = caches[ALIAS_TRAVAS]
+            chave_lock = f'{chave}:lock'
+            if not travas.add(chave_lock, 1, TEMPO_LOCK):
+                limite = time.monotonic() + ESPERA_LOCK
+                while time.monotonic() < limite:
+                    time.sleep(INTERVALO_ESPERA)
+                    dados = cache.get(chave)
+                    if dados is not None:
+                        return Response(dados)
+                return metodo(self, request, *args, **kwargs)
+
+            try:
+                response = metodo(self, request, *args, **kwargs)
+                if response.status_code == status.HTTP_200_OK:
+                    cache.set(chave, response.data, TEMPO_RESPOSTA if timeout is None else timeout)
+                return response
+            finally:
+                travas.delete(chave_lock)
+        return wrapper
+    return decorator
@@ -0,0 +1,153 @@
+# relatorios/condicional.py
+"""
+GET condicional (ETag / Last-Modified) a partir de marcas por tabela
+
+Cada tabela tem uma marca no cache compartilhado: (versão, última alteração).
+A marca muda a cada save/delete (sinais em relatorios.signals, aplicados
+após o commit) e nas operações em massa que enviam sinais próprios. Se a
+marca não estiver no cache, ela é derivada do banco uma única vez
+(COUNT e MAX(updated_at) da tabela).
+
+Só as tabelas de TABELAS_MONITORADAS têm marca: uma view com
+RespostaCondicionalMixin declara as tabelas de que depende (entre elas); a
+ETag combina as versões dessas tabelas com a URL e o escopo do usuário. Se
+o cliente envia If-None-Match/If-Modified-Since ainda válidos, a resposta
+304 sai em `initial()`, antes de qualquer serializer ou consulta agregada.
+"""
+import hashlib
+import time
+
+from django.apps import apps
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .cache import escopo_usuario
+
+PREFIXO = 'condicional:marca'
+# Saves que alteram apenas estes campos não mudam o conteúdo das respostas
+CAMPOS_IGNORADOS = {'last_login'}
+# Tabelas lidas por views com RespostaCondicionalMixin; só os saves e deletes
+# delas mudam marcas (relatorios.signals)
+TABELAS_MONITORADAS = (
+    'prestacoes.RegistroPrestacao',
+    'funcionarios.Funcionario',
+    'ponto.RegistroPonto',
+    'empresas.EmpresaTerceirizada',
+    'usuarios.Usuario',
+    'localizacao.Estado',
+    'localizacao.Cidade',
+    'localizacao.LocalPrestacao',
+)
+
+
+class NaoModificado(Exception):
+    """Interrompe a view devolvendo a resposta 304 já montada"""
+
+    def __init__(self, resposta):
+        self.resposta = resposta
+
+
+def _chave(label):
+    return f'{PREFIXO}:{label.lower()}'
+
+
+def _marca_do_banco(label):
+    model = apps.get_model(label)
+    medidas = {'total': Count('pk')}
+    if any(campo.name == 'updated_at' for campo in model._meta.concrete_fields):
+        medidas['modificado'] = Max('updated_at')
+    dados = model._default_manager.order_by().aggregate(**medidas)
+    modificado = dados.get('modificado')
+    instante = modificado.timestamp() if modificado else 0
+    return (f"{dados['total']}:{instante}", instante)
+
+
+def marcar_alteracao(label):
+    """Registra uma alteração na tabela `label` (ex.: 'prestacoes.RegistroPrestacao') após o commit"""
+    def atualizar():
+        cache.set(_chave(label), (f'{time.time_ns()}', time.time()), None)
+    transaction.on_commit(atualizar)
+
+
+def marcas(labels):
+    """Marcas atuais das tabelas, derivando do banco as que não estão no cache"""
+    chaves = {label: _chave(label) for label in labels}
+    encontradas = cache.get_many(chaves.values())
+    resultado = {}
+    for label, chave in chaves.items():
+        marca = encontradas.get(chave)
+        if marca is None:
+            cache.add(chave, _marca_do_banco(label), None)
+            marca = cache.get(chave) or _marca_do_banco(label)
+        resultado[label] = marca
+    return resultado
+
+
+class RespostaCondicionalMixin:
+    """
+    Responde 304 para GET/HEAD quando as tabelas de `tabelas_condicionais`
+    não mudaram desde a resposta que o cliente já tem.
+
+    Exemplo:
+        class EstadoView(RespostaCondicionalMixin, viewsets.ModelViewSet):
+            tabelas_condicionais = ['localizacao.Estado']
+    """
+    tabelas_condicionais = []
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # A marca de uma tabela não monitorada nunca muda: a view responderia 304 para sempre
+        fora = set(cls.tabelas_condicionais) - set(TABELAS_MONITORADAS)
+        if fora:
+            raise ImproperlyConfigured(
+                f'{cls.__name__}: inclua {sorted(fora)} em relatorios.condicional.TABELAS_MONITORADAS.'
+            )
+
+    def get_tabelas_condicionais(self):
+        return self.tabelas_condicionais
+
+    def _validadores(self, request):
+        atuais = marcas(self.get_tabelas_condicionais())
+        parametros = sorted((nome, tuple(sorted(request.query_params.getlist(nome)))) for nome in request.query_params)
+        assinatura = repr((
+            # A data entra na assinatura porque respostas com janela relativa a
+            # "hoje" mudam na virada do dia mesmo sem alteração nas tabelas
+            request.path, parametros, escopo_usuario(request.user), timezone.localdate().isoformat(),
+            request.META.get('HTTP_ACCEPT', ''), sorted(versao for versao, _ in atuais.values()),
+        ))
+        etag = quote_etag(hashlib.sha1(assinatura.encode()).hexdigest())
+        instante = max((modificado for _, modificado in atuais.values()), default=0)
+        return etag, int(instante) or None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._etag = self._ultima_modificacao = None
+        if request.method not in ('GET', 'HEAD') or not self.get_tabelas_condicionais():
+            return
+        self._etag, self._ultima_modificacao = self._validadores(request)
+        resposta = get_conditional_response(
+            request, etag=self._etag, last_modified=self._ultima_modificacao
+        )
+        if resposta is not None:
+            raise NaoModificado(resposta)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NaoModificado):
+            return exc.resposta
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        etag = getattr(self, '_etag', None)
+        if etag and response.status_code in (200, 304):
+            response['ETag'] = etag
+            if self._ultima_modificacao:
+                response['Last-Modified'] = http_date(self._ultima_modificacao)
+            # O navegador pode guardar, mas deve revalidar a cada uso
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
@@ -0,0 +1,259 @@
+# relatorios/exportacao.py
+"""
+Exportação em streaming (CSV e XLSX) dos endpoints de listagem de relatórios
+
+As linhas são lidas do banco com `values_list(...).iterator(chunk_size)`
+(cursor no servidor, sem instanciar modelos) e escritas na resposta em
+blocos. A memória do worker fica constante, independente do número de linhas.
+
+O XLSX é gerado diretamente como um zip em streaming: a planilha é escrita
+com strings inline, sem tabela de strings compartilhadas, então nada precisa
+ser mantido em memória entre os blocos.
+"""
+import csv
+import re
+import zipfile
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+TAMANHO_BLOCO = 2000
+
+
+class Coluna:
+    """Coluna exportada: título, um ou mais campos (lookups) e formatação opcional"""
+
+    def __init__(self, titulo, *campos, formatar=None):
+        self.titulo = titulo
+        self.campos = campos
+        self.formatar = formatar
+
+    def valor(self, valores):
+        if self.formatar:
+            return self.formatar(*valores)
+        return valores[0]
+
+
+def nome_completo(first_name, last_name):
+    return f'{first_name or ""} {last_name or ""}'.strip()
+
+
+def duracao(segundos):
+    return str(timedelta(seconds=segundos or 0))
+
+
+def _normalizar(valor):
+    if isinstance(valor, datetime):
+        return timezone.localtime(valor) if timezone.is_aware(valor) else valor
+    return valor
+
+
+def iterar_linhas(queryset, colunas, tamanho_bloco=TAMANHO_BLOCO):
+    """Percorre o queryset com cursor no servidor, devolvendo linhas já formatadas"""
+    campos = []
+    posicoes = []
+    for coluna in colunas:
+        inicio = len(campos)
+        campos.extend(coluna.campos)
+        posicoes.append((coluna, inicio, len(campos)))
+
+    for registro in queryset.values_list(*campos).iterator(chunk_size=tamanho_bloco):
+        yield [
+            _normalizar(coluna.valor(registro[inicio:fim]))
+            for coluna, inicio, fim in posicoes
+        ]
+
+
+class _Buffer:
+    """Destino de escrita que acumula os bytes até serem repassados à resposta"""
+
+    def __init__(self):
+        self.partes = []
+
+    def write(self, dados):
+        self.partes.append(dados)
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def esvaziar(self):
+        dados = b''.join(part if isinstance(part, bytes) else part.encode('utf-8') for part in self.partes)
+        self.partes = []
+        return dados
+
+
+def _texto_csv(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, bool):
+        return 'sim' if valor else 'não'
+    if isinstance(valor, (datetime, date, time)):
+        return valor.isoformat()
+    return valor
+
+
+def gerar_csv(colunas, linhas, tamanho_bloco=TAMANHO_BLOCO):
+    buffer = _Buffer()
+    escritor = csv.writer(buffer)
+    escritor.writerow([coluna.titulo for coluna in colunas])
+    for numero, linha in enumerate(linhas, start=1):
+        escritor.writerow([_texto_csv(valor) for valor in linha])
+        if numero % tamanho_bloco == 0:
+            yield buffer.esvaziar()
+    yield buffer.esvaziar()
+
+
+_CARACTERES_INVALIDOS_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+_XLSX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{nome}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+_XLSX_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/></cellXfs>'
+    '</styleSheet>'
+)
+
+
+def _celula_xlsx(valor):
+    if valor is None:
+        return '<c/>'
+    if isinstance(valor, bool):
+        return f'<c t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, (int, float, Decimal)):
+        return f'<c><v>{valor}</v></c>'
+    if isinstance(valor, (datetime, date, time)):
+        valor = valor.isoformat()
+    texto = escape(_CARACTERES_INVALIDOS_XML.sub('', str(valor)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _linha_xlsx(valores):
+    return '<row>' + ''.join(_celula_xlsx(valor) for valor in valores) + '</row>'
+
+
+def gerar_xlsx(colunas, linhas, nome_planilha='Dados', tamanho_bloco=TAMANHO_BLOCO):
+    buffer = _Buffer()
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_DEFLATED) as arquivo:
+        arquivo.writestr('[Content_Types].xml', _XLSX_CONTENT_TYPES)
+        arquivo.writestr('_rels/.rels', _XLSX_RELS)
+        arquivo.writestr('xl/workbook.xml', _XLSX_WORKBOOK.format(nome=escape(nome_planilha[:31])))
+        arquivo.writestr('xl/_rels/workbook.xml.rels', _XLSX_WORKBOOK_RELS)
+        arquivo.writestr('xl/styles.xml', _XLSX_STYLES)
+        yield buffer.esvaziar()
+
+        with arquivo.open('xl/worksheets/sheet1.xml', mode='w', force_zip64=True) as planilha:
+            planilha.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                b'<sheetData>'
+            )
+            planilha.write(_linha_xlsx([coluna.titulo for coluna in colunas]).encode('utf-8'))
+            bloco = []
+            for linha in linhas:
+                bloco.append(_linha_xlsx(linha))
+                if len(bloco) >= tamanho_bloco:
+                    planilha.write(''.join(bloco).encode('utf-8'))
+                    bloco = []
+                    yield buffer.esvaziar()
+            planilha.write(''.join(bloco).encode('utf-8'))
+            planilha.write(b'</sheetData></worksheet>')
+    yield buffer.esvaziar()
+
+
+FORMATOS = {
+    'csv': ('text/csv; charset=utf-8', gerar_csv),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', gerar_xlsx),
+}
+
+
+def resposta_exportacao(queryset, colunas, nome_arquivo, formato='csv'):
+    """Monta a StreamingHttpResponse no formato pedido"""
+    content_type, gerador = FORMATOS[formato]
+    resposta = StreamingHttpResponse(
+        gerador(colunas, iterar_linhas(queryset, colunas)),
+        content_type=content_type,
+    )
+    carimbo = timezone.localtime().strftime('%Y%m%d_%H%M')
+    resposta['Content-Disposition'] = f'attachment; filename="{nome_arquivo}_{carimbo}.{formato}"'
+    return resposta
+
+
+class ExportacaoMixin:
+    """
+    Adiciona a action `exportar` a um ViewSet de relatórios.
+
+    O ViewSet define `colunas_exportacao` e `nome_exportacao`; a exportação
+    respeita os mesmos filtros, busca e ordenação da listagem.
+
+    Parâmetros:
+    - `formato`: csv (padrão) ou xlsx
+    """
+    colunas_exportacao = []
+    nome_exportacao = 'relatorio'
+
+    @action(detail=False, methods=['get'])
+    def exportar(self, request):
+        """
+        Exporta todos os registros filtrados em CSV ou XLSX (streaming)
+
+        **Parâmetros:**
+        - `formato`: csv (padrão) ou xlsx
+        - Demais filtros, `search` e `ordering` iguais aos da listagem
+        """
+        formato = request.query_params.get('formato', 'csv').lower()
+        if formato not in FORMATOS:
+            return Response(
+                {'detail': f"Formato inválido. Use: {', '.join(FORMATOS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        queryset = self.filter_queryset(self.get_queryset())
+        return resposta_exportacao(queryset, self.colunas_exportacao, self.nome_exportacao, formato)
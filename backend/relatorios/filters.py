@@ -1,10 +1,12 @@
 # relatorios/filters.py
 import django_filters
-from django.db.models import Q
+from django.db.models import F, Q
+from rest_framework.filters import SearchFilter
 from datetime import datetime, timedelta
+from funcionarios.busca import filtro_nome, filtrar_por_nome
 from funcionarios.models import Funcionario
-from prestacoes.models import RegistroPrestacao
-from ponto.models import RegistroPonto
+from prestacoes.models import ConflitoPrestacao, RegistroPrestacao
+from ponto.models import IntervaloPonto, RegistroPonto
 from empresas.models import EmpresaTerceirizada
 
 
@@ -12,7 +14,7 @@ class FuncionarioFilter(django_filters.FilterSet):
     """Filtros para funcionários
     
     Filtros disponíveis:
-    - nome: Busca por nome completo do funcionário (busca em primeiro nome e sobrenome)
+    - nome: Busca por nome completo do funcionário, sem diferenciar acentos
     - empresa: Busca por nome da empresa (busca parcial, case-insensitive)
     - cargo: Busca por nome do cargo (busca parcial, case-insensitive)
     - cpf: Busca por CPF (busca parcial)
@@ -80,17 +82,14 @@ class FuncionarioFilter(django_filters.FilterSet):
 
     def filter_nome(self, queryset, name, value):
         """Filtro customizado para nome completo"""
-        return queryset.filter(
-            Q(usuario__first_name__icontains=value) |
-            Q(usuario__last_name__icontains=value)
-        )
+        return filtrar_por_nome(queryset, value)
 
 
 class PrestacaoFilter(django_filters.FilterSet):
     """Filtros para prestações
     
     Filtros disponíveis:
-    - funcionario_nome: Busca por nome do funcionário (busca em primeiro nome e sobrenome)
+    - funcionario_nome: Busca por nome do funcionário, sem diferenciar acentos
     - empresa: Busca por nome da empresa (busca parcial, case-insensitive)
     - data_inicio: Data da prestação a partir de (formato: YYYY-MM-DD)
     - data_fim: Data da prestação até (formato: YYYY-MM-DD)
@@ -165,10 +164,7 @@ class PrestacaoFilter(django_filters.FilterSet):
 
     def filter_funcionario_nome(self, queryset, name, value):
         """Filtro customizado para nome do funcionário"""
-        return queryset.filter(
-            Q(funcionario__usuario__first_name__icontains=value) |
-            Q(funcionario__usuario__last_name__icontains=value)
-        )
+        return filtrar_por_nome(queryset, value, caminho='funcionario__')
 
 
 class PontoFilter(django_filters.FilterSet):
@@ -199,10 +195,104 @@ class PontoFilter(django_filters.FilterSet):
 
     def filter_funcionario_nome(self, queryset, name, value):
         """Filtro customizado para nome do funcionário"""
-        return queryset.filter(
-            Q(funcionario__usuario__first_name__icontains=value) |
-            Q(funcionario__usuario__last_name__icontains=value)
-        )
+        return filtrar_por_nome(queryset, value, caminho='funcionario__')
+
+
+class IntervaloPontoFilter(django_filters.FilterSet):
+    """Filtros para intervalos de ponto (dia local do pareamento)"""
+    funcionario_nome = django_filters.CharFilter(
+        method='filter_funcionario_nome',
+        label='Nome do funcionário'
+    )
+    empresa_id = django_filters.NumberFilter(
+        field_name='funcionario__empresa_id',
+        label='ID da empresa'
+    )
+    data_inicio = django_filters.DateFilter(
+        field_name='data',
+        lookup_expr='gte',
+        label='Data (início)'
+    )
+    data_fim = django_filters.DateFilter(
+        field_name='data',
+        lookup_expr='lte',
+        label='Data (fim)'
+    )
+    status = django_filters.ChoiceFilter(
+        choices=IntervaloPonto.STATUS_CHOICES,
+        label='Status'
+    )
+
+    class Meta:
+        model = IntervaloPonto
+        fields = ['funcionario']
+
+    def filter_funcionario_nome(self, queryset, name, value):
+        return filtrar_por_nome(queryset, value, caminho='funcionario__')
+
+
+class ConflitoPrestacaoFilter(django_filters.FilterSet):
+    """Filtros para conflitos de horário entre prestações"""
+    funcionario_nome = django_filters.CharFilter(
+        method='filter_funcionario_nome',
+        label='Nome do funcionário'
+    )
+    empresa_id = django_filters.NumberFilter(
+        field_name='funcionario__empresa_id',
+        label='ID da empresa'
+    )
+    data_inicio = django_filters.DateFilter(
+        field_name='data',
+        lookup_expr='gte',
+        label='Data (início)'
+    )
+    data_fim = django_filters.DateFilter(
+        field_name='data',
+        lookup_expr='lte',
+        label='Data (fim)'
+    )
+    mesmo_local = django_filters.BooleanFilter(
+        method='filter_mesmo_local',
+        label='Mesmo local',
+        help_text='false: só conflitos entre locais diferentes'
+    )
+
+    class Meta:
+        model = ConflitoPrestacao
+        fields = ['funcionario']
+
+    def filter_funcionario_nome(self, queryset, name, value):
+        return filtrar_por_nome(queryset, value, caminho='funcionario__')
+
+    def filter_mesmo_local(self, queryset, name, value):
+        if value:
+            return queryset.filter(local_prestacao=F('local_conflitante'))
+        return queryset.exclude(local_prestacao=F('local_conflitante'))
 
 
 # Filtros removidos - não precisamos mais do modelo RelatorioPersonalizado
+
+
+class BuscaFuncionarioFilter(SearchFilter):
+    """SearchFilter que busca o nome do funcionário pelo índice de nome normalizado
+
+    Cada termo de `search` precisa casar com o nome do funcionário (sem
+    acentos, ver funcionarios/busca.py) ou com um dos `search_fields` da view.
+    O caminho até o funcionário vem de `busca_funcionario` na view
+    ('' para Funcionario, 'funcionario__' para prestações e pontos).
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        termos = self.get_search_terms(request)
+        if not termos:
+            return queryset
+
+        caminho = getattr(view, 'busca_funcionario', '')
+        campos = self.get_search_fields(view, request) or []
+        filtro = Q()
+        for termo in termos:
+            condicao = filtro_nome(termo, caminho)
+            for campo in campos:
+                condicao |= Q(**{f'{campo}__icontains': termo})
+            filtro &= condicao
+        return queryset.filter(filtro)
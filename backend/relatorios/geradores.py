@@ -0,0 +1,116 @@
+# relatorios/geradores.py
+"""
+Cálculo dos relatórios, independente da request
+
+Usado tanto pelos endpoints síncronos do dashboard quanto pelas tarefas em
+segundo plano (relatorios.tarefas). Cada gerador recebe parâmetros já
+validados e, opcionalmente, uma função `progresso(percentual)`.
+"""
+from datetime import date, timedelta
+
+from django.db.models import Sum
+
+from .agregacao import Medida, Razao, agregar_por, consolidar
+from .models import ResumoDiarioPrestacao
+from .serializers import ParametrosFinanceiroSerializer, RelatorioFinanceiroSerializer
+
+# Financeiro: agrupa por funcionário e deriva resumo e empresas em memória
+CAMPOS_FINANCEIRO = {
+    'funcionario__usuario__first_name': 'funcionario__usuario__first_name',
+    'funcionario__usuario__last_name': 'funcionario__usuario__last_name',
+    'funcionario__empresa__nome_fantasia': 'empresa__nome_fantasia',
+}
+MEDIDAS_FINANCEIRO = [
+    Medida('total_prestacoes', Sum, 'total_prestacoes'),
+    Medida('valor_total', Sum, 'valor_total'),
+    Medida('segundos_trabalhados', Sum, 'segundos_trabalhados'),
+    Razao('valor_medio', 'valor_total', 'total_prestacoes'),
+    Razao('valor_por_hora', 'valor_total', 'segundos_trabalhados', fator=3600),
+]
+
+
+def _meses(data_inicio, data_fim):
+    """Divide [data_inicio, data_fim] em intervalos mensais"""
+    inicio = data_inicio
+    while inicio <= data_fim:
+        proximo = (inicio.replace(day=1) + timedelta(days=32)).replace(day=1)
+        fim = min(proximo - timedelta(days=1), data_fim)
+        yield inicio, fim
+        inicio = proximo
+
+
+def relatorio_financeiro(data_inicio=None, data_fim=None, empresa_id=None, progresso=None):
+    """
+    Relatório financeiro das prestações aprovadas.
+
+    Com `progresso` e um intervalo fechado, o período é agregado mês a mês e
+    consolidado em memória (as medidas são aditivas), permitindo informar o
+    andamento de relatórios longos.
+    """
+    if isinstance(data_inicio, str):
+        data_inicio = date.fromisoformat(data_inicio) if data_inicio else None
+    if isinstance(data_fim, str):
+        data_fim = date.fromisoformat(data_fim) if data_fim else None
+
+    filtros = {'validacao_gestor': 'aprovada'}
+    if empresa_id:
+        filtros['empresa_id'] = empresa_id
+    queryset = ResumoDiarioPrestacao.objects.filter(**filtros)
+
+    if progresso and data_inicio and data_fim:
+        intervalos = list(_meses(data_inicio, data_fim))
+        linhas = []
+        for numero, (inicio, fim) in enumerate(intervalos, start=1):
+            linhas.extend(agregar_por(
+                queryset.filter(data__gte=inicio, data__lte=fim), CAMPOS_FINANCEIRO, MEDIDAS_FINANCEIRO
+            ))
+            progresso(int(numero * 90 / len(intervalos)))
+        por_funcionario = consolidar(linhas, list(CAMPOS_FINANCEIRO), MEDIDAS_FINANCEIRO)
+    else:
+        if data_inicio:
+            queryset = queryset.filter(data__gte=data_inicio)
+        if data_fim:
+            queryset = queryset.filter(data__lte=data_fim)
+        # Uma única consulta agrupada por funcionário
+        por_funcionario = agregar_por(queryset, CAMPOS_FINANCEIRO, MEDIDAS_FINANCEIRO)
+    por_funcionario.sort(key=lambda linha: linha['valor_total'], reverse=True)
+
+    # Dados agregados
+    consolidado = consolidar(por_funcionario, [], MEDIDAS_FINANCEIRO)
+    dados_agregados = consolidado[0] if consolidado else {}
+
+    # Dados por empresa
+    medidas = ['total_prestacoes', 'valor_total', 'valor_medio', 'valor_por_hora']
+    por_empresa = [
+        {campo: linha[campo] for campo in ['funcionario__empresa__nome_fantasia'] + medidas}
+        for linha in sorted(
+            consolidar(por_funcionario, ['funcionario__empresa__nome_fantasia'], MEDIDAS_FINANCEIRO),
+            key=lambda linha: linha['valor_total'],
+            reverse=True
+        )
+    ]
+
+    # Dados por funcionário (top 20)
+    por_funcionario = [
+        {campo: linha[campo] for campo in list(CAMPOS_FINANCEIRO) + medidas}
+        for linha in por_funcionario[:20]
+    ]
+
+    dados = {
+        'resumo': {
+            'total_prestacoes': dados_agregados.get('total_prestacoes') or 0,
+            'valor_total': float(dados_agregados.get('valor_total') or 0),
+            'valor_medio': float(dados_agregados.get('valor_medio') or 0),
+            'horas_totais': str(timedelta(seconds=dados_agregados.get('segundos_trabalhados') or 0)),
+            'valor_por_hora': float(dados_agregados.get('valor_por_hora') or 0)
+        },
+        'por_empresa': por_empresa,
+        'por_funcionario': por_funcionario
+    }
+    return RelatorioFinanceiroSerializer(dados).data
+
+
+# Relatórios disponíveis para as tarefas em segundo plano: tipo -> (gerador, parâmetros)
+GERADORES = {
+    'financeiro': (relatorio_financeiro, ParametrosFinanceiroSerializer),
+}
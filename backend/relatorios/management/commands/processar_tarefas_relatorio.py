@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from relatorios.tarefas import executar, recuperar_abandonadas, remover_expiradas, reservar_proxima
+
+INTERVALO_MANUTENCAO = 60
+
+
+class Command(BaseCommand):
+    help = 'Worker da fila de relatórios em segundo plano (TarefaRelatorio)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--uma-vez', action='store_true', help='Processa as tarefas pendentes e encerra')
+        parser.add_argument('--intervalo', type=float, default=2.0, help='Segundos entre verificações da fila vazia')
+
+    def handle(self, *args, **options):
+        proxima_manutencao = 0
+        while True:
+            close_old_connections()
+            if time.monotonic() >= proxima_manutencao:
+                recuperadas = recuperar_abandonadas()
+                removidas = remover_expiradas()
+                if recuperadas or removidas:
+                    self.stdout.write(f'{recuperadas} tarefas recolocadas na fila, {removidas} expiradas removidas.')
+                proxima_manutencao = time.monotonic() + INTERVALO_MANUTENCAO
+
+            tarefa = reservar_proxima()
+            if tarefa is None:
+                if options['uma_vez']:
+                    break
+                time.sleep(options['intervalo'])
+                continue
+
+            self.stdout.write(f'Executando tarefa {tarefa.id} ({tarefa.tipo})...')
+            if executar(tarefa):
+                self.stdout.write(self.style.SUCCESS(f'Tarefa {tarefa.id} concluída.'))
+            else:
+                self.stdout.write(self.style.ERROR(f'Tarefa {tarefa.id} falhou.'))
@@ -0,0 +1,23 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from relatorios.resumo import reconstruir_resumo
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o resumo diário de prestações (ResumoDiarioPrestacao) para um intervalo de datas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--inicio', help='Data inicial (YYYY-MM-DD). Omitida: desde o primeiro registro')
+        parser.add_argument('--fim', help='Data final (YYYY-MM-DD). Omitida: até o último registro')
+
+    def handle(self, *args, **options):
+        try:
+            inicio = date.fromisoformat(options['inicio']) if options['inicio'] else None
+            fim = date.fromisoformat(options['fim']) if options['fim'] else None
+        except ValueError as e:
+            raise CommandError(f'Data inválida: {e}')
+
+        total = reconstruir_resumo(inicio, fim)
+        self.stdout.write(self.style.SUCCESS(f'{total} linhas de resumo geradas.'))
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+
+
+def popular_resumo(apps, schema_editor):
+    """Gera o resumo inicial a partir das prestações existentes"""
+    RegistroPrestacao = apps.get_model('prestacoes', 'RegistroPrestacao')
+    ResumoDiarioPrestacao = apps.get_model('relatorios', 'ResumoDiarioPrestacao')
+    agrupados = RegistroPrestacao.objects.order_by().values(
+        'data', 'local_prestacao_id', 'funcionario_id', 'validacao_gestor',
+        empresa_id=F('funcionario__empresa_id'),
+    ).annotate(
+        total_prestacoes=Count('id'),
+        valor_total=Sum('valor'),
+        soma_segundos=Sum('segundos_trabalhados'),
+    )
+    lote = []
+    for linha in agrupados.iterator(chunk_size=2000):
+        lote.append(ResumoDiarioPrestacao(
+            data=linha['data'],
+            empresa_id=linha['empresa_id'],
+            local_prestacao_id=linha['local_prestacao_id'],
+            funcionario_id=linha['funcionario_id'],
+            validacao_gestor=linha['validacao_gestor'],
+            total_prestacoes=linha['total_prestacoes'],
+            valor_total=linha['valor_total'] or 0,
+            segundos_trabalhados=linha['soma_segundos'] or 0,
+        ))
+        if len(lote) >= 2000:
+            ResumoDiarioPrestacao.objects.bulk_create(lote)
+            lote = []
+    if lote:
+        ResumoDiarioPrestacao.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('empresas', '0003_gestor_updated_at'),
+        ('funcionarios', '0004_cargo_updated_at'),
+        ('localizacao', '0004_alter_estado_created_at_alter_estado_updated_at'),
+        ('prestacoes', '0005_registroprestacao_segundos_trabalhados'),
+        ('relatorios', '0003_delete_relatoriopersonalizado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoDiarioPrestacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField()),
+                ('validacao_gestor', models.CharField(max_length=15)),
+                ('total_prestacoes', models.PositiveIntegerField(default=0)),
+                ('valor_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('segundos_trabalhados', models.PositiveBigIntegerField(default=0)),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='empresas.empresaterceirizada')),
+                ('funcionario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='funcionarios.funcionario')),
+                ('local_prestacao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='localizacao.localprestacao')),
+            ],
+            options={
+                'verbose_name': 'Resumo Diário de Prestações',
+                'verbose_name_plural': 'Resumos Diários de Prestações',
+                'ordering': ['-data'],
+                'indexes': [models.Index(fields=['data', 'validacao_gestor'], name='relatorios__data_0a79b6_idx'), models.Index(fields=['empresa', 'data'], name='relatorios__empresa_b9bdd8_idx'), models.Index(fields=['funcionario', 'data'], name='relatorios__funcion_aa141f_idx')],
+                'constraints': [models.UniqueConstraint(fields=('data', 'empresa', 'local_prestacao', 'funcionario', 'validacao_gestor'), name='resumo_prestacao_chave_unica')],
+            },
+        ),
+        migrations.RunPython(popular_resumo, migrations.RunPython.noop),
+    ]
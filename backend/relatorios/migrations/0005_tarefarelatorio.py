@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:00
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('relatorios', '0004_resumodiarioprestacao'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TarefaRelatorio',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('tipo', models.CharField(max_length=30)),
+                ('parametros', models.JSONField(default=dict)),
+                ('assinatura', models.CharField(help_text='Hash do tipo, parâmetros e escopo do usuário', max_length=64)),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('executando', 'Executando'), ('concluida', 'Concluída'), ('erro', 'Erro')], default='pendente', max_length=15)),
+                ('progresso', models.PositiveSmallIntegerField(default=0, help_text='Percentual concluído (0-100)')),
+                ('erro', models.TextField(blank=True)),
+                ('arquivo', models.CharField(blank=True, help_text='Caminho do resultado em disco', max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('iniciado_em', models.DateTimeField(blank=True, null=True)),
+                ('concluido_em', models.DateTimeField(blank=True, null=True)),
+                ('expira_em', models.DateTimeField(blank=True, null=True)),
+                ('solicitado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Tarefa de Relatório',
+                'verbose_name_plural': 'Tarefas de Relatório',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='relatorios__status_b9af16_idx'), models.Index(fields=['expira_em'], name='relatorios__expira__1f39cf_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__in', ['pendente', 'executando'])), fields=('assinatura',), name='tarefa_relatorio_assinatura_em_andamento')],
+            },
+        ),
+    ]
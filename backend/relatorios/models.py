@@ -1,11 +1,111 @@
 # relatorios/models.py
+import uuid
+
+from django.conf import settings
 from django.db import models
 
-# Esta app agora serve apenas como namespace para os endpoints de relatórios
-# Os dados são obtidos diretamente dos modelos das outras apps:
+# Os dados dos relatórios são obtidos dos modelos das outras apps:
 # - funcionarios.models.Funcionario
-# - prestacoes.models.RegistroPrestacao  
+# - prestacoes.models.RegistroPrestacao
 # - ponto.models.RegistroPonto
 # - empresas.models.EmpresaTerceirizada
+#
+# Os modelos abaixo são estruturas derivadas (resumos) mantidas pela própria
+# app para acelerar os dashboards e a fila de relatórios em segundo plano.
+
+
+class ResumoDiarioPrestacao(models.Model):
+    """
+    Resumo diário das prestações, mantido incrementalmente.
+
+    Uma linha por (dia, empresa, local, funcionário, status de validação) com
+    contagem, soma de valores e segundos trabalhados. Atualizado pelos sinais
+    de `relatorios.signals` e reconstruível com o comando
+    `reconstruir_resumo_prestacoes`.
+    """
+    data = models.DateField()
+    empresa = models.ForeignKey('empresas.EmpresaTerceirizada', on_delete=models.CASCADE, related_name='+')
+    local_prestacao = models.ForeignKey('localizacao.LocalPrestacao', on_delete=models.CASCADE, related_name='+')
+    funcionario = models.ForeignKey('funcionarios.Funcionario', on_delete=models.CASCADE, related_name='+')
+    validacao_gestor = models.CharField(max_length=15)
+
+    total_prestacoes = models.PositiveIntegerField(default=0)
+    valor_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    segundos_trabalhados = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Resumo Diário de Prestações'
+        verbose_name_plural = 'Resumos Diários de Prestações'
+        ordering = ['-data']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['data', 'empresa', 'local_prestacao', 'funcionario', 'validacao_gestor'],
+                name='resumo_prestacao_chave_unica'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['data', 'validacao_gestor']),
+            models.Index(fields=['empresa', 'data']),
+            models.Index(fields=['funcionario', 'data']),
+        ]
+
+    def __str__(self):
+        return f"{self.data} - {self.funcionario_id} - {self.validacao_gestor}: {self.total_prestacoes}"
+
+
+class TarefaRelatorio(models.Model):
+    """
+    Relatório executado em segundo plano (fila no próprio banco).
+
+    Criada pelo endpoint /api/relatorios/tarefas/ e processada pelo comando
+    `processar_tarefas_relatorio`. O resultado é gravado em disco
+    (settings.RELATORIOS_TAREFAS_DIR) e removido após `expira_em`.
+    Pedidos idênticos (mesma assinatura) enquanto a tarefa está pendente ou
+    em execução reaproveitam a mesma tarefa.
+    """
+    STATUS_CHOICES = [
+        ('pendente', 'Pendente'),
+        ('executando', 'Executando'),
+        ('concluida', 'Concluída'),
+        ('erro', 'Erro'),
+    ]
+    EM_ANDAMENTO = ('pendente', 'executando')
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    tipo = models.CharField(max_length=30)
+    parametros = models.JSONField(default=dict)
+    assinatura = models.CharField(max_length=64, help_text="Hash do tipo, parâmetros e escopo do usuário")
+    solicitado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+
+    status = models.CharField(max_length=15, choices=STATUS_CHOICES, default='pendente')
+    progresso = models.PositiveSmallIntegerField(default=0, help_text="Percentual concluído (0-100)")
+    erro = models.TextField(blank=True)
+    arquivo = models.CharField(max_length=255, blank=True, help_text="Caminho do resultado em disco")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    iniciado_em = models.DateTimeField(null=True, blank=True)
+    concluido_em = models.DateTimeField(null=True, blank=True)
+    expira_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Tarefa de Relatório'
+        verbose_name_plural = 'Tarefas de Relatório'
+        ordering = ['-created_at']
+        constraints = [
+            # Deduplicação: no máximo uma tarefa em andamento por assinatura
+            models.UniqueConstraint(
+                fields=['assinatura'],
+                condition=models.Q(status__in=['pendente', 'executando']),
+                name='tarefa_relatorio_assinatura_em_andamento'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['expira_em']),
+        ]
 
-# Não precisamos de modelos próprios aqui, apenas dos endpoints filtrados
\ No newline at end of file
+    def __str__(self):
+        return f"{self.tipo} ({self.status}) - {self.created_at:%d/%m/%Y %H:%M}"
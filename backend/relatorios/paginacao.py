@@ -0,0 +1,208 @@
+# relatorios/paginacao.py
+"""
+Paginação das listagens de relatórios
+
+Por padrão a paginação continua sendo por número de página (PageNumberPagination
+global, com `count`). Com `?paginacao=cursor` a listagem passa a usar paginação
+por chave (keyset): a próxima página é buscada com um filtro
+`(data, horario_chegada, id) < (valores da última linha)` na mesma ordenação
+da listagem, com a chave primária como desempate. Não há OFFSET nem COUNT(*),
+então qualquer página custa o mesmo que a primeira.
+
+Parâmetros (modo cursor):
+- `paginacao=cursor`: ativa o modo cursor
+- `cursor`: valor opaco devolvido em `next`/`previous`
+- `page_size`: tamanho da página (padrão PAGE_SIZE, máximo 1000)
+- `contar=true`: inclui o total (`count`) na resposta
+"""
+import base64
+import json
+import uuid
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .arquivo import ConsultaComArquivo
+
+VALORES_VERDADEIROS = ('1', 'true', 'sim')
+
+
+def _serializar(valor):
+    if isinstance(valor, (datetime, date, time)):
+        return valor.isoformat()
+    if isinstance(valor, (uuid.UUID, Decimal)):
+        return str(valor)
+    return valor
+
+
+class PaginacaoRelatorios(PageNumberPagination):
+    """PageNumberPagination com modo cursor (keyset) opcional"""
+    modo_query_param = 'paginacao'
+    cursor_query_param = 'cursor'
+    contagem_query_param = 'contar'
+    tamanho_cursor_query_param = 'page_size'
+    max_tamanho_cursor = 1000
+    mensagem_cursor_invalido = 'Cursor inválido.'
+
+    modo_cursor = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.modo_cursor = (
+            request.query_params.get(self.modo_query_param) == 'cursor'
+            or self.cursor_query_param in request.query_params
+        )
+        if not self.modo_cursor:
+            return super().paginate_queryset(queryset, request, view)
+        return self._paginar_por_cursor(queryset, request)
+
+    def get_paginated_response(self, data):
+        if not self.modo_cursor:
+            return super().get_paginated_response(data)
+        resposta = {}
+        if self.total is not None:
+            resposta['count'] = self.total
+        resposta.update({
+            'next': self.proximo,
+            'previous': self.anterior,
+            'results': data,
+        })
+        return Response(resposta)
+
+    def get_schema_operation_parameters(self, view):
+        parametros = super().get_schema_operation_parameters(view)
+        return parametros + [
+            {
+                'name': self.modo_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Use "cursor" para paginação por chave (sem OFFSET/COUNT)',
+                'schema': {'type': 'string', 'enum': ['cursor']},
+            },
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Cursor devolvido em next/previous',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.contagem_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'No modo cursor, inclui o total de registros (count)',
+                'schema': {'type': 'boolean'},
+            },
+        ]
+
+    # Modo cursor
+
+    def _tamanho_cursor(self, request):
+        try:
+            tamanho = int(request.query_params[self.tamanho_cursor_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(tamanho, self.max_tamanho_cursor))
+
+    def _ordenacao(self, queryset):
+        """Campos da ordenação atual com a chave primária como desempate"""
+        model = queryset.model
+        if isinstance(queryset, ConsultaComArquivo):
+            ordem = queryset.ordem
+        else:
+            ordem = list(queryset.query.order_by or model._meta.ordering)
+        campos = []
+        for item in ordem:
+            if not isinstance(item, str) or item == '?':
+                raise NotFound('Ordenação não suportada no modo cursor.')
+            decrescente = item.startswith('-')
+            nome = item.lstrip('-')
+            if nome == 'pk':
+                nome = model._meta.pk.name
+            try:
+                campo = model._meta.get_field(nome)
+            except FieldDoesNotExist:
+                raise NotFound('Ordenação não suportada no modo cursor.')
+            if campo.is_relation or campo.null:
+                raise NotFound('Ordenação não suportada no modo cursor.')
+            campos.append((campo, decrescente))
+        if not any(campo.primary_key for campo, _ in campos):
+            campos.append((model._meta.pk, campos[-1][1] if campos else True))
+        return campos
+
+    def _codificar(self, campos, obj, reverso):
+        # Aceita instâncias ou linhas de values()
+        valores = [obj[campo.attname] if isinstance(obj, dict) else getattr(obj, campo.attname) for campo, _ in campos]
+        dados = {
+            'o': [('-' if desc else '') + campo.name for campo, desc in campos],
+            'v': [_serializar(valor) for valor in valores],
+            'r': reverso,
+        }
+        texto = json.dumps(dados, separators=(',', ':')).encode()
+        cursor = base64.urlsafe_b64encode(texto).decode().rstrip('=')
+        return replace_query_param(self.url_base, self.cursor_query_param, cursor)
+
+    def _decodificar(self, cursor, campos):
+        try:
+            texto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            dados = json.loads(texto)
+            ordem = [('-' if desc else '') + campo.name for campo, desc in campos]
+            if dados['o'] != ordem or len(dados['v']) != len(campos):
+                raise ValueError
+            valores = [campo.to_python(valor) for (campo, _), valor in zip(campos, dados['v'])]
+            return valores, bool(dados['r'])
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.mensagem_cursor_invalido)
+
+    @staticmethod
+    def _filtro_apos(campos, valores, reverso):
+        """
+        Linhas estritamente depois de `valores` na ordenação (antes, se reverso):
+        f1 < v1 OR (f1 = v1 AND (f2 < v2 OR (f2 = v2 AND ...)))
+        precedido de f1 <= v1 para que o índice limite a faixa lida.
+        """
+        filtro = None
+        for (campo, desc), valor in reversed(list(zip(campos, valores))):
+            operador = 'lt' if desc != reverso else 'gt'
+            condicao = Q(**{f'{campo.name}__{operador}': valor})
+            if filtro is not None:
+                condicao |= Q(**{campo.name: valor}) & filtro
+            filtro = condicao
+        campo, desc = campos[0]
+        limite = 'lte' if desc != reverso else 'gte'
+        return Q(**{f'{campo.name}__{limite}': valores[0]}) & filtro
+
+    def _paginar_por_cursor(self, queryset, request):
+        self.request = request
+        self.url_base = remove_query_param(request.build_absolute_uri(), self.page_query_param)
+        tamanho = self._tamanho_cursor(request)
+        campos = self._ordenacao(queryset)
+
+        contar = request.query_params.get(self.contagem_query_param, '').lower()
+        self.total = queryset.count() if contar in VALORES_VERDADEIROS else None
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        reverso = False
+        if cursor:
+            valores, reverso = self._decodificar(cursor, campos)
+            queryset = queryset.filter(self._filtro_apos(campos, valores, reverso))
+
+        ordem = [('-' if desc != reverso else '') + campo.name for campo, desc in campos]
+        itens = list(queryset.order_by(*ordem)[:tamanho + 1])
+        tem_mais = len(itens) > tamanho
+        itens = itens[:tamanho]
+        if reverso:
+            itens.reverse()
+
+        self.proximo = self.anterior = None
+        if itens:
+            if tem_mais or reverso:
+                self.proximo = self._codificar(campos, itens[-1], reverso=False)
+            if cursor and (tem_mais or not reverso):
+                self.anterior = self._codificar(campos, itens[0], reverso=True)
+        return itens
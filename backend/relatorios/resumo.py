@@ -0,0 +1,149 @@
+# relatorios/resumo.py
+"""
+Manutenção do resumo diário de prestações (ResumoDiarioPrestacao)
+
+A unidade de atualização é a célula (funcionario_id, data): sempre que uma
+prestação muda, as linhas de resumo daquele funcionário naquele dia são
+recalculadas a partir dos registros originais. Como um funcionário tem poucas
+prestações por dia, o recálculo é barato (índice funcionario+data) e
+idempotente, sem risco de contagem dupla quando o mesmo evento chega por mais
+de um caminho (post_save, histórico de validação, operações em massa).
+
+Prestações movidas para o arquivo (app `arquivo`) continuam no resumo: cada
+célula soma a tabela quente e RegistroPrestacaoArquivada. As duas consultas
+agrupadas saem na mesma ordem e são intercaladas em uma passada.
+"""
+import heapq
+from itertools import groupby
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+from arquivo.models import RegistroPrestacaoArquivada
+from prestacoes.models import RegistroPrestacao
+from .models import ResumoDiarioPrestacao
+
+TAMANHO_LOTE = 500
+SOMAS = ('total_prestacoes', 'valor_total', 'soma_segundos')
+
+
+def _agrupar(queryset):
+    """Agrupa registros de prestação nas linhas de resumo, ordenadas por `_chave`"""
+    return queryset.order_by().values(
+        'data', 'local_prestacao_id', 'funcionario_id', 'validacao_gestor',
+        empresa_id=F('funcionario__empresa_id'),
+    ).annotate(
+        total_prestacoes=Count('id'),
+        valor_total=Sum('valor'),
+        soma_segundos=Sum('segundos_trabalhados'),
+    ).order_by('data', 'funcionario_id', 'local_prestacao_id', 'validacao_gestor')
+
+
+def _chave(linha):
+    return linha['data'], linha['funcionario_id'], linha['local_prestacao_id'], linha['validacao_gestor']
+
+
+def _agrupar_com_arquivo(filtro, chunk_size=TAMANHO_LOTE):
+    """Linhas agrupadas da tabela quente e do arquivo, somadas por célula"""
+    fontes = [
+        _agrupar(modelo.objects.filter(filtro)).iterator(chunk_size=chunk_size)
+        for modelo in (RegistroPrestacao, RegistroPrestacaoArquivada)
+    ]
+    for _, linhas in groupby(heapq.merge(*fontes, key=_chave), key=_chave):
+        linha, *demais = linhas
+        for outra in demais:
+            linha = dict(linha, **{soma: (linha[soma] or 0) + (outra[soma] or 0) for soma in SOMAS})
+        yield linha
+
+
+def _linhas_resumo(agrupados):
+    for linha in agrupados:
+        yield ResumoDiarioPrestacao(
+            data=linha['data'],
+            empresa_id=linha['empresa_id'],
+            local_prestacao_id=linha['local_prestacao_id'],
+            funcionario_id=linha['funcionario_id'],
+            validacao_gestor=linha['validacao_gestor'],
+            total_prestacoes=linha['total_prestacoes'],
+            valor_total=linha['valor_total'] or 0,
+            segundos_trabalhados=linha['soma_segundos'] or 0,
+        )
+
+
+def _remover(queryset):
+    # Linhas derivadas: sem Collector, que carregaria cada linha e enviaria um
+    # post_delete por linha (a marca condicional já muda pela prestação)
+    queryset._raw_delete(queryset.db)
+
+
+def _lotes_por_data(chaves):
+    """
+    Filtros de até TAMANHO_LOTE células, com um termo por data
+    (data = d AND funcionario_id IN ...): cargas em massa costumam cobrir
+    muitos funcionários em poucos dias.
+    """
+    por_data = {}
+    for funcionario_id, data in chaves:
+        por_data.setdefault(data, set()).add(funcionario_id)
+    filtro, tamanho = None, 0
+    for data in sorted(por_data):
+        funcionarios = sorted(por_data[data])
+        for inicio in range(0, len(funcionarios), TAMANHO_LOTE):
+            parte = funcionarios[inicio:inicio + TAMANHO_LOTE]
+            if filtro is not None and tamanho + len(parte) > TAMANHO_LOTE:
+                yield filtro
+                filtro, tamanho = None, 0
+            termo = Q(data=data, funcionario_id__in=parte)
+            filtro = termo if filtro is None else filtro | termo
+            tamanho += len(parte)
+    if filtro is not None:
+        yield filtro
+
+
+def atualizar_resumo(chaves):
+    """Recalcula as linhas de resumo das células (funcionario_id, data) informadas"""
+    chaves = {chave for chave in chaves if None not in chave}
+    if not chaves:
+        return
+
+    with transaction.atomic():
+        for filtro in _lotes_por_data(chaves):
+            _remover(ResumoDiarioPrestacao.objects.filter(filtro))
+            ResumoDiarioPrestacao.objects.bulk_create(_linhas_resumo(_agrupar_com_arquivo(filtro)))
+
+
+def trocar_empresa(funcionario_id, empresa_id):
+    """
+    Leva as linhas de resumo do funcionário para a nova empresa (a empresa é
+    copiada do funcionário para o resumo). Devolve os meses (primeiro dia)
+    que têm linhas, para a invalidação do cache.
+    """
+    linhas = ResumoDiarioPrestacao.objects.filter(funcionario_id=funcionario_id)
+    meses = list(linhas.dates('data', 'month'))
+    linhas.update(empresa_id=empresa_id)
+    return meses
+
+
+def reconstruir_resumo(data_inicio=None, data_fim=None, batch_size=2000):
+    """Reconstrói o resumo de um intervalo de datas com uma única consulta agrupada"""
+    filtros = {}
+    if data_inicio:
+        filtros['data__gte'] = data_inicio
+    if data_fim:
+        filtros['data__lte'] = data_fim
+    filtro = Q(**filtros)
+
+    total = 0
+    with transaction.atomic():
+        _remover(ResumoDiarioPrestacao.objects.filter(**filtros))
+        lote = []
+        for linha in _linhas_resumo(_agrupar_com_arquivo(filtro, chunk_size=batch_size)):
+            lote.append(linha)
+            if len(lote) >= batch_size:
+                ResumoDiarioPrestacao.objects.bulk_create(lote)
+                total += len(lote)
+                lote = []
+        if lote:
+            ResumoDiarioPrestacao.objects.bulk_create(lote)
+            total += len(lote)
+    return total
@@ -1,9 +1,15 @@
 # relatorios/serializers.py
+from datetime import timedelta
+
+from django.db.models import Case, DurationField, ExpressionWrapper, F, FloatField, IntegerField, Value, When
+from django.db.models.functions import Cast
 from rest_framework import serializers
+from rest_framework.reverse import reverse
 from funcionarios.models import Funcionario
-from prestacoes.models import RegistroPrestacao
-from ponto.models import RegistroPonto
+from prestacoes.models import ConflitoPrestacao, RegistroPrestacao
+from ponto.models import IntervaloPonto, RegistroPonto
 from empresas.models import EmpresaTerceirizada
+from .models import TarefaRelatorio
 
 
 class FuncionarioSerializer(serializers.ModelSerializer):
@@ -43,25 +49,129 @@ class PrestacaoSerializer(serializers.ModelSerializer):
         ]
 
 
+class PrestacaoListaSerializer(serializers.Serializer):
+    """
+    Leitura rápida da listagem de prestações, com a mesma saída de PrestacaoSerializer
+
+    Serializa linhas de `values()` montadas por `consultar`: funcionário,
+    usuário, empresa, cargo, local e cidade vêm na mesma consulta da página e
+    horas e valor por hora são calculados no SQL (EXPRESSOES), a partir de
+    `segundos_trabalhados`, sem instanciar modelos.
+    """
+    id = serializers.UUIDField()
+    nome_completo = serializers.SerializerMethodField()
+    cpf = serializers.ReadOnlyField(source='funcionario__usuario__cpf')
+    empresa_nome = serializers.CharField(source='funcionario__empresa__nome_fantasia')
+    cargo_nome = serializers.CharField(source='funcionario__cargo__nome')
+    data = serializers.DateField()
+    horario_chegada = serializers.TimeField()
+    horario_saida_almoco = serializers.TimeField()
+    horario_retorno_almoco = serializers.TimeField()
+    horario_saida = serializers.TimeField()
+    local_prestacao_nome = serializers.CharField(source='local_prestacao__nome')
+    cidade_nome = serializers.CharField(source='local_prestacao__cidade__nome')
+    valor = serializers.DecimalField(max_digits=10, decimal_places=2)
+    horas_trabalhadas = serializers.ReadOnlyField()
+    valor_por_hora = serializers.ReadOnlyField()
+    validacao_gestor = serializers.CharField()
+    observacoes = serializers.CharField()
+    created_at = serializers.DateTimeField()
+
+    CAMPOS_CONSULTA = ('funcionario__usuario__first_name', 'funcionario__usuario__last_name')
+
+    # Mesmas contas de RegistroPrestacao.horas_trabalhadas e .valor_por_hora; o
+    # valor por hora sai em float, como o JSON já entregava o Decimal, dividido
+    # pelos segundos (sem o arredondamento das horas feito pelo modelo)
+    _SEGUNDOS = ExpressionWrapper(F('segundos_trabalhados'), output_field=IntegerField())
+    EXPRESSOES = {
+        'horas_trabalhadas': ExpressionWrapper(_SEGUNDOS * Value(timedelta(seconds=1)), output_field=DurationField()),
+        'valor_por_hora': Case(
+            When(segundos_trabalhados__gt=0, then=Cast('valor', FloatField()) * 3600 / _SEGUNDOS),
+            default=Value(0.0),
+            output_field=FloatField(),
+        ),
+    }
+
+    @classmethod
+    def consultar(cls, queryset):
+        """Linhas `values()` com todas as colunas usadas pelo serializer"""
+        campos = [
+            campo.source for campo in cls().fields.values()
+            if not isinstance(campo, serializers.SerializerMethodField) and campo.source not in cls.EXPRESSOES
+        ]
+        return queryset.values(*campos, *cls.CAMPOS_CONSULTA, **cls.EXPRESSOES)
+
+    def get_nome_completo(self, linha):
+        # Mesma regra de Usuario.get_full_name
+        return f"{linha['funcionario__usuario__first_name']} {linha['funcionario__usuario__last_name']}".strip()
+
+
 class PontoSerializer(serializers.ModelSerializer):
     nome_funcionario = serializers.CharField(source='funcionario.nome_completo', read_only=True)
     empresa_nome = serializers.CharField(source='funcionario.empresa.nome_fantasia', read_only=True)
     foto_url = serializers.SerializerMethodField()
+    foto_listagem_url = serializers.SerializerMethodField()
+    foto_detalhe_url = serializers.SerializerMethodField()
     
     class Meta:
         model = RegistroPonto
         fields = [
-            'id', 'nome_funcionario', 'empresa_nome', 'foto_url',
-            'ip', 'latitude', 'longitude', 'created_at'
+            'id', 'nome_funcionario', 'empresa_nome', 'foto_url', 'foto_listagem_url',
+            'foto_detalhe_url', 'foto_status', 'ip', 'latitude', 'longitude',
+            'distancia_local', 'validacao_local', 'created_at'
         ]
     
-    def get_foto_url(self, obj):
-        if obj.foto:
+    def _url(self, arquivo):
+        if arquivo:
             request = self.context.get('request')
             if request:
-                return request.build_absolute_uri(obj.foto.url)
+                return request.build_absolute_uri(arquivo.url)
         return None
 
+    def get_foto_url(self, obj):
+        return self._url(obj.foto)
+
+    # Enquanto a foto não é processada, as variantes apontam para a original
+    def get_foto_listagem_url(self, obj):
+        return self._url(obj.foto_listagem or obj.foto)
+
+    def get_foto_detalhe_url(self, obj):
+        return self._url(obj.foto_detalhe or obj.foto)
+
+
+class IntervaloPontoSerializer(serializers.ModelSerializer):
+    nome_funcionario = serializers.CharField(source='funcionario.nome_completo', read_only=True)
+    horas = serializers.SerializerMethodField()
+
+    class Meta:
+        model = IntervaloPonto
+        fields = [
+            'id', 'funcionario', 'nome_funcionario', 'data', 'entrada', 'saida',
+            'inicio', 'fim', 'segundos', 'horas', 'status'
+        ]
+
+    def get_horas(self, obj):
+        return str(timedelta(seconds=obj.segundos))
+
+
+class ConflitoPrestacaoSerializer(serializers.ModelSerializer):
+    nome_funcionario = serializers.CharField(source='funcionario.nome_completo', read_only=True)
+    nome_local_prestacao = serializers.CharField(source='local_prestacao.nome', read_only=True)
+    nome_local_conflitante = serializers.CharField(source='local_conflitante.nome', read_only=True)
+    horas = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ConflitoPrestacao
+        fields = [
+            'id', 'funcionario', 'nome_funcionario', 'data',
+            'prestacao', 'local_prestacao', 'nome_local_prestacao',
+            'conflitante', 'local_conflitante', 'nome_local_conflitante',
+            'inicio', 'fim', 'segundos', 'horas'
+        ]
+
+    def get_horas(self, obj):
+        return str(timedelta(seconds=obj.segundos))
+
 
 class DashboardSerializer(serializers.Serializer):
     """Serializer para dados do dashboard"""
@@ -82,4 +192,59 @@ class RelatorioFinanceiroSerializer(serializers.Serializer):
     """Serializer para relatório financeiro"""
     resumo = serializers.DictField()
     por_empresa = serializers.ListField()
-    por_funcionario = serializers.ListField()
\ No newline at end of file
+    por_funcionario = serializers.ListField()
+
+
+class ParametrosFinanceiroSerializer(serializers.Serializer):
+    """Parâmetros do relatório financeiro em segundo plano"""
+    data_inicio = serializers.DateField(required=False, allow_null=True)
+    data_fim = serializers.DateField(required=False, allow_null=True)
+    empresa_id = serializers.IntegerField(required=False, allow_null=True, min_value=1)
+
+    def validate(self, attrs):
+        if attrs.get('data_inicio') and attrs.get('data_fim') and attrs['data_inicio'] > attrs['data_fim']:
+            raise serializers.ValidationError('data_inicio deve ser anterior ou igual a data_fim.')
+        return attrs
+
+
+class SolicitacaoTarefaSerializer(serializers.Serializer):
+    """Pedido de relatório em segundo plano
+
+    O contexto deve conter `geradores` (relatorios.geradores.GERADORES).
+    Os parâmetros validados são normalizados (datas ISO, sem valores vazios)
+    para que pedidos equivalentes tenham a mesma assinatura.
+    """
+    tipo = serializers.CharField()
+    parametros = serializers.DictField(required=False, default=dict)
+
+    def validate(self, attrs):
+        geradores = self.context['geradores']
+        if attrs['tipo'] not in geradores:
+            raise serializers.ValidationError({
+                'tipo': f"Tipo inválido. Use: {', '.join(geradores)}."
+            })
+        _, parametros_serializer = geradores[attrs['tipo']]
+        parametros = parametros_serializer(data=attrs['parametros'])
+        if not parametros.is_valid():
+            raise serializers.ValidationError({'parametros': parametros.errors})
+        attrs['parametros'] = {
+            nome: valor for nome, valor in parametros.data.items() if valor not in (None, '')
+        }
+        return attrs
+
+
+class TarefaRelatorioSerializer(serializers.ModelSerializer):
+    resultado_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = TarefaRelatorio
+        fields = [
+            'id', 'tipo', 'parametros', 'status', 'progresso', 'erro',
+            'created_at', 'iniciado_em', 'concluido_em', 'expira_em', 'resultado_url'
+        ]
+        read_only_fields = fields
+
+    def get_resultado_url(self, obj):
+        if obj.status != 'concluida':
+            return None
+        return reverse('tarefas-resultado', args=[obj.id], request=self.context.get('request'))
@@ -0,0 +1,97 @@
+# relatorios/series.py
+"""
+Séries temporais com períodos de dia, semana (ISO, começando na segunda) ou mês
+
+O agrupamento é feito no banco com Trunc: campos de data são truncados
+diretamente; campos de data/hora são convertidos antes para o fuso local
+(settings.TIME_ZONE, America/Cuiaba). Os períodos sem registros são
+preenchidos com as medidas zeradas, então a série sempre tem um ponto por
+período entre o início e o fim. Uma consulta com arquivo (tabela quente +
+arquivo) é agregada parte a parte e somada por período.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db.models import DateField, DateTimeField
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from .agregacao import agregar_partes, linha_vazia
+from .arquivo import partes_consulta
+
+GRANULARIDADES = {
+    'dia': 'day',
+    'semana': 'week',
+    'mes': 'month',
+}
+MAX_PERIODOS = 1000
+
+
+def inicio_do_periodo(data, granularidade):
+    if granularidade == 'semana':
+        return data - timedelta(days=data.weekday())
+    if granularidade == 'mes':
+        return data.replace(day=1)
+    return data
+
+
+def periodos(inicio, fim, granularidade):
+    """Datas iniciais de todos os períodos que cobrem [inicio, fim]"""
+    atual = inicio_do_periodo(inicio, granularidade)
+    while atual <= fim:
+        yield atual
+        if granularidade == 'mes':
+            atual = (atual + timedelta(days=32)).replace(day=1)
+        elif granularidade == 'semana':
+            atual += timedelta(days=7)
+        else:
+            atual += timedelta(days=1)
+
+
+def inicio_padrao(fim, granularidade, quantidade):
+    """Início da janela com os últimos `quantidade` períodos completos até `fim`"""
+    inicio = inicio_do_periodo(fim, granularidade)
+    if granularidade == 'mes':
+        meses = inicio.year * 12 + inicio.month - 1 - (quantidade - 1)
+        return inicio.replace(year=meses // 12, month=meses % 12 + 1)
+    passo = timedelta(days=7 if granularidade == 'semana' else 1)
+    return inicio - passo * (quantidade - 1)
+
+
+def contar_periodos(inicio, fim, granularidade):
+    if granularidade == 'mes':
+        return (fim.year - inicio.year) * 12 + fim.month - inicio.month + 1
+    dias = (fim - inicio_do_periodo(inicio, granularidade)).days
+    return dias // (7 if granularidade == 'semana' else 1) + 1
+
+
+def filtro_intervalo(campo, model, inicio, fim):
+    """Filtro [inicio, fim] em datas locais; em data/hora usa limites no fuso local (aproveita índice)"""
+    if isinstance(model._meta.get_field(campo), DateTimeField):
+        return {
+            f'{campo}__gte': timezone.make_aware(datetime.combine(inicio, time.min)),
+            f'{campo}__lt': timezone.make_aware(datetime.combine(fim + timedelta(days=1), time.min)),
+        }
+    return {f'{campo}__gte': inicio, f'{campo}__lte': fim}
+
+
+def serie_temporal(queryset, campo, granularidade, medidas, inicio, fim):
+    """
+    Agrega o queryset por período em uma consulta (uma por parte, em uma
+    ConsultaComArquivo) e preenche os períodos vazios.
+
+    Devolve uma lista de dicionários {'periodo': date, <medida>: valor, ...}
+    em ordem cronológica.
+    """
+    model = queryset.model
+    tzinfo = timezone.get_current_timezone() if isinstance(model._meta.get_field(campo), DateTimeField) else None
+    agrupados = [
+        parte.filter(**filtro_intervalo(campo, model, inicio, fim)).annotate(
+            periodo=Trunc(campo, GRANULARIDADES[granularidade], output_field=DateField(), tzinfo=tzinfo)
+        )
+        for parte in partes_consulta(queryset)
+    ]
+    linhas = {linha['periodo']: linha for linha in agregar_partes(agrupados, ['periodo'], medidas)}
+    return [
+        linhas.get(periodo) or linha_vazia(medidas, periodo=periodo)
+        for periodo in periodos(inicio, fim, granularidade)
+    ]
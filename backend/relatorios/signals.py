@@ -0,0 +1,142 @@
+# relatorios/signals.py
+"""
+Sinais que mantêm as estruturas derivadas da app de relatórios
+(resumo diário de prestações, versões do cache dos dashboards e marcas de
+alteração por tabela usadas no GET condicional).
+
+Conectados em RelatoriosConfig.ready().
+"""
+from django.conf import settings
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from arquivo.signals import registros_arquivados
+from funcionarios.models import Funcionario
+from funcionarios.signals import funcionarios_criados
+from ponto.models import RegistroPonto
+from ponto.signals import pontos_alterados
+from prestacoes.models import RegistroPrestacao, HistoricoValidacao
+from prestacoes.signals import prestacoes_alteradas
+from . import cache as cache_relatorios
+from . import condicional
+from .resumo import atualizar_resumo, trocar_empresa
+
+
+def alterar_prestacoes(chaves):
+    """Atualiza resumo e invalida o cache das células (funcionario_id, data) alteradas"""
+    chaves = {chave for chave in chaves if None not in chave}
+    if not chaves:
+        return
+    atualizar_resumo(chaves)
+    empresas = dict(
+        Funcionario.objects.filter(pk__in={funcionario_id for funcionario_id, _ in chaves})
+        .values_list('pk', 'empresa_id')
+    )
+    cache_relatorios.invalidar('prestacoes', {
+        (empresas.get(funcionario_id), data) for funcionario_id, data in chaves
+    })
+
+
+@receiver(post_save, sender=RegistroPrestacao)
+def atualizar_resumo_prestacao(sender, instance, **kwargs):
+    # (funcionario, data) anteriores guardados por prestacoes.signals.guardar_dia_anterior
+    chaves = {(instance.funcionario_id, instance.data)}
+    anterior = getattr(instance, '_dia_anterior', None)
+    if anterior:
+        chaves.add(anterior)
+    alterar_prestacoes(chaves)
+
+
+@receiver(post_delete, sender=RegistroPrestacao)
+def remover_resumo_prestacao(sender, instance, **kwargs):
+    alterar_prestacoes({(instance.funcionario_id, instance.data)})
+
+
+@receiver(post_save, sender=HistoricoValidacao)
+def atualizar_resumo_validacao(sender, instance, created, **kwargs):
+    """Mudanças de status registradas no histórico movem a prestação entre os status do resumo"""
+    if created:
+        prestacao = RegistroPrestacao.objects.filter(pk=instance.prestacao_id).values_list(
+            'funcionario_id', 'data'
+        ).first()
+        if prestacao:
+            alterar_prestacoes({prestacao})
+
+
+@receiver(prestacoes_alteradas)
+def atualizar_resumo_em_massa(sender, chaves, **kwargs):
+    alterar_prestacoes(chaves)
+
+
+@receiver(pre_save, sender=Funcionario)
+def guardar_empresa_anterior(sender, instance, **kwargs):
+    instance._empresa_anterior = None
+    if not instance._state.adding:
+        instance._empresa_anterior = sender.objects.filter(pk=instance.pk).values_list(
+            'empresa_id', flat=True
+        ).first()
+
+
+@receiver(post_save, sender=Funcionario)
+@receiver(post_delete, sender=Funcionario)
+def invalidar_cache_funcionario(sender, instance, **kwargs):
+    anterior = getattr(instance, '_empresa_anterior', None)
+    empresas = {empresa_id for empresa_id in (instance.empresa_id, anterior) if empresa_id}
+    cache_relatorios.invalidar('funcionarios', {(empresa_id, None) for empresa_id in empresas})
+    if anterior and anterior != instance.empresa_id:
+        # O resumo guarda a empresa do funcionário: as prestações mudam de empresa com ele
+        meses = trocar_empresa(instance.pk, instance.empresa_id)
+        cache_relatorios.invalidar('prestacoes', {
+            (empresa_id, mes) for empresa_id in empresas for mes in [*meses, None]
+        })
+
+
+@receiver(funcionarios_criados)
+def invalidar_cache_funcionarios_em_massa(sender, funcionarios, **kwargs):
+    cache_relatorios.invalidar('funcionarios', {(funcionario.empresa_id, None) for funcionario in funcionarios})
+    condicional.marcar_alteracao(sender._meta.label)
+    condicional.marcar_alteracao(settings.AUTH_USER_MODEL)
+
+
+@receiver(post_save, sender=RegistroPonto)
+@receiver(post_delete, sender=RegistroPonto)
+def invalidar_cache_ponto(sender, instance, **kwargs):
+    empresa_id = Funcionario.objects.filter(pk=instance.funcionario_id).values_list(
+        'empresa_id', flat=True
+    ).first()
+    data = timezone.localdate(instance.created_at) if instance.created_at else None
+    cache_relatorios.invalidar('pontos', {(empresa_id, data)})
+
+
+@receiver(pontos_alterados)
+@receiver(registros_arquivados, sender=RegistroPonto)
+def invalidar_cache_pontos_em_massa(sender, chaves, **kwargs):
+    empresas = dict(
+        Funcionario.objects.filter(pk__in={funcionario_id for funcionario_id, _ in chaves})
+        .values_list('pk', 'empresa_id')
+    )
+    cache_relatorios.invalidar('pontos', {
+        (empresas.get(funcionario_id), data) for funcionario_id, data in chaves
+    })
+
+
+def marcar_tabela_alterada(sender, **kwargs):
+    """Save/delete em uma tabela monitorada muda a marca dela (ETag/Last-Modified)"""
+    update_fields = kwargs.get('update_fields')
+    if update_fields and set(update_fields) <= condicional.CAMPOS_IGNORADOS:
+        return
+    condicional.marcar_alteracao(sender._meta.label)
+
+
+for _label in condicional.TABELAS_MONITORADAS:
+    post_save.connect(marcar_tabela_alterada, sender=_label)
+    post_delete.connect(marcar_tabela_alterada, sender=_label)
+
+
+@receiver(prestacoes_alteradas)
+@receiver(pontos_alterados)
+@receiver(registros_arquivados)
+def marcar_alteracoes_em_massa(sender, **kwargs):
+    if sender._meta.label in condicional.TABELAS_MONITORADAS:
+        condicional.marcar_alteracao(sender._meta.label)
@@ -0,0 +1,174 @@
+# relatorios/tarefas.py
+"""
+Fila de relatórios em segundo plano, sem broker externo
+
+- `solicitar` cria (ou reaproveita) uma TarefaRelatorio pendente
+- o comando `processar_tarefas_relatorio` reserva tarefas com um UPDATE
+  condicional (status='pendente' -> 'executando'), então vários workers podem
+  rodar ao mesmo tempo sem executar a mesma tarefa duas vezes
+- o resultado é gravado como JSON em RELATORIOS_TAREFAS_DIR e apagado junto
+  com a tarefa após RELATORIOS_TAREFAS_EXPIRACAO segundos
+- tarefas 'executando' sem atualização há mais de TEMPO_ABANDONO (worker
+  reiniciado no meio da execução) voltam para a fila
+- tarefas internas (TAREFAS_INTERNAS, ex.: cadastro de funcionários por
+  planilha) usam a mesma fila, mas não podem ser pedidas pelo endpoint de
+  relatórios; arquivos enviados com o pedido ficam em DIRETORIO/entradas até
+  a execução
+"""
+import hashlib
+import json
+import logging
+import os
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework.utils.encoders import JSONEncoder
+
+from .cache import escopo_usuario
+from .geradores import GERADORES
+from .models import TarefaRelatorio
+
+logger = logging.getLogger(__name__)
+
+DIRETORIO = Path(getattr(settings, 'RELATORIOS_TAREFAS_DIR', settings.BASE_DIR / 'relatorios_gerados'))
+EXPIRACAO = getattr(settings, 'RELATORIOS_TAREFAS_EXPIRACAO', 24 * 60 * 60)
+TEMPO_ABANDONO = timedelta(minutes=10)
+ENTRADAS = DIRETORIO / 'entradas'
+
+# Tarefas enfileiradas por outras apps: tipo -> função (importada só na execução)
+TAREFAS_INTERNAS = {
+    'provisionamento': 'funcionarios.provisionamento.executar_tarefa',
+}
+
+
+def calcular_assinatura(tipo, parametros, escopo):
+    texto = json.dumps([tipo, parametros, escopo], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(texto.encode()).hexdigest()
+
+
+def solicitar(tipo, parametros, usuario):
+    """
+    Enfileira um relatório já validado. Devolve (tarefa, criada).
+
+    Se já houver uma tarefa idêntica pendente ou em execução, ela é devolvida
+    no lugar de uma nova.
+    """
+    assinatura = calcular_assinatura(tipo, parametros, escopo_usuario(usuario))
+    existente = TarefaRelatorio.objects.filter(
+        assinatura=assinatura, status__in=TarefaRelatorio.EM_ANDAMENTO
+    ).first()
+    if existente:
+        return existente, False
+    try:
+        with transaction.atomic():
+            tarefa = TarefaRelatorio.objects.create(
+                tipo=tipo, parametros=parametros, assinatura=assinatura, solicitado_por=usuario
+            )
+        return tarefa, True
+    except IntegrityError:
+        # Outro pedido idêntico foi criado entre a consulta e o insert
+        existente = TarefaRelatorio.objects.filter(
+            assinatura=assinatura, status__in=TarefaRelatorio.EM_ANDAMENTO
+        ).first()
+        if existente is None:
+            raise
+        return existente, False
+
+
+def salvar_entrada(arquivo, nome_arquivo):
+    """Grava um arquivo enviado com o pedido até a execução da tarefa; devolve o caminho"""
+    ENTRADAS.mkdir(parents=True, exist_ok=True)
+    destino = ENTRADAS / f'{uuid.uuid4()}{Path(nome_arquivo).suffix.lower()}'
+    with open(destino, 'wb') as saida:
+        for pedaco in arquivo.chunks():
+            saida.write(pedaco)
+    return str(destino)
+
+
+def _executor(tipo):
+    if tipo in TAREFAS_INTERNAS:
+        return import_string(TAREFAS_INTERNAS[tipo])
+    gerador, _ = GERADORES[tipo]
+    return gerador
+
+
+def reservar_proxima():
+    """Reserva a tarefa pendente mais antiga para este worker, ou None"""
+    candidatas = TarefaRelatorio.objects.filter(status='pendente').order_by('created_at')
+    for tarefa_id in candidatas.values_list('id', flat=True)[:10]:
+        agora = timezone.now()
+        reservada = TarefaRelatorio.objects.filter(id=tarefa_id, status='pendente').update(
+            status='executando', iniciado_em=agora, updated_at=agora, progresso=0
+        )
+        if reservada:
+            return TarefaRelatorio.objects.get(id=tarefa_id)
+    return None
+
+
+def caminho_resultado(tarefa):
+    return DIRETORIO / f'{tarefa.id}.json'
+
+
+def _gravar_resultado(tarefa, dados):
+    DIRETORIO.mkdir(parents=True, exist_ok=True)
+    destino = caminho_resultado(tarefa)
+    temporario = destino.with_suffix('.tmp')
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(dados, arquivo, cls=JSONEncoder, ensure_ascii=False)
+    os.replace(temporario, destino)
+    return destino
+
+
+def executar(tarefa):
+    """Executa uma tarefa já reservada e registra o resultado ou o erro"""
+    fila = TarefaRelatorio.objects.filter(id=tarefa.id, status='executando')
+
+    def progresso(percentual):
+        fila.update(progresso=min(percentual, 99), updated_at=timezone.now())
+
+    try:
+        dados = _executor(tarefa.tipo)(progresso=progresso, **tarefa.parametros)
+        destino = _gravar_resultado(tarefa, dados)
+    except Exception as e:
+        logger.exception('Falha na tarefa de relatório %s', tarefa.id)
+        agora = timezone.now()
+        fila.update(
+            status='erro', erro=str(e), concluido_em=agora, updated_at=agora,
+            expira_em=agora + timedelta(seconds=EXPIRACAO),
+        )
+        return False
+
+    agora = timezone.now()
+    fila.update(
+        status='concluida', progresso=100, arquivo=str(destino), concluido_em=agora, updated_at=agora,
+        expira_em=agora + timedelta(seconds=EXPIRACAO),
+    )
+    return True
+
+
+def recuperar_abandonadas():
+    """Devolve à fila tarefas cujo worker parou de dar sinal de vida"""
+    limite = timezone.now() - TEMPO_ABANDONO
+    return TarefaRelatorio.objects.filter(status='executando', updated_at__lt=limite).update(
+        status='pendente', progresso=0, iniciado_em=None
+    )
+
+
+def remover_expiradas():
+    """Apaga tarefas expiradas e seus arquivos de resultado"""
+    expiradas = TarefaRelatorio.objects.filter(expira_em__lt=timezone.now())
+    total = 0
+    for tarefa in expiradas.only('id', 'arquivo').iterator():
+        if tarefa.arquivo:
+            try:
+                os.remove(tarefa.arquivo)
+            except FileNotFoundError:
+                pass
+        tarefa.delete()
+        total += 1
+    return total
@@ -1,3 +1,663 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import shutil
+import tempfile
+import threading
+import zipfile
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.db.models import Count, Q, Sum
+from django.http import QueryDict
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.renderers import JSONRenderer
+
+from arquivo.arquivamento import arquivar
+from arquivo.models import RegistroPrestacaoArquivada
+from empresas.models import EmpresaTerceirizada
+from localizacao.models import Estado
+from ponto.models import RegistroPonto
+from prestacoes.models import RegistroPrestacao
+from prestacoes.tests import cliente, criar_funcionario, criar_prestacao, montar_cenario
+from .agregacao import Medida, Razao, agregar, agregar_por, consolidar
+from .cache import Dependencia, _chave_versao, em_cache
+from .condicional import RespostaCondicionalMixin
+from .exportacao import Coluna, gerar_csv
+from . import tarefas
+from .models import ResumoDiarioPrestacao, TarefaRelatorio
+from .serializers import PrestacaoSerializer
+
+# Cache isolado por teste (o FileBasedCache de settings é compartilhado)
+CACHE_TESTES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'testes'},
+    'travas': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'relatorios_cache_travas'},
+}
+
+
+class MotorAgregacaoTests(TestCase):
+
+    MEDIDAS = [
+        Medida('aprovadas', Count, 'id', filtro=Q(validacao_gestor='aprovada')),
+        Medida('pendentes', Count, 'id', filtro=Q(validacao_gestor='pendente')),
+        Medida('valor_total', Sum, 'valor'),
+        Razao('valor_medio', 'valor_total', 'aprovadas'),
+    ]
+
+    def setUp(self):
+        self.cenario = montar_cenario()
+        criar_prestacao(self.cenario, validacao_gestor='aprovada', valor=Decimal('100.00'))
+        criar_prestacao(self.cenario, data=date(2024, 5, 3), validacao_gestor='aprovada', valor=Decimal('50.00'))
+        criar_prestacao(self.cenario, data=date(2024, 5, 6), valor=Decimal('30.00'))
+
+    def test_todas_as_medidas_em_uma_consulta(self):
+        with self.assertNumQueries(1):
+            linha = agregar(RegistroPrestacao.objects.all(), self.MEDIDAS)
+        self.assertEqual(linha, {
+            'aprovadas': 2, 'pendentes': 1, 'valor_total': Decimal('180.00'), 'valor_medio': Decimal('90'),
+        })
+
+    def test_conjunto_vazio_usa_os_padroes(self):
+        linha = agregar(RegistroPrestacao.objects.none(), self.MEDIDAS)
+        self.assertEqual(linha, {'aprovadas': 0, 'pendentes': 0, 'valor_total': 0, 'valor_medio': 0})
+
+    def test_consolidar_igual_a_agregar_direto(self):
+        with self.assertNumQueries(1):
+            linhas = agregar_por(RegistroPrestacao.objects.all(), ['data', 'validacao_gestor'], self.MEDIDAS)
+        self.assertEqual(len(linhas), 3)
+        self.assertEqual(consolidar(linhas, [], self.MEDIDAS), [agregar(RegistroPrestacao.objects.all(), self.MEDIDAS)])
+
+        por_status = consolidar(linhas, ['validacao_gestor'], self.MEDIDAS, condicao=lambda linha: linha['valor_total'] > 40)
+        self.assertEqual([(linha['validacao_gestor'], linha['aprovadas'], linha['valor_total']) for linha in por_status], [
+            ('aprovada', 2, Decimal('150.00')),
+        ])
+
+    def test_medida_distinta_nao_consolida(self):
+        medidas = [Medida('funcionarios', Count, 'funcionario', distinto=True)]
+        linhas = agregar_por(RegistroPrestacao.objects.all(), ['data'], medidas)
+        with self.assertRaises(ValueError):
+            consolidar(linhas, [], medidas)
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class DashboardGeralTests(TestCase):
+
+    def setUp(self):
+        self.cenario = montar_cenario()
+        self.api = cliente(self.cenario.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            criar_prestacao(self.cenario, validacao_gestor='aprovada', valor=Decimal('100.00'))
+            criar_prestacao(self.cenario, data=date(2024, 5, 3), validacao_gestor='aprovada', horario_saida=time(12))
+            criar_prestacao(self.cenario, data=date(2024, 5, 6))
+            criar_prestacao(self.cenario, data=date(2024, 6, 3), validacao_gestor='aprovada')
+
+    def test_totais_do_periodo(self):
+        resposta = self.api.get('/api/relatorios/dashboard/geral/', {
+            'empresa_id': self.cenario.empresa.pk, 'data_inicio': '2024-05-01', 'data_fim': '2024-05-31',
+        })
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.data['funcionarios'], {'ativos': 1, 'inativos': 0, 'total': 1})
+        self.assertEqual(resposta.data['prestacoes'], {'aprovadas': 2, 'pendentes': 1, 'total': 3})
+        self.assertEqual(resposta.data['financeiro']['valor_total_aprovado'], 200.0)
+        # 08:00-17:00 e 08:00-12:00, só as aprovadas
+        self.assertEqual(resposta.data['financeiro']['horas_trabalhadas'], '13:00:00')
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class ResumoTrocaEmpresaTests(TestCase):
+
+    def setUp(self):
+        self.cenario = montar_cenario()
+        self.api = cliente(self.cenario.admin)
+        self.outra = EmpresaTerceirizada.objects.create(razao_social='Outra', cnpj='99.999.999/0001-99')
+
+    def _aprovadas(self, empresa):
+        resposta = self.api.get('/api/relatorios/dashboard/geral/', {
+            'empresa_id': empresa.pk, 'data_inicio': '2024-05-01', 'data_fim': '2024-05-31',
+        })
+        self.assertEqual(resposta.status_code, 200)
+        return resposta.data['prestacoes']['aprovadas']
+
+    def test_prestacoes_acompanham_o_funcionario_na_troca_de_empresa(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            criar_prestacao(self.cenario, validacao_gestor='aprovada')
+        self.assertEqual(self._aprovadas(self.cenario.empresa), 1)
+        self.assertEqual(self._aprovadas(self.outra), 0)
+
+        funcionario = self.cenario.funcionario
+        funcionario.empresa = self.outra
+        with self.captureOnCommitCallbacks(execute=True):
+            funcionario.save()
+
+        self.assertEqual(self._aprovadas(self.cenario.empresa), 0)
+        self.assertEqual(self._aprovadas(self.outra), 1)
+        self.assertEqual(set(ResumoDiarioPrestacao.objects.values_list('empresa_id', flat=True)), {self.outra.pk})
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class CacheDashboardTests(TestCase):
+
+    def setUp(self):
+        self.cenario = montar_cenario()
+        self.api = cliente(self.cenario.admin)
+
+    def _pendentes(self):
+        resposta = self.api.get('/api/relatorios/dashboard/geral/', {'empresa_id': self.cenario.empresa.pk})
+        return resposta.data['prestacoes']['pendentes']
+
+    def test_alteracao_invalida_a_resposta_em_cache(self):
+        self.assertEqual(self._pendentes(), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            criar_prestacao(self.cenario)
+        self.assertEqual(self._pendentes(), 1)
+
+    def test_versao_so_muda_depois_do_commit(self):
+        self._pendentes()
+        chave = _chave_versao('prestacoes', self.cenario.empresa.pk, '*')
+        antes = cache.get(chave)
+        with self.captureOnCommitCallbacks() as callbacks:
+            criar_prestacao(self.cenario)
+        self.assertEqual(cache.get(chave), antes)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(cache.get(chave), antes)
+
+    def test_outra_empresa_continua_valida(self):
+        outra = montar_cenario()
+        chave = _chave_versao('prestacoes', outra.empresa.pk, '*')
+        self.api.get('/api/relatorios/dashboard/geral/', {'empresa_id': outra.empresa.pk})
+        antes = cache.get(chave)
+        with self.captureOnCommitCallbacks(execute=True):
+            criar_prestacao(self.cenario)
+        self.assertEqual(cache.get(chave), antes)
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class SingleFlightTests(TransactionTestCase):
+    """Misses simultâneos da mesma resposta: só um worker calcula, o outro espera o resultado"""
+
+    def test_dois_misses_calculam_uma_vez(self):
+        calculando = threading.Event()
+        liberar = threading.Event()
+        calculos = []
+
+        class Visao:
+            @em_cache(Dependencia('prestacoes', empresa=True))
+            def geral(self, request):
+                calculos.append(threading.get_ident())
+                calculando.set()
+                liberar.wait(5)
+                return Response({'total': 1})
+
+        respostas = []
+
+        def requisicao():
+            request = SimpleNamespace(
+                query_params=QueryDict('empresa_id=1'), user=SimpleNamespace(is_staff=True, pk=1)
+            )
+            try:
+                respostas.append(Visao().geral(request).data)
+            finally:
+                connection.close()
+
+        primeira = threading.Thread(target=requisicao)
+        primeira.start()
+        self.assertTrue(calculando.wait(5))
+        segunda = threading.Thread(target=requisicao)
+        segunda.start()
+        # A segunda não obtém o lock e fica aguardando a resposta da primeira
+        segunda.join(0.3)
+        self.assertTrue(segunda.is_alive())
+        liberar.set()
+        primeira.join(5)
+        segunda.join(5)
+
+        self.assertEqual(len(calculos), 1)
+        self.assertEqual(respostas, [{'total': 1}, {'total': 1}])
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class EstatisticasPrestacoesTests(TestCase):
+
+    def setUp(self):
+        self.cenario = montar_cenario()
+        self.cenario.empresa.nome_fantasia = 'Fantasia Teste'
+        self.cenario.empresa.save()
+        self.api = cliente(self.cenario.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            criar_prestacao(self.cenario, validacao_gestor='rejeitada', valor=Decimal('50.00'))
+            criar_prestacao(self.cenario, data=date(2024, 5, 3), valor=Decimal('150.00'))
+        # Move a rejeitada; a pendente fica na tabela quente
+        arquivar('prestacoes', date(2024, 6, 1))
+
+    def _estatisticas(self, **parametros):
+        resposta = self.api.get('/api/relatorios/prestacoes/estatisticas/', parametros)
+        self.assertEqual(resposta.status_code, 200)
+        return resposta.data
+
+    def test_resumo_e_registros_incluem_o_arquivo(self):
+        pelo_resumo = self._estatisticas()
+        for parametros in ({'empresa': 'Fantasia'}, {'empresa': 'Fantasia', 'data_inicio': '2024-05-01'}):
+            pelos_registros = self._estatisticas(**parametros)
+            for campo in ('total', 'pendentes', 'rejeitadas', 'valor_total', 'valor_medio'):
+                self.assertEqual(pelos_registros[campo], pelo_resumo[campo], (parametros, campo))
+        self.assertEqual(pelo_resumo['total'], 2)
+        self.assertEqual(pelo_resumo['valor_total'], Decimal('200.00'))
+        self.assertEqual(list(pelos_registros['por_empresa']), [{
+            'funcionario__empresa__nome_fantasia': 'Fantasia Teste', 'total': 2, 'valor_total': Decimal('200.00'),
+        }])
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class ListagemPrestacoesTests(TestCase):
+
+    def setUp(self):
+        self.cenario = montar_cenario()
+        self.api = cliente(self.cenario.admin)
+
+    def test_mesma_saida_do_serializer_do_modelo(self):
+        prestacoes = [
+            criar_prestacao(self.cenario, valor=Decimal('100.10'), horario_saida_almoco=time(12),
+                            horario_retorno_almoco=time(13, 15)),
+            criar_prestacao(self.cenario, data=date(2024, 5, 3), horario_chegada=time(9), horario_saida=time(9, 20)),
+        ]
+        resposta = self.api.get('/api/relatorios/prestacoes/', {'format': 'json'})
+        self.assertEqual(resposta.status_code, 200)
+        linhas = {linha['id']: linha for linha in json.loads(resposta.content)['results']}
+        for prestacao in prestacoes:
+            esperado = json.loads(JSONRenderer().render(PrestacaoSerializer(prestacao).data))
+            linha = linhas[str(prestacao.pk)]
+            for campo in ('horas_trabalhadas', 'valor', 'nome_completo', 'data'):
+                self.assertEqual(linha[campo], esperado[campo], campo)
+            # O modelo divide por horas arredondadas (Decimal(str(float))); o SQL divide pelos segundos
+            self.assertAlmostEqual(linha['valor_por_hora'], esperado['valor_por_hora'], places=9)
+
+    def test_listagem_com_arquivo_calcula_no_banco(self):
+        criar_prestacao(self.cenario, validacao_gestor='rejeitada')
+        criar_prestacao(self.cenario, data=date(2024, 5, 3), horario_saida=time(12))
+        arquivar('prestacoes', date(2024, 6, 1))
+        resposta = self.api.get('/api/relatorios/prestacoes/', {'format': 'json', 'data_inicio': '2024-05-01'})
+        linhas = json.loads(resposta.content)['results']
+        self.assertEqual(
+            [(linha['data'], linha['horas_trabalhadas'], linha['valor_por_hora']) for linha in linhas],
+            [('2024-05-03', '14400.0', 25.0), ('2024-05-02', '32400.0', 100 / 9)],
+        )
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class ResumoParidadeTests(TestCase):
+    """O resumo diário acompanha os registros (tabela quente + arquivo) em todas as formas de escrita"""
+
+    CHAVE = ('funcionario_id', 'data', 'local_prestacao_id', 'validacao_gestor')
+
+    def setUp(self):
+        self.cenario = montar_cenario()
+
+    def _pelos_registros(self):
+        totais = {}
+        for modelo in (RegistroPrestacao, RegistroPrestacaoArquivada):
+            for linha in modelo.objects.values(*self.CHAVE, 'valor', 'segundos_trabalhados'):
+                chave = tuple(linha[campo] for campo in self.CHAVE)
+                quantidade, valor, segundos = totais.get(chave, (0, Decimal('0'), 0))
+                totais[chave] = (quantidade + 1, valor + linha['valor'], segundos + linha['segundos_trabalhados'])
+        return totais
+
+    def _pelo_resumo(self):
+        return {
+            tuple(linha[campo] for campo in self.CHAVE): (
+                linha['total_prestacoes'], linha['valor_total'], linha['segundos_trabalhados']
+            )
+            for linha in ResumoDiarioPrestacao.objects.filter(total_prestacoes__gt=0).values(
+                *self.CHAVE, 'total_prestacoes', 'valor_total', 'segundos_trabalhados'
+            )
+        }
+
+    def test_resumo_igual_aos_registros(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            primeira = criar_prestacao(self.cenario)
+            segunda = criar_prestacao(self.cenario, data=date(2024, 5, 3), valor=Decimal('70.00'))
+            terceira = criar_prestacao(self.cenario, data=date(2024, 5, 6))
+        self.assertEqual(self._pelo_resumo(), self._pelos_registros())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            segunda.horario_saida = time(12)
+            segunda.valor = Decimal('90.00')
+            segunda.save()
+            # A célula do dia antigo também é atualizada
+            terceira.data = date(2024, 5, 7)
+            terceira.save()
+            RegistroPrestacao.objects.filter(pk__in=[primeira.pk, segunda.pk]).validar('rejeitada', self.cenario.admin)
+            terceira.delete()
+        self.assertEqual(self._pelo_resumo(), self._pelos_registros())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            arquivar('prestacoes', date(2024, 6, 1))
+        self.assertTrue(RegistroPrestacaoArquivada.objects.exists())
+        self.assertEqual(self._pelo_resumo(), self._pelos_registros())
+
+
+class ExportacaoTests(TestCase):
+
+    def setUp(self):
+        self.cenario = montar_cenario()
+        self.api = cliente(self.cenario.admin)
+        self.prestacoes = [
+            criar_prestacao(self.cenario, valor=Decimal('100.00')),
+            criar_prestacao(self.cenario, data=date(2024, 5, 3), valor=Decimal('80.50'), validacao_gestor='aprovada'),
+        ]
+
+    def _exportar(self, **parametros):
+        resposta = self.api.get('/api/relatorios/prestacoes/exportar/', parametros)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertTrue(resposta.streaming)
+        return b''.join(resposta.streaming_content)
+
+    def test_csv_com_os_filtros_da_listagem(self):
+        conteudo = self._exportar(formato='csv', validacao_gestor='aprovada')
+        linhas = list(csv.reader(io.StringIO(conteudo.decode('utf-8'))))
+        self.assertEqual(linhas[0][:3], ['ID', 'Data', 'Funcionário'])
+        self.assertEqual(len(linhas), 2)
+        registro = dict(zip(linhas[0], linhas[1]))
+        self.assertEqual(registro['ID'], str(self.prestacoes[1].pk))
+        self.assertEqual((registro['Data'], registro['Horas trabalhadas'], registro['Valor']), (
+            '2024-05-03', '9:00:00', '80.50',
+        ))
+        self.assertEqual(registro['Validação local'], 'não')
+
+    def test_xlsx_e_um_zip_com_uma_linha_por_registro(self):
+        conteudo = self._exportar(formato='xlsx')
+        with zipfile.ZipFile(io.BytesIO(conteudo)) as arquivo:
+            self.assertIsNone(arquivo.testzip())
+            planilha = arquivo.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        self.assertEqual(planilha.count('<row>'), 3)
+        self.assertIn('<c><v>80.50</v></c>', planilha)
+
+    def test_formato_invalido(self):
+        resposta = self.api.get('/api/relatorios/prestacoes/exportar/', {'formato': 'pdf'})
+        self.assertEqual(resposta.status_code, 400)
+
+    def test_csv_escrito_em_blocos(self):
+        linhas = ([numero, f'nome {numero}'] for numero in range(5))
+        blocos = list(gerar_csv([Coluna('N', 'n'), Coluna('Nome', 'nome')], linhas, tamanho_bloco=2))
+        # Cabeçalho + 2 linhas, 2 linhas, 1 linha
+        self.assertEqual([bloco.count(b'\r\n') for bloco in blocos], [3, 2, 1])
+
+
+class PaginacaoCursorTests(TestCase):
+
+    def setUp(self):
+        self.cenario = montar_cenario()
+        self.api = cliente(self.cenario.admin)
+        outro = criar_funcionario(self.cenario.empresa, self.cenario.cargo)
+        # Empates em (data, horario_chegada) são desempatados pelo id
+        for dia in (2, 3, 6):
+            criar_prestacao(self.cenario, data=date(2024, 5, dia))
+            criar_prestacao(self.cenario, funcionario=outro, data=date(2024, 5, dia))
+        self.esperado = list(
+            RegistroPrestacao.objects.order_by('-data', '-horario_chegada', '-id').values_list('id', flat=True)
+        )
+
+    def _pagina(self, url, **parametros):
+        # next/previous já trazem todos os parâmetros
+        resposta = self.api.get(url, {'format': 'json', **parametros} if parametros else None)
+        self.assertEqual(resposta.status_code, 200)
+        return json.loads(resposta.content)
+
+    def test_percorre_todas_as_linhas_sem_repetir(self):
+        pagina = self._pagina('/api/relatorios/prestacoes/', paginacao='cursor', page_size=4)
+        self.assertNotIn('count', pagina)
+        self.assertIsNone(pagina['previous'])
+        ids = [linha['id'] for linha in pagina['results']]
+        segunda = self._pagina(pagina['next'])
+        ids += [linha['id'] for linha in segunda['results']]
+        self.assertIsNone(segunda['next'])
+        self.assertEqual(ids, [str(pk) for pk in self.esperado])
+
+        # Voltar devolve a primeira página
+        anterior = self._pagina(segunda['previous'])
+        self.assertEqual([linha['id'] for linha in anterior['results']], ids[:4])
+
+    def test_sem_count_nem_offset(self):
+        with CaptureQueriesContext(connection) as consultas:
+            self._pagina('/api/relatorios/prestacoes/', paginacao='cursor', page_size=2)
+        sql = ' '.join(consulta['sql'] for consulta in consultas.captured_queries)
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('OFFSET', sql)
+
+        pagina = self._pagina('/api/relatorios/prestacoes/', paginacao='cursor', contar='true')
+        self.assertEqual(pagina['count'], 6)
+
+    def test_cursor_invalido(self):
+        resposta = self.api.get('/api/relatorios/prestacoes/', {'cursor': 'abc'})
+        self.assertEqual(resposta.status_code, 404)
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class TarefasRelatorioTests(TestCase):
+
+    PEDIDO = {'tipo': 'financeiro', 'parametros': {'data_inicio': '2024-05-01', 'data_fim': '2024-05-31'}}
+
+    def setUp(self):
+        self.cenario = montar_cenario()
+        self.api = cliente(self.cenario.admin)
+        diretorio = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, diretorio, ignore_errors=True)
+        patcher = mock.patch.object(tarefas, 'DIRETORIO', diretorio)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        with self.captureOnCommitCallbacks(execute=True):
+            criar_prestacao(self.cenario, validacao_gestor='aprovada', valor=Decimal('120.00'))
+
+    def _pedir(self, pedido=None):
+        return self.api.post('/api/relatorios/tarefas/', pedido or self.PEDIDO, format='json')
+
+    def test_fluxo_completo(self):
+        resposta = self._pedir()
+        self.assertEqual(resposta.status_code, 202)
+        tarefa_id = resposta.data['id']
+        # Pedido idêntico em andamento reaproveita a tarefa
+        self.assertEqual(self._pedir().data['id'], tarefa_id)
+        self.assertEqual(self.api.get(f'/api/relatorios/tarefas/{tarefa_id}/resultado/').status_code, 409)
+
+        tarefa = tarefas.reservar_proxima()
+        self.assertEqual(str(tarefa.pk), tarefa_id)
+        self.assertIsNone(tarefas.reservar_proxima())
+        self.assertTrue(tarefas.executar(tarefa))
+
+        estado = self.api.get(f'/api/relatorios/tarefas/{tarefa_id}/').data
+        self.assertEqual((estado['status'], estado['progresso']), ('concluida', 100))
+        resultado = self.api.get(f'/api/relatorios/tarefas/{tarefa_id}/resultado/')
+        dados = json.loads(b''.join(resultado.streaming_content))
+        resultado.close()
+        # Mesma resposta do dashboard síncrono
+        sincrono = self.api.get('/api/relatorios/dashboard/financeiro/', self.PEDIDO['parametros'])
+        self.assertEqual(dados['resumo'], json.loads(JSONRenderer().render(sincrono.data))['resumo'])
+        self.assertEqual(dados['resumo']['valor_total'], 120.0)
+
+        # Concluída, a tarefa não é mais reaproveitada
+        self.assertNotEqual(self._pedir().data['id'], tarefa_id)
+
+    def test_parametros_invalidos(self):
+        resposta = self._pedir({'tipo': 'financeiro', 'parametros': {'data_inicio': '2024-06-01', 'data_fim': '2024-05-01'}})
+        self.assertEqual(resposta.status_code, 400)
+        self.assertEqual(self._pedir({'tipo': 'provisionamento'}).status_code, 400)
+        self.assertFalse(TarefaRelatorio.objects.exists())
+
+    def test_erro_fica_registrado(self):
+        self._pedir()
+        tarefa = tarefas.reservar_proxima()
+        with mock.patch.dict(tarefas.GERADORES, {'financeiro': (mock.Mock(side_effect=ValueError('falhou')), None)}), \
+                self.assertLogs('relatorios.tarefas', 'ERROR'):
+            self.assertFalse(tarefas.executar(tarefa))
+        tarefa.refresh_from_db()
+        self.assertEqual((tarefa.status, tarefa.erro), ('erro', 'falhou'))
+
+    def test_tarefa_abandonada_volta_para_a_fila(self):
+        self._pedir()
+        tarefa = tarefas.reservar_proxima()
+        self.assertEqual(tarefas.recuperar_abandonadas(), 0)
+        TarefaRelatorio.objects.filter(pk=tarefa.pk).update(
+            updated_at=timezone.now() - tarefas.TEMPO_ABANDONO - timedelta(seconds=1)
+        )
+        self.assertEqual(tarefas.recuperar_abandonadas(), 1)
+        self.assertEqual(tarefas.reservar_proxima(), tarefa)
+
+    def test_expiradas_sao_removidas_com_o_arquivo(self):
+        self._pedir()
+        tarefa = tarefas.reservar_proxima()
+        tarefas.executar(tarefa)
+        arquivo = tarefas.caminho_resultado(tarefa)
+        self.assertTrue(arquivo.exists())
+        TarefaRelatorio.objects.filter(pk=tarefa.pk).update(expira_em=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(tarefas.remover_expiradas(), 1)
+        self.assertFalse(arquivo.exists())
+        self.assertFalse(TarefaRelatorio.objects.exists())
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class RespostaCondicionalTests(TestCase):
+
+    def setUp(self):
+        self.cenario = montar_cenario()
+        self.api = cliente(self.cenario.admin)
+
+    def _get(self, url, etag=None):
+        cabecalhos = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.api.get(url, **cabecalhos)
+
+    def test_304_sem_consultas_enquanto_a_tabela_nao_muda(self):
+        for url in ('/api/estados/', '/api/relatorios/dashboard/geral/'):
+            primeira = self._get(url)
+            self.assertEqual(primeira.status_code, 200, url)
+            with self.assertNumQueries(0):
+                segunda = self._get(url, primeira['ETag'])
+            self.assertEqual(segunda.status_code, 304, url)
+            self.assertEqual(segunda['ETag'], primeira['ETag'])
+
+    def test_alteracao_troca_a_etag(self):
+        etag = self._get('/api/estados/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Estado.objects.create(sigla='GO', nome='Goiás')
+        resposta = self._get('/api/estados/', etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotEqual(resposta['ETag'], etag)
+
+    def test_so_tabelas_monitoradas_mudam_marcas(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            TarefaRelatorio.objects.create(tipo='financeiro', assinatura='x')
+        self.assertEqual(callbacks, [])
+        with self.captureOnCommitCallbacks() as callbacks:
+            Estado.objects.create(sigla='GO', nome='Goiás')
+        self.assertEqual(len(callbacks), 1)
+
+    def test_view_com_tabela_nao_monitorada(self):
+        with self.assertRaises(ImproperlyConfigured):
+            type('Visao', (RespostaCondicionalMixin,), {'tabelas_condicionais': ['relatorios.TarefaRelatorio']})
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class SerieTemporalTests(TestCase):
+
+    URL = '/api/relatorios/dashboard/serie_temporal/'
+
+    def setUp(self):
+        self.cenario = montar_cenario()
+        self.api = cliente(self.cenario.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            criar_prestacao(self.cenario, validacao_gestor='aprovada', valor=Decimal('100.00'))
+            criar_prestacao(self.cenario, data=date(2024, 5, 3), valor=Decimal('40.00'))
+            criar_prestacao(self.cenario, data=date(2024, 5, 20), validacao_gestor='aprovada')
+
+    def _serie(self, **parametros):
+        resposta = self.api.get(self.URL, parametros)
+        self.assertEqual(resposta.status_code, 200, resposta.data)
+        return resposta.data
+
+    def test_dias_sem_registros_sao_zerados(self):
+        dados = self._serie(data_inicio='2024-05-01', data_fim='2024-05-04', medidas='total,aprovadas,valor_medio')
+        self.assertEqual(dados['series'], [
+            {'periodo': date(2024, 5, 1), 'total': 0, 'aprovadas': 0, 'valor_medio': 0},
+            {'periodo': date(2024, 5, 2), 'total': 1, 'aprovadas': 1, 'valor_medio': Decimal('100')},
+            {'periodo': date(2024, 5, 3), 'total': 1, 'aprovadas': 0, 'valor_medio': Decimal('40')},
+            {'periodo': date(2024, 5, 4), 'total': 0, 'aprovadas': 0, 'valor_medio': 0},
+        ])
+
+    def test_semanas_e_meses(self):
+        semanas = self._serie(granularidade='semana', data_inicio='2024-05-01', data_fim='2024-05-31', medidas='total')
+        self.assertEqual(
+            [(linha['periodo'], linha['total']) for linha in semanas['series']],
+            [(date(2024, 4, 29), 2), (date(2024, 5, 6), 0), (date(2024, 5, 13), 0),
+             (date(2024, 5, 20), 1), (date(2024, 5, 27), 0)],
+        )
+        meses = self._serie(granularidade='mes', data_inicio='2024-04-01', data_fim='2024-06-30', medidas='valor_total')
+        self.assertEqual(
+            [linha['valor_total'] for linha in meses['series']], [0, Decimal('240.00'), 0],
+        )
+
+    def test_filtro_por_empresa(self):
+        outra = montar_cenario()
+        dados = self._serie(empresa_id=outra.empresa.pk, data_inicio='2024-05-01', data_fim='2024-05-31', medidas='total')
+        self.assertEqual(sum(linha['total'] for linha in dados['series']), 0)
+
+    def test_parametros_invalidos(self):
+        for parametros in (
+            {'fonte': 'outra'}, {'granularidade': 'ano'}, {'medidas': 'total,xyz'},
+            {'data_inicio': '2024-13-01'}, {'data_inicio': '2024-06-01', 'data_fim': '2024-05-01'},
+            {'data_inicio': '2000-01-01', 'data_fim': '2024-05-01'}, {'empresa_id': 'abc'},
+        ):
+            resposta = self.api.get(self.URL, parametros)
+            self.assertEqual(resposta.status_code, 400, parametros)
+            self.assertIn('detail', resposta.data)
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class PontosArquivadosTests(TestCase):
+
+    def setUp(self):
+        self.cenario = montar_cenario()
+        self.api = cliente(self.cenario.admin)
+        # Maio vai para o arquivo; 01/06 (mesma semana ISO de 31/05) fica na tabela quente
+        for dia in (date(2024, 5, 2), date(2024, 5, 31), date(2024, 6, 1)):
+            ponto = RegistroPonto.objects.create(
+                funcionario=self.cenario.funcionario, foto='pontos/teste.png', ip='127.0.0.1',
+                latitude=Decimal('-15.6'), longitude=Decimal('-56.1'),
+            )
+            RegistroPonto.objects.filter(pk=ponto.pk).update(
+                created_at=timezone.make_aware(datetime.combine(dia, time(10)))
+            )
+        arquivar('pontos', date(2024, 6, 1))
+
+    def _get(self, url, **parametros):
+        resposta = self.api.get(url, parametros)
+        self.assertEqual(resposta.status_code, 200, resposta.data)
+        return resposta.data
+
+    def test_estatisticas_incluem_o_arquivo(self):
+        url = '/api/relatorios/pontos/estatisticas/'
+        dados = self._get(url)
+        self.assertEqual(dados['total'], 3)
+        self.assertEqual(dados['por_funcionario'], [{'funcionario__usuario__first_name': 'Nome', 'total': 3}])
+        self.assertEqual(dados['por_empresa'], [
+            {'funcionario__empresa__nome_fantasia': self.cenario.empresa.nome_fantasia, 'total': 3},
+        ])
+        self.assertEqual(self._get(url, data_inicio='2024-05-15T00:00:00')['total'], 2)
+        self.assertEqual(self._get(url, data_inicio='2024-06-01T00:00:00')['total'], 1)
+
+    def test_serie_de_pontos_inclui_o_arquivo(self):
+        url = '/api/relatorios/dashboard/serie_temporal/'
+        meses = self._get(url, fonte='pontos', granularidade='mes', data_inicio='2024-05-01', data_fim='2024-06-30')
+        self.assertEqual(
+            [(linha['total'], linha['funcionarios']) for linha in meses['series']], [(2, 1), (1, 1)],
+        )
+        # O funcionário aparece no arquivo e na tabela quente e conta uma vez
+        semana = self._get(url, fonte='pontos', granularidade='semana', data_inicio='2024-05-27', data_fim='2024-06-02')
+        self.assertEqual(semana['series'], [{'periodo': date(2024, 5, 27), 'total': 2, 'funcionarios': 1}])
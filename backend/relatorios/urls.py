@@ -1,14 +1,18 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
-    FuncionarioViewSet, PrestacaoViewSet, PontoViewSet, DashboardViewSet
+    FuncionarioViewSet, PrestacaoViewSet, PontoViewSet, DashboardViewSet,
+    TarefaRelatorioViewSet, IntervaloPontoViewSet, ConflitoPrestacaoViewSet
 )
 
 router = DefaultRouter()
 router.register(r"funcionarios", FuncionarioViewSet)
 router.register(r"prestacoes", PrestacaoViewSet)
 router.register(r"pontos", PontoViewSet)
+router.register(r"intervalos", IntervaloPontoViewSet)
+router.register(r"conflitos", ConflitoPrestacaoViewSet)
 router.register(r"dashboard", DashboardViewSet, basename='dashboard')
+router.register(r"tarefas", TarefaRelatorioViewSet, basename='tarefas')
 
 urlpatterns = [
     path("", include(router.urls)),
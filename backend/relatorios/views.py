@@ -19,40 +19,60 @@ ENDPOINTS DISPONÍVEIS:
 - /api/relatorios/funcionarios/ - Funcionários com filtros
 - /api/relatorios/prestacoes/ - Prestações com filtros  
 - /api/relatorios/pontos/ - Registros de ponto com filtros
+- /api/relatorios/{funcionarios,prestacoes,pontos}/exportar/ - Exportação CSV/XLSX
 - /api/relatorios/dashboard/geral/ - Dashboard geral
 - /api/relatorios/dashboard/graficos/ - Dados para gráficos
 - /api/relatorios/dashboard/financeiro/ - Relatório financeiro
 """
 
+from django.http import FileResponse
 from django.shortcuts import render
-from rest_framework import viewsets, status, filters
+from rest_framework import viewsets, status, filters, mixins
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Count, Sum, Avg
+from django.db.models import Q, F, Count, Sum
 from django.db.models.functions import TruncMonth, TruncDay
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from django.utils import timezone
 from .serializers import (
-    FuncionarioSerializer, PrestacaoSerializer, PontoSerializer, 
-    DashboardSerializer, GraficoSerializer, RelatorioFinanceiroSerializer
+    FuncionarioSerializer, PrestacaoSerializer, PrestacaoListaSerializer, PontoSerializer, 
+    DashboardSerializer, GraficoSerializer,
+    SolicitacaoTarefaSerializer, TarefaRelatorioSerializer, IntervaloPontoSerializer,
+    ConflitoPrestacaoSerializer
 )
 from .filters import (
-    FuncionarioFilter, PrestacaoFilter, PontoFilter
+    FuncionarioFilter, PrestacaoFilter, PontoFilter, IntervaloPontoFilter, BuscaFuncionarioFilter,
+    ConflitoPrestacaoFilter
 )
+from .arquivo import ArquivoMixin, ConsultaComArquivo, partes_consulta
+from .agregacao import Medida, Razao, agregar, agregar_partes, agregar_por, consolidar, linha_vazia
+from .cache import Dependencia, em_cache
+from .condicional import RespostaCondicionalMixin
+from .exportacao import Coluna, ExportacaoMixin, duracao, nome_completo
+from .paginacao import PaginacaoRelatorios
+from .geradores import GERADORES, relatorio_financeiro
+from .series import (
+    GRANULARIDADES, MAX_PERIODOS, contar_periodos, inicio_padrao, periodos, serie_temporal
+)
+from .tarefas import caminho_resultado, solicitar
 from funcionarios.models import Funcionario
-from prestacoes.models import RegistroPrestacao
-from ponto.models import RegistroPonto
+from prestacoes.models import ConflitoPrestacao, RegistroPrestacao
+from ponto.models import IntervaloPonto, RegistroPonto
+from arquivo.arquivamento import limite_arquivado
+from arquivo.models import RegistroPontoArquivado, RegistroPrestacaoArquivada
 from empresas.models import EmpresaTerceirizada
+from .models import ResumoDiarioPrestacao, TarefaRelatorio
 
 
-class FuncionarioViewSet(viewsets.ReadOnlyModelViewSet):
+class FuncionarioViewSet(ExportacaoMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet para funcionários com filtros avançados
     
     Este endpoint permite listar e filtrar funcionários das empresas terceirizadas.
     
     **Filtros disponíveis:**
-    - `nome`: Busca por nome completo (primeiro nome ou sobrenome)
+    - `nome`: Busca por nome completo, sem diferenciar acentos (ex.: "joao" encontra "João")
     - `empresa`: Busca por nome da empresa (busca parcial)
     - `cargo`: Busca por nome do cargo (busca parcial)
     - `cpf`: Busca por CPF (busca parcial)
@@ -62,7 +82,7 @@ class FuncionarioViewSet(viewsets.ReadOnlyModelViewSet):
     - `cidade`: Cidade da empresa (busca parcial)
     
     **Busca e Ordenação:**
-    - `search`: Busca em nome, sobrenome e CPF
+    - `search`: Busca em nome (sem acentos) e CPF
     - `ordering`: Ordenação por data_admissao, usuario__first_name, created_at
     
     **Exemplos de uso:**
@@ -70,15 +90,44 @@ class FuncionarioViewSet(viewsets.ReadOnlyModelViewSet):
     - `/api/relatorios/funcionarios/?empresa=ABC&cargo=Analista`
     - `/api/relatorios/funcionarios/?data_admissao_inicio=2024-01-01&data_admissao_fim=2024-12-31`
     - `/api/relatorios/funcionarios/?search=123.456.789-00&ordering=-data_admissao`
+    
+    **Exportação (CSV/XLSX em streaming, mesmos filtros):**
+    - `/api/relatorios/funcionarios/exportar/?formato=xlsx&ativo=true`
     """
     queryset = Funcionario.objects.select_related('usuario', 'empresa', 'cargo')
     serializer_class = FuncionarioSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, BuscaFuncionarioFilter, filters.OrderingFilter]
     filterset_class = FuncionarioFilter
-    search_fields = ['usuario__first_name', 'usuario__last_name', 'usuario__cpf']
+    search_fields = ['usuario__cpf']
+    busca_funcionario = ''
     ordering_fields = ['data_admissao', 'usuario__first_name', 'created_at']
     ordering = ['usuario__first_name']
 
+    nome_exportacao = 'funcionarios'
+    colunas_exportacao = [
+        Coluna('ID', 'id'),
+        Coluna('Nome', 'usuario__first_name', 'usuario__last_name', formatar=nome_completo),
+        Coluna('CPF', 'usuario__cpf'),
+        Coluna('Telefone', 'usuario__telefone'),
+        Coluna('Email', 'usuario__email'),
+        Coluna('Empresa', 'empresa__nome_fantasia'),
+        Coluna('Cargo', 'cargo__nome'),
+        Coluna('Registro', 'registro'),
+        Coluna('Data de admissão', 'data_admissao'),
+        Coluna('Data de demissão', 'data_demissao'),
+        Coluna('PIX', 'pix'),
+        Coluna('Banco', 'banco'),
+        Coluna('Agência', 'agencia'),
+        Coluna('Conta', 'conta'),
+        Coluna('Ativo', 'ativo'),
+    ]
+
+    MEDIDAS_ESTATISTICAS = [
+        Medida('total', Count, 'id'),
+        Medida('ativos', Count, 'id', filtro=Q(ativo=True)),
+        Medida('inativos', Count, 'id', filtro=Q(ativo=False)),
+    ]
+
     @action(detail=False, methods=['get'])
     def estatisticas(self, request):
         """
@@ -97,11 +146,12 @@ class FuncionarioViewSet(viewsets.ReadOnlyModelViewSet):
         - por_cargo: Top 10 cargos por quantidade de funcionários
         """
         queryset = self.filter_queryset(self.get_queryset())
+        totais = agregar(queryset, self.MEDIDAS_ESTATISTICAS)
         
         stats = {
-            'total': queryset.count(),
-            'ativos': queryset.filter(ativo=True).count(),
-            'inativos': queryset.filter(ativo=False).count(),
+            'total': totais['total'],
+            'ativos': totais['ativos'],
+            'inativos': totais['inativos'],
             'por_empresa': queryset.values('empresa__nome_fantasia').annotate(
                 total=Count('id')
             ).order_by('-total')[:10],
@@ -113,14 +163,14 @@ class FuncionarioViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(stats)
 
 
-class PrestacaoViewSet(viewsets.ReadOnlyModelViewSet):
+class PrestacaoViewSet(ArquivoMixin, ExportacaoMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet para prestações com filtros avançados
     
     Este endpoint permite listar e filtrar prestações de serviços das empresas terceirizadas.
     
     **Filtros disponíveis:**
-    - `funcionario_nome`: Busca por nome completo do funcionário
+    - `funcionario_nome`: Busca por nome completo do funcionário (sem acentos)
     - `empresa`: Busca por nome da empresa (busca parcial)
     - `data_inicio`: Data da prestação a partir de (YYYY-MM-DD)
     - `data_fim`: Data da prestação até (YYYY-MM-DD)
@@ -131,7 +181,7 @@ class PrestacaoViewSet(viewsets.ReadOnlyModelViewSet):
     - `cidade`: Cidade do local de prestação (busca parcial)
     
     **Busca e Ordenação:**
-    - `search`: Busca em nome do funcionário
+    - `search`: Busca em nome do funcionário (sem acentos)
     - `ordering`: Ordenação por data, valor, created_at
     
     **Exemplos de uso:**
@@ -139,94 +189,437 @@ class PrestacaoViewSet(viewsets.ReadOnlyModelViewSet):
     - `/api/relatorios/prestacoes/?empresa=ABC&data_inicio=2024-01-01&data_fim=2024-01-31`
     - `/api/relatorios/prestacoes/?valor_min=100.00&valor_max=500.00&validacao_gestor=aprovada`
     - `/api/relatorios/prestacoes/?local_prestacao=Escritório&cidade=Cuiabá`
+    
+    **Paginação por cursor (sem OFFSET/COUNT; `count` só com `contar=true`):**
+    - `/api/relatorios/prestacoes/?paginacao=cursor&data_inicio=2024-01-01`
+    
+    **Exportação (CSV/XLSX em streaming, mesmos filtros):**
+    - `/api/relatorios/prestacoes/exportar/?formato=csv&data_inicio=2024-01-01&data_fim=2024-01-31`
+    
+    **Registros arquivados:** listagem e exportação incluem as prestações já
+    movidas para o arquivo quando `data_inicio`/`data_fim` é anterior ao
+    último mês arquivado. As estatísticas sempre incluem, pelo resumo diário
+    ou pelas duas tabelas.
     """
-    queryset = RegistroPrestacao.objects.select_related(
-        'funcionario__usuario', 'funcionario__empresa', 'local_prestacao'
-    )
+    RELACIONADOS = ('funcionario__usuario', 'funcionario__empresa', 'funcionario__cargo', 'local_prestacao__cidade')
+    queryset = RegistroPrestacao.objects.select_related(*RELACIONADOS)
     serializer_class = PrestacaoSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, BuscaFuncionarioFilter, filters.OrderingFilter]
     filterset_class = PrestacaoFilter
-    search_fields = ['funcionario__usuario__first_name', 'funcionario__usuario__last_name']
+    search_fields = []
+    busca_funcionario = 'funcionario__'
     ordering_fields = ['data', 'valor', 'created_at']
     ordering = ['-data', '-horario_chegada']
+    pagination_class = PaginacaoRelatorios
+
+    nome_exportacao = 'prestacoes'
+    colunas_exportacao = [
+        Coluna('ID', 'id', formatar=str),
+        Coluna('Data', 'data'),
+        Coluna('Funcionário', 'funcionario__usuario__first_name', 'funcionario__usuario__last_name',
+               formatar=nome_completo),
+        Coluna('CPF', 'funcionario__usuario__cpf'),
+        Coluna('Empresa', 'funcionario__empresa__nome_fantasia'),
+        Coluna('Local', 'local_prestacao__nome'),
+        Coluna('Cidade', 'local_prestacao__cidade__nome'),
+        Coluna('Chegada', 'horario_chegada'),
+        Coluna('Saída almoço', 'horario_saida_almoco'),
+        Coluna('Retorno almoço', 'horario_retorno_almoco'),
+        Coluna('Saída', 'horario_saida'),
+        Coluna('Horas trabalhadas', 'segundos_trabalhados', formatar=duracao),
+        Coluna('Valor', 'valor'),
+        Coluna('Validação gestor', 'validacao_gestor'),
+        Coluna('Validação local', 'validacao_local'),
+        Coluna('Observações', 'observacoes'),
+        Coluna('Criado em', 'created_at'),
+    ]
+
+    # Aditivas: agregadas por empresa em cada tabela (quente e arquivo) e consolidadas
+    MEDIDAS_ESTATISTICAS = [
+        Medida('total', Count, 'id'),
+        Medida('aprovadas', Count, 'id', filtro=Q(validacao_gestor='aprovada')),
+        Medida('pendentes', Count, 'id', filtro=Q(validacao_gestor='pendente')),
+        Medida('rejeitadas', Count, 'id', filtro=Q(validacao_gestor='rejeitada')),
+        Medida('valor_total', Sum, 'valor'),
+        Razao('valor_medio', 'valor_total', 'total'),
+    ]
+    
+    # Mesmas estatísticas calculadas sobre o resumo diário
+    MEDIDAS_ESTATISTICAS_RESUMO = [
+        Medida('total', Sum, 'total_prestacoes'),
+        Medida('aprovadas', Sum, 'total_prestacoes', filtro=Q(validacao_gestor='aprovada')),
+        Medida('pendentes', Sum, 'total_prestacoes', filtro=Q(validacao_gestor='pendente')),
+        Medida('rejeitadas', Sum, 'total_prestacoes', filtro=Q(validacao_gestor='rejeitada')),
+        Medida('valor_total', Sum, 'valor_total'),
+        Razao('valor_medio', 'valor_total', 'total'),
+    ]
+    
+    # Filtros que o resumo diário responde sem consultar os registros: filtro -> lookup no resumo
+    FILTROS_RESUMO = {
+        'data_inicio': 'data__gte',
+        'data_fim': 'data__lte',
+        'validacao_gestor': 'validacao_gestor',
+    }
+    PARAMETROS_IGNORADOS = {'ordering', 'page', 'page_size', 'format', 'paginacao', 'cursor', 'contar'}
+
+    tabela_arquivo = 'prestacoes'
+    # O resumo diário soma o arquivo; a consulta aos registros precisa somar também
+    acoes_arquivo = ('list', 'exportar', 'estatisticas')
+    acoes_arquivo_sem_periodo = ('estatisticas',)
+
+    def get_queryset_arquivo(self):
+        return RegistroPrestacaoArquivada.objects.select_related(*self.RELACIONADOS)
+
+    def list(self, request, *args, **kwargs):
+        # Listagem por values(): todos os joins na consulta da página, sem N+1
+        queryset = PrestacaoListaSerializer.consultar(self.filter_queryset(self.get_queryset()))
+        pagina = self.paginate_queryset(queryset)
+        if pagina is not None:
+            return self.get_paginated_response(PrestacaoListaSerializer(pagina, many=True).data)
+        return Response(PrestacaoListaSerializer(queryset, many=True).data)
+
+    def _filtros_resumo(self, request):
+        """Filtros equivalentes no resumo diário, ou None se a consulta exigir os registros"""
+        parametros = {nome for nome, valor in request.query_params.items() if valor}
+        if parametros - set(self.FILTROS_RESUMO) - self.PARAMETROS_IGNORADOS:
+            return None
+        
+        filterset = self.filterset_class(request.query_params, queryset=self.get_queryset(), request=request)
+        if not filterset.is_valid():
+            return None
+        
+        return {
+            lookup: filterset.form.cleaned_data[nome]
+            for nome, lookup in self.FILTROS_RESUMO.items()
+            if filterset.form.cleaned_data.get(nome) not in (None, '')
+        }
 
     @action(detail=False, methods=['get'])
     def estatisticas(self, request):
-        """Estatísticas das prestações"""
-        queryset = self.filter_queryset(self.get_queryset())
+        """
+        Estatísticas das prestações
         
-        stats = {
-            'total': queryset.count(),
-            'aprovadas': queryset.filter(validacao_gestor='aprovada').count(),
-            'pendentes': queryset.filter(validacao_gestor='pendente').count(),
-            'rejeitadas': queryset.filter(validacao_gestor='rejeitada').count(),
-            'valor_total': queryset.aggregate(total=Sum('valor'))['total'] or 0,
-            'valor_medio': queryset.aggregate(medio=Avg('valor'))['medio'] or 0,
-            'por_empresa': queryset.values('funcionario__empresa__nome_fantasia').annotate(
-                total=Count('id'),
-                valor_total=Sum('valor')
+        Quando apenas filtros de data/status são usados, os números vêm do
+        resumo diário; demais filtros consultam os registros diretamente,
+        na tabela quente e no arquivo (o resumo também soma os dois).
+        """
+        filtros_resumo = self._filtros_resumo(request)
+        
+        if filtros_resumo is not None:
+            queryset = ResumoDiarioPrestacao.objects.filter(**filtros_resumo)
+            totais = agregar(queryset, self.MEDIDAS_ESTATISTICAS_RESUMO)
+            por_empresa = queryset.values(
+                funcionario__empresa__nome_fantasia=F('empresa__nome_fantasia')
+            ).annotate(
+                total=Sum('total_prestacoes'),
+                valor_total=Sum('valor_total')
             ).order_by('-valor_total')[:10]
+        else:
+            campo_empresa = 'funcionario__empresa__nome_fantasia'
+            linhas = []
+            for parte in partes_consulta(self.filter_queryset(self.get_queryset())):
+                linhas.extend(agregar_por(parte, [campo_empresa], self.MEDIDAS_ESTATISTICAS))
+            totais = (consolidar(linhas, [], self.MEDIDAS_ESTATISTICAS) or [linha_vazia(self.MEDIDAS_ESTATISTICAS)])[0]
+            por_empresa = [
+                {campo: linha[campo] for campo in (campo_empresa, 'total', 'valor_total')}
+                for linha in sorted(
+                    consolidar(linhas, [campo_empresa], self.MEDIDAS_ESTATISTICAS),
+                    key=lambda linha: linha['valor_total'], reverse=True
+                )[:10]
+            ]
+        
+        stats = {
+            'total': totais['total'],
+            'aprovadas': totais['aprovadas'],
+            'pendentes': totais['pendentes'],
+            'rejeitadas': totais['rejeitadas'],
+            'valor_total': totais['valor_total'],
+            'valor_medio': totais['valor_medio'],
+            'por_empresa': por_empresa
         }
         
         return Response(stats)
 
 
-class PontoViewSet(viewsets.ReadOnlyModelViewSet):
+class PontoViewSet(ArquivoMixin, ExportacaoMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet para registros de ponto com filtros avançados
     
     Este endpoint permite listar e filtrar registros de ponto dos funcionários.
     
     **Filtros disponíveis:**
-    - `funcionario_nome`: Busca por nome completo do funcionário
+    - `funcionario_nome`: Busca por nome completo do funcionário (sem acentos)
     - `empresa`: Busca por nome da empresa (busca parcial)
     - `data_inicio`: Data do registro a partir de (YYYY-MM-DDTHH:MM:SS)
     - `data_fim`: Data do registro até (YYYY-MM-DDTHH:MM:SS)
     
     **Busca e Ordenação:**
-    - `search`: Busca em nome do funcionário
+    - `search`: Busca em nome do funcionário (sem acentos)
     - `ordering`: Ordenação por created_at
     
     **Exemplos de uso:**
     - `/api/relatorios/pontos/?funcionario_nome=João`
     - `/api/relatorios/pontos/?empresa=ABC&data_inicio=2024-01-01T00:00:00`
     - `/api/relatorios/pontos/?data_inicio=2024-01-01T00:00:00&data_fim=2024-01-31T23:59:59`
+    
+    **Paginação por cursor (sem OFFSET/COUNT; `count` só com `contar=true`):**
+    - `/api/relatorios/pontos/?paginacao=cursor&contar=true`
+    
+    **Exportação (CSV/XLSX em streaming, mesmos filtros):**
+    - `/api/relatorios/pontos/exportar/?formato=xlsx&empresa=ABC`
+    
+    **Registros arquivados:** listagem e exportação incluem os pontos já
+    movidos para o arquivo quando `data_inicio`/`data_fim` é anterior ao
+    último mês arquivado; as estatísticas os incluem também sem filtro de
+    data. As fotos continuam nos mesmos endereços.
     """
-    queryset = RegistroPonto.objects.select_related('funcionario__usuario', 'funcionario__empresa')
+    RELACIONADOS = ('funcionario__usuario', 'funcionario__empresa')
+    queryset = RegistroPonto.objects.select_related(*RELACIONADOS)
     serializer_class = PontoSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, BuscaFuncionarioFilter, filters.OrderingFilter]
     filterset_class = PontoFilter
-    search_fields = ['funcionario__usuario__first_name', 'funcionario__usuario__last_name']
+    search_fields = []
+    busca_funcionario = 'funcionario__'
     ordering_fields = ['created_at']
     ordering = ['-created_at']
+    pagination_class = PaginacaoRelatorios
+
+    nome_exportacao = 'pontos'
+    colunas_exportacao = [
+        Coluna('ID', 'id'),
+        Coluna('Data/hora', 'created_at'),
+        Coluna('Funcionário', 'funcionario__usuario__first_name', 'funcionario__usuario__last_name',
+               formatar=nome_completo),
+        Coluna('CPF', 'funcionario__usuario__cpf'),
+        Coluna('Empresa', 'funcionario__empresa__nome_fantasia'),
+        Coluna('Latitude', 'latitude'),
+        Coluna('Longitude', 'longitude'),
+        Coluna('IP', 'ip'),
+        Coluna('Foto', 'foto'),
+    ]
+
+    MEDIDAS_ESTATISTICAS = [Medida('total', Count, 'id')]
+
+    tabela_arquivo = 'pontos'
+    acoes_arquivo = ('list', 'exportar', 'estatisticas')
+    acoes_arquivo_sem_periodo = ('estatisticas',)
+
+    def get_queryset_arquivo(self):
+        return RegistroPontoArquivado.objects.select_related(*self.RELACIONADOS)
 
     @action(detail=False, methods=['get'])
     def estatisticas(self, request):
-        """Estatísticas dos registros de ponto"""
-        queryset = self.filter_queryset(self.get_queryset())
-        
+        """
+        Estatísticas dos registros de ponto
+
+        Agrupa por funcionário e empresa em uma consulta por tabela (quente e
+        arquivo) e deriva os totais e os rankings em memória.
+        """
+        campo_funcionario = 'funcionario__usuario__first_name'
+        campo_empresa = 'funcionario__empresa__nome_fantasia'
+        linhas = agregar_partes(
+            partes_consulta(self.filter_queryset(self.get_queryset())),
+            [campo_funcionario, campo_empresa], self.MEDIDAS_ESTATISTICAS
+        )
+
+        def ranking(campo):
+            return [
+                {campo: linha[campo], 'total': linha['total']}
+                for linha in sorted(
+                    consolidar(linhas, [campo], self.MEDIDAS_ESTATISTICAS),
+                    key=lambda linha: linha['total'], reverse=True
+                )[:10]
+            ]
+
         stats = {
-            'total': queryset.count(),
-            'por_funcionario': queryset.values('funcionario__usuario__first_name').annotate(
-                total=Count('id')
-            ).order_by('-total')[:10],
-            'por_empresa': queryset.values('funcionario__empresa__nome_fantasia').annotate(
-                total=Count('id')
-            ).order_by('-total')[:10]
+            'total': sum(linha['total'] for linha in linhas),
+            'por_funcionario': ranking(campo_funcionario),
+            'por_empresa': ranking(campo_empresa),
         }
         
         return Response(stats)
 
 
-class DashboardViewSet(viewsets.ViewSet):
+class IntervaloPontoViewSet(ExportacaoMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Intervalos trabalhados derivados dos registros de ponto
+    
+    Os pontos de cada funcionário são pareados por dia (horário de Cuiabá) em
+    entrada/saída (ver ponto/pareamento.py); pontos sem par aparecem com
+    status `sem_saida`.
+    
+    **Filtros disponíveis:**
+    - `funcionario`: ID do funcionário
+    - `funcionario_nome`: Busca por nome completo do funcionário (sem acentos)
+    - `empresa_id`: ID da empresa
+    - `data_inicio` / `data_fim`: Dia do intervalo (YYYY-MM-DD)
+    - `status`: completo, sem_saida
+    
+    **Exemplos de uso:**
+    - `/api/relatorios/intervalos/?funcionario=12&data_inicio=2024-05-01&data_fim=2024-05-31`
+    - `/api/relatorios/intervalos/?status=sem_saida&data_inicio=2024-05-01`
+    - `/api/relatorios/intervalos/folha/?empresa_id=3&data_inicio=2024-05-01&data_fim=2024-05-31`
+    """
+    queryset = IntervaloPonto.objects.select_related('funcionario__usuario')
+    serializer_class = IntervaloPontoSerializer
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_class = IntervaloPontoFilter
+    ordering_fields = ['data', 'inicio', 'segundos']
+    ordering = ['-data', '-inicio']
+    pagination_class = PaginacaoRelatorios
+
+    nome_exportacao = 'intervalos_ponto'
+    colunas_exportacao = [
+        Coluna('Data', 'data'),
+        Coluna('Funcionário', 'funcionario__usuario__first_name', 'funcionario__usuario__last_name',
+               formatar=nome_completo),
+        Coluna('CPF', 'funcionario__usuario__cpf'),
+        Coluna('Entrada', 'inicio'),
+        Coluna('Saída', 'fim'),
+        Coluna('Horas', 'segundos', formatar=duracao),
+        Coluna('Status', 'status'),
+    ]
+
+    MEDIDAS_FOLHA = [
+        Medida('intervalos', Count, 'id'),
+        Medida('sem_saida', Count, 'id', filtro=Q(status='sem_saida')),
+        Medida('segundos', Sum, 'segundos'),
+    ]
+
+    @action(detail=False, methods=['get'])
+    def folha(self, request):
+        """
+        Folha de ponto: horas por funcionário e dia, com os mesmos filtros da listagem.
+        
+        Uma consulta agrupada sobre os intervalos já pareados, paginada por
+        funcionário/dia.
+        """
+        queryset = self.filterset_class(
+            request.query_params, queryset=IntervaloPonto.objects.all(), request=request
+        ).qs
+        campos = ['funcionario_id', 'funcionario__usuario__first_name', 'funcionario__usuario__last_name', 'data']
+        linhas = queryset.order_by().values(*campos).annotate(
+            **{medida.nome: medida.expressao() for medida in self.MEDIDAS_FOLHA}
+        ).order_by('funcionario__usuario__first_name', 'funcionario__usuario__last_name', 'funcionario_id', 'data')
+
+        pagina = self.paginate_queryset(linhas)
+        resultado = [
+            {
+                'funcionario': linha['funcionario_id'],
+                'nome_funcionario': nome_completo(
+                    linha['funcionario__usuario__first_name'], linha['funcionario__usuario__last_name']
+                ),
+                'data': linha['data'],
+                'intervalos': linha['intervalos'],
+                'sem_saida': linha['sem_saida'],
+                'segundos': linha['segundos'] or 0,
+                'horas': duracao(linha['segundos']),
+            }
+            for linha in (pagina if pagina is not None else linhas)
+        ]
+        if pagina is not None:
+            return self.get_paginated_response(resultado)
+        return Response(resultado)
+
+
+class ConflitoPrestacaoViewSet(ExportacaoMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Prestações do mesmo funcionário com horários sobrepostos
+    
+    Os conflitos são refeitos a cada prestação gravada (ver
+    prestacoes/sobreposicao.py); prestações rejeitadas não contam.
+    `prestacao` é a que começa primeiro e `data` é a data dela.
+    
+    **Filtros disponíveis:**
+    - `funcionario`: ID do funcionário
+    - `funcionario_nome`: Busca por nome completo do funcionário (sem acentos)
+    - `empresa_id`: ID da empresa
+    - `data_inicio` / `data_fim`: Data do conflito (YYYY-MM-DD)
+    - `mesmo_local`: false para só conflitos entre locais diferentes
+    
+    **Exemplos de uso:**
+    - `/api/relatorios/conflitos/?data_inicio=2024-05-01&data_fim=2024-05-31`
+    - `/api/relatorios/conflitos/?empresa_id=3&mesmo_local=false`
+    """
+    queryset = ConflitoPrestacao.objects.select_related(
+        'funcionario__usuario', 'local_prestacao', 'local_conflitante'
+    )
+    serializer_class = ConflitoPrestacaoSerializer
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_class = ConflitoPrestacaoFilter
+    ordering_fields = ['data', 'inicio', 'segundos']
+    ordering = ['-data', '-inicio']
+    pagination_class = PaginacaoRelatorios
+
+    nome_exportacao = 'conflitos_prestacao'
+    colunas_exportacao = [
+        Coluna('Data', 'data'),
+        Coluna('Funcionário', 'funcionario__usuario__first_name', 'funcionario__usuario__last_name',
+               formatar=nome_completo),
+        Coluna('CPF', 'funcionario__usuario__cpf'),
+        Coluna('Local', 'local_prestacao__nome'),
+        Coluna('Local conflitante', 'local_conflitante__nome'),
+        Coluna('Início', 'inicio'),
+        Coluna('Fim', 'fim'),
+        Coluna('Sobreposição', 'segundos', formatar=duracao),
+    ]
+
+
+class DashboardViewSet(RespostaCondicionalMixin, viewsets.ViewSet):
     """
     ViewSet para dados do dashboard
     
     Este ViewSet fornece dados agregados para dashboards e relatórios.
     Todos os endpoints requerem autenticação JWT.
+    
+    As medidas de cada dashboard são declaradas abaixo e compiladas pelo
+    motor de `relatorios.agregacao` em uma única consulta por modelo. Os dados
+    de prestações vêm do resumo diário (`ResumoDiarioPrestacao`), que tem
+    poucas linhas por dia em vez de um registro por prestação.
+    
+    As respostas ficam em cache (`relatorios.cache`) até que os dados da
+    empresa/mês consultados sejam alterados. Clientes que reenviam a ETag
+    (If-None-Match) recebem 304 sem nenhuma consulta enquanto as tabelas
+    abaixo não mudarem (`relatorios.condicional`).
     """
     
+    tabelas_condicionais = [
+        'prestacoes.RegistroPrestacao',
+        'funcionarios.Funcionario',
+        'ponto.RegistroPonto',
+        'empresas.EmpresaTerceirizada',
+        'usuarios.Usuario',
+    ]
+    
+    APROVADA = Q(validacao_gestor='aprovada')
+    
+    MEDIDAS_GERAL_FUNCIONARIOS = [
+        Medida('ativos', Count, 'id', filtro=Q(ativo=True)),
+        Medida('inativos', Count, 'id', filtro=Q(ativo=False)),
+    ]
+    MEDIDAS_GERAL_PRESTACOES = [
+        Medida('aprovadas', Sum, 'total_prestacoes', filtro=APROVADA),
+        Medida('pendentes', Sum, 'total_prestacoes', filtro=Q(validacao_gestor='pendente')),
+        Medida('valor_total_aprovado', Sum, 'valor_total', filtro=APROVADA),
+        Medida('segundos_trabalhados', Sum, 'segundos_trabalhados', filtro=APROVADA),
+    ]
+    
+    # Gráficos: agrupa uma vez por (dia, status, empresa) e deriva os recortes em memória
+    CAMPOS_GRAFICOS = {
+        'data': 'data',
+        'validacao_gestor': 'validacao_gestor',
+        'funcionario__empresa__nome_fantasia': 'empresa__nome_fantasia',
+    }
+    MEDIDAS_GRAFICOS = [
+        Medida('total', Sum, 'total_prestacoes'),
+        Medida('valor_total', Sum, 'valor_total'),
+    ]
+    
     @action(detail=False, methods=['get'])
+    @em_cache(
+        Dependencia('prestacoes', empresa=True, periodo=True),
+        Dependencia('funcionarios', empresa=True),
+    )
     def geral(self, request):
         """
         Dashboard geral com estatísticas principais
@@ -260,37 +653,31 @@ class DashboardViewSet(viewsets.ViewSet):
             
             if empresa_id:
                 filtros_funcionarios['empresa_id'] = empresa_id
-                filtros_prestacoes['funcionario__empresa_id'] = empresa_id
+                filtros_prestacoes['empresa_id'] = empresa_id
             
             if data_inicio:
                 filtros_prestacoes['data__gte'] = data_inicio
             if data_fim:
                 filtros_prestacoes['data__lte'] = data_fim
             
-            # Estatísticas de funcionários
-            funcionarios_ativos = Funcionario.objects.filter(ativo=True, **filtros_funcionarios).count()
-            funcionarios_inativos = Funcionario.objects.filter(ativo=False, **filtros_funcionarios).count()
-            
-            # Estatísticas de prestações
-            prestacoes_aprovadas = RegistroPrestacao.objects.filter(
-                validacao_gestor='aprovada', **filtros_prestacoes
-            ).count()
-            
-            prestacoes_pendentes = RegistroPrestacao.objects.filter(
-                validacao_gestor='pendente', **filtros_prestacoes
-            ).count()
-            
-            # Valores totais
-            valor_total_aprovado = RegistroPrestacao.objects.filter(
-                validacao_gestor='aprovada', **filtros_prestacoes
-            ).aggregate(total=Sum('valor'))['total'] or 0
+            # Uma consulta por modelo: todas as medidas são agregações condicionais
+            funcionarios = agregar(
+                Funcionario.objects.filter(**filtros_funcionarios),
+                self.MEDIDAS_GERAL_FUNCIONARIOS
+            )
+            prestacoes = agregar(
+                ResumoDiarioPrestacao.objects.filter(
+                    validacao_gestor__in=['aprovada', 'pendente'], **filtros_prestacoes
+                ),
+                self.MEDIDAS_GERAL_PRESTACOES
+            )
             
-            # Horas totais trabalhadas
-            horas_trabalhadas = RegistroPrestacao.objects.filter(
-                validacao_gestor='aprovada', **filtros_prestacoes
-            ).aggregate(
-                total_horas=Sum('horas_trabalhadas')
-            )['total_horas'] or 0
+            funcionarios_ativos = funcionarios['ativos']
+            funcionarios_inativos = funcionarios['inativos']
+            prestacoes_aprovadas = prestacoes['aprovadas']
+            prestacoes_pendentes = prestacoes['pendentes']
+            valor_total_aprovado = prestacoes['valor_total_aprovado']
+            horas_trabalhadas = timedelta(seconds=prestacoes['segundos_trabalhados'])
             
             dados = {
                 'funcionarios': {
@@ -319,6 +706,10 @@ class DashboardViewSet(viewsets.ViewSet):
             )
 
     @action(detail=False, methods=['get'])
+    @em_cache(
+        Dependencia('prestacoes', empresa=True),
+        Dependencia('funcionarios'),
+    )
     def graficos(self, request):
         """
         Dados para gráficos do dashboard
@@ -347,28 +738,35 @@ class DashboardViewSet(viewsets.ViewSet):
             # Filtros base
             filtros_prestacoes = {}
             if empresa_id:
-                filtros_prestacoes['funcionario__empresa_id'] = empresa_id
+                filtros_prestacoes['empresa_id'] = empresa_id
+            
+            # Data limite baseada no período (data local, America/Cuiaba)
+            hoje = timezone.localdate()
+            data_limite = hoje - timedelta(days=int(periodo))
+            filtros_prestacoes['data__gte'] = data_limite
             
-            # Data limite baseada no período
-            data_limite = datetime.now() - timedelta(days=int(periodo))
-            filtros_prestacoes['data__gte'] = data_limite.date()
+            # Uma única consulta agrupada sobre as prestações do período
+            linhas = agregar_por(
+                ResumoDiarioPrestacao.objects.filter(**filtros_prestacoes),
+                self.CAMPOS_GRAFICOS,
+                self.MEDIDAS_GRAFICOS
+            )
             
             # Gráfico de prestações por status
-            status_prestacoes = RegistroPrestacao.objects.filter(
-                **filtros_prestacoes
-            ).values('validacao_gestor').annotate(
-                total=Count('id')
-            ).order_by('validacao_gestor')
+            status_prestacoes = [
+                {'validacao_gestor': linha['validacao_gestor'], 'total': linha['total']}
+                for linha in sorted(
+                    consolidar(linhas, ['validacao_gestor'], self.MEDIDAS_GRAFICOS),
+                    key=lambda linha: linha['validacao_gestor']
+                )
+            ]
             
-            # Gráfico de prestações por dia
-            prestacoes_por_dia = RegistroPrestacao.objects.filter(
-                **filtros_prestacoes
-            ).extra(
-                select={'dia': 'DATE(data)'}
-            ).values('dia').annotate(
-                total=Count('id'),
-                valor_total=Sum('valor')
-            ).order_by('dia')
+            # Gráfico de prestações por dia (dias sem prestações aparecem zerados)
+            por_dia = {linha['data']: linha for linha in consolidar(linhas, ['data'], self.MEDIDAS_GRAFICOS)}
+            prestacoes_por_dia = []
+            for dia in periodos(data_limite, max(hoje, max(por_dia, default=hoje)), 'dia'):
+                linha = por_dia.get(dia) or linha_vazia(self.MEDIDAS_GRAFICOS)
+                prestacoes_por_dia.append({'dia': dia, 'total': linha['total'], 'valor_total': linha['valor_total']})
             
             # Gráfico de funcionários por empresa
             funcionarios_por_empresa = Funcionario.objects.filter(
@@ -377,14 +775,20 @@ class DashboardViewSet(viewsets.ViewSet):
                 total=Count('id')
             ).order_by('-total')[:10]
             
-            # Gráfico de valores por empresa
-            valores_por_empresa = RegistroPrestacao.objects.filter(
-                validacao_gestor='aprovada',
-                **filtros_prestacoes
-            ).values('funcionario__empresa__nome_fantasia').annotate(
-                total_valor=Sum('valor'),
-                total_prestacoes=Count('id')
-            ).order_by('-total_valor')[:10]
+            # Gráfico de valores por empresa (apenas prestações aprovadas)
+            valores_por_empresa = [
+                {
+                    'funcionario__empresa__nome_fantasia': linha['funcionario__empresa__nome_fantasia'],
+                    'total_valor': linha['valor_total'],
+                    'total_prestacoes': linha['total'],
+                }
+                for linha in consolidar(
+                    linhas, ['funcionario__empresa__nome_fantasia'], self.MEDIDAS_GRAFICOS,
+                    condicao=lambda linha: linha['validacao_gestor'] == 'aprovada'
+                )
+            ]
+            valores_por_empresa.sort(key=lambda linha: linha['total_valor'], reverse=True)
+            valores_por_empresa = valores_por_empresa[:10]
             
             dados = {
                 'status_prestacoes': list(status_prestacoes),
@@ -403,6 +807,7 @@ class DashboardViewSet(viewsets.ViewSet):
             )
 
     @action(detail=False, methods=['get'])
+    @em_cache(Dependencia('prestacoes', empresa=True, periodo=True))
     def financeiro(self, request):
         """
         Relatório financeiro detalhado
@@ -415,7 +820,7 @@ class DashboardViewSet(viewsets.ViewSet):
         - `empresa_id`: ID da empresa (integer)
         
         **Resposta:**
-        - resumo: Dados agregados (total prestações, valor total, valor médio, horas totais)
+        - resumo: Dados agregados (total prestações, valor total, valor médio, horas totais, valor por hora)
         - por_empresa: Dados agrupados por empresa
         - por_funcionario: Dados agrupados por funcionário (top 20)
         
@@ -425,67 +830,200 @@ class DashboardViewSet(viewsets.ViewSet):
         - `/api/relatorios/dashboard/financeiro/?empresa_id=1&data_inicio=2024-01-01`
         """
         try:
-            data_inicio = request.query_params.get('data_inicio')
-            data_fim = request.query_params.get('data_fim')
-            empresa_id = request.query_params.get('empresa_id')
-            
-            # Filtros
-            filtros = {'validacao_gestor': 'aprovada'}
-            if data_inicio:
-                filtros['data__gte'] = data_inicio
-            if data_fim:
-                filtros['data__lte'] = data_fim
-            if empresa_id:
-                filtros['funcionario__empresa_id'] = empresa_id
-            
-            # Dados agregados
-            dados_agregados = RegistroPrestacao.objects.filter(
-                **filtros
-            ).aggregate(
-                total_prestacoes=Count('id'),
-                valor_total=Sum('valor'),
-                valor_medio=Avg('valor'),
-                horas_totais=Sum('horas_trabalhadas')
+            dados = relatorio_financeiro(
+                data_inicio=request.query_params.get('data_inicio'),
+                data_fim=request.query_params.get('data_fim'),
+                empresa_id=request.query_params.get('empresa_id'),
             )
-            
-            # Dados por empresa
-            por_empresa = RegistroPrestacao.objects.filter(
-                **filtros
-            ).values('funcionario__empresa__nome_fantasia').annotate(
-                total_prestacoes=Count('id'),
-                valor_total=Sum('valor'),
-                valor_medio=Avg('valor')
-            ).order_by('-valor_total')
-            
-            # Dados por funcionário
-            por_funcionario = RegistroPrestacao.objects.filter(
-                **filtros
-            ).values(
-                'funcionario__usuario__first_name',
-                'funcionario__usuario__last_name',
-                'funcionario__empresa__nome_fantasia'
-            ).annotate(
-                total_prestacoes=Count('id'),
-                valor_total=Sum('valor'),
-                valor_medio=Avg('valor')
-            ).order_by('-valor_total')[:20]
-            
-            dados = {
-                'resumo': {
-                    'total_prestacoes': dados_agregados['total_prestacoes'] or 0,
-                    'valor_total': float(dados_agregados['valor_total'] or 0),
-                    'valor_medio': float(dados_agregados['valor_medio'] or 0),
-                    'horas_totais': str(dados_agregados['horas_totais'] or 0)
-                },
-                'por_empresa': list(por_empresa),
-                'por_funcionario': list(por_funcionario)
-            }
-            
-            serializer = RelatorioFinanceiroSerializer(dados)
-            return Response(serializer.data)
+            return Response(dados)
             
         except Exception as e:
             return Response(
                 {'error': str(e)}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
+
+    # Séries temporais: fonte -> (modelo, campo de data, lookup da empresa, medidas disponíveis)
+    SERIES = {
+        'prestacoes': (ResumoDiarioPrestacao, 'data', 'empresa_id', [
+            Medida('total', Sum, 'total_prestacoes'),
+            Medida('aprovadas', Sum, 'total_prestacoes', filtro=APROVADA),
+            Medida('pendentes', Sum, 'total_prestacoes', filtro=Q(validacao_gestor='pendente')),
+            Medida('rejeitadas', Sum, 'total_prestacoes', filtro=Q(validacao_gestor='rejeitada')),
+            Medida('valor_total', Sum, 'valor_total'),
+            Medida('valor_aprovado', Sum, 'valor_total', filtro=APROVADA),
+            Medida('segundos_trabalhados', Sum, 'segundos_trabalhados'),
+            Razao('valor_medio', 'valor_total', 'total'),
+        ]),
+        'pontos': (RegistroPonto, 'created_at', 'funcionario__empresa_id', [
+            Medida('total', Count, 'id'),
+            Medida('funcionarios', Count, 'funcionario', distinto=True),
+        ]),
+    }
+    # Fontes com registros arquivados: fonte -> (modelo do arquivo, tabela em arquivo.MesArquivado)
+    # O resumo diário das prestações já soma o arquivo
+    SERIES_ARQUIVO = {
+        'pontos': (RegistroPontoArquivado, 'pontos'),
+    }
+    # Quantidade de períodos exibidos quando data_inicio não é informada
+    JANELA_SERIE = {'dia': 30, 'semana': 12, 'mes': 12}
+
+    @action(detail=False, methods=['get'])
+    @em_cache(
+        Dependencia('prestacoes', empresa=True, periodo=True),
+        Dependencia('pontos', empresa=True, periodo=True),
+    )
+    def serie_temporal(self, request):
+        """
+        Série temporal de prestações ou pontos
+
+        Agrupa no banco por dia, semana ISO ou mês (horário local de Cuiabá) e
+        devolve um ponto por período, inclusive os períodos sem registros.
+        
+        **Parâmetros:**
+        - `fonte`: prestacoes (padrão) ou pontos
+        - `granularidade`: dia (padrão), semana ou mes
+        - `medidas`: lista separada por vírgula (padrão: todas da fonte)
+          - prestacoes: total, aprovadas, pendentes, rejeitadas, valor_total,
+            valor_aprovado, segundos_trabalhados, valor_medio
+          - pontos: total, funcionarios
+        - `data_inicio` / `data_fim`: YYYY-MM-DD (padrão: últimos 30 dias, 12 semanas ou 12 meses)
+        - `empresa_id`: ID da empresa (integer)
+
+        Pontos já arquivados entram na série quando `data_inicio` é anterior ao
+        limite arquivado; as prestações vêm do resumo diário, que soma o arquivo.
+        
+        **Exemplos de uso:**
+        - `/api/relatorios/dashboard/serie_temporal/?granularidade=mes&medidas=total,valor_aprovado`
+        - `/api/relatorios/dashboard/serie_temporal/?fonte=pontos&granularidade=semana&empresa_id=1`
+        """
+        params = request.query_params
+        fonte = params.get('fonte', 'prestacoes')
+        granularidade = params.get('granularidade', 'dia')
+        if fonte not in self.SERIES:
+            return Response(
+                {'detail': f"Fonte inválida. Use: {', '.join(self.SERIES)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if granularidade not in GRANULARIDADES:
+            return Response(
+                {'detail': f"Granularidade inválida. Use: {', '.join(GRANULARIDADES)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        model, campo, campo_empresa, medidas = self.SERIES[fonte]
+        disponiveis = {medida.nome: medida for medida in medidas}
+        nomes = [nome.strip() for nome in params.get('medidas', '').split(',') if nome.strip()] or list(disponiveis)
+        invalidas = [nome for nome in nomes if nome not in disponiveis]
+        if invalidas:
+            return Response(
+                {'detail': f"Medidas inválidas: {', '.join(invalidas)}. Use: {', '.join(disponiveis)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            data_fim = date.fromisoformat(params['data_fim']) if params.get('data_fim') else timezone.localdate()
+            data_inicio = (
+                date.fromisoformat(params['data_inicio']) if params.get('data_inicio')
+                else inicio_padrao(data_fim, granularidade, self.JANELA_SERIE[granularidade])
+            )
+        except ValueError:
+            return Response({'detail': 'Datas devem estar no formato YYYY-MM-DD.'}, status=status.HTTP_400_BAD_REQUEST)
+        if data_inicio > data_fim:
+            return Response(
+                {'detail': 'data_inicio deve ser anterior ou igual a data_fim.'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if contar_periodos(data_inicio, data_fim, granularidade) > MAX_PERIODOS:
+            return Response(
+                {'detail': f'Intervalo longo demais: máximo de {MAX_PERIODOS} períodos.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        empresa_id = params.get('empresa_id')
+        if empresa_id and not empresa_id.isdigit():
+            return Response({'detail': 'empresa_id deve ser um número inteiro.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Razões precisam das medidas usadas no cálculo
+        necessarias = set(nomes)
+        for nome in nomes:
+            if isinstance(disponiveis[nome], Razao):
+                necessarias.update({disponiveis[nome].numerador, disponiveis[nome].denominador})
+        selecionadas = [medida for medida in medidas if medida.nome in necessarias]
+
+        queryset = model.objects.all()
+        if fonte in self.SERIES_ARQUIVO:
+            arquivado, tabela = self.SERIES_ARQUIVO[fonte]
+            limite = limite_arquivado(tabela)
+            if limite is not None and data_inicio < limite:
+                queryset = ConsultaComArquivo([queryset, arquivado.objects.all()])
+        if empresa_id:
+            queryset = queryset.filter(**{campo_empresa: int(empresa_id)})
+
+        linhas = serie_temporal(queryset, campo, granularidade, selecionadas, data_inicio, data_fim)
+        return Response({
+            'fonte': fonte,
+            'granularidade': granularidade,
+            'data_inicio': data_inicio,
+            'data_fim': data_fim,
+            'medidas': nomes,
+            'series': [
+                {'periodo': linha['periodo'], **{nome: linha[nome] for nome in nomes}}
+                for linha in linhas
+            ],
+        })
+
+
+class TarefaRelatorioViewSet(mixins.CreateModelMixin,
+                             mixins.ListModelMixin,
+                             mixins.RetrieveModelMixin,
+                             viewsets.GenericViewSet):
+    """
+    Relatórios em segundo plano
+
+    Relatórios longos (ex.: financeiro de um ano inteiro) são enfileirados e
+    processados pelo comando `processar_tarefas_relatorio`, sem ocupar um
+    worker do uWSGI durante o cálculo.
+
+    **Fluxo:**
+    1. `POST /api/relatorios/tarefas/` com `{"tipo": "financeiro", "parametros": {...}}`
+       → 202 com o `id` da tarefa (pedidos idênticos em andamento devolvem a mesma tarefa)
+    2. `GET /api/relatorios/tarefas/{id}/` → `status` e `progresso` (0-100)
+    3. `GET /api/relatorios/tarefas/{id}/resultado/` quando `status` = concluida
+
+    **Tipos disponíveis:**
+    - `financeiro`: parâmetros `data_inicio`, `data_fim`, `empresa_id` (mesma resposta de dashboard/financeiro)
+
+    Os resultados ficam disponíveis até `expira_em`.
+    """
+    queryset = TarefaRelatorio.objects.all()
+    serializer_class = TarefaRelatorioSerializer
+    filterset_fields = ['status', 'tipo']
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.user.is_staff:
+            return queryset
+        return queryset.filter(solicitado_por_id=self.request.user.pk)
+
+    def create(self, request, *args, **kwargs):
+        serializer = SolicitacaoTarefaSerializer(data=request.data, context={'geradores': GERADORES})
+        serializer.is_valid(raise_exception=True)
+        tarefa, _ = solicitar(
+            serializer.validated_data['tipo'], serializer.validated_data['parametros'], request.user
+        )
+        dados = self.get_serializer(tarefa).data
+        return Response(dados, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'])
+    def resultado(self, request, pk=None):
+        """Resultado (JSON) de uma tarefa concluída"""
+        tarefa = self.get_object()
+        if tarefa.status != 'concluida':
+            return Response(
+                {'detail': 'Tarefa ainda não concluída.', 'status': tarefa.status, 'progresso': tarefa.progresso},
+                status=status.HTTP_409_CONFLICT
+            )
+        try:
+            arquivo = open(caminho_resultado(tarefa), 'rb')
+        except FileNotFoundError:
+            return Response({'detail': 'Resultado expirado.'}, status=status.HTTP_410_GONE)
+        return FileResponse(arquivo, content_type='application/json')
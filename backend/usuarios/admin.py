@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import Usuario
+from .models import TokenRevogado, Usuario
 
 
 @admin.register(Usuario)
@@ -37,3 +37,19 @@ class UsuarioAdmin(UserAdmin):
     )
     
     readonly_fields = ('date_joined', 'last_login', 'created_at', 'updated_at')
+
+
+@admin.register(TokenRevogado)
+class TokenRevogadoAdmin(admin.ModelAdmin):
+    """Tokens JWT revogados (logout e rotação); só leitura"""
+
+    list_display = ('jti', 'tipo', 'usuario', 'revogado_em', 'expira_em')
+    list_filter = ('tipo',)
+    search_fields = ('jti', 'usuario__username')
+    raw_id_fields = ('usuario',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class UsuariosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'usuarios'
\ No newline at end of file
+    name = 'usuarios'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,97 @@
+# usuarios/autenticacao.py
+"""
+Autenticação JWT sem consulta ao banco por requisição
+
+JWTStatelessAuthentication valida o access token e devolve um
+UsuarioDoToken: `id`/`pk` e `is_staff` saem dos claims (usuarios.tokens) e o
+Usuario só é carregado, pelo cache do processo (usuarios.cache), quando a
+view precisa de outro atributo ou da instância (FK, filtros, serializers).
+Os demais claims de escopo ficam em `request.auth` (ex.:
+request.auth['empresa_id']).
+
+Como no JWTAuthentication, o token não é consultado no banco: um usuário
+desativado perde o acesso no próximo refresh, que é recusado (ver
+usuarios.tokens). Tokens revogados no logout são recusados pela lista em
+memória de usuarios.revogacao, também sem consulta. Tokens emitidos sem os
+claims de escopo continuam aceitos; nesse caso o usuário é carregado na
+autenticação.
+"""
+from django.utils.functional import SimpleLazyObject
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from . import cache
+from .revogacao import revogado
+from .tokens import CLAIMS_ESCOPO
+
+
+def carregar_usuario(usuario_id):
+    usuario = cache.obter(usuario_id)
+    if usuario is None:
+        raise AuthenticationFailed('Usuário não encontrado.', code='user_not_found')
+    if not usuario.is_active:
+        raise AuthenticationFailed('Usuário inativo.', code='user_inactive')
+    return usuario
+
+
+class UsuarioDoToken(SimpleLazyObject):
+    """request.user resolvido sob demanda; id, pk e is_staff vêm do token"""
+
+    def __init__(self, usuario_id, is_staff):
+        super().__init__(lambda: carregar_usuario(usuario_id))
+        # Direto no __dict__: LazyObject repassa os demais atributos ao usuário
+        self.__dict__['_usuario_id'] = usuario_id
+        self.__dict__['_is_staff'] = is_staff
+
+    @property
+    def pk(self):
+        return self._usuario_id
+
+    id = pk
+
+    @property
+    def is_staff(self):
+        return self._is_staff
+
+    @property
+    def is_active(self):
+        return True
+
+    @property
+    def is_authenticated(self):
+        return True
+
+    @property
+    def is_anonymous(self):
+        return False
+
+    def __bool__(self):
+        return True
+
+
+class JWTStatelessAuthentication(JWTAuthentication):
+    """JWTAuthentication que não lê o Usuario do banco a cada requisição"""
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        if revogado(token[api_settings.JTI_CLAIM]):
+            raise InvalidToken('Token revogado.')
+        return token
+
+    def get_user(self, validated_token):
+        try:
+            usuario_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('O token não identifica o usuário.')
+
+        if not all(claim in validated_token for claim in CLAIMS_ESCOPO):
+            return carregar_usuario(usuario_id)
+        return UsuarioDoToken(usuario_id, validated_token['is_staff'])
+
+
+class JWTStatelessScheme(SimpleJWTScheme):
+    """Mesmo esquema Bearer do JWTAuthentication na documentação (drf-spectacular)"""
+    target_class = JWTStatelessAuthentication
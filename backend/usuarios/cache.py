@@ -0,0 +1,65 @@
+# usuarios/cache.py
+"""
+Cache de usuários em memória, por processo
+
+Guarda o Usuario (com `funcionario` e `gestor` já carregados) por
+USUARIOS_CACHE_SEGUNDOS, para a resolução sob demanda do request.user em
+usuarios.autenticacao. Salvar ou remover Usuario, Funcionario ou Gestor
+invalida a entrada no processo que fez a alteração (usuarios.signals); nos
+demais workers a entrada vence pelo prazo.
+
+Cada chamada devolve uma cópia: a view pode alterar e salvar o usuário sem
+mexer na instância guardada.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .models import Usuario
+
+DURACAO = getattr(settings, 'USUARIOS_CACHE_SEGUNDOS', 60)
+TAMANHO_MAXIMO = getattr(settings, 'USUARIOS_CACHE_MAXIMO', 2000)
+
+_usuarios = OrderedDict()
+_trava = threading.Lock()
+_invalidacoes = 0
+
+
+def obter(usuario_id):
+    """Usuario do cache ou do banco (uma consulta); None se não existir"""
+    agora = time.monotonic()
+    with _trava:
+        item = _usuarios.get(usuario_id)
+        if item is not None and item[0] > agora:
+            _usuarios.move_to_end(usuario_id)
+            return copy.copy(item[1])
+        invalidacoes = _invalidacoes
+
+    usuario = Usuario.objects.select_related('funcionario', 'gestor').filter(pk=usuario_id).first()
+    if usuario is None:
+        return None
+    with _trava:
+        # Invalidado durante a leitura: a instância pode já estar desatualizada
+        if invalidacoes == _invalidacoes:
+            _usuarios[usuario_id] = (agora + DURACAO, usuario)
+            _usuarios.move_to_end(usuario_id)
+            while len(_usuarios) > TAMANHO_MAXIMO:
+                _usuarios.popitem(last=False)
+    return copy.copy(usuario)
+
+
+def invalidar(usuario_id):
+    global _invalidacoes
+    with _trava:
+        _usuarios.pop(usuario_id, None)
+        _invalidacoes += 1
+
+
+def limpar():
+    global _invalidacoes
+    with _trava:
+        _usuarios.clear()
+        _invalidacoes += 1
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from usuarios.revogacao import limpar_expirados
+
+
+class Command(BaseCommand):
+    help = 'Remove da lista de revogação (TokenRevogado) os tokens que já expiraram (agendar no cron)'
+
+    def handle(self, *args, **options):
+        removidos = limpar_expirados()
+        self.stdout.write(self.style.SUCCESS(f'{removidos} tokens revogados expirados removidos.'))
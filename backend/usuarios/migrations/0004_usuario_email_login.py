@@ -0,0 +1,67 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:30
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+import usuarios.models
+
+
+def normalizar_email(email):
+    """Cópia de usuarios.models.normalizar_email na data desta migração"""
+    email = (email or '').strip().lower()
+    return email or None
+
+
+def preencher_email_login(apps, schema_editor):
+    """Preenche email_login; recusa a migração se dois usuários têm o mesmo email normalizado"""
+    Usuario = apps.get_model('usuarios', 'Usuario')
+    por_email = defaultdict(list)
+    for usuario_id, email in Usuario.objects.values_list('id', 'email').iterator(chunk_size=2000):
+        email_login = normalizar_email(email)
+        if email_login:
+            por_email[email_login].append(usuario_id)
+
+    duplicados = {email: ids for email, ids in por_email.items() if len(ids) > 1}
+    if duplicados:
+        linhas = '\n'.join(f'  {email}: usuários {ids}' for email, ids in sorted(duplicados.items()))
+        raise RuntimeError(
+            'Emails repetidos (sem diferenciar maiúsculas) impedem o índice único de email_login. '
+            f'Corrija os emails destes usuários e rode a migração de novo:\n{linhas}'
+        )
+
+    lote = []
+    for email_login, (usuario_id,) in por_email.items():
+        lote.append(Usuario(id=usuario_id, email_login=email_login))
+        if len(lote) >= 2000:
+            Usuario.objects.bulk_update(lote, ['email_login'])
+            lote = []
+    if lote:
+        Usuario.objects.bulk_update(lote, ['email_login'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0003_token_revogado'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='usuario',
+            managers=[
+                ('objects', usuarios.models.UsuarioManager()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='usuario',
+            name='email_login',
+            field=models.CharField(blank=True, editable=False, max_length=254, null=True),
+        ),
+        migrations.RunPython(preencher_email_login, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='usuario',
+            name='email_login',
+            field=models.CharField(blank=True, editable=False, help_text='Email normalizado (normalizar_email) usado no login; preenchido ao salvar', max_length=254, null=True, unique=True),
+        ),
+    ]
@@ -1,9 +1,35 @@
 # usuarios/models.py
 from django.db import models
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
+from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
 
 
+def normalizar_email(email):
+    """Email de login: sem espaços nas pontas e em minúsculas; None se vazio"""
+    email = (email or '').strip().lower()
+    return email or None
+
+
+class UsuarioManager(UserManager):
+
+    def username_por_email(self, email):
+        """Username da conta com este email (busca pelo índice de email_login); None se não houver"""
+        email_login = normalizar_email(email)
+        if email_login is None:
+            return None
+        return self.filter(email_login=email_login).values_list('username', flat=True).first()
+
+    def simular_verificacao_senha(self, senha):
+        """
+        Gasta o mesmo hash de uma verificação de senha
+
+        Para recusar uma conta inexistente sem responder mais rápido que uma
+        senha errada (o mesmo que o ModelBackend faz para username inexistente).
+        """
+        self.model().set_password(senha)
+
+
 class Usuario(AbstractUser):
     """Extensão do modelo User padrão"""
     cpf = models.CharField(
@@ -12,9 +38,60 @@ class Usuario(AbstractUser):
         validators=[RegexValidator(r'^\d{3}\.\d{3}\.\d{3}-\d{2}$', 'CPF deve estar no formato XXX.XXX.XXX-XX')]
     )
     telefone = models.CharField(max_length=15, blank=True)
+    email_login = models.CharField(
+        max_length=254,
+        unique=True,
+        blank=True,
+        null=True,
+        editable=False,
+        help_text="Email normalizado (normalizar_email) usado no login; preenchido ao salvar"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = UsuarioManager()
+
     class Meta:
         verbose_name = 'Usuário'
         verbose_name_plural = 'Usuários'
+
+    def clean(self):
+        super().clean()
+        email_login = normalizar_email(self.email)
+        if email_login and Usuario.objects.filter(email_login=email_login).exclude(pk=self.pk).exists():
+            raise ValidationError({'email': 'Já existe um usuário com este email.'})
+
+    def save(self, *args, **kwargs):
+        self.email_login = normalizar_email(self.email)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'email' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'email_login'}
+        super().save(*args, **kwargs)
+
+
+class TokenRevogado(models.Model):
+    """
+    Token JWT revogado (logout ou rotação do refresh token)
+
+    Consultado pela lista em memória de usuarios.revogacao; as linhas de
+    tokens já expirados são removidas pelo comando `limpar_tokens_revogados`.
+    """
+    jti = models.CharField(max_length=255, unique=True)
+    tipo = models.CharField(max_length=20, help_text="access ou refresh")
+    usuario = models.ForeignKey(
+        Usuario,
+        on_delete=models.CASCADE,
+        related_name='tokens_revogados',
+        blank=True,
+        null=True
+    )
+    expira_em = models.DateTimeField(db_index=True)
+    revogado_em = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'Token Revogado'
+        verbose_name_plural = 'Tokens Revogados'
+        ordering = ['-revogado_em']
+
+    def __str__(self):
+        return f"{self.tipo} {self.jti}"
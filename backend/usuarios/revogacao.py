@@ -0,0 +1,109 @@
+# usuarios/revogacao.py
+"""
+Revogação de tokens JWT (logout e rotação do refresh token)
+
+Os `jti` revogados ficam na tabela TokenRevogado até o token expirar. Cada
+processo mantém uma cópia compacta da lista: um array ordenado com um hash
+de 64 bits de cada `jti` (8 bytes por token), consultado por busca binária.
+Verificar um token custa microssegundos e nenhuma consulta; só um `jti`
+encontrado no array é confirmado no banco (colisão de hash).
+
+O array é atualizado de forma incremental a cada
+REVOGACAO_ATUALIZACAO_SEGUNDOS (padrão 5): lê só as revogações desde a
+última leitura, com uma margem para transações que gravaram depois. Uma
+recarga completa a cada REVOGACAO_RECARGA_SEGUNDOS (padrão 3600) descarta
+os tokens já expirados. O processo que revoga vê a revogação na hora; os
+demais, na próxima atualização.
+"""
+import hashlib
+import heapq
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .models import TokenRevogado
+
+INTERVALO_ATUALIZACAO = getattr(settings, 'REVOGACAO_ATUALIZACAO_SEGUNDOS', 5)
+INTERVALO_RECARGA = getattr(settings, 'REVOGACAO_RECARGA_SEGUNDOS', 3600)
+# Revogações gravadas por transações que terminaram depois da última leitura
+MARGEM_LEITURA = timedelta(seconds=60)
+
+
+def _hash(jti):
+    return int.from_bytes(hashlib.blake2b(str(jti).encode(), digest_size=8).digest(), 'big')
+
+
+class _ListaRevogados:
+    """Hashes ordenados dos jti revogados; o array é trocado inteiro (cópia na escrita)"""
+
+    def __init__(self):
+        self.hashes = array('Q')
+        self.lido_ate = None
+        self.proxima_atualizacao = 0
+        self.proxima_recarga = 0
+        self.trava = threading.Lock()
+
+    def contem(self, valor):
+        hashes = self.hashes
+        posicao = bisect_left(hashes, valor)
+        return posicao < len(hashes) and hashes[posicao] == valor
+
+    def adicionar(self, valores):
+        novos = sorted({valor for valor in valores if not self.contem(valor)})
+        if novos:
+            self.hashes = array('Q', heapq.merge(self.hashes, novos))
+
+    def atualizar(self):
+        agora = time.monotonic()
+        if agora < self.proxima_atualizacao:
+            return
+        with self.trava:
+            if agora < self.proxima_atualizacao:
+                return
+            lido_ate = timezone.now()
+            if agora >= self.proxima_recarga:
+                jtis = TokenRevogado.objects.filter(expira_em__gt=lido_ate).values_list('jti', flat=True)
+                self.hashes = array('Q', sorted({_hash(jti) for jti in jtis.iterator()}))
+                self.proxima_recarga = agora + INTERVALO_RECARGA
+            else:
+                jtis = TokenRevogado.objects.filter(revogado_em__gte=self.lido_ate - MARGEM_LEITURA)
+                self.adicionar(_hash(jti) for jti in jtis.values_list('jti', flat=True))
+            self.lido_ate = lido_ate
+            self.proxima_atualizacao = agora + INTERVALO_ATUALIZACAO
+
+
+_lista = _ListaRevogados()
+
+
+def revogado(jti):
+    """O token de `jti` foi revogado?"""
+    _lista.atualizar()
+    if not _lista.contem(_hash(jti)):
+        return False
+    return TokenRevogado.objects.filter(jti=jti).exists()
+
+
+def revogar(token):
+    """Revoga um token do SimpleJWT (access ou refresh) até a expiração dele"""
+    jti = token[api_settings.JTI_CLAIM]
+    TokenRevogado.objects.get_or_create(jti=jti, defaults={
+        'tipo': token.get(api_settings.TOKEN_TYPE_CLAIM, ''),
+        'usuario_id': token.get(api_settings.USER_ID_CLAIM),
+        'expira_em': datetime_from_epoch(token['exp']),
+    })
+    with _lista.trava:
+        _lista.adicionar([_hash(jti)])
+
+
+def limpar_expirados():
+    """Remove os tokens revogados que já expiraram; devolve quantos"""
+    expirados = TokenRevogado.objects.filter(expira_em__lte=timezone.now())
+    # Sem Collector: nada depende das linhas e não há sinais por linha a enviar
+    return expirados._raw_delete(expirados.db)
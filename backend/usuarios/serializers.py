@@ -1,8 +1,9 @@
-from rest_framework import serializers
+from rest_framework import exceptions, serializers
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
-from .models import Usuario
+from .models import Usuario, normalizar_email
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from .tokens import RefreshTokenComEscopo
 
 
 class UsuarioSerializer(serializers.ModelSerializer):
@@ -43,8 +44,9 @@ class UsuarioCreateSerializer(serializers.ModelSerializer):
         return value
     
     def validate_email(self, value):
-        """Validação do email"""
-        if Usuario.objects.filter(email=value).exists():
+        """Validação do email (sem diferenciar maiúsculas)"""
+        email_login = normalizar_email(value)
+        if email_login and Usuario.objects.filter(email_login=email_login).exists():
             raise serializers.ValidationError("Já existe um usuário com este email.")
         return value
     
@@ -52,10 +54,8 @@ class UsuarioCreateSerializer(serializers.ModelSerializer):
         """Criação do usuário"""
         validated_data.pop('password_confirm')
         password = validated_data.pop('password')
-        usuario = Usuario.objects.create_user(**validated_data)
-        usuario.set_password(password)
-        usuario.save()
-        return usuario
+        # create_user já faz o hash: um único INSERT, sem set_password + save
+        return Usuario.objects.create_user(password=password, **validated_data)
 
 
 class UsuarioUpdateSerializer(serializers.ModelSerializer):
@@ -75,8 +75,11 @@ class UsuarioUpdateSerializer(serializers.ModelSerializer):
         return value
     
     def validate_email(self, value):
-        """Validação do email na atualização"""
-        if self.instance and Usuario.objects.filter(email=value).exclude(pk=self.instance.pk).exists():
+        """Validação do email na atualização (sem diferenciar maiúsculas)"""
+        email_login = normalizar_email(value)
+        if self.instance and email_login and Usuario.objects.filter(
+            email_login=email_login
+        ).exclude(pk=self.instance.pk).exists():
             raise serializers.ValidationError("Já existe um usuário com este email.")
         return value
 
@@ -103,6 +106,7 @@ class UsuarioPasswordSerializer(serializers.Serializer):
 
 class EmailOrUsernameTokenObtainPairSerializer(TokenObtainPairSerializer):
     """Permite autenticar usando username OU email no endpoint de token."""
+    token_class = RefreshTokenComEscopo
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -117,11 +121,13 @@ class EmailOrUsernameTokenObtainPairSerializer(TokenObtainPairSerializer):
 
         # Se email foi enviado e username não, resolve o username pelo email
         if email and not username:
-            try:
-                user = Usuario.objects.get(email=email)
-                attrs[self.username_field] = getattr(user, self.username_field)
-            except Usuario.DoesNotExist:
-                # Mantém fluxo padrão que resultará em credenciais inválidas
-                attrs[self.username_field] = ''
+            username = Usuario.objects.username_por_email(email)
+            if username is None:
+                # Email sem conta: recusa sem autenticar, no mesmo tempo de uma senha errada
+                Usuario.objects.simular_verificacao_senha(attrs.get('password'))
+                raise exceptions.AuthenticationFailed(
+                    self.error_messages['no_active_account'], 'no_active_account'
+                )
+            attrs[self.username_field] = username
 
         return super().validate(attrs)
@@ -0,0 +1,25 @@
+# usuarios/signals.py
+"""
+Invalidação do cache de usuários (usuarios.cache)
+
+Conectados em UsuariosConfig.ready().
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import cache
+from .models import Usuario
+
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def invalidar_usuario(sender, instance, **kwargs):
+    cache.invalidar(instance.pk)
+
+
+@receiver(post_save, sender='funcionarios.Funcionario')
+@receiver(post_delete, sender='funcionarios.Funcionario')
+@receiver(post_save, sender='empresas.Gestor')
+@receiver(post_delete, sender='empresas.Gestor')
+def invalidar_usuario_relacionado(sender, instance, **kwargs):
+    cache.invalidar(instance.usuario_id)
@@ -1,3 +1,168 @@
+from unittest import mock
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
 from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from prestacoes.tests import criar_usuario, montar_cenario
+from .autenticacao import JWTStatelessAuthentication
+from . import revogacao
+from .models import TokenRevogado, Usuario
+from .tokens import RefreshTokenComEscopo
+
+
+class TokensJwtTests(TestCase):
+
+    def setUp(self):
+        self.cenario = montar_cenario()
+        self.usuario = self.cenario.funcionario.usuario
+        self.refresh = RefreshTokenComEscopo.for_user(self.usuario)
+        self.api = APIClient()
+
+    def _me(self, access):
+        self.api.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        resposta = self.api.get('/api/auth/me/')
+        self.api.credentials()
+        return resposta
+
+    def _renovar(self, refresh, url='/api/auth/token/refresh/'):
+        return self.api.post(url, {'refresh': str(refresh)}, format='json')
+
+    def test_access_leva_o_escopo_do_usuario(self):
+        access = self.refresh.access_token
+        self.assertEqual(access['funcionario_id'], self.cenario.funcionario.pk)
+        self.assertEqual(access['empresa_id'], self.cenario.empresa.pk)
+        self.assertFalse(access['is_staff'])
+        self.assertEqual(self._me(access).status_code, 200)
+
+    def test_autenticacao_nao_consulta_o_usuario(self):
+        autenticacao = JWTStatelessAuthentication()
+        token = autenticacao.get_validated_token(str(self.refresh.access_token).encode())
+        with self.assertNumQueries(0):
+            usuario = autenticacao.get_user(token)
+            self.assertEqual((usuario.pk, usuario.is_staff), (self.usuario.pk, False))
+        # Qualquer outro atributo carrega o Usuario
+        self.assertEqual(usuario.username, self.usuario.username)
+
+    def test_logout_revoga_access_e_refresh(self):
+        access = str(self.refresh.access_token)
+        self.api.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        resposta = self.api.post('/api/auth/logout/', {'refresh': str(self.refresh)}, format='json')
+        self.api.credentials()
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(TokenRevogado.objects.count(), 2)
+
+        self.assertEqual(self._me(access).status_code, 401)
+        self.assertEqual(self._renovar(self.refresh).status_code, 401)
+        verificacao = self.api.post('/api/auth/token/verify/', {'token': access}, format='json')
+        self.assertEqual(verificacao.status_code, 401)
+
+    def test_logout_recusa_refresh_de_outro_usuario(self):
+        outro = RefreshTokenComEscopo.for_user(criar_usuario())
+        self.api.credentials(HTTP_AUTHORIZATION=f'Bearer {self.refresh.access_token}')
+        resposta = self.api.post('/api/auth/logout/', {'refresh': str(outro)}, format='json')
+        self.assertEqual(resposta.status_code, 400)
+        self.assertFalse(TokenRevogado.objects.exists())
+
+    def test_rotacao_revoga_o_refresh_usado(self):
+        for url in ('/api/auth/token/refresh/', '/api/auth/refresh-token/'):
+            refresh = RefreshTokenComEscopo.for_user(self.usuario)
+            resposta = self._renovar(refresh, url)
+            self.assertEqual(resposta.status_code, 200, url)
+            self.assertNotEqual(resposta.data['refresh'], str(refresh))
+            self.assertEqual(self._me(resposta.data['access']).status_code, 200)
+            # O refresh antigo não pode ser reutilizado; o novo sim
+            self.assertEqual(self._renovar(refresh, url).status_code, 401, url)
+            self.assertEqual(self._renovar(resposta.data['refresh'], url).status_code, 200, url)
+
+    def test_refresh_de_usuario_inativo_e_recusado(self):
+        self.usuario.is_active = False
+        self.usuario.save()
+        self.assertEqual(self._renovar(self.refresh).status_code, 401)
+
+    def test_refresh_atualiza_o_escopo(self):
+        self.usuario.is_staff = True
+        self.usuario.save()
+        resposta = self._renovar(self.refresh)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertTrue(AccessToken(resposta.data['access'])['is_staff'])
+
+
+class ListaRevogadosTests(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(revogacao, '_lista', revogacao._ListaRevogados())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.usuario = montar_cenario().funcionario.usuario
+
+    def _revogar_em_outro_processo(self, token):
+        # Só a linha no banco, como faria o logout em outro worker
+        TokenRevogado.objects.create(
+            jti=token['jti'], tipo='access', usuario_id=self.usuario.pk,
+            expira_em=datetime_from_epoch(token['exp']),
+        )
+
+    def test_atualizacao_incremental_ve_revogacoes_de_outros_processos(self):
+        token = RefreshTokenComEscopo.for_user(self.usuario).access_token
+        self.assertFalse(revogacao.revogado(token['jti']))
+
+        self._revogar_em_outro_processo(token)
+        # Dentro do intervalo a lista local ainda não sabe; depois dele, sim
+        with self.assertNumQueries(0):
+            self.assertFalse(revogacao.revogado(token['jti']))
+        revogacao._lista.proxima_atualizacao = 0
+        self.assertTrue(revogacao.revogado(token['jti']))
+
+    def test_token_valido_nao_consulta_o_banco(self):
+        revogacao.revogado('aquecimento')
+        with self.assertNumQueries(0):
+            self.assertFalse(revogacao.revogado('outro-jti'))
+
+
+class EmailLoginTests(TestCase):
+
+    SENHA = 'senha-de-teste-123'
+
+    def setUp(self):
+        self.usuario = criar_usuario(email=' Joao.Silva@Ex.com ')
+        self.usuario.set_password(self.SENHA)
+        self.usuario.save()
+        self.api = APIClient()
+
+    def test_email_login_normalizado(self):
+        self.assertEqual(self.usuario.email_login, 'joao.silva@ex.com')
+        self.assertEqual(Usuario.objects.username_por_email('JOAO.SILVA@ex.com'), self.usuario.username)
+        self.assertIsNone(Usuario.objects.username_por_email(''))
+        # Emails vazios não colidem entre si
+        self.assertIsNone(criar_usuario(email='').email_login)
+        self.assertIsNone(criar_usuario(email='  ').email_login)
+
+    def test_login_sem_diferenciar_maiusculas(self):
+        for url in ('/api/auth/login/', '/api/auth/token/'):
+            resposta = self.api.post(url, {'email': 'JOAO.silva@ex.com', 'password': self.SENHA}, format='json')
+            self.assertEqual(resposta.status_code, 200, url)
+
+    def test_email_desconhecido_gasta_o_hash(self):
+        with mock.patch.object(Usuario.objects, 'simular_verificacao_senha') as simular:
+            for url in ('/api/auth/login/', '/api/auth/token/'):
+                resposta = self.api.post(url, {'email': 'outro@ex.com', 'password': self.SENHA}, format='json')
+                self.assertEqual(resposta.status_code, 401, url)
+        self.assertEqual(simular.call_count, 2)
+
+    def test_email_unico_sem_diferenciar_maiusculas(self):
+        outro = Usuario(username='outro', cpf='999.999.999-99', email='joao.silva@EX.COM')
+        with self.assertRaises(ValidationError):
+            outro.clean()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            outro.save()
 
-# Create your tests here.
+        resposta = self.api.post('/api/auth/register/', {
+            'username': 'outro', 'email': 'JOAO.SILVA@ex.com', 'cpf': '999.999.999-99',
+            'password': self.SENHA, 'password_confirm': self.SENHA,
+        }, format='json')
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn('email', resposta.data)
@@ -0,0 +1,83 @@
+# usuarios/tokens.py
+"""
+Tokens JWT com o escopo do usuário nos claims
+
+Além do `user_id`, o access token leva o que a maioria das requisições
+precisa saber do usuário (CLAIMS_ESCOPO): `is_staff`, `funcionario_id`,
+`gestor_id` (só gestor ativo) e `empresa_id` (do funcionário ou, se não
+houver, do gestor). Com eles usuarios.autenticacao.JWTStatelessAuthentication
+autentica sem ler o Usuario do banco.
+
+Os claims são lidos do banco sempre que um access token é emitido (login e
+refresh). Uma mudança de staff, empresa ou gestor vale a partir do próximo
+refresh, no máximo ACCESS_TOKEN_LIFETIME depois. O refresh de usuário
+inativo ou removido é recusado.
+
+O refresh token revogado (logout ou já usado na rotação) é recusado na
+validação, e /api/auth/token/verify/ recusa qualquer token revogado; a
+revogação fica em usuarios.revogacao.
+"""
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer, TokenVerifySerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken, UntypedToken
+
+from .models import Usuario
+from .revogacao import revogado, revogar
+
+CLAIMS_ESCOPO = ('is_staff', 'funcionario_id', 'gestor_id', 'empresa_id')
+
+
+def claims_do_usuario(usuario_id):
+    """Claims de escopo do usuário ativo (uma consulta); None se inativo ou inexistente"""
+    linha = Usuario.objects.filter(pk=usuario_id).values(
+        'is_active', 'is_staff', 'funcionario__id', 'funcionario__empresa_id',
+        'gestor__id', 'gestor__empresa_id', 'gestor__ativo',
+    ).first()
+    if linha is None or not linha['is_active']:
+        return None
+    gestor_id = linha['gestor__id'] if linha['gestor__ativo'] else None
+    return {
+        'is_staff': linha['is_staff'],
+        'funcionario_id': linha['funcionario__id'],
+        'gestor_id': gestor_id,
+        'empresa_id': linha['funcionario__empresa_id'] or (linha['gestor__empresa_id'] if gestor_id else None),
+    }
+
+
+class RefreshTokenComEscopo(RefreshToken):
+    """Refresh token cujos access tokens saem com os claims de escopo atualizados"""
+
+    def verify(self):
+        super().verify()
+        if revogado(self[api_settings.JTI_CLAIM]):
+            raise TokenError('Token revogado.')
+
+    def blacklist(self):
+        # Chamado pelo TokenRefreshSerializer na rotação (BLACKLIST_AFTER_ROTATION)
+        revogar(self)
+
+    @property
+    def access_token(self):
+        claims = claims_do_usuario(self[api_settings.USER_ID_CLAIM])
+        if claims is None:
+            raise TokenError('Usuário inativo ou inexistente.')
+        access = super().access_token
+        for nome, valor in claims.items():
+            access[nome] = valor
+        return access
+
+
+class TokenRefreshComEscopoSerializer(TokenRefreshSerializer):
+    """Serializer de /api/auth/token/refresh/ (SIMPLE_JWT['TOKEN_REFRESH_SERIALIZER'])"""
+    token_class = RefreshTokenComEscopo
+
+
+class TokenVerifyComRevogacaoSerializer(TokenVerifySerializer):
+    """Serializer de /api/auth/token/verify/ (SIMPLE_JWT['TOKEN_VERIFY_SERIALIZER'])"""
+
+    def validate(self, attrs):
+        token = UntypedToken(attrs['token'])
+        if revogado(token[api_settings.JTI_CLAIM]):
+            raise TokenError('Token revogado.')
+        return {}
@@ -1,11 +1,15 @@
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import Token
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth import authenticate
 from django.contrib.auth.hashers import make_password
 from .models import Usuario
+from .revogacao import revogar
+from .tokens import RefreshTokenComEscopo, TokenRefreshComEscopoSerializer
 from .serializers import (
     UsuarioSerializer, 
     UsuarioCreateSerializer, 
@@ -82,7 +86,7 @@ class UsuarioViewSet(viewsets.ModelViewSet):
         if serializer.is_valid():
             usuario = serializer.save()
             # Cria tokens JWT
-            refresh = RefreshToken.for_user(usuario)
+            refresh = RefreshTokenComEscopo.for_user(usuario)
             access_token = refresh.access_token
             
             return Response({
@@ -111,18 +115,19 @@ class UsuarioViewSet(viewsets.ModelViewSet):
         
         # Se veio email e não veio username, resolver username pelo email
         if email and not username:
-            try:
-                user_obj = Usuario.objects.get(email=email)
-                resolved_username = user_obj.username
-            except Usuario.DoesNotExist:
-                resolved_username = None
+            resolved_username = Usuario.objects.username_por_email(email)
         else:
             resolved_username = username
 
-        user = authenticate(username=resolved_username, password=password) if resolved_username else None
+        if resolved_username:
+            user = authenticate(username=resolved_username, password=password)
+        else:
+            # Email sem conta: recusa sem autenticar, no mesmo tempo de uma senha errada
+            Usuario.objects.simular_verificacao_senha(password)
+            user = None
         if user and user.is_active:
             # Cria tokens JWT
-            refresh = RefreshToken.for_user(user)
+            refresh = RefreshTokenComEscopo.for_user(user)
             access_token = refresh.access_token
             
             return Response({
@@ -141,16 +146,32 @@ class UsuarioViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def logout(self, request):
-        """Endpoint para logout de usuários"""
-        try:
-            # Com JWT, o logout é feito no frontend removendo o token
-            # Aqui podemos adicionar o token à blacklist se necessário
-            return Response({'message': 'Logout realizado com sucesso!'})
-        except:
-            return Response(
-                {'detail': 'Erro ao realizar logout.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        """
+        Endpoint para logout de usuários
+
+        Revoga o access token da requisição e o refresh token enviado em
+        `refresh` (opcional), que deixam de ser aceitos (usuarios.revogacao).
+        """
+        refresh_token = request.data.get('refresh')
+        if refresh_token:
+            try:
+                refresh = RefreshTokenComEscopo(refresh_token)
+            except TokenError:
+                return Response(
+                    {'detail': 'Refresh token inválido ou expirado.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if refresh[api_settings.USER_ID_CLAIM] != request.user.pk:
+                return Response(
+                    {'detail': 'O refresh token não pertence ao usuário logado.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            revogar(refresh)
+
+        # Com autenticação por sessão não há access token a revogar
+        if isinstance(request.auth, Token):
+            revogar(request.auth)
+        return Response({'message': 'Logout realizado com sucesso!'})
     
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def me(self, request):
@@ -215,19 +236,20 @@ class UsuarioViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        # Mesmo fluxo de /api/auth/token/refresh/: com a rotação, o refresh
+        # enviado é revogado e um novo é devolvido
+        serializer = TokenRefreshComEscopoSerializer(data={'refresh': refresh_token})
         try:
-            refresh = RefreshToken(refresh_token)
-            access_token = refresh.access_token
-            
-            return Response({
-                'access': str(access_token),
-                'message': 'Token renovado com sucesso!'
-            })
-        except Exception as e:
+            serializer.is_valid(raise_exception=True)
+        except TokenError:
             return Response(
                 {'detail': 'Refresh token inválido ou expirado.'},
                 status=status.HTTP_401_UNAUTHORIZED
             )
+        return Response({
+            **serializer.validated_data,
+            'message': 'Token renovado com sucesso!'
+        })
 
 
 class EmailOrUsernameTokenObtainPairView(TokenObtainPairView):